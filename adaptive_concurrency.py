@@ -0,0 +1,169 @@
+import os
+import threading
+from contextlib import contextmanager
+from time import monotonic
+from typing import Callable
+
+try:
+    import resource # POSIX のみ
+except ImportError:
+    resource = None
+
+# adaptive_concurrency.py
+# 役割:
+# - --workers auto 用の適応的な同時実行数コントローラ
+# - 接続レイテンシ・タイムアウト率・認証失敗率・ローカル資源(fd / メモリ)を見ながら
+#   実行中セッション数の上限を AIMD (加算増加・乗算減少) で上下させる
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DECREASE_FACTOR = 0.5          # タイムアウト / 認証失敗時に上限を何倍にするか
+LATENCY_DECREASE_FACTOR = 0.8  # 接続レイテンシ悪化時に上限を何倍にするか
+DECREASE_COOLDOWN = 2.0        # 連続した失敗で何度も半減しないための待ち時間(秒)
+LATENCY_EWMA_ALPHA = 0.2       # 接続レイテンシの指数移動平均の重み
+FD_USAGE_HIGH_WATER = 0.8      # open fd がソフトリミットのこの割合を超えたら増やさない
+MEMORY_AVAILABLE_LOW_WATER = 0.1  # 空きメモリがこの割合を下回ったら増やさない
+RESOURCE_CHECK_INTERVAL = 1.0     # fd / メモリを調べ直す間隔(秒)。接続のたびに /proc を読まない
+
+
+def _open_fd_ratio() -> float | None:
+    """使用中の fd 数 / RLIMIT_NOFILE(soft) を返す。取得できない環境では None。"""
+    if resource is None or not os.path.isdir("/proc/self/fd"):
+        return None
+    soft_limit, _hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit <= 0:
+        return None
+    return len(os.listdir("/proc/self/fd")) / soft_limit
+
+
+def _available_memory_ratio() -> float | None:
+    """MemAvailable / MemTotal を返す。/proc/meminfo が無い環境では None。"""
+    meminfo = {}
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                meminfo[key] = int(value.split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    if not meminfo.get("MemTotal") or "MemAvailable" not in meminfo:
+        return None
+    return meminfo["MemAvailable"] / meminfo["MemTotal"]
+
+
+class AdaptiveConcurrencyController:
+    """
+    実行中セッション数の上限を実行中に上下させるコントローラ。
+
+    - `run()` / `slot()` で上限に空きが出るまで待ってから handler を実行する
+    - handler は接続のたびに `record_connect()` で結果を報告する
+        - タイムアウト / 認証失敗 → 上限を乗算で減らす（AAA のスロットリング・WAN 飽和対策）
+        - 接続レイテンシが基準の `latency_tolerance` 倍を超えた → 上限を少し減らす
+        - 問題なく接続できた → 上限 1 つ分の成功ごとに +1（TCP の輻輳制御と同じ考え方）
+        - プールの使い回し / fast-connect はレイテンシを渡さない（成功としてだけ数え、基準のレイテンシには使わない）
+    - ローカルの fd / メモリが逼迫しているときは増やさず、減らす（調べるのは RESOURCE_CHECK_INTERVAL 秒に 1 回）
+    """
+
+    def __init__(self, *, max_limit: int, min_limit: int = 1, initial_limit: int | None = None,
+                 latency_tolerance: float = 3.0):
+        if max_limit <= 0 or min_limit <= 0:
+            raise ValueError("max_limit / min_limit には1以上の整数を指定してくださいケロ🐸")
+
+        self.min_limit = min(min_limit, max_limit)
+        self.max_limit = max_limit
+        self.limit = max(self.min_limit, min(initial_limit or self.min_limit, max_limit))
+        self.latency_tolerance = latency_tolerance
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.baseline_latency: float | None = None  # 観測した中で最も速い接続レイテンシ
+        self.latency_ewma: float | None = None
+        self.error_counts: dict[str, int] = {}
+
+        self._successes_since_increase = 0
+        self._last_decrease = 0.0
+        self._resources_checked_at: float | None = None
+        self._resources_exhausted = False
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """上限に空きが出るまで待ち、実行枠を 1 つ確保する。"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def run(self, handler: Callable, *args, **kwargs):
+        """実行枠を確保してから handler を実行する（ThreadPoolExecutor.submit 用）。"""
+        with self.slot():
+            return handler(*args, **kwargs)
+
+    def record_connect(self, latency: float | None, error_class: str | None = None) -> None:
+        """
+        1 回分の接続結果を報告し、上限を調整する。
+
+        Parameters
+        ----------
+        latency : float | None
+            接続〜enable〜プロンプト確定までの秒数。失敗時、またはフルの接続でない成功（プールの使い回し / fast-connect）は None。
+        error_class : str | None
+            `classify_connection_error()` の分類（"timeout" / "auth" / "enable" / "other"）。成功時は None。
+        """
+        exhausted = error_class is None and self._local_resources_exhausted()
+        with self._condition:
+            if error_class is not None:
+                self.error_counts[error_class] = self.error_counts.get(error_class, 0) + 1
+                if error_class in ("timeout", "auth"):
+                    self._decrease(DECREASE_FACTOR)
+                return
+
+            if latency is not None:
+                self.baseline_latency = latency if self.baseline_latency is None else min(self.baseline_latency, latency)
+                self.latency_ewma = latency if self.latency_ewma is None else (
+                    LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self.latency_ewma)
+
+            if exhausted:
+                self._decrease(LATENCY_DECREASE_FACTOR)
+                return
+
+            if latency is not None and self.latency_ewma > self.baseline_latency * self.latency_tolerance:
+                self._decrease(LATENCY_DECREASE_FACTOR)
+                return
+
+            self._successes_since_increase += 1
+            if self._successes_since_increase >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes_since_increase = 0
+                self._condition.notify_all()
+
+    def _decrease(self, factor: float) -> None:
+        # ロック取得済みで呼ぶこと。
+        now = monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self._successes_since_increase = 0
+        self.limit = max(self.min_limit, int(self.limit * factor))
+
+    def _local_resources_exhausted(self) -> bool:
+        # ロックの外で呼ぶ。RESOURCE_CHECK_INTERVAL 秒以内なら前回の結果を返す（同時に 2 スレッドが調べても害はない）。
+        now = monotonic()
+        if self._resources_checked_at is not None and now - self._resources_checked_at < RESOURCE_CHECK_INTERVAL:
+            return self._resources_exhausted
+        fd_ratio = _open_fd_ratio()
+        memory_ratio = _available_memory_ratio()
+        self._resources_exhausted = ((fd_ratio is not None and fd_ratio >= FD_USAGE_HIGH_WATER)
+                                     or (memory_ratio is not None and memory_ratio <= MEMORY_AVAILABLE_LOW_WATER))
+        self._resources_checked_at = now
+        return self._resources_exhausted
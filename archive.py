@@ -0,0 +1,118 @@
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cmd2
+
+from message import print_info, print_success, print_error
+from log_storage import GC_GRACE_SECONDS, archive_logs, collect_garbage, get_archive_after_days
+
+# archive.py
+# 役割:
+# - `archive` コマンドで、古い日付ディレクトリ（logs/{mode}/{YYYYmmdd}/, logs/{mode}_json/{YYYYmmdd}/）を
+#   月ごとの zip（logs/archive/{mode}/{YYYYmm}.zip）にまとめる
+# - まとめた後も show --log / --diff はファイル名を指定すればそのまま読める（log_storage.py）
+# - まとめたログは目録（log_catalog.py）から外れるので、show --grep の検索・ファイル名の補完の対象にはならない
+# - `gc` コマンドで、log.dedup のオブジェクト（logs/objects/）のうちどの参照ファイルからも指されていないものを消す🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+MODE = ["execute", "console", "configure", "scp"]
+LOG_ROOT = Path("logs")
+
+
+######################
+###  HELP_SECTION  ###
+######################
+archive_mode_help = "アーカイブするモードを指定します。(default: すべて)"
+archive_older_than_help = "この日数より前の日付ディレクトリをまとめます。(default: sys_config.yaml の log.archive_after_days)"
+archive_before_help = "この日付より前（当日は含まない）の日付ディレクトリをまとめます。YYYY-MM-DDで記載します。"
+archive_dry_run_help = "まとめる予定の日付ディレクトリを表示するだけで、何も変更しません。"
+gc_dry_run_help = "消す予定のオブジェクトの数と容量を表示するだけで、何も変更しません。"
+gc_grace_help = f"作られてからこの秒数経っていないオブジェクトは消しません。(default: {GC_GRACE_SECONDS})"
+
+
+######################
+### PARSER_SECTION ###
+######################
+archive_parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
+archive_parser.add_argument("-m", "--mode", nargs="+", default=MODE, choices=MODE, help=archive_mode_help)
+archive_parser.add_argument("--dry-run", action="store_true", help=archive_dry_run_help)
+
+# mutually exclusive
+archive_until = archive_parser.add_mutually_exclusive_group()
+archive_until.add_argument("--older-than", type=int, default=None, metavar="DAYS", help=archive_older_than_help)
+archive_until.add_argument("--before", type=str, default="", metavar="DATE", help=archive_before_help)
+
+gc_parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
+gc_parser.add_argument("--dry-run", action="store_true", help=gc_dry_run_help)
+gc_parser.add_argument("--grace", type=int, default=GC_GRACE_SECONDS, metavar="SECONDS", help=gc_grace_help)
+
+
+@cmd2.with_argparser(archive_parser)
+def do_archive(self, args):
+    """
+    `archive` コマンドのエントリポイント。
+
+    - `archive`                               : log.archive_after_days より前のログをまとめる
+    - `archive --older-than 7 -m execute`     : execute の 7 日より前のログをまとめる
+    - `archive --before 2025-06-01 --dry-run` : 2025-06-01 より前にまとめるディレクトリを確認する
+    """
+    if args.before:
+        try:
+            before = datetime.strptime(args.before.replace("-", ""), "%Y%m%d").strftime("%Y%m%d")
+        except ValueError:
+            print_error(f"--before は YYYY-MM-DD で指定してケロ🐸: {args.before}")
+            return
+    else:
+        days = args.older_than if args.older_than is not None else get_archive_after_days()
+        if days < 1:
+            print_error("--older-than には 1 以上を指定してケロ🐸 (今日のログはまとめない)")
+            return
+        before = (datetime.now() - timedelta(days=days)).strftime("%Y%m%d")
+
+    directories = [directory for mode in args.mode for directory in (mode, f"{mode}_json")]
+    try:
+        results = archive_logs(LOG_ROOT, directories, before=before, dry_run=args.dry_run)
+    except OSError as e:
+        print_error(f"アーカイブに失敗したケロ🐸: {e}")
+        return
+
+    if not results:
+        print_info(f"📭 {before} より前にまとめるログは無いケロ🐸")
+        return
+
+    for bundle, dates in results:
+        if args.dry_run:
+            print_info(f"📦 {bundle} ← {len(dates)} 日分 ({dates[0]} 〜 {dates[-1]}) をまとめる予定ケロ🐸")
+        else:
+            print_success(f"📦 {bundle} ← {len(dates)} 日分 ({dates[0]} 〜 {dates[-1]}) をまとめたケロ🐸")
+    if not args.dry_run:
+        print_info("📦 まとめたログは show --grep とファイル名の補完には出てこないケロ🐸 (show --log でファイル名を指定すれば読める)")
+
+
+@cmd2.with_argparser(gc_parser)
+def do_gc(self, args):
+    """
+    `gc` コマンドのエントリポイント。
+
+    - `gc`           : どこからも参照されていないオブジェクトを消す
+    - `gc --dry-run` : 消す予定の数と容量だけ表示する
+    """
+    if args.grace < 0:
+        print_error("--grace には 0 以上を指定してケロ🐸")
+        return
+    try:
+        removed, freed = collect_garbage(LOG_ROOT, grace_seconds=args.grace, dry_run=args.dry_run)
+    except OSError as e:
+        print_error(f"gc に失敗したケロ🐸: {e}")
+        return
+
+    if not removed:
+        print_info("🧹 消すオブジェクトは無いケロ🐸")
+    elif args.dry_run:
+        print_info(f"🧹 {removed} 個のオブジェクト ({freed / 1024 / 1024:.1f} MiB) を消す予定ケロ🐸")
+    else:
+        print_success(f"🧹 {removed} 個のオブジェクト ({freed / 1024 / 1024:.1f} MiB) を消したケロ🐸")
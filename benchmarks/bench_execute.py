@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+from ruamel.yaml import YAML
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from fake_ios_server import FakeIOSFleet, FakeDeviceProfile  # noqa: E402
+
+# benchmarks/bench_execute.py
+# 役割:
+# - 偽 IOS デバイス（fake_ios_server.py）を N 台立ち上げ、`execute --group` を実際に流してスループットを測る
+# - 台数ごと（既定: 1 / 10 / 100 / 1000）に、hosts/sec・ピーク RSS・フェーズ別レイテンシ（p50/p95/p99）を出す
+#   フェーズ別の所要時間は、実行時に logs/metrics/ に書き出される JSON Lines（run_metrics.py）から集計する
+# - 結果は benchmarks/results/ に JSON で保存し、同じ条件の前回の結果との差分を表示する（バージョン間の劣化の確認用）
+#
+# 使い方:
+#   python benchmarks/bench_execute.py --hosts 1 10 100 --latency 0.05 --output-size 4096
+#   python benchmarks/bench_execute.py --hosts 1000 --workers 100 --label after-pool
+# 注意:
+# - 1000 台ではサーバー・クライアント合わせて数千の fd を使う。ulimit -n が足りなければ上げること
+# - クライアント（KeroRoute 側）は台数ごとに別プロセスで動かす（ピーク RSS を台数ごとに測るため）
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_HOST_COUNTS = (1, 10, 100, 1000)
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+GROUP_NAME = "bench"
+console = Console()
+
+
+def _raise_fd_limit() -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _git_describe() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _prepare_workdir(workdir: Path, fleet: FakeIOSFleet, args) -> None:
+    """inventory.yaml / sys_config.yaml を一時ディレクトリに用意する（KeroRoute はカレントディレクトリから読む）。"""
+    yaml = YAML()
+    with open(workdir / "inventory.yaml", "w", encoding="utf-8") as f:
+        yaml.dump(fleet.inventory(GROUP_NAME), f)
+
+    with open(REPO_ROOT / "sys_config.yaml", encoding="utf-8") as f:
+        sys_config = yaml.load(f)
+    sys_config.setdefault("metrics", {})["enabled"] = True
+    with open(workdir / "sys_config.yaml", "w", encoding="utf-8") as f:
+        yaml.dump(sys_config, f)
+
+
+def _phase_percentiles(metrics_files: list[Path]) -> tuple[dict, int, int]:
+    """logs/metrics/ の JSON Lines からフェーズ別のパーセンタイルと成功 / 失敗数を集計する。"""
+    # KeroRoute のモジュールは import 時にカレントディレクトリの sys_config.yaml を読むので、ここで import する。
+    from run_result import percentile, PERCENTILES
+
+    samples: dict[str, list[float]] = {}
+    ok = failed = 0
+    for path in metrics_files:
+        for line in path.read_text(encoding="utf-8").splitlines():
+            record = json.loads(line)
+            if record.get("type") != "host":
+                continue
+            if record["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+            for name, seconds in record["phases"].items():
+                samples.setdefault(name, []).append(seconds)
+            if record.get("elapsed") is not None:
+                samples.setdefault("total", []).append(record["elapsed"])
+    phases = {name: {f"p{pct}": round(percentile(values, pct), 6) for pct in PERCENTILES} for name, values in samples.items()}
+    return phases, ok, failed
+
+
+def run_client(workdir: Path, execute_line: str, result_file: Path) -> None:
+    """（子プロセス）workdir で `execute --group ...` を 1 回実行し、所要時間とピーク RSS を result_file に書く。"""
+    _raise_fd_limit()
+    os.chdir(workdir)
+    from kero_route import KeroRoute
+
+    app = KeroRoute(stdout=open(os.devnull, "w"))
+    started = time.perf_counter()
+    app.onecmd_plus_hooks(execute_line)
+    elapsed = time.perf_counter() - started
+
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # Linux は KiB
+    result_file.write_text(json.dumps({"elapsed": elapsed, "peak_rss_mb": round(peak_rss_kb / 1024, 1)}), encoding="utf-8")
+
+
+def run_one(host_count: int, args) -> dict:
+    """偽デバイスを host_count 台立ち上げ、子プロセスで execute --group を流して結果を返す。"""
+    profile = FakeDeviceProfile(command_latency=args.latency, output_size=args.output_size, failure_rate=args.failure_rate,
+                                login_privileged=args.login_privileged)
+    with FakeIOSFleet(host_count, profile, seed=args.seed) as fleet, tempfile.TemporaryDirectory(prefix="kero-bench-") as tmp:
+        workdir = Path(tmp)
+        _prepare_workdir(workdir, fleet, args)
+
+        execute_line = f"execute --group {GROUP_NAME} -c {shlex.quote(args.command)}"
+        if args.workers:
+            execute_line += f" --workers {args.workers}"
+        if args.extra:
+            execute_line += f" {args.extra}"
+
+        result_file = workdir / "client_result.json"
+        subprocess.run([sys.executable, __file__, "--client", str(workdir), "--execute-line", execute_line, "--result-file", str(result_file)],
+                       cwd=workdir, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL, check=True)
+
+        client = json.loads(result_file.read_text(encoding="utf-8"))
+        phases, ok, failed = _phase_percentiles(sorted((workdir / "logs" / "metrics").rglob("*.jsonl")))
+
+    return {"hosts": host_count,
+            "elapsed": round(client["elapsed"], 3),
+            "hosts_per_sec": round(host_count / client["elapsed"], 3) if client["elapsed"] > 0 else None,
+            "peak_rss_mb": client["peak_rss_mb"],
+            "ok": ok,
+            "failed": failed,
+            "sessions_failed_by_server": fleet.sessions_failed,
+            "phases": phases}
+
+
+def _params(args) -> dict:
+    return {"command": args.command,
+            "latency": args.latency,
+            "output_size": args.output_size,
+            "failure_rate": args.failure_rate,
+            "login_privileged": args.login_privileged,
+            "workers": args.workers,
+            "extra": args.extra}
+
+
+def _previous_result(params: dict) -> dict | None:
+    """同じ条件で保存された直近の結果。"""
+    for path in sorted(RESULTS_DIR.glob("*.json"), reverse=True):
+        try:
+            saved = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if saved.get("params") == params:
+            return saved
+    return None
+
+
+def _delta(current: float | None, previous: float | None) -> str:
+    if current is None or not previous:
+        return ""
+    return f" ({(current - previous) / previous * 100:+.1f}%)"
+
+
+def print_results(report: dict, previous: dict | None) -> None:
+    previous_by_hosts = {result["hosts"]: result for result in (previous or {}).get("results", [])}
+
+    table = Table(title=f"🐸 execute --group benchmark ({report['label']}) 🐸",
+                  caption=f"compared with: {previous['label']} ({previous['created_at']})" if previous else "no previous result with the same params")
+    for header in ["HOSTS", "ELAPSED", "HOSTS/SEC", "PEAK RSS", "OK/FAILED", "CONNECT P95", "COMMAND P95", "TOTAL P95"]:
+        table.add_column(header)
+    for result in report["results"]:
+        before = previous_by_hosts.get(result["hosts"], {})
+
+        def phase_p95(record, *names):
+            values = [record.get("phases", {}).get(name, {}).get("p95") for name in names]
+            values = [value for value in values if value is not None]
+            return sum(values) if values else None
+
+        def cell(value, previous_value, unit):
+            return f"{value:.3f}{unit}{_delta(value, previous_value)}" if value is not None else "-"
+
+        table.add_row(f"{result['hosts']}",
+                      cell(result["elapsed"], before.get("elapsed"), "s"),
+                      cell(result["hosts_per_sec"], before.get("hosts_per_sec"), ""),
+                      cell(result["peak_rss_mb"], before.get("peak_rss_mb"), "MB"),
+                      f"{result['ok']}/{result['failed']}",
+                      cell(phase_p95(result, "connect", "tcp_connect", "ssh_auth"), phase_p95(before, "connect", "tcp_connect", "ssh_auth"), "s"),
+                      cell(phase_p95(result, "command"), phase_p95(before, "command"), "s"),
+                      cell(phase_p95(result, "total"), phase_p95(before, "total"), "s"))
+    console.print(table)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="execute --group を偽 IOS デバイスに流してスループットを測るケロ🐸")
+    parser.add_argument("--hosts", type=int, nargs="+", default=list(DEFAULT_HOST_COUNTS), help="台数（複数指定可）")
+    parser.add_argument("--command", default="show version", help="実行するコマンド")
+    parser.add_argument("--latency", type=float, default=0.0, help="コマンドごとの応答遅延(秒)")
+    parser.add_argument("--output-size", type=int, default=4096, help="コマンド出力のバイト数")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="セッションを失敗させる確率 (0-1)")
+    parser.add_argument("--login-privileged", action="store_true", help="ログイン直後から # にする（enable を省く）")
+    parser.add_argument("--workers", default=None, help="execute に渡す --workers (N|auto)")
+    parser.add_argument("--extra", default="", help="execute に追加で渡すオプション（例: '--pipeline --stream'）")
+    parser.add_argument("--label", default=None, help="結果に付けるラベル（既定: git describe）")
+    parser.add_argument("--seed", type=int, default=0, help="失敗させるセッションを決める乱数のシード")
+    parser.add_argument("--no-save", action="store_true", help="結果を benchmarks/results/ に保存しない")
+    parser.add_argument("--verbose", action="store_true", help="子プロセスの stderr を表示する")
+    # 子プロセス用（内部）
+    parser.add_argument("--client", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--execute-line", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.client:
+        run_client(args.client, args.execute_line, args.result_file)
+        return
+
+    _raise_fd_limit()
+    os.chdir(REPO_ROOT)
+    label = args.label or _git_describe()
+    params = _params(args)
+    previous = _previous_result(params)
+
+    results = []
+    for host_count in args.hosts:
+        console.print(f"🐸 {host_count} hosts ...")
+        results.append(run_one(host_count, args))
+
+    report = {"label": label,
+              "git_commit": _git_describe(),
+              "created_at": datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "params": params,
+              "results": results}
+    print_results(report, previous)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{label.replace('/', '_')}.json"
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        console.print(f"💾 {path}")
+
+
+if __name__ == "__main__":
+    main()
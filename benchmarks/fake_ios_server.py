@@ -0,0 +1,291 @@
+import random
+import selectors
+import socket
+import threading
+import time
+from dataclasses import dataclass
+
+import paramiko
+
+# benchmarks/fake_ios_server.py
+# 役割:
+# - ベンチマーク用に、ローカルで Cisco IOS っぽく振る舞う SSH サーバーを N 台分立ち上げる（FakeIOSFleet）
+#   - ホストごとに 127.0.0.1 の別ポートで待ち受ける（hostname はプロンプトに出る）
+#   - ユーザー名 / パスワード / enable secret、コマンドごとの遅延、出力サイズ、失敗率を設定できる
+# - Netmiko の cisco_ios ドライバが使う範囲（エコーバック、terminal width/length、enable、show 系、exit）だけを実装する
+# 実機の代わりに、接続〜出力収集〜パース・ログ保存までのスループットを同じ条件で何度でも測るため🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+HOST_KEY_BITS = 2048
+OUTPUT_LINE_WIDTH = 79
+
+
+@dataclass(frozen=True)
+class FakeDeviceProfile:
+    """
+    偽デバイスの振る舞い（全ホスト共通）。
+
+    Attributes
+    ----------
+    username, password : str
+        SSH のログイン情報
+    secret : str
+        enable のパスワード
+    login_privileged : bool
+        True ならログイン直後から特権モード（#）
+    command_latency : float
+        コマンドを受け取ってから出力を返すまでの秒数
+    output_size : int
+        show 系コマンドの出力のバイト数（おおよそ）
+    failure_rate : float
+        セッションごとに失敗させる確率（0〜1）。認証直後に切断する
+    """
+    username: str = "kero"
+    password: str = "kero"
+    secret: str = "kero"
+    login_privileged: bool = False
+    command_latency: float = 0.0
+    output_size: int = 1024
+    failure_rate: float = 0.0
+
+
+_host_key: paramiko.RSAKey | None = None
+_host_key_lock = threading.Lock()
+
+
+def _get_host_key() -> paramiko.RSAKey:
+    """ホスト鍵はプロセスで 1 つだけ作る（生成が遅いので）。"""
+    global _host_key
+    with _host_key_lock:
+        if _host_key is None:
+            _host_key = paramiko.RSAKey.generate(HOST_KEY_BITS)
+        return _host_key
+
+
+def build_output(command: str, hostname: str, size: int) -> str:
+    """command の出力として size バイト程度のテキストを作る。"""
+    header = f"{hostname} output of '{command}'"
+    line = ("Interface              IP-Address      OK? Method Status                Protocol " * 2)[:OUTPUT_LINE_WIDTH]
+    lines = [header]
+    total = len(header)
+    while total < size:
+        lines.append(line)
+        total += len(line) + 2
+    return "\r\n".join(lines)
+
+
+class _ServerInterface(paramiko.ServerInterface):
+    def __init__(self, profile: FakeDeviceProfile):
+        self.profile = profile
+        self.shell_requested = threading.Event()
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if username == self.profile.username and password == self.profile.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_requested.set()
+        return True
+
+
+class FakeIOSSession:
+    """1 SSH セッション分の CLI（行編集なし、エコーバックあり）。"""
+
+    def __init__(self, channel: paramiko.Channel, hostname: str, profile: FakeDeviceProfile):
+        self.channel = channel
+        self.hostname = hostname
+        self.profile = profile
+        self.privileged = profile.login_privileged
+        self._awaiting_secret = False
+
+    @property
+    def prompt(self) -> str:
+        return f"{self.hostname}{'#' if self.privileged else '>'}"
+
+    def run(self) -> None:
+        self.channel.sendall(f"\r\n{self.prompt}".encode())
+        pending = b""
+        last_was_cr = False
+        while True:
+            data = self.channel.recv(4096)
+            if not data:
+                return
+            for byte in data:
+                char = bytes([byte])
+                if char in (b"\r", b"\n"):
+                    if char == b"\n" and last_was_cr:
+                        last_was_cr = False
+                        continue
+                    last_was_cr = char == b"\r"
+                    line, pending = pending.decode(errors="replace"), b""
+                    if not self._awaiting_secret:
+                        self.channel.sendall(b"\r\n")
+                    if not self._handle_line(line.strip()):
+                        return
+                else:
+                    last_was_cr = False
+                    pending += char
+                    if not self._awaiting_secret:
+                        self.channel.sendall(char)
+
+    def _handle_line(self, line: str) -> bool:
+        """1 行分のコマンドを処理する。セッションを終える場合は False。"""
+        if self._awaiting_secret:
+            self._awaiting_secret = False
+            if line == self.profile.secret:
+                self.privileged = True
+                self.channel.sendall(f"\r\n{self.prompt}".encode())
+            else:
+                self.channel.sendall(f"\r\n% Access denied\r\n\r\n{self.prompt}".encode())
+            return True
+
+        if line in ("exit", "logout", "quit"):
+            return False
+        if line in ("enable", "en"):
+            if self.privileged:
+                self.channel.sendall(self.prompt.encode())
+            else:
+                self._awaiting_secret = True
+                self.channel.sendall(b"Password: ")
+            return True
+        if line == "disable":
+            self.privileged = False
+            self.channel.sendall(self.prompt.encode())
+            return True
+        if not line or line.startswith("terminal "):
+            self.channel.sendall(self.prompt.encode())
+            return True
+
+        if self.profile.command_latency > 0:
+            time.sleep(self.profile.command_latency)
+        output = build_output(line, self.hostname, self.profile.output_size)
+        self.channel.sendall(f"{output}\r\n{self.prompt}".encode())
+        return True
+
+
+class FakeIOSFleet:
+    """
+    N 台分の偽 IOS デバイス。`with FakeIOSFleet(100, profile) as fleet:` で起動・停止する。
+
+    すべて 127.0.0.1 で待ち受ける。accept は 1 スレッド（selectors）でまとめて行い、セッションごとにスレッドを立てる。
+    """
+
+    def __init__(self, count: int, profile: FakeDeviceProfile | None = None, *, hostname_prefix: str = "BENCH-R", seed: int | None = None):
+        self.profile = profile or FakeDeviceProfile()
+        self.hostnames = [f"{hostname_prefix}{index:04d}" for index in range(1, count + 1)]
+        self.ports: dict[str, int] = {}
+        self.sessions_started = 0
+        self.sessions_failed = 0
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._sockets: list[socket.socket] = []
+        self._stopped = threading.Event()
+        self._acceptor: threading.Thread | None = None
+
+    def start(self) -> "FakeIOSFleet":
+        _get_host_key()
+        for hostname in self.hostnames:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(16)
+            listener.setblocking(False)
+            self._selector.register(listener, selectors.EVENT_READ, hostname)
+            self._sockets.append(listener)
+            self.ports[hostname] = listener.getsockname()[1]
+        self._acceptor = threading.Thread(target=self._accept_loop, name="fake-ios-accept", daemon=True)
+        self._acceptor.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._acceptor is not None:
+            self._acceptor.join(timeout=5)
+        for listener in self._sockets:
+            self._selector.unregister(listener)
+            listener.close()
+        self._sockets = []
+        self._selector.close()
+
+    def __enter__(self) -> "FakeIOSFleet":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def device(self, hostname: str, *, device_type: str = "cisco_ios") -> dict:
+        """Netmiko の ConnectHandler にそのまま渡せる device 辞書。"""
+        return {"device_type": device_type,
+                "ip": "127.0.0.1",
+                "port": self.ports[hostname],
+                "username": self.profile.username,
+                "password": self.profile.password,
+                "secret": self.profile.secret,
+                "allow_agent": False,
+                "use_keys": False}
+
+    def inventory(self, group: str = "bench") -> dict:
+        """inventory.yaml と同じ形の辞書（全ホストを group に入れる）。"""
+        hosts = {hostname: {"hostname": hostname,
+                            "ip": "127.0.0.1",
+                            "port": self.ports[hostname],
+                            "username": self.profile.username,
+                            "password": self.profile.password,
+                            "secret": self.profile.secret,
+                            "device_type": "cisco_ios",
+                            "timeout": 10,
+                            "ttl": 64,
+                            "description": "fake IOS for benchmarks",
+                            "tags": ["bench"]}
+                 for hostname in self.hostnames}
+        return {"all": {"hosts": hosts,
+                        "groups": {group: {"description": "fake IOS fleet", "tags": ["bench"], "hosts": list(self.hostnames)}}}}
+
+    def _accept_loop(self) -> None:
+        while not self._stopped.is_set():
+            for key, _ in self._selector.select(timeout=0.2):
+                try:
+                    client, _ = key.fileobj.accept()
+                except BlockingIOError:
+                    continue
+                client.setblocking(True)
+                threading.Thread(target=self._serve, args=(client, key.data), name=f"fake-ios-{key.data}", daemon=True).start()
+
+    def _serve(self, client: socket.socket, hostname: str) -> None:
+        with self._rng_lock:
+            self.sessions_started += 1
+            fail = self._rng.random() < self.profile.failure_rate
+
+        transport = paramiko.Transport(client)
+        transport.add_server_key(_get_host_key())
+        interface = _ServerInterface(self.profile)
+        try:
+            transport.start_server(server=interface)
+            channel = transport.accept(timeout=10)
+            if channel is None or not interface.shell_requested.wait(timeout=10):
+                return
+            if fail:
+                with self._rng_lock:
+                    self.sessions_failed += 1
+                return # 認証直後に切断（不安定なデバイスの代わり）
+            FakeIOSSession(channel, hostname, self.profile).run()
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        finally:
+            transport.close()
@@ -0,0 +1,103 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# benchmarks/micro/conftest.py
+# 役割:
+# - マイクロベンチマーク共通の fixture（合成データの生成・カレントディレクトリの切り替え・rich 出力の抑止）
+# - 規模は --bench-scale で切り替える（full: 要求どおりの規模 / quick: 動作確認用の小さい規模）
+#
+# 使い方:
+#   pip install -r requirements-dev.txt                                          # pytest-benchmark
+#   python -m pytest benchmarks/micro --benchmark-autosave                       # full
+#   python -m pytest benchmarks/micro --bench-scale quick --benchmark-disable    # 動くかだけ確認
+#   python -m pytest benchmarks/micro --benchmark-compare                        # 前回の autosave と比較
+
+pytest.importorskip("pytest_benchmark")
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+import synthetic_data  # noqa: E402
+
+# show.py は import 時にカレントディレクトリの sys_config.yaml を読むので、リポジトリ直下で先に import しておく。
+_cwd = os.getcwd()
+os.chdir(REPO_ROOT)
+try:
+    import show  # noqa: E402
+finally:
+    os.chdir(_cwd)
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+MB = 1024 * 1024
+SCALES = {"full": {"inventory_hosts": (10000, 50000),
+                   "payload_sizes": (1 * MB, 20 * MB, 200 * MB),
+                   "log_count": 100000,
+                   "config_lines": 200000},
+          "quick": {"inventory_hosts": (100, 500),
+                    "payload_sizes": (64 * 1024, MB),
+                    "log_count": 1000,
+                    "config_lines": 2000}}
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-scale", choices=sorted(SCALES), default="full", help="合成データの規模 (full|quick)")
+
+
+def pytest_generate_tests(metafunc):
+    scale = SCALES[metafunc.config.getoption("--bench-scale")]
+    if "inventory_hosts" in metafunc.fixturenames:
+        metafunc.parametrize("inventory_hosts", scale["inventory_hosts"], indirect=True, ids=lambda hosts: f"{hosts}hosts")
+    if "payload_size" in metafunc.fixturenames:
+        metafunc.parametrize("payload_size", scale["payload_sizes"], ids=lambda size: f"{size // 1024}KiB")
+
+
+@pytest.fixture(scope="session")
+def bench_scale(request) -> dict:
+    return SCALES[request.config.getoption("--bench-scale")]
+
+
+def _workdir(tmp_path_factory, name: str) -> Path:
+    """KeroRoute はカレントディレクトリの sys_config.yaml を読むので、生成先にもコピーしておく。"""
+    workdir = tmp_path_factory.mktemp(name)
+    shutil.copy(REPO_ROOT / "sys_config.yaml", workdir / "sys_config.yaml")
+    return workdir
+
+
+@pytest.fixture(scope="session")
+def inventory_hosts(request, tmp_path_factory) -> tuple[int, Path]:
+    """（台数, inventory.yaml のあるディレクトリ）。台数ごとに 1 回だけ生成する。"""
+    hosts = request.param
+    workdir = _workdir(tmp_path_factory, f"inventory-{hosts}")
+    synthetic_data.generate_inventory(workdir / "inventory.yaml", hosts)
+    return hosts, workdir
+
+
+@pytest.fixture(scope="session")
+def log_tree(bench_scale, tmp_path_factory) -> Path:
+    workdir = _workdir(tmp_path_factory, "log-tree")
+    synthetic_data.generate_log_tree(workdir, bench_scale["log_count"])
+    return workdir
+
+
+@pytest.fixture(scope="session")
+def diff_pair(bench_scale, tmp_path_factory) -> tuple[Path, tuple[str, str]]:
+    workdir = _workdir(tmp_path_factory, "diff")
+    return workdir, synthetic_data.generate_diff_pair(workdir, bench_scale["config_lines"])
+
+
+@pytest.fixture
+def quiet_console(monkeypatch):
+    """show.py の rich 出力を /dev/null に流す（端末への描画時間を測らないため）。"""
+    from rich.console import Console
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        monkeypatch.setattr(show, "console", Console(file=devnull, width=120))
+        yield
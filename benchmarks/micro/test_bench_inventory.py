@@ -0,0 +1,74 @@
+from load_and_validate_yaml import get_validated_inventory_data
+from completers import host_names_completer, group_names_completer, device_types_completer
+import inventory_cache
+
+# inventory.yaml を読むホットパス（execute / configure の前処理とタブ補完）。
+# 読み込みは inventory_cache 経由なので、2 回目以降の round はメモリ上のキャッシュに当たる。
+# 初回（YAML のパース）とサイドカーからの起動は test_load_inventory_* で別に測る。
+
+
+def test_load_inventory_parse(benchmark, inventory_hosts, monkeypatch):
+    """キャッシュなし（YAML をパースしてサイドカーを書く）。"""
+    hosts, workdir = inventory_hosts
+    monkeypatch.chdir(workdir)
+
+    def cold():
+        inventory_cache.clear_cache()
+        (workdir / ".kero_cache" / "inventory.yaml.pickle").unlink(missing_ok=True)
+
+    inventory = benchmark.pedantic(inventory_cache.load_inventory, setup=cold, rounds=3, iterations=1)
+
+    benchmark.extra_info["hosts"] = hosts
+    assert len(inventory["all"]["hosts"]) == hosts
+
+
+def test_load_inventory_sidecar(benchmark, inventory_hosts, monkeypatch):
+    """起動直後（メモリ上のキャッシュは空、サイドカーはある）。"""
+    hosts, workdir = inventory_hosts
+    monkeypatch.chdir(workdir)
+    inventory_cache.load_inventory()
+
+    inventory = benchmark.pedantic(inventory_cache.load_inventory, setup=inventory_cache.clear_cache, rounds=3, iterations=1)
+
+    benchmark.extra_info["hosts"] = hosts
+    assert len(inventory["all"]["hosts"]) == hosts
+
+
+def test_get_validated_inventory_data(benchmark, inventory_hosts, monkeypatch):
+    hosts, workdir = inventory_hosts
+    monkeypatch.chdir(workdir)
+
+    inventory = benchmark.pedantic(get_validated_inventory_data, kwargs={"group": "group0001"}, rounds=3, iterations=1)
+
+    benchmark.extra_info["hosts"] = hosts
+    assert len(inventory["all"]["hosts"]) == hosts
+
+
+def test_host_names_completer(benchmark, inventory_hosts, monkeypatch):
+    hosts, workdir = inventory_hosts
+    monkeypatch.chdir(workdir)
+
+    candidates = benchmark.pedantic(host_names_completer, args=(None, "R0000", "execute --host R0000", 15, 20), rounds=3, iterations=1)
+
+    benchmark.extra_info["hosts"] = hosts
+    assert candidates and all(candidate.startswith("R0000") for candidate in candidates)
+
+
+def test_group_names_completer(benchmark, inventory_hosts, monkeypatch):
+    hosts, workdir = inventory_hosts
+    monkeypatch.chdir(workdir)
+
+    candidates = benchmark.pedantic(group_names_completer, args=(None, "group", "execute --group group", 16, 21), rounds=3, iterations=1)
+
+    benchmark.extra_info["hosts"] = hosts
+    assert "group0001" in candidates
+
+
+def test_device_types_completer(benchmark, inventory_hosts, monkeypatch):
+    hosts, workdir = inventory_hosts
+    monkeypatch.chdir(workdir)
+
+    candidates = benchmark.pedantic(device_types_completer, args=(None, "cisco", "", 0, 0), rounds=3, iterations=1)
+
+    benchmark.extra_info["hosts"] = hosts
+    assert "cisco_ios" in candidates
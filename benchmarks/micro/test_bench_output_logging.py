@@ -0,0 +1,42 @@
+import argparse
+
+from output_logging import save_log, save_json
+from synthetic_data import build_text_payload, build_json_payload
+
+# --log でのログ保存（1 ホスト分の出力を 1 ファイルに書く）。ペイロードのサイズごとに測る。
+
+
+def _log_args() -> argparse.Namespace:
+    return argparse.Namespace(log=True, memo="", command="show running-config")
+
+
+def test_save_log(benchmark, payload_size, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    payload = build_text_payload(payload_size)
+
+    log_path = benchmark.pedantic(save_log, args=(payload, "R1", _log_args()), rounds=3, iterations=1)
+
+    benchmark.extra_info["bytes"] = payload_size
+    assert log_path.stat().st_size == payload_size
+
+
+def test_save_log_chunks(benchmark, payload_size, tmp_path, monkeypatch):
+    """--stream / HostTextBuffer と同じく、チャンクの iterable で渡す場合。"""
+    monkeypatch.chdir(tmp_path)
+    payload = build_text_payload(payload_size)
+    chunks = [payload[start:start + 64 * 1024] for start in range(0, len(payload), 64 * 1024)]
+
+    log_path = benchmark.pedantic(save_log, args=(chunks, "R1", _log_args()), rounds=3, iterations=1)
+
+    benchmark.extra_info["bytes"] = payload_size
+    assert log_path.stat().st_size == payload_size
+
+
+def test_save_json(benchmark, payload_size, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    payload = build_json_payload(payload_size)
+
+    json_path = benchmark.pedantic(save_json, args=(payload, "R1", _log_args()), kwargs={"parser_kind": "textfsm"}, rounds=3, iterations=1)
+
+    benchmark.extra_info["bytes"] = json_path.stat().st_size
+    assert json_path.stat().st_size > 0
@@ -0,0 +1,43 @@
+import argparse
+from datetime import datetime, timedelta
+
+import show
+from completers import log_filename_completer
+
+# logs/ 配下を走査するホットパス（show --logs / --diff と、--log / --diff のタブ補完）。
+
+
+def _show_args(**overrides) -> argparse.Namespace:
+    values = {"mode": "execute", "logs": True, "date": "", "style": "unified", "keep_html": False, "diff": None}
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def test_show_logs(benchmark, log_tree, quiet_console, monkeypatch):
+    monkeypatch.chdir(log_tree)
+
+    benchmark.pedantic(show._show_logs, args=(_show_args(),), rounds=3, iterations=1)
+
+
+def test_show_logs_date(benchmark, log_tree, quiet_console, monkeypatch):
+    monkeypatch.chdir(log_tree)
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+
+    benchmark.pedantic(show._show_logs, args=(_show_args(date=yesterday),), rounds=3, iterations=1)
+
+
+def test_log_filename_completer(benchmark, log_tree, monkeypatch):
+    monkeypatch.chdir(log_tree)
+    text = datetime.now().strftime("%Y%m%d")
+    line = f"show --log {text}"
+
+    candidates = benchmark.pedantic(log_filename_completer, args=(None, text, line, len(line) - len(text), len(line)), rounds=3, iterations=1)
+
+    assert candidates and all(candidate.startswith(text) for candidate in candidates)
+
+
+def test_show_diff_unified(benchmark, diff_pair, quiet_console, monkeypatch):
+    workdir, (old_log, new_log) = diff_pair
+    monkeypatch.chdir(workdir)
+
+    benchmark.pedantic(show._show_diff, args=(_show_args(logs=False, diff=[old_log, new_log]),), rounds=3, iterations=1)
@@ -0,0 +1,223 @@
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# benchmarks/synthetic_data.py
+# 役割:
+# - マイクロベンチマーク（benchmarks/micro/）用の合成データを作る
+#   - inventory.yaml（1 万〜5 万台規模。グループ・タグ付き）
+#   - logs/{mode}/{YYYYmmdd}/*.log のログツリー（10 万ファイル規模）
+#   - 大きな running-config と、その一部を変えたもう 1 本（show --diff 用）
+#   - save_log / save_json に渡す 1MB〜200MB のペイロード
+# - 本物と同じ形・同じ命名規則で作るので、カレントディレクトリを生成先に移せばそのまま KeroRoute から読める
+#
+# 使い方:
+#   python benchmarks/synthetic_data.py inventory /tmp/kero-synth --hosts 50000
+#   python benchmarks/synthetic_data.py logs /tmp/kero-synth --count 100000 --days 30
+#   python benchmarks/synthetic_data.py diff /tmp/kero-synth --lines 200000
+# 注意:
+# - YAML は ruamel.yaml で dump せず文字列で組み立てる（5 万台を dump すると生成だけで数十秒かかるため）
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEVICE_TYPES = ("cisco_ios", "cisco_xe", "cisco_nxos", "juniper_junos", "arista_eos")
+TAGS = ("core", "dist", "access", "branch", "lab", "backup", "dc", "wan")
+LOG_COMMANDS = ("show-version", "show-ip-interface-brief", "show-running-config", "jizen_command", "jigo_command")
+HOSTS_PER_GROUP = 100
+PAYLOAD_LINE = "GigabitEthernet0/0/0         10.0.0.1        YES NVRAM  up                    up      \n"
+
+
+def host_name(index: int) -> str:
+    return f"R{index:06d}"
+
+
+def generate_inventory(path: str | Path, hosts: int, *, hosts_per_group: int = HOSTS_PER_GROUP, seed: int = 0) -> Path:
+    """
+    hosts 台分の inventory.yaml を path に書く。
+
+    ホスト名は R000001 から連番、グループは hosts_per_group 台ずつ（group0001, group0002, ...）。
+
+    Returns
+    -------
+    Path
+        書き出した inventory.yaml
+    """
+    rng = random.Random(seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    lines = ["all:", "  hosts:"]
+    for index in range(1, hosts + 1):
+        name = host_name(index)
+        tags = ", ".join(f'"{tag}"' for tag in rng.sample(TAGS, 2))
+        lines += [f"    {name}:",
+                  f'      hostname: "{name}"',
+                  f'      ip: "10.{index >> 16 & 0xff}.{index >> 8 & 0xff}.{index & 0xff}"',
+                  '      username: "cisco"',
+                  '      password: "cisco"',
+                  f'      device_type: "{rng.choice(DEVICE_TYPES)}"',
+                  "      port: 22",
+                  "      timeout: 10",
+                  "      ttl: 64",
+                  f"      tags: [{tags}]",
+                  f'      description: "synthetic host {index}"']
+
+    lines.append("  groups:")
+    for group_index, start in enumerate(range(1, hosts + 1, hosts_per_group), start=1):
+        members = ", ".join(host_name(index) for index in range(start, min(start + hosts_per_group, hosts + 1)))
+        lines += [f"    group{group_index:04d}:",
+                  f'      description: "synthetic group {group_index}"',
+                  '      tags: ["synthetic"]',
+                  f"      hosts: [{members}]"]
+
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def generate_log_tree(root: str | Path, count: int, *, mode: str = "execute", days: int = 30, today_share: float = 0.1,
+                      now: datetime | None = None, seed: int = 0) -> list[Path]:
+    """
+    root/logs/{mode}/{YYYYmmdd}/ に count 個の .log を作る。
+
+    today_share の割合を今日の日付ディレクトリに、残りを過去 days 日に均等に割り振る。
+    ファイル名は save_log() と同じ `{YYYYmmdd-HHMMSS}_{hostname}_{command}.log`。
+
+    Returns
+    -------
+    list[Path]
+        作成したログファイル（作成順）
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    log_root = Path(root) / "logs" / mode
+    today_count = int(count * today_share)
+
+    created = []
+    for index in range(count):
+        if index < today_count:
+            stamp = now.replace(hour=0, minute=0, second=0) + timedelta(seconds=index % 86400)
+        else:
+            stamp = now - timedelta(days=1 + index % max(days, 1), seconds=index // max(days, 1) % 86400)
+        date_dir = log_root / stamp.strftime("%Y%m%d")
+        date_dir.mkdir(parents=True, exist_ok=True)
+
+        log_path = date_dir / f"{stamp.strftime('%Y%m%d-%H%M%S')}_{host_name(index % 50000 + 1)}_{rng.choice(LOG_COMMANDS)}.log"
+        fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, f"{log_path.name}\n".encode())
+        finally:
+            os.close(fd)
+        created.append(log_path)
+    return created
+
+
+def generate_running_config(lines: int, *, seed: int = 0) -> list[str]:
+    """lines 行程度の IOS 風 running-config（行末に改行付き）を作る。"""
+    rng = random.Random(seed)
+    config = ["Building configuration...\n", "\n", "version 17.9\n", "hostname SYNTH-R1\n", "!\n"]
+    index = 0
+    while len(config) < lines:
+        index += 1
+        config += [f"interface GigabitEthernet{index // 48}/0/{index % 48}\n",
+                   f" description synthetic-link-{index}\n",
+                   f" ip address 10.{index >> 8 & 0xff}.{index & 0xff}.1 255.255.255.0\n",
+                   f" {'shutdown' if rng.random() < 0.2 else 'no shutdown'}\n",
+                   "!\n"]
+    config.append("end\n")
+    return config
+
+
+def mutate_config(config: list[str], *, change_rate: float = 0.01, seed: int = 1) -> list[str]:
+    """config の change_rate の割合の行を書き換え・削除・追加した別バージョンを返す。"""
+    rng = random.Random(seed)
+    mutated = []
+    for line in config:
+        roll = rng.random()
+        if roll < change_rate / 3:
+            continue
+        if roll < change_rate * 2 / 3:
+            mutated.append(line.replace("synthetic", "changed"))
+        else:
+            mutated.append(line)
+        if rng.random() < change_rate / 3:
+            mutated.append(" ip ospf cost 10\n")
+    return mutated
+
+
+def generate_diff_pair(root: str | Path, lines: int, *, mode: str = "execute", change_rate: float = 0.01, seed: int = 0) -> tuple[str, str]:
+    """
+    root/logs/{mode}/ に running-config のログを 2 本（旧・新）書く。
+
+    Returns
+    -------
+    tuple[str, str]
+        `show --diff OLD NEW` に渡すログファイル名
+    """
+    old = generate_running_config(lines, seed=seed)
+    new = mutate_config(old, change_rate=change_rate, seed=seed + 1)
+    now = datetime.now()
+    names = []
+    for offset, content in ((1, old), (0, new)):
+        stamp = now - timedelta(days=offset)
+        date_dir = Path(root) / "logs" / mode / stamp.strftime("%Y%m%d")
+        date_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{stamp.strftime('%Y%m%d-%H%M%S')}_SYNTH-R1_show-running-config.log"
+        (date_dir / name).write_text("".join(content), encoding="utf-8")
+        names.append(name)
+    return names[0], names[1]
+
+
+def build_text_payload(size: int) -> str:
+    """size バイト程度のコマンド出力風テキスト。"""
+    repeat, remainder = divmod(size, len(PAYLOAD_LINE))
+    return PAYLOAD_LINE * repeat + PAYLOAD_LINE[:remainder]
+
+
+def build_json_payload(size: int) -> list[dict]:
+    """json.dumps したときに size バイト程度になる、パーサ出力風の list[dict]。"""
+    record = {"interface": "GigabitEthernet0/0/0", "ip_address": "10.0.0.1", "ok": "YES", "method": "NVRAM", "status": "up", "protocol": "up"}
+    record_size = len(str(record)) + 2
+    return [dict(record, index=index) for index in range(max(size // record_size, 1))]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="マイクロベンチマーク用の合成データを作るケロ🐸")
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+
+    inventory_parser = subparsers.add_parser("inventory", help="inventory.yaml を作る")
+    inventory_parser.add_argument("output", type=Path, help="出力先ディレクトリ")
+    inventory_parser.add_argument("--hosts", type=int, default=10000, help="台数")
+    inventory_parser.add_argument("--hosts-per-group", type=int, default=HOSTS_PER_GROUP, help="1 グループあたりの台数")
+
+    logs_parser = subparsers.add_parser("logs", help="logs/{mode}/{YYYYmmdd}/*.log を作る")
+    logs_parser.add_argument("output", type=Path, help="出力先ディレクトリ")
+    logs_parser.add_argument("--count", type=int, default=100000, help="ログファイル数")
+    logs_parser.add_argument("--days", type=int, default=30, help="過去何日分に散らすか")
+    logs_parser.add_argument("--mode", default="execute", help="logs/ の下のモード名")
+
+    diff_parser = subparsers.add_parser("diff", help="show --diff 用の running-config ログを 2 本作る")
+    diff_parser.add_argument("output", type=Path, help="出力先ディレクトリ")
+    diff_parser.add_argument("--lines", type=int, default=200000, help="running-config の行数")
+    diff_parser.add_argument("--change-rate", type=float, default=0.01, help="変更する行の割合")
+
+    for subparser in (inventory_parser, logs_parser, diff_parser):
+        subparser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    args = parser.parse_args(argv)
+
+    if args.kind == "inventory":
+        path = generate_inventory(args.output / "inventory.yaml", args.hosts, hosts_per_group=args.hosts_per_group, seed=args.seed)
+        print(f"🐸 {path} ({args.hosts} hosts)")
+    elif args.kind == "logs":
+        created = generate_log_tree(args.output, args.count, mode=args.mode, days=args.days, seed=args.seed)
+        print(f"🐸 {args.output / 'logs' / args.mode} ({len(created)} logs)")
+    else:
+        old, new = generate_diff_pair(args.output, args.lines, change_rate=args.change_rate, seed=args.seed)
+        print(f"🐸 show --diff {old} {new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import re
+from time import perf_counter
+from typing import Callable
+
+from netmiko.base_connection import BaseConnection
+from netmiko.exceptions import ReadTimeout
+
+from load_and_validate_yaml import load_sys_config
+from run_metrics import record_command
+
+# command_pipeline.py
+# 役割:
+# - execute --commands-list --pipeline 用に、コマンド列をまとめて 1 回でチャネルに書き込む
+# - 返ってきたストリームを既知のプロンプトでコマンドごとの出力に切り分ける
+# send_command() を 1 コマンドずつ呼ぶと「送信 → プロンプト待ち」を行数分繰り返すので、
+# 高 RTT の回線ではその往復がそのまま実行時間になる。ウィンドウ単位でまとめて送ればその往復が 1 回で済む🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_PIPELINE_WINDOW = 0           # 1 回にまとめて書き込むコマンド数。0 ならリスト全体
+DEFAULT_PIPELINE_READ_TIMEOUT = 60.0  # 1 コマンド分の出力を待つ秒数
+
+
+def get_pipeline_window() -> int:
+    """
+    `sys_config.yaml` の `executor.pipeline_window` を返す。未設定/不正なら DEFAULT_PIPELINE_WINDOW。
+    do_execute（メインスレッド）で 1 度だけ呼ぶこと。
+    """
+    executor_config = load_sys_config().get("executor") or {}
+    window = executor_config.get("pipeline_window", DEFAULT_PIPELINE_WINDOW)
+    if isinstance(window, int) and window >= 0:
+        return window
+    return DEFAULT_PIPELINE_WINDOW
+
+
+def _split_segment(segment: str, return_char: str = "\n") -> str:
+    """
+    "{command}\\n{output}\\n{prompt}" 形式の 1 コマンド分から、
+    先頭行（コマンドのエコー）と最終行（プロンプト）を取り除いた出力を返す。
+    send_command(strip_prompt=True, strip_command=True) と同じ形になる。
+    """
+    lines = segment.split(return_char)
+    return return_char.join(lines[1:-1])
+
+
+def send_commands_pipelined(connection: BaseConnection, prompt: str, commands: list[str], *, window: int = DEFAULT_PIPELINE_WINDOW,
+                            read_timeout: float = DEFAULT_PIPELINE_READ_TIMEOUT,
+                            command_timeout: Callable[[], float | None] | None = None) -> list[str]:
+    """
+    コマンド列をウィンドウ単位でまとめて書き込み、コマンドごとの出力を返す。
+
+    Parameters
+    ----------
+    connection : BaseConnection
+        特権モード / base_prompt 確定済みで、チャネルに未読データが無い Netmiko 接続
+    prompt : str
+        接続時に取得したプロンプト（例: "R1#"）。出力の区切りに使う。
+    commands : list[str]
+        実行するコマンド列
+    window : int
+        1 回にまとめて書き込むコマンド数。0 ならリスト全体を 1 回で書き込む。
+    read_timeout : float
+        1 コマンド分の出力（次のプロンプト）を待つ秒数
+    command_timeout : Callable[[], float | None] | None
+        指定時は 1 コマンドの出力を待つ直前に呼び、その戻り値を待ち時間にする（None なら read_timeout）。
+        実行全体の期限（--deadline）の残りで毎回切り詰めるため。
+
+    Returns
+    -------
+    list[str]
+        commands と同じ順序の出力（send_command() の戻り値と同じくエコーとプロンプトは除去済み）
+
+    Raises
+    ------
+    netmiko.exceptions.ReadTimeout
+        read_timeout 以内にプロンプトが返ってこなかった場合
+
+    Notes
+    -----
+    - 出力の区切りは「行頭のプロンプト」で判定するので、出力中に行頭からプロンプトと同じ文字列が
+      現れるコマンド（プロンプトを変える / 対話的な確認を求めるコマンド等）には使わないこと。
+    """
+    # 行頭のプロンプトだけを区切りとみなす（出力中の "R1#" のような文字列には反応しない）
+    prompt_pattern = rf"(?:^|\n){re.escape(prompt)}"
+    window = window or len(commands)
+
+    outputs = []
+    for start in range(0, len(commands), window):
+        batch = commands[start:start + window]
+        connection.write_channel("".join(f"{command}{connection.RETURN}" for command in batch))
+
+        # メトリクス上の 1 コマンドの所要時間は、前のコマンドの出力を読み終えてから次のプロンプトまで。
+        started = perf_counter()
+        for command in batch:
+            timeout = (command_timeout() if command_timeout is not None else None) or read_timeout
+            try:
+                segment = connection.read_until_pattern(pattern=prompt_pattern, read_timeout=timeout)
+            except ReadTimeout as e:
+                raise ReadTimeout(f"pipeline: '{command}' の出力が {timeout}s 以内に返ってこなかったケロ🐸") from e
+            output = _split_segment(connection.normalize_linefeeds(segment))
+            finished = perf_counter()
+            record_command(command, finished - started, output)
+            started = finished
+            outputs.append(output)
+
+    return outputs
@@ -1,24 +1,59 @@
-from ruamel.yaml import YAML
 from pathlib import Path
 from typing import List, Set
 import shlex
 
 from load_and_validate_yaml import COMMANDS_LISTS_FILE, CONFIG_LISTS_FILE
+from inventory_cache import INVENTORY_FILE, load_inventory, load_yaml_cached
+from inventory_db import get_inventory_backend
+from completion_index import get_completion_index, get_completion_limit
+from log_catalog import get_log_catalog
 
-_yaml = YAML()
 
+def _inventory_source() -> Path:
+    """inventory の元ファイル（sqlite バックエンドなら DB ファイル）。"""
+    backend = get_inventory_backend()
+    return backend.path if backend is not None else Path(INVENTORY_FILE)
 
-def _load(path: str | Path) -> dict:
-    with open(path, "r", encoding="utf-8") as file_path:
-        return _yaml.load(file_path)
 
+def _collect_device_types() -> Set[str]:
+    types: Set[str] = set()
+
+    # 1. inventory.yaml（または SQLite の inventory）
+    try:
+        backend = get_inventory_backend()
+        if backend is not None:
+            types.update(backend.device_types())
+        else:
+            inventory_data = load_inventory()["all"]["hosts"]
+            for host in inventory_data.values():
+                types.add(host["device_type"])
+    except Exception:
+        pass # 壊れててもかけてても静かに無視
+        
+    # 2. commands-lists.yaml
+    try:
+        commands_lists_data = load_yaml_cached(COMMANDS_LISTS_FILE)["commands_lists"]
+        for commands_list_name in commands_lists_data.keys():    
+            types.add(commands_lists_data[commands_list_name]["device_type"])
+    except Exception:
+        pass # 壊れててもかけてても静かに無視
+
+    # 3. config-lists.yaml
+    try:
+        config_lists_data = load_yaml_cached(CONFIG_LISTS_FILE)["config_lists"]
+        for config_list_name in config_lists_data.keys():
+            types.add(config_lists_data[config_list_name]["device_type"])
+    except Exception:
+        pass # 壊れててもかけてても静かに無視
 
-def _match(candidates: List[str], text:str) -> List[str]:
-    candidate_list = []
-    for candidate in candidates:
-        if candidate.startswith(text):
-            candidate_list.append(candidate)
-    return candidate_list
+    return types
+
+
+def _list_names(file_name: str, section: str) -> List[str]:
+    lists_yaml = load_yaml_cached(file_name).get(section, {})
+    if not isinstance(lists_yaml, dict):
+        return []
+    return list(lists_yaml.keys())
 
 
 def host_names_completer(_self, text :str, _line, _begidx, _endidx) -> List[str]:
@@ -39,8 +74,11 @@ def host_names_completer(_self, text :str, _line, _begidx, _endidx) -> List[str]
         text をプレフィックスに持つ候補一覧（ソート済み）。
     """
     try:
-        inventory_data = _load("inventory.yaml")["all"]["hosts"]
-        return _match(list(inventory_data.keys()), text)
+        backend = get_inventory_backend()
+        if backend is not None:
+            return backend.host_names(text, limit=get_completion_limit())
+        index = get_completion_index("host_names", (INVENTORY_FILE,), lambda: load_inventory()["all"]["hosts"].keys())
+        return index.lookup(text, get_completion_limit())
     except Exception: # ファイルがない、壊れてる、構造がないとか
         return []
 
@@ -63,8 +101,11 @@ def group_names_completer(_self, text :str, _line, _begidx, _endidx) -> List[str
         text をプレフィックスに持つ候補一覧（ソート済み）。
     """
     try:
-        inventory_data = _load("inventory.yaml")["all"]["groups"]
-        return _match(list(inventory_data.keys()), text)
+        backend = get_inventory_backend()
+        if backend is not None:
+            return backend.group_names(text, limit=get_completion_limit())
+        index = get_completion_index("group_names", (INVENTORY_FILE,), lambda: load_inventory()["all"]["groups"].keys())
+        return index.lookup(text, get_completion_limit())
     except Exception: # ファイルがない、壊れてる、構造がないとか
         return []
 
@@ -93,60 +134,21 @@ def device_types_completer(_self, text :str, _line, _begidx, _endidx) -> List[st
     list[str]
         text をプレフィックスに持つ device_type 候補一覧（ソート済み）。
     """   
-    types: Set[str] = set()
-
-    # 1. inventory.yaml
     try:
-        inventory_data = _load("inventory.yaml")["all"]["hosts"]
-        for host in inventory_data.values():
-            types.add(host["device_type"])
+        index = get_completion_index("device_types", (_inventory_source(), COMMANDS_LISTS_FILE, CONFIG_LISTS_FILE), _collect_device_types)
+        return index.lookup(text, get_completion_limit())
     except Exception:
-        pass # 壊れててもかけてても静かに無視
-        
-    # 2. commands-lists.yaml
-    try:
-        commands_lists_data = _load(COMMANDS_LISTS_FILE)["commands_lists"]
-        for commands_list_name in commands_lists_data.keys():    
-            types.add(commands_lists_data[commands_list_name]["device_type"])
-    except Exception:
-        pass # 壊れててもかけてても静かに無視
-
-    # 3. config-lists.yaml
-    try:
-        config_lists_data = _load(CONFIG_LISTS_FILE)["config_lists"]
-        for config_list_name in config_lists_data.keys():
-            types.add(config_lists_data[config_list_name]["device_type"])
-    except Exception:
-        pass # 壊れててもかけてても静かに無視
-
-    # 4. プレフィックス一致で絞り込み
-    device_type_list = []
-    for device_type in sorted(types):
-        if device_type.startswith(text):
-            device_type_list.append(device_type)
-    return device_type_list
+        return []
 
 
 def commands_list_names_completer(_self, text: str, line: str, _begidx, _endidx) -> List[str]:
-    commands_lists_file_path = Path(COMMANDS_LISTS_FILE)
-    if not commands_lists_file_path.exists():
-        return []
-    
     try:
-        commands_lists_yaml = _load(commands_lists_file_path).get("commands_lists", {})
-        if not isinstance(commands_lists_yaml, dict):
-            return []
+        index = get_completion_index("commands_list_names", (COMMANDS_LISTS_FILE,), lambda: _list_names(COMMANDS_LISTS_FILE, "commands_lists"))
+        return index.lookup(text, get_completion_limit())
     except Exception:
-        # 壊れているyamlなどは静かに空のリストを返す。
+        # ファイルが無い・壊れているyamlなどは静かに空のリストを返す。
         return []
 
-    names = []
-    for commands_list_name in commands_lists_yaml.keys():
-            names.append(commands_list_name)
-
-    # プレフィックス一致で絞り込み → ソート済み候補を返す
-    return _match(names, text)
-
 
 def config_list_names_completer(_self, text: str, line: str, _begidx, _endidx) -> List[str]:
     """
@@ -157,28 +159,15 @@ def config_list_names_completer(_self, text: str, line: str, _begidx, _endidx) -
         _begidx   : text の開始位置（未使用）
         _endidx   : text の終了位置（未使用）
     """
-    config_lists_file_path = Path(CONFIG_LISTS_FILE)
-    if not config_lists_file_path.exists():
-        return []
-    
     try:
-        config_lists_yaml = _load(config_lists_file_path).get("config_lists", {})
-        if not isinstance(config_lists_yaml, dict):
-            return []
+        index = get_completion_index("config_list_names", (CONFIG_LISTS_FILE,), lambda: _list_names(CONFIG_LISTS_FILE, "config_lists"))
+        return index.lookup(text, get_completion_limit())
     except Exception:
-        # 壊れているyamlなどは静かに空のリストを返す。
+        # ファイルが無い・壊れているyamlなどは静かに空のリストを返す。
         return []
 
-    names = []
-    for config_list_name in config_lists_yaml.keys():
-            names.append(config_list_name)
-
-    # プレフィックス一致で絞り込み → ソート済み候補を返す
-    return _match(names, text)   
-
 
 def log_filename_completer(_self, text, line, begidx, endidx):
-    # :TODO ログファイルの数が増えたときに1000個とか表示されてしまうので対策が必要。
     # KeroRouteでは、ログファイル補完の候補リストは下に行くほど新しいものが表示される仕様です🐸📄✨
     # 本当は上を最新にしたかったのですが、仕様上難しそうです。🐸📄✨
     # NOTE: nargs=2 でも2つ目の補完が効いているが、cmd2の挙動によるラッキーな仕様かもしれない🐸
@@ -198,17 +187,8 @@ def log_filename_completer(_self, text, line, begidx, endidx):
         except IndexError:
             pass
 
-    log_root = Path("logs") / mode
-    all_logs = sorted(log_root.glob("*/*.log"), key=lambda p: str(p.name), reverse=True)
-
-    # 🐸 NOTE: cmd2の補完順が勝手にソートされる問題への対策
-    # printを1回でも入れると、resultの順序がそのまま反映される不思議な仕様…
-    # 下のprint行をコメントアウトする、しないで昇順と降順が変わってしまう。
-    result = []
-    for log_path in all_logs:
-        if log_path.name.startswith(text):
-            # print(f"match: {log_path.name}")
-            result.append(log_path.name)
-        
-    return result
-    # return list(reversed(result))
+    # 候補は logs/catalog.sqlite3 の目録から新しい順に引き、completion_limit 件で打ち切る。
+    try:
+        return get_log_catalog().names(mode, prefix=text, newest_first=True, limit=get_completion_limit())
+    except Exception:
+        return []
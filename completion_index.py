@@ -0,0 +1,107 @@
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Iterable
+
+from load_and_validate_yaml import load_sys_config
+
+# completion_index.py
+# 役割:
+# - タブ補完の候補（ホスト名 / グループ名 / device_type / commands-list 名 / config-list 名）を索引として持つ
+#   - 元ファイルの mtime / size が変わったときだけ作り直す（TAB を押すたびに YAML を読まない）
+#   - 候補はソート済みの配列に持ち、前方一致は bisect で開始位置を探して連続区間を切り出す
+#   - 返す候補数は user_interface.completion_limit で打ち切る（数万台でも補完が一瞬で返るように）🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_COMPLETION_LIMIT = 200
+
+
+def _signature(paths: Iterable[str | Path]) -> tuple:
+    """元ファイルごとの (絶対パス, mtime_ns, size)。無いファイルは (絶対パス, None, None)。"""
+    signature = []
+    for path in paths:
+        path = Path(path).absolute()
+        try:
+            stat = path.stat()
+            signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((str(path), None, None))
+    return tuple(signature)
+
+
+class CompletionIndex:
+    """
+    補完候補の索引（スレッドセーフ）。
+
+    Parameters
+    ----------
+    sources : tuple[str | Path, ...]
+        候補の元になるファイル。どれかの mtime / size が変わったら build を呼び直す
+    build : Callable[[], Iterable[str]]
+        候補を集める関数。例外はそのまま lookup の呼び出し元に伝わる（キャッシュはしない）
+    """
+
+    def __init__(self, sources: tuple[str | Path, ...], build: Callable[[], Iterable[str]]):
+        self.sources = sources
+        self.build = build
+        self._lock = threading.Lock()
+        self._signature: tuple | None = None
+        self._candidates: list[str] = []
+
+    def candidates(self) -> list[str]:
+        """ソート済みの全候補。元ファイルが変わっていれば作り直す。"""
+        signature = _signature(self.sources)
+        with self._lock:
+            if self._signature != signature:
+                self._candidates = sorted({str(candidate) for candidate in self.build() if candidate is not None})
+                self._signature = signature
+            return self._candidates
+
+    def lookup(self, text: str, limit: int | None = None) -> list[str]:
+        """text で始まる候補をソート順に最大 limit 件（None / 0 以下なら全件）。"""
+        candidates = self.candidates()
+        start = bisect_left(candidates, text)
+        result = []
+        for index in range(start, len(candidates)):
+            candidate = candidates[index]
+            if not candidate.startswith(text):
+                break
+            if limit and limit > 0 and len(result) >= limit:
+                break
+            result.append(candidate)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signature, self._candidates = None, []
+
+
+def get_completion_limit() -> int | None:
+    """`sys_config.yaml` の `user_interface.completion_limit`（0 で無制限）。sys_config.yaml が無ければ既定値。"""
+    try:
+        limit = (load_sys_config().get("user_interface") or {}).get("completion_limit", DEFAULT_COMPLETION_LIMIT)
+    except FileNotFoundError:
+        return DEFAULT_COMPLETION_LIMIT
+    return int(limit) if limit else None
+
+
+_indexes: dict[tuple, CompletionIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_completion_index(name: str, sources: tuple[str | Path, ...], build: Callable[[], Iterable[str]]) -> CompletionIndex:
+    """name と sources の組ごとに 1 つの索引を返す（初回だけ作る）。"""
+    key = (name, tuple(str(Path(source).absolute()) for source in sources))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = CompletionIndex(sources, build)
+        return index
+
+
+def clear_completion_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
@@ -1,15 +1,24 @@
 import argparse
 import cmd2
+from functools import partial
+from time import perf_counter
 from cmd2 import Cmd2ArgumentParser
+from netmiko.exceptions import NetmikoBaseException
+from paramiko.ssh_exception import SSHException
 from rich_argparse import RawTextRichHelpFormatter
 
 from message import print_info, print_success, print_warning, print_error
 from load_and_validate_yaml import get_validated_inventory_data, get_validated_config_list, CONFIG_LISTS_FILE
 from output_logging import save_log
 from build_device import _build_device_and_hostname
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from connect_device import connect_to_device, safe_disconnect
-from workers import default_workers
+from execution_plan import ExecutionPlan, build_configure_plan
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from execution_policy import ExecutionPolicy, build_execution_policy, deadline_option, open_session_with_policy, close_session_with_policy, connect_failure
+from workers import default_workers, workers_option, create_adaptive_controller, AUTO_WORKERS
+from adaptive_concurrency import AdaptiveConcurrencyController
+from prompt_cache import flush_prompt_cache
+from run_metrics import create_run_metrics, record_command, timed
+from run_result import HostResult, RunResult, print_run_summary, STATUS_DEADLINE, STATUS_ERROR
 from completers import host_names_completer, group_names_completer, config_list_names_completer, device_types_completer
 
 
@@ -39,7 +48,15 @@ memo_help = ("ログファイル名に付加する任意のメモ（文字列）
              "example 20250506-125600_R0_show-ip-int-brief_memo.log")
 workers_help = ("並列実行するワーカースレッド数を指定します。\n"
                 "指定しない場合は sys_config.yaml の executor.default_workers を参照します。\n"
-                "そこにも設定が無いときは、グループ台数と 規定上限(DEFAULT_MAX_WORKERS) の小さい方が自動で採用されます。")
+                "そこにも設定が無いときは、グループ台数と 規定上限(DEFAULT_MAX_WORKERS) の小さい方が自動で採用されます。\n"
+                "auto を指定すると接続レイテンシ・タイムアウト/認証失敗率・fd/メモリを見ながら実行中に同時実行数を上下させます。")
+deadline_help = ("実行全体の期限(秒)を指定します。期限を過ぎたら未開始のホストはキャンセルし、実行中のセッションは切断して終了します。\n"
+                 "接続 / 認証 / enable / コマンドごとの期限は sys_config.yaml の connect.deadlines、接続失敗時のリトライは executor.retry で設定します。")
+
+trace_help = ("実行のタイムラインを Chrome trace-event 形式の JSON で FILE に書き出します。\n"
+              "ホストごと・フェーズ（接続 / 認証 / enable / 設定投入 / ログ保存 / 表示）ごとの区間がワーカースレッド別に並びます。\n"
+              "https://ui.perfetto.dev や chrome://tracing で開けます。\n"
+              "example: configure --group tokyo -L ... --trace logs/trace.json")
 
 
 ######################
@@ -55,7 +72,9 @@ netmiko_configure_parser.add_argument("-P", "--port", type=int, default=22, help
 netmiko_configure_parser.add_argument("-t", "--timeout", type=int, default=10, help=timeout_help)
 netmiko_configure_parser.add_argument("-l", "--log", action="store_true", help=log_help)
 netmiko_configure_parser.add_argument("-m", "--memo", type=str, default="", help=memo_help)
-netmiko_configure_parser.add_argument("-w", "--workers", type=int, default=None, metavar="N", help=workers_help)
+netmiko_configure_parser.add_argument("-w", "--workers", type=workers_option, default=None, metavar="N|auto", help=workers_help)
+netmiko_configure_parser.add_argument("--deadline", type=deadline_option, default=None, metavar="SECONDS", help=deadline_help)
+netmiko_configure_parser.add_argument("--trace", type=str, default=None, metavar="FILE", help=trace_help)
 
 # mutually exclusive
 target_node = netmiko_configure_parser.add_mutually_exclusive_group(required=True)
@@ -67,7 +86,7 @@ target_command = netmiko_configure_parser.add_mutually_exclusive_group(required=
 target_command.add_argument("-L", "--config-list", type=str, default="", help=command_list_help, completer=config_list_names_completer)
 
 
-def apply_config_list(connection, hostname, args):
+def apply_config_list(connection, hostname, args, plan: ExecutionPlan | None = None):
     """
     config-lists.yaml で指定された設定コマンド群を投入する。
 
@@ -79,6 +98,8 @@ def apply_config_list(connection, hostname, args):
         ログ|メッセージ表示用の識別子（base_prompt 由来のホスト名）
     args : argparse.Namespace
         CLI 引数。`args.config_list` を使用
+    plan : ExecutionPlan | None
+        `build_configure_plan()` で解決済みの実行計画。指定時は config-lists.yaml を読み直さない
 
     Returns
     -------
@@ -100,27 +121,33 @@ def apply_config_list(connection, hostname, args):
     if not args.config_list:
         raise ValueError("config_listが必要ケロ🐸")
 
-    try:
-        configure_commands = get_validated_config_list(args)
-
-    except (FileNotFoundError, ValueError) as e:
-        raise KeyError(f"[{hostname}] '{CONFIG_LISTS_FILE}' の構造がおかしいケロ🐸 詳細: {e}")
+    if plan is not None and plan.commands:
+        configure_commands = list(plan.commands)
+    else:
+        try:
+            configure_commands = get_validated_config_list(args)
 
+        except (FileNotFoundError, ValueError) as e:
+            raise KeyError(f"[{hostname}] '{CONFIG_LISTS_FILE}' の構造がおかしいケロ🐸 詳細: {e}")
 
 
+    started = perf_counter()
     result_output_string = connection.send_config_set(configure_commands, strip_prompt=False, strip_command=False)
+    record_command(f"config-list: {args.config_list}", perf_counter() - started, result_output_string)
 
     return result_output_string
 
 
 
-def _handle_configure(device: dict, args, poutput, hostname) -> str | None:
+def _handle_configure(device: dict, args, poutput, hostname, *, plan: ExecutionPlan | None = None, concurrency: AdaptiveConcurrencyController | None = None,
+                      policy: ExecutionPolicy | None = None) -> HostResult:
     """
     デバイス接続 → 設定投入 → ログ保存 → 出力表示 までを一括で行う実行ラッパー。
 
     フロー
     ------
-    1) `connect_to_device(device, hostname)` で接続を確立
+    1) `open_session_with_policy(device, hostname, policy)` で接続を確立（コネクションプール有効時はプールから借りる）
+       - フェーズごとの期限・接続失敗時のリトライは policy に従う
        - 成功時、特権モード(#) へ昇格済み
        - `set_base_prompt()` 済み
        - `(connection, prompt, hostname)` を受け取る（hostname は base_prompt 由来）
@@ -138,11 +165,17 @@ def _handle_configure(device: dict, args, poutput, hostname) -> str | None:
         cmd2 の出力関数（着色や装飾を統一するために使用）
     hostname : str
         接続前の識別子（IP または inventory の hostname）。接続後は base_prompt 由来に更新される
+    plan : ExecutionPlan | None
+        do_configure で 1 度だけ解決した config-list の実行計画
+    concurrency : AdaptiveConcurrencyController | None
+        --workers auto 時に接続結果（レイテンシ / 失敗種別）を報告する先
+    policy : ExecutionPolicy | None
+        フェーズごとの期限・接続リトライ・実行全体の期限（--deadline）。None なら Netmiko の既定値でリトライなし
 
     Returns
     -------
-    None | str
-        成功時は None。失敗時は識別子（hostname）を返す（上位で失敗ノードとして集計する用）
+    HostResult
+        成否・失敗の分類・ログの保存先（上位で RunResult に集計する用）
 
     Raises
     ------
@@ -150,41 +183,52 @@ def _handle_configure(device: dict, args, poutput, hostname) -> str | None:
 
     Notes
     -----
-    - 例外時／終了時の切断は `safe_disconnect()` を使用して元例外を潰さない
+    - 例外時／終了時の切断は `close_session_with_policy()` を使用して元例外を潰さない（プール有効時は返却）
     - 画面表示は `--no-output` | `--quiet` の指定に従う🐸
     """
     result_output_string = ""
+    if policy is None:
+        policy = ExecutionPolicy()
 
     # ✅ 1. 接続とプロンプト取得（接続＝特権化＆base_prompt確定＆prompt取得まで完了）
     try:
-        connection, prompt, hostname = connect_to_device(device, hostname)
+        connection, prompt, hostname = open_session_with_policy(device, hostname, policy, concurrency=concurrency)
     except ConnectionError as e:
         print_error(str(e))
-        return hostname # 接続失敗時にhostnameをreturn
-    
+        return connect_failure(hostname, e) # 接続失敗
+
     print_success(f"NODE: {hostname} 🔗接続成功ケロ🐸")
     
     
     # ✅ 2. 設定変更（config-list）
+    # 接続してから経った分を --deadline の残りで切り詰め直す。
+    policy.refresh_command_timeout(connection)
     try:
-        result_output_string = apply_config_list(connection, hostname, args)
-    except (KeyError, ValueError) as e:
+        result_output_string = apply_config_list(connection, hostname, args, plan=plan)
+    except (KeyError, ValueError, NetmikoBaseException, SSHException, OSError, EOFError) as e:
+        # config-list の不備（KeyError / ValueError）に加え、期限切れでセッションを切断された場合の
+        # netmiko / paramiko / ソケットの例外もここに来る（状態が不明なのでプールに戻さない）
         print_error(str(e))
-        safe_disconnect(connection)
-        return hostname # 設定投入失敗時にhostnameをreturn
+        close_session_with_policy(connection, policy, discard=True)
+        if policy.deadline.expired:
+            return HostResult.failure(hostname, "deadline", e, status=STATUS_DEADLINE)
+        return HostResult.failure(hostname, "command", e) # 設定投入失敗
 
-    # ✅ 3. 接続終了
-    safe_disconnect(connection)
+    # ✅ 3. 接続終了（プール有効時は返却）
+    close_session_with_policy(connection, policy)
 
     # ✅ 4. ログ保存（--log指定時のみ）
+    log_path = None
     if args.log:
-        save_log(result_output_string, hostname, args, mode="configure")
+        with timed("save_log"):
+            log_path = save_log(result_output_string, hostname, args, mode="configure")
 
     # ✅ 5. 結果表示
-    print_info(f"NODE: {hostname} 📄OUTPUTケロ🐸")
-    poutput(result_output_string)
+    with timed("display"):
+        print_info(f"NODE: {hostname} 📄OUTPUTケロ🐸")
+        poutput(result_output_string)
     print_success(f"NODE: {hostname} 🔚実行完了ケロ🐸")
-    return None # 成功時にNoneを返す。
+    return HostResult.success(hostname, log_path=log_path)
 
 
 @cmd2.with_argparser(netmiko_configure_parser)
@@ -201,7 +245,7 @@ def do_configure(self, args):
     実装メモ
     -------
     - 実処理は `_handle_configure()` に委譲
-    - 接続確立は `connect_to_device()` を使用
+    - 接続確立は `open_session_with_policy()` を使用
         - 成功時点で特権モード/# かつ base_prompt 確定済み
         - `(connection, prompt, hostname)` を受け取り、hostname は base_prompt 由来へ更新
     - ログ保存は `--log` 指定時のみ実施（ファイル名は hostname を組み込む）
@@ -213,11 +257,26 @@ def do_configure(self, args):
     - グループ実行時は失敗ノードを集計して最後に要約表示する🐸
     """
 
+    # config-list の解決は全ホスト共通なので、接続前に 1 度だけ行う。
+    try:
+        plan = build_configure_plan(args)
+    except (FileNotFoundError, ValueError) as e:
+        print_error(str(e))
+        return
+
+    # 期限 / リトライ（connect.deadlines / executor.retry）。--deadline の残り時間はここから数える。
+    try:
+        policy = build_execution_policy(args)
+    except ValueError as e:
+        print_error(str(e))
+        return
+
     if args.ip:
         device, hostname = _build_device_and_hostname(args)
-        result_failed_hostname = _handle_configure(device,  args, self.poutput, hostname)
-        if result_failed_hostname:
-            print_error(f"❎ 🐸なんかトラブルケロ@: {result_failed_hostname}")
+        with create_run_metrics("configure", args) as run_metrics:
+            host_result = run_metrics.run(_handle_configure, device, args, self.poutput, hostname, plan=plan, policy=policy)
+        if not host_result.ok:
+            print_error(f"❎ 🐸なんかトラブルケロ@: {host_result.hostname}")
         return
     
     elif args.host or args.group:
@@ -230,9 +289,10 @@ def do_configure(self, args):
     
     if args.host:
         device, hostname = _build_device_and_hostname(args, inventory_data)
-        result_failed_hostname = _handle_configure(device, args, self.poutput, hostname)
-        if result_failed_hostname:
-            print_error(f"❎ 🐸なんかトラブルケロ@: {result_failed_hostname}")
+        with create_run_metrics("configure", args) as run_metrics:
+            host_result = run_metrics.run(_handle_configure, device, args, self.poutput, hostname, plan=plan, policy=policy)
+        if not host_result.ok:
+            print_error(f"❎ 🐸なんかトラブルケロ@: {host_result.hostname}")
         return
 
     elif args.group:
@@ -240,27 +300,62 @@ def do_configure(self, args):
 
         max_workers = default_workers(len(device_list), args)
 
-        result_failed_hostname_list = []
+        # --workers auto のときは確保した枠の中で同時実行数を実行中に上下させる。
+        try:
+            concurrency = create_adaptive_controller(max_workers) if args.workers == AUTO_WORKERS else None
+        except ValueError as e:
+            print_error(str(e))
+            return
+        # フェーズごとの所要時間は logs/metrics/ にホストごとに追記する（sys_config.yaml の metrics.enabled）
+        run_metrics = create_run_metrics("configure", args)
+        run_metrics.workers = max_workers
+        handler = partial(run_metrics.run, _handle_configure)
+        handler = partial(concurrency.run, handler) if concurrency else handler
+
+        # 全ホストの HostResult を集め、最後にフェーズ別のパーセンタイル等をサマリ表示する。
+        run_result = RunResult("configure")
 
-        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        with run_metrics, ThreadPoolExecutor(max_workers=max_workers) as pool:
 
             futures = []
+            future_to_hostname = {}
             for device, hostname in zip(device_list, hostname_list):
-                future = pool.submit(_handle_configure, device, args, self.poutput, hostname)
+                future = pool.submit(handler, device, args, self.poutput, hostname, plan=plan, concurrency=concurrency, policy=policy)
                 futures.append(future)
+                future_to_hostname[future] = hostname
 
-            for future in as_completed(futures):
+            def _collect(future):
                 try:
-                    result_failed_hostname = future.result() # None or "R0"
-                    if result_failed_hostname: # 失敗したら文字列が帰る🐸
-                        result_failed_hostname_list.append(result_failed_hostname)
+                    run_result.add(future.result())
                 except Exception as e:
                     # _handle_configure で捕まえていない想定外の例外
-                    print_error(f"⚠️ 未処理の例外: {hostname}:{e}")
+                    print_error(f"⚠️ 未処理の例外: {future_to_hostname[future]}:{e}")
+                    run_result.add(HostResult.failure(future_to_hostname[future], "unhandled", e, status=STATUS_ERROR))
+
+            pending = set(futures)
+            try:
+                for future in as_completed(futures, timeout=policy.deadline.remaining()):
+                    pending.discard(future)
+                    _collect(future)
+            except FuturesTimeoutError:
+                # --deadline: 未開始のホストはキャンセルし、実行中のセッションは切断して終わらせる。
+                policy.abort(pending)
+                for future in [f for f in futures if f in pending]:
+                    if future.done() and not future.cancelled():
+                        _collect(future)
+                    else:
+                        run_result.add(HostResult.failure(future_to_hostname[future], "deadline", "実行全体の期限で打ち切り", status=STATUS_DEADLINE))
 
         # 結果をまとめて表示
-        if result_failed_hostname_list:
-            print_warning(f"❎ 🐸なんかトラブルケロ: {', '.join(sorted(result_failed_hostname_list))}")
+        run_result.finish()
+        # 実行中に覚えたプロンプトはここでまとめてファイルに書く（ホストごとには書かない）。
+        flush_prompt_cache()
+        print_run_summary(run_result)
+        deadline_hostnames = run_result.hostnames_with_status(STATUS_DEADLINE)
+        if deadline_hostnames:
+            print_warning(f"⏰ 実行全体の期限({args.deadline}s)で打ち切ったケロ🐸: {', '.join(deadline_hostnames)}")
+        if run_result.failed:
+            print_warning(f"❎ 🐸なんかトラブルケロ: {', '.join(run_result.failed_hostnames)}")
         else:
             print_success("✅ すべてのホストで設定完了ケロ🐸")
 
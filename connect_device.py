@@ -1,15 +1,46 @@
+import socket
+import threading
 from contextlib import suppress
 from netmiko import ConnectHandler
 from netmiko.base_connection import BaseConnection 
 from netmiko.exceptions import NetMikoTimeoutException, NetMikoAuthenticationException
 from prompt_utils import get_prompt, ensure_enable_mode, EnableModeError
+from prompt_cache import get_prompt_cache
+from rate_limiter import get_connection_rate_limiter, pop_rate_limit_wait
+from run_metrics import current_timings, timed
 
 # connect_device.py
 # 役割:
 # - Netmiko接続の確立（connect_to_device）
 # - 失敗/例外時の安全な切断（safe_disconnect）
+# - コネクションプール経由の貸し借り（open_session / close_session）
 # このモジュールは「接続ライフサイクル（open/close）」を司る。
 
+
+#######################
+###  CONST_SECTION  ###
+#######################
+# open_session() がどうやって接続を用意したか（pop_connect_kind()）。
+CONNECT_FULL = "full"      # ConnectHandler から enable / プロンプト確定まで通常の手順
+CONNECT_FAST = "fast"      # fast-connect（キャッシュしたプロンプトとの照合だけ）
+CONNECT_POOLED = "pooled"  # コネクションプールのセッションを使い回した
+
+# --workers auto はフルの接続のレイテンシだけを基準にするので、スレッドごとに直近の接続の種類を記録する。
+_connect_record = threading.local()
+
+
+def record_connect_kind(kind: str) -> None:
+    """このスレッドで直近に用意した接続の種類を記録する（connect_to_device / コネクションプールから呼ぶ）。"""
+    _connect_record.kind = kind
+
+
+def pop_connect_kind() -> str | None:
+    """このスレッドで前回の呼び出し以降に用意した接続の種類を返し、クリアする。記録が無ければ None。"""
+    kind = getattr(_connect_record, "kind", None)
+    _connect_record.kind = None
+    return kind
+
+
 def safe_disconnect(connection: BaseConnection | None) -> None:
     """クリーンアップ中の例外で元例外を潰さないために安全に切断する"""
     if connection is None:
@@ -19,6 +50,115 @@ def safe_disconnect(connection: BaseConnection | None) -> None:
         connection.disconnect()
 
 
+def classify_connection_error(error: ConnectionError) -> str:
+    """
+    connect_to_device() / connect_to_device_for_console() が送出した ConnectionError を
+    原因(__cause__)から分類する。
+
+    Returns
+    -------
+    str
+        "timeout" / "auth" / "enable" / "other"
+    """
+    # enable 失敗は ConnectionError が二重にラップされるので、原因をたどって判定する。
+    cause = error.__cause__
+    while cause is not None:
+        if isinstance(cause, NetMikoTimeoutException):
+            return "timeout"
+        if isinstance(cause, NetMikoAuthenticationException):
+            return "auth"
+        if isinstance(cause, EnableModeError):
+            return "enable"
+        cause = cause.__cause__
+    return "other"
+
+
+def _can_preconnect(device: dict) -> bool:
+    """TCP 接続を ConnectHandler の外で先に張ってよいか（素の SSH 接続のときだけ）。"""
+    device_type = device.get("device_type", "")
+    return (not device_type.endswith(("_telnet", "_serial"))
+            and not device.get("sock")
+            and not device.get("ssh_config_file")
+            and not device.get("serial_settings"))
+
+
+def _preconnect_socket(device: dict) -> socket.socket:
+    """
+    TCP 接続だけを先に行い、ソケットを返す（ConnectHandler(sock=...) に渡す）。
+    メトリクス計測時に「TCP 接続」と「SSH 認証」の所要時間を分けるために使う。
+
+    Raises
+    ------
+    NetMikoTimeoutException
+        TCP 接続に失敗した場合（Netmiko 自身が接続した場合と同じ例外に揃える）
+    """
+    host = device.get("host") or device.get("ip")
+    port = device.get("port") or 22
+    try:
+        return socket.create_connection((host, port), timeout=device.get("conn_timeout", 10))
+    except OSError as e:
+        raise NetMikoTimeoutException(f"TCP connection to device failed: {host}:{port} ({e})") from e
+
+
+def _connect_handler(device: dict) -> BaseConnection:
+    """
+    ConnectHandler(**device) を呼ぶ。処理中のホストのメトリクスを書き出す（metrics / --trace / Prometheus）場合だけ、
+    TCP 接続（tcp_connect）と SSH 認証〜セッション準備（ssh_auth）を分けて計測する。
+    書き出さないときは ConnectHandler にそのまま任せる（proxy / ssh_config / IPv6 / conn_timeout の扱いを変えない）。
+    """
+    timings = current_timings()
+    if timings is None or not timings.detailed or not _can_preconnect(device):
+        with timed("connect"):
+            return ConnectHandler(**device)
+
+    with timed("tcp_connect"):
+        sock = _preconnect_socket(device)
+    try:
+        with timed("ssh_auth"):
+            return ConnectHandler(**device, sock=sock)
+    except Exception:
+        with suppress(Exception):
+            sock.close()
+        raise
+
+
+def _fast_connect(connection: BaseConnection, cached: dict, require_enable: bool) -> tuple[str, str] | None:
+    """
+    fast-connect: キャッシュ済みのプロンプト情報を find_prompt() 1 回で照合する。
+
+    - ログイン直後のプロンプトがキャッシュと一致すれば、enable 確認 / set_base_prompt / get_prompt を省略する
+    - キャッシュ上 enable が必要なホストで `>` だった場合は、確認を挟まず enable() だけ行う
+    - 一致しなければ None を返す（呼び出し側で通常の手順にフォールバック）
+
+    Raises
+    ------
+    EnableModeError
+        enable() に失敗した場合
+    """
+    base_prompt = cached["base_prompt"]
+    # Netmiko はセッション準備時に base_prompt を確定済み。ここが違えば別の機器/設定変更とみなす。
+    if connection.base_prompt != base_prompt:
+        return None
+
+    with timed("fast_connect"):
+        prompt = connection.find_prompt()
+    if not require_enable:
+        return (prompt, cached["hostname"]) if prompt.startswith(base_prompt) else None
+
+    if prompt == cached["prompt"]:
+        return prompt, cached["hostname"]
+
+    if cached["enable_required"] and prompt == f"{base_prompt}>":
+        try:
+            with timed("enable"):
+                connection.enable()
+        except Exception as e:
+            raise EnableModeError(str(e)) from e
+        return cached["prompt"], cached["hostname"]
+
+    return None
+
+
 def connect_to_device(device: dict, hostname:str, require_enable: bool = True) -> tuple[BaseConnection, str, str]:
     """
     SSH セッションを確立し、(必要なら) 特権モード (#) に昇格させてから
@@ -33,6 +173,13 @@ def connect_to_device(device: dict, hostname:str, require_enable: bool = True) -
     - require_enable=False のとき:
         - enable は実施しない（ユーザーモードのまま）
         - set_base_prompt() は実行（ベースプロンプトは確定）
+    - `sys_config.yaml` の `connect.rate_limit.enabled` が true のとき:
+        - ConnectHandler の前にトークンバケット（全体 / グループ / タグ）+ jitter で接続開始を待たせる
+    - `sys_config.yaml` の `connect.fast_connect` が true のとき:
+        - 前回接続時のプロンプト / enable の要否をキャッシュし、次回は find_prompt() 1 回の照合だけで済ませる
+        - 照合に失敗したらキャッシュを捨てて上記の通常手順で接続し直し、キャッシュを更新する
+    - メトリクスを書き出している（`RunMetrics.run()` の中で metrics / --trace / Prometheus のどれかが有効な）とき:
+        - TCP 接続を ConnectHandler の前に張り、tcp_connect / ssh_auth / enable / set_base_prompt を分けて記録する
 
     Parameters
     ----------
@@ -65,21 +212,55 @@ def connect_to_device(device: dict, hostname:str, require_enable: bool = True) -
     """
     
     connection: BaseConnection | None = None  # 例外時の安全なdisconnect用に先行定義
+    prompt_cache = get_prompt_cache()
 
     try:   
-        connection = ConnectHandler(**device)
+        # 接続開始レートの制限（connect.rate_limit）。AAA サーバーに認証要求が一度に集中しないようにする。
+        rate_limiter = get_connection_rate_limiter()
+        if rate_limiter is not None:
+            with timed("rate_limit_wait"):
+                rate_limiter.wait_for_slot(hostname, device)
 
+        connection = _connect_handler(device)
+
+        # ✅ fast-connect（キャッシュが使えればここで終わり）
+        cached = prompt_cache.get(device) if prompt_cache is not None else None
+        if cached is not None:
+            try:
+                fast_result = _fast_connect(connection, cached, require_enable)
+            except EnableModeError as e:
+                safe_disconnect(connection)
+                raise ConnectionError(f"[{hostname}] Enableモードに移行できなかったケロ🐸 Secretが間違ってないケロ？ {e}") from e
+            if fast_result is not None:
+                prompt, hostname = fast_result
+                record_connect_kind(CONNECT_FAST)
+                return connection, prompt, hostname
+            prompt_cache.invalidate(device)
+
+        enable_required = False
         if require_enable:
             try:
-                ensure_enable_mode(connection)
+                with timed("enable"):
+                    enable_required = ensure_enable_mode(connection)
             except EnableModeError as e:
                 safe_disconnect(connection)
                 raise ConnectionError(f"[{hostname}] Enableモードに移行できなかったケロ🐸 Secretが間違ってないケロ？ {e}") from e
         
         # enable成功後にbase promptを一度だけ取得。
-        connection.set_base_prompt()
-        prompt, hostname = get_prompt(connection)
+        with timed("set_base_prompt"):
+            connection.set_base_prompt()
+        with timed("get_prompt"):
+            prompt, hostname = get_prompt(connection)
 
+        # ユーザーモードのままの接続では enable の要否が分からないのでキャッシュしない。
+        if prompt_cache is not None and require_enable:
+            prompt_cache.put(device,
+                             base_prompt=connection.base_prompt,
+                             prompt=prompt,
+                             hostname=hostname,
+                             enable_required=enable_required)
+
+        record_connect_kind(CONNECT_FULL)
         return connection, prompt, hostname
 
     except NetMikoTimeoutException as e:
@@ -118,18 +299,28 @@ def connect_to_device_for_console(device: dict, hostname: str, require_enable: b
 
     # シリアルでもAPIは同じ。host/ip チェックは device 側で満たしておくこと（build_deviceで対応済）
     try:
-        connection = ConnectHandler(**device)
+        # ターミナルサーバー経由でも AAA 認証は発生するので、SSH と同じく接続開始レートを制限する。
+        rate_limiter = get_connection_rate_limiter()
+        if rate_limiter is not None:
+            with timed("rate_limit_wait"):
+                rate_limiter.wait_for_slot(hostname, device)
+
+        with timed("connect"):
+            connection = ConnectHandler(**device)
 
         if require_enable:
             try:
-                ensure_enable_mode(connection)
+                with timed("enable"):
+                    ensure_enable_mode(connection)
             except EnableModeError as e:
                 safe_disconnect(connection)
                 raise ConnectionError(f"[{hostname}] Enableモードに移行できなかったケロ🐸 Secretが間違ってないケロ？ {e}") from e
 
         # enable成功後にbase promptを一度だけ取得。
-        connection.set_base_prompt()
-        prompt, hostname = get_prompt(connection)
+        with timed("set_base_prompt"):
+            connection.set_base_prompt()
+        with timed("get_prompt"):
+            prompt, hostname = get_prompt(connection)
 
         return connection, prompt, hostname
     
@@ -144,4 +335,44 @@ def connect_to_device_for_console(device: dict, hostname: str, require_enable: b
     except Exception as e:
         # ConnectHandler失敗直後など、connectionが無い可能性がある
         safe_disconnect(connection)
-        raise ConnectionError(f"[{hostname}]に接続できないケロ。🐸 詳細: \n {e}") from e
\ No newline at end of file
+        raise ConnectionError(f"[{hostname}]に接続できないケロ。🐸 詳細: \n {e}") from e
+
+
+def open_session(device: dict, hostname: str, require_enable: bool = True) -> tuple[BaseConnection, str, str]:
+    """
+    execute / configure / scp 用の接続取得口。
+
+    `sys_config.yaml` の `connection_pool.enabled` が true ならプールから借り（無ければ新規接続してプールに登録）、
+    false なら `connect_to_device()` と同じく毎回新規接続する。戻り値・例外は `connect_to_device()` と同じ。
+    取得した接続は必ず `close_session()` で返すこと。
+    """
+    # connection_pool は connect_device を import するので、ここで遅延 import する。
+    from connection_pool import get_connection_pool
+
+    # 前回（失敗した接続など）のリミッタ待ち時間・接続の種類が残っていれば捨てる。
+    pop_rate_limit_wait()
+    pop_connect_kind()
+
+    pool = get_connection_pool()
+    if pool is None:
+        return connect_to_device(device, hostname, require_enable=require_enable)
+    session = pool.acquire(device, hostname, require_enable=require_enable)
+    if getattr(_connect_record, "kind", None) is None:
+        record_connect_kind(CONNECT_POOLED) # connect_to_device() を通っていない = プールのセッションを使い回した
+    return session
+
+
+def close_session(connection: BaseConnection | None, *, discard: bool = False) -> None:
+    """
+    `open_session()` で取得した接続を返す。
+
+    プール有効時はプールに返却し（discard=True のときは切断して破棄）、無効時は `safe_disconnect()` する。
+    コマンド実行中に例外が起きた接続はプロンプト状態が不明なので discard=True で返すこと🐸
+    """
+    from connection_pool import get_connection_pool
+
+    pool = get_connection_pool()
+    if pool is None:
+        safe_disconnect(connection)
+        return
+    pool.release(connection, discard=discard)
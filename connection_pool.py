@@ -0,0 +1,264 @@
+import argparse
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from time import monotonic
+
+import cmd2
+from netmiko.base_connection import BaseConnection
+
+from message import print_info, print_success
+from load_and_validate_yaml import load_sys_config
+
+# connection_pool.py
+# 役割:
+# - cmd2 プロセス内で SSH セッションを使い回すコネクションプール
+# - execute / configure / scp は connect_device.open_session() 経由でここから借りる
+# - keepalive / idle TTL / LRU 退避 / 最大数 / 再利用前のヘルスチェックを担当する
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_POOL_MAX_SIZE = 300   # プールに保持するセッション数の上限
+DEFAULT_POOL_IDLE_TTL = 300   # 未使用のまま何秒経ったら切断するか
+DEFAULT_POOL_KEEPALIVE = 30   # SSH keepalive の送信間隔(秒)。Netmiko の keepalive に渡す。
+
+
+######################
+###  HELP_SECTION  ###
+######################
+pool_action_help = ("flush: プール内の未使用セッションをすべて切断します。(使用中のセッションは返却時に切断されます)\n"
+                    "show : プールの中身を表示します。(show --pool と同じ)")
+
+
+######################
+### PARSER_SECTION ###
+######################
+pool_parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
+pool_parser.add_argument("action", choices=["flush", "show"], help=pool_action_help)
+
+
+@dataclass
+class PooledSession:
+    """プールが保持する 1 セッション分の情報。"""
+    key: tuple
+    connection: BaseConnection
+    prompt: str
+    hostname: str
+    created_at: float = field(default_factory=monotonic)
+    last_used: float = field(default_factory=monotonic)
+    borrowed: bool = True
+    discard_on_release: bool = False
+    reuse_count: int = 0
+
+
+def session_key(device: dict) -> tuple:
+    """
+    ホストと認証情報からプールのキーを作る。
+    パスワード / secret はキーに平文で残さないようにハッシュ化する。
+    """
+    credentials = f"{device.get('username', '')}\0{device.get('password', '')}\0{device.get('secret', '')}"
+    credentials_digest = hashlib.sha256(credentials.encode("utf-8")).hexdigest()
+    return (device.get("device_type"), device.get("ip") or device.get("host"), device.get("port"), device.get("username"), credentials_digest)
+
+
+class ConnectionPool:
+    """
+    スレッドセーフな SSH セッションプール。
+
+    - 同じキー（ホスト + 認証情報）の未使用セッションがあれば、ヘルスチェック後に貸し出す
+    - 無ければ `connect_func` で新しく接続する
+    - 返却されたセッションは LRU の末尾に移動し、idle TTL を超えたもの・上限を超えた分は切断する
+    """
+
+    def __init__(self, *, connect_func, disconnect_func, max_size: int = DEFAULT_POOL_MAX_SIZE,
+                 idle_ttl: float = DEFAULT_POOL_IDLE_TTL, keepalive: int = DEFAULT_POOL_KEEPALIVE):
+        if max_size <= 0:
+            raise ValueError("connection_pool.max_sizeには1以上の整数を指定してくださいケロ🐸")
+
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.keepalive = keepalive
+        self._connect_func = connect_func
+        self._disconnect_func = disconnect_func
+        self._sessions: OrderedDict[int, PooledSession] = OrderedDict()  # id(connection) -> session (LRU順)
+        self._lock = threading.Lock()
+
+    def acquire(self, device: dict, hostname: str, require_enable: bool = True) -> tuple[BaseConnection, str, str]:
+        """
+        セッションを借りる。戻り値は connect_to_device() と同じ (connection, prompt, hostname)。
+
+        Raises
+        ------
+        ConnectionError
+            新規接続が必要で、その接続に失敗した場合（connect_func の例外をそのまま伝播）
+        """
+        # enable 済みのセッションとユーザーモードのセッションは別物として扱う。
+        key = session_key(device) + (require_enable,)
+
+        while True:
+            with self._lock:
+                evicted = self._evict_expired_locked()
+                session = next((s for s in self._sessions.values() if s.key == key and not s.borrowed), None)
+                if session is not None:
+                    session.borrowed = True
+            self._disconnect_all(evicted)
+            if session is None:
+                break
+
+            # ヘルスチェック（ロックの外で行う）。死んでいたら捨てて次の候補を探す。
+            if self._is_healthy(session.connection):
+                with self._lock:
+                    session.reuse_count += 1
+                    session.last_used = monotonic()
+                    self._sessions.move_to_end(id(session.connection))
+                return session.connection, session.prompt, session.hostname
+
+            with self._lock:
+                self._sessions.pop(id(session.connection), None)
+            self._disconnect_func(session.connection)
+
+        pooled_device = dict(device)
+        if self.keepalive:
+            pooled_device["keepalive"] = self.keepalive
+        connection, prompt, connected_hostname = self._connect_func(pooled_device, hostname, require_enable=require_enable)
+
+        with self._lock:
+            self._sessions[id(connection)] = PooledSession(key=key, connection=connection, prompt=prompt, hostname=connected_hostname)
+            evicted = self._evict_over_capacity_locked()
+        self._disconnect_all(evicted)
+        return connection, prompt, connected_hostname
+
+    def release(self, connection: BaseConnection | None, *, discard: bool = False) -> None:
+        """
+        借りたセッションを返す。discard=True（実行中にエラーが起きた等）のときは切断して捨てる。
+        プール管理外の接続が渡された場合はそのまま切断する。
+        """
+        if connection is None:
+            return
+
+        with self._lock:
+            session = self._sessions.get(id(connection))
+            if session is not None and not (discard or session.discard_on_release):
+                session.borrowed = False
+                session.last_used = monotonic()
+                self._sessions.move_to_end(id(connection))
+                evicted = self._evict_over_capacity_locked()
+            else:
+                self._sessions.pop(id(connection), None)
+                evicted = None
+
+        if evicted is None:
+            # 破棄指定 / flush 済み / プール管理外の接続
+            self._disconnect_func(connection)
+            return
+        self._disconnect_all(evicted)
+
+    def flush(self) -> int:
+        """未使用セッションをすべて切断する。使用中のものは返却時に切断する。切断した数を返す。"""
+        with self._lock:
+            idle_sessions = [s for s in self._sessions.values() if not s.borrowed]
+            for session in idle_sessions:
+                self._sessions.pop(id(session.connection), None)
+            for session in self._sessions.values():
+                session.discard_on_release = True
+
+        self._disconnect_all(idle_sessions)
+        return len(idle_sessions)
+
+    def snapshot(self) -> list[dict]:
+        """show --pool 用に、プール内セッションの状態を LRU 順（古い順）で返す。"""
+        now = monotonic()
+        with self._lock:
+            return [{"hostname": s.hostname,
+                     "host": s.key[1],
+                     "port": s.key[2],
+                     "username": s.key[3],
+                     "state": "in-use" if s.borrowed else "idle",
+                     "age": now - s.created_at,
+                     "idle": 0.0 if s.borrowed else now - s.last_used,
+                     "reuse_count": s.reuse_count}
+                    for s in self._sessions.values()]
+
+    def _is_healthy(self, connection: BaseConnection) -> bool:
+        try:
+            return bool(connection.is_alive())
+        except Exception:
+            return False
+
+    # *_locked はロック取得済みで呼ぶこと。プールから外したセッションを返すので、
+    # 切断（ネットワーク I/O）はロックを離してから _disconnect_all() で行う。
+    def _evict_expired_locked(self) -> list[PooledSession]:
+        now = monotonic()
+        expired = [s for s in self._sessions.values() if not s.borrowed and now - s.last_used > self.idle_ttl]
+        return self._drop_locked(expired)
+
+    def _evict_over_capacity_locked(self) -> list[PooledSession]:
+        overflow = len(self._sessions) - self.max_size
+        if overflow <= 0:
+            return []
+        # OrderedDict の先頭ほど長く使われていない（LRU）。使用中のものは退避できない。
+        lru_idle = [s for s in self._sessions.values() if not s.borrowed][:overflow]
+        return self._drop_locked(lru_idle)
+
+    def _drop_locked(self, sessions: list[PooledSession]) -> list[PooledSession]:
+        for session in sessions:
+            self._sessions.pop(id(session.connection), None)
+        return sessions
+
+    def _disconnect_all(self, sessions: list[PooledSession]) -> None:
+        for session in sessions:
+            self._disconnect_func(session.connection)
+
+
+_pool: ConnectionPool | None = None
+_pool_enabled: bool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool | None:
+    """
+    `sys_config.yaml` の `connection_pool` 設定に従ってプロセス共通のプールを返す。
+    `connection_pool.enabled` が false（既定）のときは None を返す。
+    設定は最初の呼び出し時に 1 度だけ読む（変更を反映するには KeroRoute の再起動が必要）。
+    """
+    global _pool, _pool_enabled
+
+    with _pool_lock:
+        if _pool_enabled is None:
+            pool_config = load_sys_config().get("connection_pool") or {}
+            _pool_enabled = bool(pool_config.get("enabled", False))
+            if _pool_enabled:
+                # 循環 import を避けるためここで import する。
+                from connect_device import connect_to_device, safe_disconnect
+                _pool = ConnectionPool(connect_func=connect_to_device,
+                                       disconnect_func=safe_disconnect,
+                                       max_size=pool_config.get("max_size", DEFAULT_POOL_MAX_SIZE),
+                                       idle_ttl=pool_config.get("idle_ttl", DEFAULT_POOL_IDLE_TTL),
+                                       keepalive=pool_config.get("keepalive", DEFAULT_POOL_KEEPALIVE))
+                atexit.register(_pool.flush)
+        return _pool
+
+
+@cmd2.with_argparser(pool_parser)
+def do_pool(self, args):
+    """
+    `pool` コマンドのエントリポイント。
+
+    - `pool flush` : 未使用セッションをすべて切断
+    - `pool show`  : プールの中身を表示（`show --pool` と同じ）
+    """
+    pool = get_connection_pool()
+    if pool is None:
+        print_info("コネクションプールは無効ケロ🐸 (sys_config.yaml の connection_pool.enabled)")
+        return
+
+    if args.action == "flush":
+        closed = pool.flush()
+        print_success(f"🧹 未使用セッションを {closed} 件切断したケロ🐸")
+    elif args.action == "show":
+        from show import _show_pool
+        _show_pool()
@@ -11,11 +11,14 @@ import re
 from time import perf_counter
 
 from message import print_error, print_info, print_warning, print_success
-from load_and_validate_yaml import get_validated_inventory_data, get_validated_commands_list, get_commands_list_device_type, validate_device_type_for_list
+from load_and_validate_yaml import get_validated_inventory_data
+from execution_plan import ExecutionPlan, build_execution_plan
 from output_logging import save_log, save_json
 from prompt_utils import wait_for_prompt_returned
 from build_device import build_device_and_hostname_for_console
 from connect_device import connect_to_device_for_console, safe_disconnect
+from run_metrics import measuring, timed
+from trace_export import create_trace_recorder
 from completers import host_names_completer, group_names_completer, device_types_completer, commands_list_names_completer
 
 
@@ -62,6 +65,9 @@ textfsm_template_help = ("--parser optionで textfsm を指定する際に templ
                          "--parser optionで textfsm を指定する際は必須です。(genieのときは必要ありません。)")
 # post_reconnect_baudrate_help = "実行後にこのボーレートで再接続確認だけ行うケロ🐸"
 connect_only_help = "コマンドを実行せず、接続確認だけ行うケロ🐸（enable まで）"
+trace_help = ("実行のタイムラインを Chrome trace-event 形式の JSON で FILE に書き出します。\n"
+              "接続 / enable / コマンド / ログ保存 / 表示 ごとの区間が並びます。https://ui.perfetto.dev や chrome://tracing で開けます。\n"
+              "example: console --host R1 -c 'show version' --trace logs/trace.json")
 
 
 ######################
@@ -83,6 +89,7 @@ netmiko_console_parser.add_argument("-o", "--ordered", action="store_true", help
 netmiko_console_parser.add_argument("--parser", "--parse",dest="parser",  choices=["textfsm", "genie", "text-fsm"], help=parser_help)
 netmiko_console_parser.add_argument("--textfsm-template", type=str,  help=textfsm_template_help)
 netmiko_console_parser.add_argument("--force", action="store_true", help=force_help)
+netmiko_console_parser.add_argument("--trace", type=str, default=None, metavar="FILE", help=trace_help)
 # netmiko_console_parser.add_argument("--post-reconnect-baudrate", type=int, help=post_reconnect_baudrate_help)
 
 
@@ -186,45 +193,26 @@ def _execute_console_commands(connection, prompt, args, exec_commands, parser_ki
 #         return hostname
 
 
-def _handle_console_execution(device: dict, args, poutput, hostname: str, *, output_buffers: dict | None = None, parser_kind: str | None = None) -> str | None:
+def _handle_console_execution(device: dict, args, poutput, hostname: str, *, plan: ExecutionPlan, output_buffers: dict | None = None) -> str | None:
     timer = perf_counter() # ⌚ start
+    parser_kind = plan.parser_kind
 
-    # ❶ commands-listは接続前に検証
-    # ※ 接続前なので try/except で安全に中断する
+    # ❶ commands-list は do_console で解決済み（plan.commands）。ここでは YAML を読まない。
     result_output_string = ""
-    exec_commands = None # args.commandのとき未定義になるため必要。
-    if args.commands_list:
-        try:
-            exec_commands = get_validated_commands_list(args)
-        except (FileNotFoundError, ValueError) as e:
-            print_error(str(e))
-            elapsed = perf_counter() - timer
-            print_warning(f"❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
-            return hostname
+    exec_commands = list(plan.commands) if plan.commands else None # args.commandのときはNone
     
-    # ❷ device_type ミスマッチチェック (接続前に実施)
-    if args.commands_list:
-        list_device_type = get_commands_list_device_type(args.commands_list)
-        node_device_type = device.get("device_type")
-
-        # console の device_type は *_serial になりがちなので、末尾だけ安全に外して比較
-        node_device_type_base = re.sub(r"_serial$", "", node_device_type)
-
-        try:
-            validate_device_type_for_list(hostname=hostname,
-                                          node_device_type=node_device_type_base,
-                                          list_name=args.commands_list,
-                                          list_device_type=list_device_type)
-        except ValueError as e:
-            if getattr(args, "force", False):
-                if not args.no_output:
-                    print_warning(f"{e} (--force指定のため続行ケロ🐸)")
-            else:
-                if not args.no_output:
-                    print_error(str(e))
-                    elapsed = perf_counter() - timer
-                    print_warning(f"<NODE: {hostname}> ❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
-                return hostname # このホストはスキップ
+    # ❷ device_type ミスマッチチェック (接続前に実施。検証結果は plan に入っている)
+    validation_error = plan.validation_error_for(hostname)
+    if validation_error:
+        if getattr(args, "force", False):
+            if not args.no_output:
+                print_warning(f"{validation_error} (--force指定のため続行ケロ🐸)")
+        else:
+            if not args.no_output:
+                print_error(validation_error)
+                elapsed = perf_counter() - timer
+                print_warning(f"<NODE: {hostname}> ❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
+            return hostname # このホストはスキップ
 
     
     # ❸ 接続 (enableまで)
@@ -252,12 +240,14 @@ def _handle_console_execution(device: dict, args, poutput, hostname: str, *, out
 
     # ❹ コマンド実行（単発 or リスト）
     # prompt 同期 必要に応じて 必要か？
-    wait_for_prompt_returned(connection, sleep_time=SLEEP_TIME)
+    with timed("prompt_sync"):
+        wait_for_prompt_returned(connection, sleep_time=SLEEP_TIME)
     # 実行時点のベースプロンプトから期待プロンプトを生成
     expect_string = re.escape(prompt)
 
     try:
-        result_output_string = _execute_console_commands(connection, prompt, args, exec_commands, parser_kind, expect_string=expect_string)
+        with timed("command"):
+            result_output_string = _execute_console_commands(connection, prompt, args, exec_commands, parser_kind, expect_string=expect_string)
     except Exception as e:
         if not args.no_output:
             if args.parser == "genie":
@@ -295,10 +285,11 @@ def _handle_console_execution(device: dict, args, poutput, hostname: str, *, out
     if getattr(args, "log", False):
         if not getattr(args, "no_output", False):
             print_info(f"<NODE: {hostname}> 💾ログ保存モードONケロ🐸🔛")
-        if parser_kind in ("genie", "textfsm") and isinstance(result_output_string, (list, dict)):
-            log_path = save_json(result_output_string, hostname, args, parser_kind=parser_kind, mode="console")
-        else:
-            log_path = save_log(result_output_string, hostname, args, mode="console")
+        with timed("save_log"):
+            if parser_kind in ("genie", "textfsm") and isinstance(result_output_string, (list, dict)):
+                log_path = save_json(result_output_string, hostname, args, parser_kind=parser_kind, mode="console")
+            else:
+                log_path = save_log(result_output_string, hostname, args, mode="console")
         if not getattr(args, "no_output", False):
             print_success(f"<NODE: {hostname}> 💾ログ保存完了ケロ🐸⏩⏩⏩ {log_path}")
 
@@ -308,14 +299,56 @@ def _handle_console_execution(device: dict, args, poutput, hostname: str, *, out
             print_info(f"<NODE: {hostname}> 📄OUTPUTは省略するケロ (hidden by --quiet) 🐸")
         else:
             if not (args.group and args.ordered and output_buffers is not None):
-                print_info(f"<NODE: {hostname}> 📄OUTPUTケロ🐸")
-                poutput(display_text)
+                with timed("display"):
+                    print_info(f"<NODE: {hostname}> 📄OUTPUTケロ🐸")
+                    poutput(display_text)
     elapsed = perf_counter() - timer
     if not args.no_output:
         print_success(f"<NODE: {hostname}> 🔚実行完了ケロ🐸 (elapsed: {elapsed:.2f}s)")
     return None # 成功時
             
 
+def _run_console_execution(device: dict, args, poutput, hostname: str, *, plan: ExecutionPlan) -> str | None:
+    """
+    `_handle_console_execution()` を実行する。--trace 指定時はフェーズごとの区間を計測してタイムラインに書き出す。
+    戻り値は `_handle_console_execution()` と同じ（失敗したホスト名 or None）。
+    """
+    trace = create_trace_recorder("console", args, run_info={"target": hostname, "command": args.command or None,
+                                                              "commands_list": args.commands_list or None})
+    if trace is None:
+        return _handle_console_execution(device, args, poutput, hostname, plan=plan)
+
+    result_failed_hostname = None
+    status = "error" # _handle_console_execution で捕まえていない例外
+    try:
+        with measuring(hostname) as timings:
+            try:
+                result_failed_hostname = _handle_console_execution(device, args, poutput, hostname, plan=plan)
+                status = "failed" if result_failed_hostname else "ok"
+            finally:
+                timings.finish(status)
+                trace.add_host(timings)
+    finally:
+        trace.close()
+    return result_failed_hostname
+
+
+def _build_console_plan_or_report(args, device: dict, hostname: str, parser_kind: str | None) -> ExecutionPlan | None:
+    """
+    console 用の実行計画を組み立てる。組み立てられないときはエラーを表示して None を返す。
+    """
+    # console の device_type は *_serial になりがちなので、末尾だけ安全に外して比較
+    node_device_type_base = re.sub(r"_serial$", "", device.get("device_type") or "")
+
+    try:
+        return build_execution_plan(args, {hostname: node_device_type_base}, parser_kind)
+    except (FileNotFoundError, ValueError) as e:
+        if not args.no_output:
+            print_error(str(e))
+            print_warning("❌中断ケロ🐸")
+        return None
+
+
 @cmd2.with_argparser(netmiko_console_parser)
 def do_console(self, args):
     """
@@ -405,7 +438,10 @@ def do_console(self, args):
 
     if args.host:
         device , hostname = build_device_and_hostname_for_console(args, inventory_data, serial_port)
-        result_failed_hostname = _handle_console_execution(device, args, self.poutput, hostname, parser_kind=parser_kind)
+        plan = _build_console_plan_or_report(args, device, hostname, parser_kind)
+        if plan is None:
+            return
+        result_failed_hostname = _run_console_execution(device, args, self.poutput, hostname, plan=plan)
         if result_failed_hostname and not args.no_output:
             print_error(f"❎ 🐸なんかトラブルケロ@: {result_failed_hostname}")
         return
@@ -465,7 +501,10 @@ def do_console(self, args):
     else:
         # hostやgroupを使用しないとき用
         device , hostname = build_device_and_hostname_for_console(args, inventory_data, serial_port)
-        result_failed_hostname = _handle_console_execution(device, args, self.poutput, hostname, parser_kind=parser_kind)
+        plan = _build_console_plan_or_report(args, device, hostname, parser_kind)
+        if plan is None:
+            return
+        result_failed_hostname = _run_console_execution(device, args, self.poutput, hostname, plan=plan)
         if result_failed_hostname and not args.no_output:
             print_error(f"❎ 🐸なんかトラブルケロ@: {result_failed_hostname}")
         return
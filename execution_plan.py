@@ -0,0 +1,122 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+from load_and_validate_yaml import get_validated_commands_list, get_commands_list_device_type, get_validated_config_list, validate_device_type_for_list
+from command_pipeline import get_pipeline_window
+
+# execution_plan.py
+# 役割:
+# - 1 回の実行（execute / configure / console）で使う「実行計画」を実行前に 1 度だけ組み立てる
+# - commands-lists.yaml / config-lists.yaml の読み込み・device_type 検証はここで済ませ、
+#   ワーカースレッドは I/O（接続とコマンド送信）だけを行う
+# ruamel の YAML インスタンスはスレッドセーフではないので、ワーカー内で YAML を読まないこと🐸
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """
+    1 回の実行で全ホスト共通の、解決済みの実行内容（イミュータブル）。
+
+    Attributes
+    ----------
+    commands : tuple[str, ...] | None
+        commands-list / config-list を解決したコマンド列。--command 実行時は None。
+    list_name : str | None
+        commands-list / config-list の名前。
+    list_device_type : str | None
+        リスト側に定義された device_type。
+    parser_kind : str | None
+        "genie" / "textfsm" / None
+    textfsm_template : str | None
+        parser_kind="textfsm" のときのテンプレートパス。
+    host_validation_errors : Mapping[str, str]
+        hostname -> device_type 検証エラーメッセージ。含まれないホストは検証 OK。
+    pipeline_window : int | None
+        --pipeline 指定時に 1 回でまとめて書き込むコマンド数（0 ならリスト全体）。None なら 1 コマンドずつ送信。
+    """
+    commands: tuple[str, ...] | None = None
+    list_name: str | None = None
+    list_device_type: str | None = None
+    parser_kind: str | None = None
+    textfsm_template: str | None = None
+    host_validation_errors: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    pipeline_window: int | None = None
+
+    def validation_error_for(self, hostname: str) -> str | None:
+        """指定ホストの device_type 検証エラー（無ければ None）を返す。"""
+        return self.host_validation_errors.get(hostname)
+
+
+def _validate_hosts(list_name: str, list_device_type: str | None, targets: Mapping[str, str | None]) -> Mapping[str, str]:
+    errors = {}
+    for hostname, node_device_type in targets.items():
+        try:
+            validate_device_type_for_list(hostname=hostname,
+                                          node_device_type=node_device_type,
+                                          list_name=list_name,
+                                          list_device_type=list_device_type)
+        except ValueError as e:
+            errors[hostname] = str(e)
+    return MappingProxyType(errors)
+
+
+def build_execution_plan(args, targets: Mapping[str, str | None], parser_kind: str | None = None) -> ExecutionPlan:
+    """
+    execute / console 用の実行計画を組み立てる。
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        CLI 引数（commands_list, textfsm_template, pipeline を参照）
+    targets : Mapping[str, str | None]
+        hostname -> ノードの device_type。device_type 検証に使う。
+        (console の *_serial などは呼び出し側で素の型に戻してから渡すこと)
+    parser_kind : str | None
+        正規化済みの parser 名
+
+    Returns
+    -------
+    ExecutionPlan
+
+    Raises
+    ------
+    FileNotFoundError
+        commands-lists.yaml が存在しない場合
+    ValueError
+        commands-list が未定義 / 空 / 形式不正の場合
+    """
+    textfsm_template = None
+    if parser_kind == "textfsm" and getattr(args, "textfsm_template", None):
+        textfsm_template = str(Path(args.textfsm_template))
+
+    if not getattr(args, "commands_list", None):
+        return ExecutionPlan(parser_kind=parser_kind, textfsm_template=textfsm_template)
+
+    commands = tuple(get_validated_commands_list(args))
+    list_device_type = get_commands_list_device_type(args.commands_list)
+    pipeline_window = get_pipeline_window() if getattr(args, "pipeline", False) else None
+
+    return ExecutionPlan(commands=commands,
+                         list_name=args.commands_list,
+                         list_device_type=list_device_type,
+                         parser_kind=parser_kind,
+                         textfsm_template=textfsm_template,
+                         host_validation_errors=_validate_hosts(args.commands_list, list_device_type, targets),
+                         pipeline_window=pipeline_window)
+
+
+def build_configure_plan(args) -> ExecutionPlan:
+    """
+    configure 用の実行計画（config-list の解決のみ）を組み立てる。
+
+    Raises
+    ------
+    FileNotFoundError
+        config-lists.yaml が存在しない場合
+    ValueError
+        config-list が未定義 / 空 / 形式不正の場合
+    """
+    commands = tuple(get_validated_config_list(args))
+    return ExecutionPlan(commands=commands, list_name=args.config_list)
@@ -0,0 +1,295 @@
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from netmiko.base_connection import BaseConnection
+
+from load_and_validate_yaml import load_sys_config
+from connect_device import open_session, close_session, safe_disconnect, classify_connection_error, pop_connect_kind, CONNECT_FAST, CONNECT_POOLED
+from rate_limiter import pop_rate_limit_wait
+from run_metrics import timed
+from run_result import HostResult, STATUS_DEADLINE
+
+# execution_policy.py
+# 役割:
+# - 1 ホスト分の処理（_handle_execution / _handle_configure）の周りに掛けるポリシー層
+#   - フェーズごとの期限（connect / auth / enable / command）を Netmiko のタイムアウトに割り当てる
+#   - タイムアウト等の一時的な接続失敗を、指数バックオフ + jitter で有限回リトライする
+#   - 実行全体の期限（--deadline）を管理し、期限切れ時は in-flight のセッションを閉じる
+# 夜間の収集ジョブを、数台の不調なデバイスに引きずられずにメンテナンス枠の中で終わらせるため🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_MAX_RETRIES = 0      # 接続失敗時のリトライ回数（初回を含まない）
+DEFAULT_BACKOFF_BASE = 1.0   # 1 回目のリトライ前に待つ時間の上限(秒)。以降は 2 倍ずつ増える
+DEFAULT_BACKOFF_MAX = 10.0   # リトライ前に待つ時間の上限(秒)
+MIN_PHASE_TIMEOUT = 0.1      # 期限の残りで切り詰めたときの最小値(秒)。Netmiko の read_timeout=0 は「無期限」になるため
+
+# 認証 / enable の失敗はリトライしても結果が変わらず、アカウントロックの恐れもあるので対象外。
+RETRYABLE_ERROR_CLASSES = frozenset({"timeout", "other"})
+
+
+class DeadlineExceededError(ConnectionError):
+    """実行全体の期限（--deadline）を過ぎたため、接続しなかった / 中断した。"""
+
+
+def deadline_option(value: str) -> float:
+    """--deadline の argparse 用 type 関数。正の秒数を受け付ける（それ以外は理由つきの argparse エラー）。"""
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = None
+    if seconds is None or not seconds > 0 or seconds == float("inf"):
+        raise argparse.ArgumentTypeError(f"--deadline には正の秒数を指定してくださいケロ🐸: {value}")
+    return seconds
+
+
+class RunDeadline:
+    """実行全体の期限。seconds が None なら期限なし。"""
+
+    def __init__(self, seconds: float | None, *, clock=time.monotonic):
+        self.seconds = seconds
+        self._clock = clock
+        self.expires_at = clock() + seconds if seconds is not None else None
+
+    def remaining(self) -> float | None:
+        """残り秒数（0 未満にはならない）。期限なしなら None。"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and self._clock() >= self.expires_at
+
+    def clamp(self, timeout: float | None) -> float | None:
+        """timeout を期限の残りで切り詰める。timeout が None なら残り秒数（期限なしなら None）。"""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return max(MIN_PHASE_TIMEOUT, remaining)
+        return max(MIN_PHASE_TIMEOUT, min(timeout, remaining))
+
+
+class ActiveSessions:
+    """
+    実行中のセッションの登録簿。スレッドセーフ。
+
+    期限切れ時に `close_all()` で in-flight のセッションを切断し、実行中のコマンドを中断させる。
+    close_all() の後に登録しようとした場合は DeadlineExceededError を送出する（切断は呼び出し側で行う）。
+    """
+
+    def __init__(self):
+        self._connections: set[BaseConnection] = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def register(self, connection: BaseConnection, hostname: str) -> None:
+        with self._lock:
+            if not self._closed:
+                self._connections.add(connection)
+                return
+        raise DeadlineExceededError(f"[{hostname}] 実行全体の期限を過ぎたので中断したケロ🐸")
+
+    def unregister(self, connection: BaseConnection) -> None:
+        with self._lock:
+            self._connections.discard(connection)
+
+    def close_all(self) -> int:
+        """登録中のセッションをすべて切断し、切断した数を返す。以降の登録は拒否する。"""
+        with self._lock:
+            self._closed = True
+            connections, self._connections = list(self._connections), set()
+        for connection in connections:
+            safe_disconnect(connection)
+        return len(connections)
+
+
+@dataclass(frozen=True)
+class ExecutionPolicy:
+    """
+    1 回の実行（execute / configure）で全ホスト共通の期限・リトライ設定。
+
+    Attributes
+    ----------
+    connect_timeout : float | None
+        TCP 接続の期限（Netmiko の conn_timeout）。None なら Netmiko の既定値。
+    auth_timeout : float | None
+        SSH バナー / 認証の期限（auth_timeout, banner_timeout）。
+    enable_timeout : float | None
+        ログイン後のプロンプト確認・enable の期限（接続中の read_timeout_override）。
+    command_timeout : float | None
+        1 コマンドの出力を待つ期限（接続後の read_timeout_override）。
+    max_retries : int
+        接続失敗時のリトライ回数。タイムアウト / その他の接続エラーだけが対象。
+    backoff_base, backoff_max : float
+        リトライ前の待ち時間。attempt 回目は 0〜min(backoff_max, backoff_base * 2**attempt) 秒のランダム（full jitter）。
+    deadline : RunDeadline
+        実行全体の期限（--deadline）。各フェーズの期限は残り時間で切り詰められる。
+    sessions : ActiveSessions
+        期限切れ時に切断する in-flight セッションの登録簿。
+    """
+    connect_timeout: float | None = None
+    auth_timeout: float | None = None
+    enable_timeout: float | None = None
+    command_timeout: float | None = None
+    max_retries: int = DEFAULT_MAX_RETRIES
+    backoff_base: float = DEFAULT_BACKOFF_BASE
+    backoff_max: float = DEFAULT_BACKOFF_MAX
+    deadline: RunDeadline = field(default_factory=lambda: RunDeadline(None))
+    sessions: ActiveSessions = field(default_factory=ActiveSessions)
+
+    def device_with_deadlines(self, device: dict) -> dict:
+        """ConnectHandler に渡す device 辞書に、フェーズごとの期限（残り時間で切り詰め済み）を足したコピーを返す。"""
+        device = dict(device)
+        phase_timeouts = (("conn_timeout", self.connect_timeout),
+                          ("auth_timeout", self.auth_timeout),
+                          ("banner_timeout", self.auth_timeout),
+                          ("read_timeout_override", self.enable_timeout))
+        for key, timeout in phase_timeouts:
+            timeout = self.deadline.clamp(timeout)
+            if timeout is not None:
+                device[key] = timeout
+        return device
+
+    def current_command_timeout(self) -> float | None:
+        """今からコマンドを送るときの期限（残り時間で切り詰め済み）。"""
+        return self.deadline.clamp(self.command_timeout)
+
+    def refresh_command_timeout(self, connection: BaseConnection) -> float | None:
+        """コマンドを送る直前に呼び、接続の read_timeout_override を今の残り時間で切り詰め直す。設定した値を返す。"""
+        timeout = self.current_command_timeout()
+        connection.read_timeout_override = timeout
+        return timeout
+
+    def backoff(self, attempt: int, *, rng=None) -> float:
+        """attempt 回目（0 始まり）のリトライ前に待つ秒数。"""
+        rng = rng or random.random
+        return rng() * min(self.backoff_max, self.backoff_base * (2 ** attempt))
+
+    def abort(self, futures: Iterable[Future] = ()) -> int:
+        """期限切れ時の後始末。未開始の futures をキャンセルし、in-flight のセッションを切断する。切断した数を返す。"""
+        for future in futures:
+            future.cancel()
+        return self.sessions.close_all()
+
+
+def _positive_or_none(section: dict, key: str, name: str) -> float | None:
+    value = section.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"sys_config.yamlの{name}.{key}には正の数かnullを指定してくださいケロ🐸: {value}")
+    return float(value)
+
+
+def build_execution_policy(args) -> ExecutionPolicy:
+    """
+    `sys_config.yaml` の `connect.deadlines` / `executor.retry` と `--deadline` から実行ポリシーを組み立てる。
+    do_execute / do_configure（メインスレッド）で 1 度だけ呼ぶこと。
+
+    Raises
+    ------
+    ValueError
+        期限 / リトライ設定に不正な値が書かれていた場合
+    """
+    system_config = load_sys_config()
+    deadlines = (system_config.get("connect") or {}).get("deadlines") or {}
+    retry = (system_config.get("executor") or {}).get("retry") or {}
+
+    max_retries = retry.get("max_retries", DEFAULT_MAX_RETRIES)
+    if type(max_retries) != int or max_retries < 0:
+        raise ValueError(f"sys_config.yamlのexecutor.retry.max_retriesには0以上の整数を指定してくださいケロ🐸: {max_retries}")
+
+    backoff_base = _positive_or_none(retry, "backoff_base", "executor.retry")
+    backoff_max = _positive_or_none(retry, "backoff_max", "executor.retry")
+
+    return ExecutionPolicy(connect_timeout=_positive_or_none(deadlines, "connect", "connect.deadlines"),
+                           auth_timeout=_positive_or_none(deadlines, "auth", "connect.deadlines"),
+                           enable_timeout=_positive_or_none(deadlines, "enable", "connect.deadlines"),
+                           command_timeout=_positive_or_none(deadlines, "command", "connect.deadlines"),
+                           max_retries=max_retries,
+                           backoff_base=backoff_base if backoff_base is not None else DEFAULT_BACKOFF_BASE,
+                           backoff_max=backoff_max if backoff_max is not None else DEFAULT_BACKOFF_MAX,
+                           deadline=RunDeadline(getattr(args, "deadline", None)))
+
+
+def connect_failure(hostname: str, error: ConnectionError) -> HostResult:
+    """`open_session_with_policy()` の ConnectionError を HostResult にする（期限切れは STATUS_DEADLINE）。"""
+    if isinstance(error, DeadlineExceededError):
+        return HostResult.failure(hostname, "deadline", error, status=STATUS_DEADLINE)
+    return HostResult.failure(hostname, classify_connection_error(error), error)
+
+
+def open_session_with_policy(device: dict, hostname: str, policy: ExecutionPolicy, *, concurrency=None,
+                             open_func=open_session, sleep=time.sleep) -> tuple[BaseConnection, str, str]:
+    """
+    `open_session()` にフェーズごとの期限とリトライを掛けたもの。戻り値は `open_session()` と同じ。
+
+    - 接続前に期限を過ぎていれば接続しない
+    - タイムアウト / その他の接続エラーは max_retries 回までバックオフしてリトライする（待つと期限を過ぎる場合はしない）
+    - 接続後はコマンド用の期限を read_timeout_override に設定し、期限切れ時に切断できるよう登録する
+    - concurrency（--workers auto）には試行ごとの結果を報告する（リミッタ / バックオフの待ち時間は含めない）
+
+    取得した接続は必ず `close_session_with_policy()` で返すこと。
+
+    Raises
+    ------
+    DeadlineExceededError
+        実行全体の期限を過ぎた場合
+    ConnectionError
+        リトライしても接続できなかった場合（最後の試行の例外）
+    """
+    attempt = 0
+    while True:
+        if policy.deadline.expired:
+            raise DeadlineExceededError(f"[{hostname}] 実行全体の期限を過ぎたので接続しなかったケロ🐸")
+
+        connect_timer = time.perf_counter()
+        try:
+            connection, prompt, new_hostname = open_func(policy.device_with_deadlines(device), hostname)
+        except ConnectionError as e:
+            error_class = classify_connection_error(e)
+            if concurrency is not None:
+                concurrency.record_connect(None, error_class)
+
+            if attempt >= policy.max_retries or error_class not in RETRYABLE_ERROR_CLASSES:
+                raise
+            delay = policy.backoff(attempt)
+            remaining = policy.deadline.remaining()
+            if remaining is not None and delay >= remaining:
+                raise
+            with timed("retry_backoff"):
+                sleep(delay)
+            attempt += 1
+            continue
+
+        if concurrency is not None:
+            # レートリミッタで待った時間は接続レイテンシに含めない。
+            # プールの使い回し・fast-connect はフルの接続より桁違いに速く、基準のレイテンシを狂わせるので成功だけ報告する。
+            latency = time.perf_counter() - connect_timer - pop_rate_limit_wait()
+            concurrency.record_connect(None if pop_connect_kind() in (CONNECT_FAST, CONNECT_POOLED) else latency)
+        break
+
+    policy.refresh_command_timeout(connection)
+    try:
+        policy.sessions.register(connection, new_hostname)
+    except DeadlineExceededError:
+        close_session(connection, discard=True)
+        raise
+    return connection, prompt, new_hostname
+
+
+def close_session_with_policy(connection: BaseConnection | None, policy: ExecutionPolicy, *, discard: bool = False) -> None:
+    """`open_session_with_policy()` で取得した接続を登録簿から外して返す（`close_session()` と同じ）。"""
+    if connection is not None:
+        policy.sessions.unregister(connection)
+        connection.read_timeout_override = None # プールに戻したセッションに今回の期限を残さない
+    close_session(connection, discard=discard)
@@ -1,17 +1,29 @@
 from time import perf_counter
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
 import json
 import cmd2
 from cmd2 import Cmd2ArgumentParser
 from rich_argparse import RawTextRichHelpFormatter
 from message import print_info, print_success, print_warning, print_error
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 
 from output_logging import save_log, save_json
 from build_device import _build_device_and_hostname
-from load_and_validate_yaml import get_validated_commands_list, get_validated_inventory_data, validate_device_type_for_list, get_commands_list_device_type
-from connect_device import connect_to_device, safe_disconnect
-from workers import default_workers
+from load_and_validate_yaml import get_validated_inventory_data
+from execution_plan import ExecutionPlan, build_execution_plan
+from execution_policy import ExecutionPolicy, build_execution_policy, deadline_option, open_session_with_policy, close_session_with_policy, connect_failure
+from workers import default_workers, default_parse_workers, workers_option, create_adaptive_controller, AUTO_WORKERS
+from adaptive_concurrency import AdaptiveConcurrencyController
+from parse_stage import parse_raw_outputs, create_parse_pool
+from command_pipeline import DEFAULT_PIPELINE_READ_TIMEOUT, send_commands_pipelined
+from output_stream import HostOutputStream, SortedPrefixFlusher
+from output_buffer import MemoryBudget, HostTextBuffer, get_max_buffer_bytes, write_chunks
+from prompt_cache import flush_prompt_cache
+from run_metrics import create_run_metrics, record_command, timed
+from rate_limiter import get_connection_rate_limiter
+from run_result import HostResult, RunResult, print_run_summary, STATUS_SKIPPED, STATUS_DEADLINE, STATUS_ERROR
 from completers import host_names_completer, group_names_completer, device_types_completer, commands_list_names_completer
 
 
@@ -44,16 +56,32 @@ memo_help = ("ログファイル名に付加する任意のメモ（文字列）
              "[bright_yellow]example: 20250506-125600_R0_show-ip-int-brief_memo.log\n[/bright_yellow]")
 workers_help = ("並列実行するワーカースレッド数を指定します。\n"
                 "指定しない場合は [bright_yellow]sys_config.yaml[/bright_yellow] の [bright_yellow]executor.default_workers[/bright_yellow] を参照します。\n"
-                "そこにも設定が無いときは、グループ台数と 規定上限([bright_blue]DEFAULT_MAX_WORKERS[/bright_blue]) の小さい方が自動で採用されます。\n\n")
+                "そこにも設定が無いときは、グループ台数と 規定上限([bright_blue]DEFAULT_MAX_WORKERS[/bright_blue]) の小さい方が自動で採用されます。\n"
+                "[bright_yellow]auto[/bright_yellow] を指定すると接続レイテンシ・タイムアウト/認証失敗率・fd/メモリを見ながら実行中に同時実行数を上下させます。\n"
+                "(設定: [bright_yellow]sys_config.yaml[/bright_yellow] の [bright_yellow]executor.adaptive[/bright_yellow])\n\n")
 secret_help = ("enable に入るための secret を指定します。(省略時は password を流用します。)\n"
                "--ip 専用。--host | --group 指定時は [green]inventory.yaml[/green] の値を使用します。\n\n")
 quiet_help = ("画面上の出力（nodeのcommandの結果）を抑制します。進捗・エラーは表示されます。このオプションを使う場合は --log が必須です。")
 no_output_help = ("画面上の出力を完全に抑制します（進捗・エラーも表示しません）。 --log が未指定の場合は実行を中止します。")
-ordered_help = ("--group指定時にoutputの順番を昇順に並べ変えます。 このoptionを使用しない場合は実行完了順に表示されます。--group 未指定の場合は実行を中止します。")
+ordered_help = ("--group指定時にoutputの順番を昇順に並べ変えます。 このoptionを使用しない場合は実行完了順に表示されます。--group 未指定の場合は実行を中止します。\n"
+                "昇順で手前のホストがすべて完了した時点で、そのホストの結果を表示します。")
 parser_help = ("コマンドの結果をparseします。textfsmかgenieを指定します。")
 textfsm_template_help = ("--parser optionで textfsm を指定する際に template ファイルを渡すためのオプションです。\n"
                          "--parser optionで textfsm を指定する際は必須です。(genieのときは必要ありません。)")
 force_help = "device_type の不一致や未設定エラーを無視して強制実行するケロ🐸"
+stream_help = ("コマンドの結果を届いた順に表示し、ログにも 1 コマンドずつ追記します。(ホストの全コマンド完了を待たない)\n"
+               "大きな出力（show tech 等）や大量ホストでメモリに結果を溜め込みません。--parser とは併用できません。")
+pipeline_help = ("--commands-list のコマンドを 1 つずつ送らず、まとめてチャネルに書き込んで実行します。(高 RTT 回線向け)\n"
+                 "まとめる数は [bright_yellow]sys_config.yaml[/bright_yellow] の [bright_yellow]executor.pipeline_window[/bright_yellow] (0 ならリスト全体)。\n"
+                 "プロンプトが変わるコマンドや対話的な確認を求めるコマンドを含むリストには使わないでください。")
+deadline_help = ("実行全体の期限(秒)を指定します。期限を過ぎたら未開始のホストはキャンセルし、実行中のセッションは切断して終了します。\n"
+                 "接続 / 認証 / enable / コマンドごとの期限は [bright_yellow]sys_config.yaml[/bright_yellow] の [bright_yellow]connect.deadlines[/bright_yellow]、\n"
+                 "接続失敗時のリトライは [bright_yellow]executor.retry[/bright_yellow] で設定します。(どちらも期限の残り時間で切り詰められます)")
+
+trace_help = ("実行のタイムラインを Chrome trace-event 形式の JSON で FILE に書き出します。\n"
+              "ホストごと・フェーズ（接続 / 認証 / enable / コマンド / パース / ログ保存 / 表示）ごとの区間がワーカースレッド別に並びます。\n"
+              "[bright_yellow]https://ui.perfetto.dev[/bright_yellow] や chrome://tracing で開けます。\n"
+              "example: execute --group tokyo -L ... --trace logs/trace.json")
 
 
 ######################
@@ -69,12 +97,16 @@ netmiko_execute_parser.add_argument("-P", "--port", type=int, default=22, help=p
 netmiko_execute_parser.add_argument("-t", "--timeout", type=int, default=10, help=timeout_help)
 netmiko_execute_parser.add_argument("-l", "--log", action="store_true", help=log_help)
 netmiko_execute_parser.add_argument("-m", "--memo", type=str, default="", help=memo_help)
-netmiko_execute_parser.add_argument("-w", "--workers", type=int, default=None, metavar="N", help=workers_help)
+netmiko_execute_parser.add_argument("-w", "--workers", type=workers_option, default=None, metavar="N|auto", help=workers_help)
 netmiko_execute_parser.add_argument("-s", "--secret", type=str, default="", help=secret_help)
 netmiko_execute_parser.add_argument("-o", "--ordered", action="store_true", help=ordered_help)
 netmiko_execute_parser.add_argument("--parser", "--parse",dest="parser",  choices=["textfsm", "genie", "text-fsm"], help=parser_help)
 netmiko_execute_parser.add_argument("--textfsm-template", type=str,  help=textfsm_template_help)
 netmiko_execute_parser.add_argument("--force", action="store_true", help=force_help)
+netmiko_execute_parser.add_argument("--pipeline", action="store_true", help=pipeline_help)
+netmiko_execute_parser.add_argument("--stream", action="store_true", help=stream_help)
+netmiko_execute_parser.add_argument("--deadline", type=deadline_option, default=None, metavar="SECONDS", help=deadline_help)
+netmiko_execute_parser.add_argument("--trace", type=str, default=None, metavar="FILE", help=trace_help)
 
 
 # mutually exclusive
@@ -92,7 +124,17 @@ silence_group.add_argument("--quiet", action="store_true", help=quiet_help)
 silence_group.add_argument("--no-output", action="store_true", help=no_output_help)
 
 
-def _execute_command(connection, prompt, command, args, parser_kind):
+def _send_command(connection, command: str, policy: ExecutionPolicy | None = None) -> str:
+    """send_command() を 1 回実行し、所要時間と受信バイト数をメトリクスに記録する。policy があれば送る直前に期限を切り詰め直す。"""
+    if policy is not None:
+        policy.refresh_command_timeout(connection)
+    started = perf_counter()
+    output = connection.send_command(command)
+    record_command(command, perf_counter() - started, output)
+    return output
+
+
+def _execute_command(connection, prompt, command, args, parser_kind, on_output=None, policy: ExecutionPolicy | None = None):
     """
     単一コマンドを Netmiko で実行し、プロンプト＋コマンド＋出力を 1 つの文字列に整形して返す。
 
@@ -107,31 +149,33 @@ def _execute_command(connection, prompt, command, args, parser_kind):
     args : argparse.Namespace
         実行オプション（parser_kind 等を含む）。
     parser_kind : str | None
-        "genie" / "textfsm" のときは構造化データを返す。None のときはテキストを返す。
+        "genie" / "textfsm" のときはパース前の生テキストを返す（パースは parse_stage で行う）。
+        None のときは整形済みテキストを返す。
+    on_output : Callable[[str], None] | None
+        --stream 用。指定時は整形済みテキストを戻り値にせず、これに渡す（戻り値は空文字）。
+    policy : ExecutionPolicy | None
+        コマンドの期限（connect.deadlines.command と --deadline の残り）。
 
     Returns
     -------
-    str | list | dict
+    str | list[tuple[str, str]]
         parser_kind=None のときは "{prompt} {command}\\n{device_output}\\n" 形式のテキスト。
-        parser_kind が指定されている場合は構造化データ（list/dict）。
+        parser_kind が指定されている場合は [(command, 生テキスト)]。
     """
+    output = _send_command(connection, command, policy)
+
     if parser_kind:
-        if parser_kind == "genie":
-            output = connection.send_command(command, use_genie=True, raise_parsing_error=True)
-            full_output = output
-        elif parser_kind == "textfsm":
-            template = str(Path(args.textfsm_template))
-            output = connection.send_command(command, use_textfsm=True, raise_parsing_error=True,
-                                             textfsm_template=template)
-            full_output = output
-    else:
-        output = connection.send_command(command)
-        full_output = f"{prompt} {command}\n{output}\n"
+        return [(command, output)]
 
+    full_output = f"{prompt} {command}\n{output}\n"
+    if on_output is not None:
+        on_output(full_output)
+        return ""
     return full_output
 
 
-def _execute_commands_list(connection, prompt, exec_commands, args, parser_kind):
+def _execute_commands_list(connection, prompt, exec_commands, args, parser_kind, pipeline_window: int | None = None, on_output=None,
+                           policy: ExecutionPolicy | None = None):
     """
     commands-lists.yaml で定義されたコマンド列を順次実行し、結果を連結して返す。
 
@@ -146,45 +190,50 @@ def _execute_commands_list(connection, prompt, exec_commands, args, parser_kind)
     args : argparse.Namespace
         実行オプション（parser_kind 等を含む）。
     parser_kind : str | None
-        "genie" / "textfsm" のときは各コマンドの構造化データ（list）を返す。None のときはテキスト連結。
+        "genie" / "textfsm" のときは各コマンドの (command, 生テキスト) を返す。None のときはテキスト連結。
+    pipeline_window : int | None
+        --pipeline 指定時のウィンドウ幅（0 ならリスト全体）。指定時は `send_commands_pipelined()` でまとめて送信する。
+        戻り値の形式は 1 コマンドずつ送った場合と同じ。
+    on_output : Callable[[str], None] | None
+        --stream 用。指定時は各コマンドの整形済みテキストを溜めずに届いた順にこれへ渡す（戻り値は空文字）。
+    policy : ExecutionPolicy | None
+        コマンドの期限（connect.deadlines.command と --deadline の残り）。--pipeline の 1 コマンド分の待ち時間にも使う。
 
     Returns
     -------
-    str | list
+    str | list[tuple[str, str]]
         parser_kind=None のときは各要素 "{prompt} {command}\\n{output}\\n" を連結したテキスト。
-        parser_kind が指定されている場合は各コマンド結果の配列（list）。
+        parser_kind が指定されている場合は各コマンドの (command, 生テキスト) の配列。
     """
     full_output_list = []
+    raw_output_list = []
 
-    # textfsmだけ先に一度だけ作る 
-    if parser_kind == "textfsm":
-        template = str(Path(args.textfsm_template))
+    if pipeline_window is not None:
+        # 1 コマンドずつ送る場合と同じ期限で、コマンドごとに切り詰め直して待つ（未設定ならパイプラインの既定値）。
+        command_timeout = (lambda: policy.refresh_command_timeout(connection)) if policy is not None else None
+        outputs = send_commands_pipelined(connection, prompt, exec_commands, window=pipeline_window,
+                                          read_timeout=DEFAULT_PIPELINE_READ_TIMEOUT, command_timeout=command_timeout)
+    else:
+        outputs = (_send_command(connection, command, policy) for command in exec_commands)
 
-    for command in exec_commands:
+    for command, output in zip(exec_commands, outputs):
         if parser_kind:
-            if parser_kind == "genie":
-                output = connection.send_command(command, use_genie=True, raise_parsing_error=True)
-                full_output = output
-                full_output_list.append(full_output)
-            elif parser_kind == "textfsm":
-                output = connection.send_command(command, use_textfsm=True, raise_parsing_error=True,
-                                                 textfsm_template=template)
-                full_output = output
-                full_output_list.append(full_output)
+            raw_output_list.append((command, output))
         else:
-            output = connection.send_command(command)
             full_output = f"{prompt} {command}\n{output}\n"
-            full_output_list.append(full_output)
+            if on_output is not None:
+                on_output(full_output)
+            else:
+                full_output_list.append(full_output)
     
-    if parser_kind == "genie":
-        return full_output_list
-    elif parser_kind == "textfsm":
-        return full_output_list
+    if parser_kind:
+        return raw_output_list
     else:
         return "".join(full_output_list)
 
 
-def _execute_commands(connection, prompt, args, exec_commands, parser_kind: str | None = None):
+def _execute_commands(connection, prompt, args, exec_commands, parser_kind: str | None = None, pipeline_window: int | None = None, on_output=None,
+                      policy: ExecutionPolicy | None = None):
     """
     単発コマンド（--command）またはコマンドリスト（--commands-list）を実行し、結果を返すラッパー関数。
 
@@ -198,11 +247,17 @@ def _execute_commands(connection, prompt, args, exec_commands, parser_kind: str
         引数オブジェクト（args.command または args.commands_list を持つ）。
     exec_commands : list[str] | None
         コマンドリスト実行時に使用するコマンド配列。単発コマンド時は None。
+    pipeline_window : int | None
+        --pipeline 指定時のウィンドウ幅。コマンドリスト実行時のみ使用。
+    on_output : Callable[[str], None] | None
+        --stream 用のコマンド単位の出力先。
+    policy : ExecutionPolicy | None
+        コマンドの期限。コマンドを送るたびに --deadline の残りで切り詰め直す。
 
     Returns
     -------
-    str
-        実行結果テキスト。
+    str | list[tuple[str, str]]
+        実行結果テキスト。parser_kind 指定時はパース前の (command, 生テキスト) のリスト。
 
     Raises
     ------
@@ -210,14 +265,17 @@ def _execute_commands(connection, prompt, args, exec_commands, parser_kind: str
         args.command と args.commands_list のいずれも指定されていない場合。
     """
     if args.command:
-        return _execute_command(connection, prompt, args.command, args=args, parser_kind=parser_kind)
+        return _execute_command(connection, prompt, args.command, args=args, parser_kind=parser_kind, on_output=on_output, policy=policy)
     elif args.commands_list:
-        return _execute_commands_list(connection, prompt, exec_commands, args=args, parser_kind=parser_kind)
+        return _execute_commands_list(connection, prompt, exec_commands, args=args, parser_kind=parser_kind, pipeline_window=pipeline_window, on_output=on_output,
+                                      policy=policy)
     else:
         raise ValueError("command または commands_list のいずれかが必要ケロ🐸")
 
 
-def _handle_execution(device: dict, args, poutput, hostname, *, output_buffers: dict | None = None, parser_kind: str | None = None) -> str | None:
+def _handle_execution(device: dict, args, poutput, hostname, *, plan: ExecutionPlan, output_buffers: SortedPrefixFlusher | None = None,
+                      parse_pool: Executor | None = None, concurrency: AdaptiveConcurrencyController | None = None,
+                      buffer_budget: MemoryBudget | None = None, policy: ExecutionPolicy | None = None) -> HostResult:
     """
     デバイス接続〜コマンド実行〜ログ保存までをまとめて処理するラッパー関数。
 
@@ -226,98 +284,132 @@ def _handle_execution(device: dict, args, poutput, hostname, *, output_buffers:
         args: コマンドライン引数
         poutput: cmd2 の出力関数
         hostname (str): ログファイル名などに使うホスト識別子
+        plan (ExecutionPlan): do_execute で 1 度だけ組み立てた実行計画（コマンド列・parser・device_type 検証結果）
+        output_buffers (SortedPrefixFlusher | None): --ordered 用の出力バッファ。結果はここに登録し、表示は集計側で行う。
+        parse_pool (Executor | None): --parser 用のプロセスプール。None なら自スレッドでパースする。
+        concurrency (AdaptiveConcurrencyController | None): --workers auto 時に接続結果を報告する先。
+        buffer_budget (MemoryBudget | None): 実行全体で結果をメモリに溜めてよい量（executor.max_buffer_mb）。
+        policy (ExecutionPolicy | None): フェーズごとの期限・接続リトライ・実行全体の期限（--deadline）。None なら Netmiko の既定値でリトライなし。
     
     Returns:
-        成功時 None
-        失敗時 hostname (str)
+        HostResult: 成否・失敗の分類・ログの保存先（フェーズごとの所要時間は RunMetrics.run() 経由のときに付く）
     """
     timer = perf_counter() # ⌚ start
-    # ✅ 1. commands-list の存在チェック（必要なら）
+    inventory_hostname = hostname # --ordered の並び順に使う（接続後の hostname はプロンプト由来に変わる）
+    # ✅ 1. commands-list は do_execute で解決済み（plan.commands）。ワーカーでは YAML を読まない。
     result_output_string = ""
-    exec_commands = None # args.commandのとき未定義になるため必要。
-
-    try:
-        if args.commands_list:
-            exec_commands = get_validated_commands_list(args)
-    except (FileNotFoundError, ValueError) as e:
-        if not args.no_output:
-            print_error(str(e))
-            elapsed = perf_counter() - timer
-            print_warning(f"<NODE: {hostname}> ❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
-        return hostname # 失敗時
-    
-    # ✅ 2. device_type ミスマッチチェック (接続前に実施)
-    if args.commands_list:
-        list_device_type = get_commands_list_device_type(args.commands_list)
-        node_device_type = device.get("device_type")
-
-        try:
-            validate_device_type_for_list(hostname=hostname,
-                                          node_device_type=node_device_type,
-                                          list_name=args.commands_list,
-                                          list_device_type=list_device_type)
-        except ValueError as e:
-            if getattr(args, "force", False):
-                if not args.no_output:
-                    print_warning(f"{e} (--force指定のため続行ケロ🐸)")
-            else:
-                if not args.no_output:
-                    print_error(str(e))
-                    elapsed = perf_counter() - timer
-                    print_warning(f"<NODE: {hostname}> ❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
-                return hostname # このホストはスキップ
+    parser_kind = plan.parser_kind
+    exec_commands = list(plan.commands) if plan.commands else None # args.commandのときはNone
+    if policy is None:
+        policy = ExecutionPolicy()
+
+    # ✅ 2. device_type ミスマッチチェック (接続前に実施。検証結果は plan に入っている)
+    validation_error = plan.validation_error_for(hostname)
+    if validation_error:
+        if getattr(args, "force", False):
+            if not args.no_output:
+                print_warning(f"{validation_error} (--force指定のため続行ケロ🐸)")
+        else:
+            if not args.no_output:
+                print_error(validation_error)
+                elapsed = perf_counter() - timer
+                print_warning(f"<NODE: {hostname}> ❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
+            return HostResult.failure(hostname, "validation", validation_error, status=STATUS_SKIPPED) # このホストはスキップ
 
-    # ✅ 3. 接続とプロンプト取得
+    # ✅ 3. 接続とプロンプト取得（コネクションプール有効時はプールから借りる。期限とリトライは policy に従う）
     try:
-        connection, prompt, hostname = connect_to_device(device, hostname)
+        connection, prompt, hostname = open_session_with_policy(device, hostname, policy, concurrency=concurrency)
     except ConnectionError as e:
         if not args.no_output:
             print_error(str(e))
             elapsed = perf_counter() - timer
             print_warning(f"<NODE: {hostname}> ❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
-        return hostname # 失敗時
-    
+        return connect_failure(hostname, e) # 失敗時
+
     if not args.no_output:
         print_success(f"<NODE: {hostname}> 🔗接続成功ケロ🐸")
 
+    # --ordered のときは表示せずに順番待ち用のバッファへ登録する。
+    ordered_enabled = output_buffers is not None and args.group and args.ordered and not args.no_output and not args.quiet
+
+    # 表示 / ログ / --ordered 用の本文バッファ。executor.max_buffer_mb を超えた分は一時ファイルへ退避する。
+    # (1 ホスト分の出力も "".join で 1 つの巨大な文字列にはしない)
+    text_buffer = HostTextBuffer(buffer_budget)
+
+    # --stream: コマンドの結果を届いた順に表示 / ログ追記する
+    stream = None
+    on_output = None
+    if getattr(args, "stream", False):
+        stream = HostOutputStream(hostname, args, poutput,
+                                  live=not (args.no_output or args.quiet or ordered_enabled),
+                                  keep_buffer=text_buffer if ordered_enabled else None)
+        on_output = stream.write
+    elif not parser_kind:
+        on_output = text_buffer.write
+
     # ✅ 4. コマンド実行（単発 or リスト）
+    # parser 指定時もここでは生テキストを集めるだけ。パースは接続を閉じた後に行う。
+    platform = connection.device_type
     try:
-        result_output_string = _execute_commands(connection, prompt, args, exec_commands, parser_kind)
+        result_output_string = _execute_commands(connection, prompt, args, exec_commands, parser_kind, pipeline_window=plan.pipeline_window,
+                                                 on_output=on_output, policy=policy)
     except Exception as e:
+        if stream is not None:
+            stream.close() # 途中までの結果はログに残す
+        text_buffer.close()
         if not args.no_output:
-            if args.parser == "genie":
-                print_error(f"<NODE: {hostname}> 🧩Genieパース失敗ケロ🐸: {e}")
-            elif args.parser == "textfsm":
-                print_error(f"<NODE: {hostname}> 🧩textfsmパース失敗ケロ🐸: {e}")
-            else:   
+            if policy.deadline.expired:
+                print_error(f"<NODE: {hostname}> ⏰実行全体の期限を過ぎたので中断したケロ🐸: {e}")
+            else:
                 print_error(f"<NODE: {hostname}> ⚠️実行エラーケロ🐸: {e}")
             elapsed = perf_counter() - timer
             print_warning(f"<NODE: {hostname}> ❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
-        safe_disconnect(connection)
-        return hostname # 失敗時
-
-    # ✅ 5. 接続終了
-    safe_disconnect(connection)
-
-    # ✅ 6. parser option 使用時の json と ordered 用の処理
-    # display_text = 生テキスト or json 文字列
-    # 表示用。save_json側でjson.dumpsが入るのでsave_jsonの呼び出し時はresult_output_stringを渡す。
-    display_text = result_output_string 
-    if parser_kind and isinstance(result_output_string, (list, dict)):
-        display_text = json.dumps(result_output_string, ensure_ascii=False, indent=2)
-
-    # ordered option用の貯める処理。(quiet | no-outputのときは貯めない。)
-    if output_buffers is not None and args.group and args.ordered and not args.no_output and not args.quiet:
-        output_buffers[hostname] = display_text
+        close_session_with_policy(connection, policy, discard=True) # 状態が不明なセッションはプールに戻さない
+        if policy.deadline.expired:
+            return HostResult.failure(hostname, "deadline", e, status=STATUS_DEADLINE)
+        return HostResult.failure(hostname, "command", e) # 失敗時
+
+    # ✅ 5. 接続終了（プール有効時は返却）
+    close_session_with_policy(connection, policy)
+
+    # ✅ 5.5 パース（--parser指定時のみ。group実行時はプロセスプールで行う）
+    if parser_kind:
+        try:
+            with timed("parse"):
+                parsed_list = parse_raw_outputs(result_output_string, platform=platform, parser_kind=parser_kind,
+                                                textfsm_template=plan.textfsm_template, parse_pool=parse_pool)
+        except Exception as e:
+            text_buffer.close()
+            if not args.no_output:
+                if parser_kind == "genie":
+                    print_error(f"<NODE: {hostname}> 🧩Genieパース失敗ケロ🐸: {e}")
+                else:
+                    print_error(f"<NODE: {hostname}> 🧩textfsmパース失敗ケロ🐸: {e}")
+                elapsed = perf_counter() - timer
+                print_warning(f"<NODE: {hostname}> ❌中断ケロ🐸 (elapsed: {elapsed:.2f}s)")
+            return HostResult.failure(hostname, "parse", e) # 失敗時
+
+        # 単発コマンドは構造化データそのもの、commands-list はコマンド毎の配列。
+        result_output_string = parsed_list[0] if args.command else parsed_list
+
+    # ✅ 6. parser option 使用時の json
+    # 表示用の json は text_buffer に直接書き出す（json.dumps で巨大な文字列を作らない）。
+    # save_json 側で json 化するので、save_json の呼び出し時は result_output_string を渡す。
+    if parser_kind and isinstance(result_output_string, (list, dict)) and not args.no_output and not args.quiet:
+        json.dump(result_output_string, text_buffer, ensure_ascii=False, indent=2)
     
     # ✅ 7. ログ保存（--log指定時のみ）
+    log_path = None
     if getattr(args, "log", False):
         if not getattr(args, "no_output", False):
             print_info(f"<NODE: {hostname}> 💾ログ保存モードONケロ🐸🔛")
-        if parser_kind in ("genie", "textfsm") and isinstance(result_output_string, (list, dict)):
-            log_path = save_json(result_output_string, hostname, args, parser_kind=parser_kind, mode="execute")
-        else:
-            log_path = save_log(result_output_string, hostname, args)
+        with timed("save_log"):
+            if stream is not None:
+                log_path = stream.close() # --stream では実行中に追記済み
+            elif parser_kind in ("genie", "textfsm") and isinstance(result_output_string, (list, dict)):
+                log_path = save_json(result_output_string, hostname, args, parser_kind=parser_kind, mode="execute")
+            else:
+                log_path = save_log(text_buffer.chunks(), hostname, args)
         if not getattr(args, "no_output", False):
             print_success(f"<NODE: {hostname}> 💾ログ保存完了ケロ🐸⏩⏩⏩ {log_path}")
 
@@ -327,13 +419,34 @@ def _handle_execution(device: dict, args, poutput, hostname, *, output_buffers:
         if args.quiet:
             print_info(f"<NODE: {hostname}> 📄OUTPUTは省略するケロ (hidden by --quiet) 🐸")
         else:
-            if not (args.group and args.ordered and output_buffers is not None):
-                print_info(f"<NODE: {hostname}> 📄OUTPUTケロ🐸")
-                poutput(display_text)
+            if not ordered_enabled and stream is None:
+                with timed("display"):
+                    print_info(f"<NODE: {hostname}> 📄OUTPUTケロ🐸")
+                    write_chunks(poutput, text_buffer.chunks())
+
+    # ordered option用の貯める処理。(quiet | no-outputのときは貯めない。) バッファは表示後に flusher 側で閉じる。
+    if ordered_enabled:
+        output_buffers.put(inventory_hostname, hostname, text_buffer)
+    else:
+        text_buffer.close()
+
     elapsed = perf_counter() - timer
     if not args.no_output:
         print_success(f"<NODE: {hostname}> 🔚実行完了ケロ🐸 (elapsed: {elapsed:.2f}s)")
-    return None # 成功時
+    return HostResult.success(hostname, log_path=log_path) # 成功時
+
+
+def _build_plan_or_report(args, targets: dict, parser_kind: str | None) -> ExecutionPlan | None:
+    """
+    実行計画を組み立てる。commands-list の不備などで組み立てられないときはエラーを表示して None を返す。
+    """
+    try:
+        return build_execution_plan(args, targets, parser_kind)
+    except (FileNotFoundError, ValueError) as e:
+        if not args.no_output:
+            print_error(str(e))
+            print_warning("❌中断ケロ🐸")
+        return None
 
 
 @cmd2.with_argparser(netmiko_execute_parser)
@@ -357,6 +470,10 @@ def do_execute(self, args):
         print_error("--ordered は --group 指定時のみ使用できるケロ🐸")
         return
 
+    if args.pipeline and not args.commands_list:
+        print_error("--pipeline は --commands-list 指定時のみ使用できるケロ🐸 (-c の単発コマンドはまとめて送れない)")
+        return
+
     if args.quiet and not args.log:
         print_error("--quietオプションを使用するには--logが必要ケロ🐸")
         return
@@ -372,6 +489,10 @@ def do_execute(self, args):
             args.parser = "textfsm"
         parser_kind = args.parser
 
+    if args.stream and parser_kind:
+        print_error("--stream は --parser と併用できないケロ🐸 (パースは全コマンドの結果が揃ってから行うため)")
+        return
+
     if args.parser == "textfsm":
         if not args.textfsm_template:
             print_error("--parser textfsm を使うには --textfsm-template <PATH> が必要ケロ🐸")
@@ -380,12 +501,41 @@ def do_execute(self, args):
             print_error(f"指定のtemplateが見つからないケロ🐸: {args.textfsm_template}")
             return
 
+    # 実行全体で結果をメモリに溜めてよい量。超えた分は一時ファイルに退避する。
+    try:
+        buffer_budget = MemoryBudget(get_max_buffer_bytes())
+    except ValueError as e:
+        if not args.no_output:
+            print_error(str(e))
+        return
+
+    # 期限 / リトライ（connect.deadlines / executor.retry）。--deadline の残り時間はここから数える。
+    try:
+        policy = build_execution_policy(args)
+    except ValueError as e:
+        if not args.no_output:
+            print_error(str(e))
+        return
+
+    # 接続レートの制限（connect.rate_limit）はワーカーを起動する前にここで作る。設定の誤りは接続ごとではなくここで 1 度だけ出す。
+    try:
+        get_connection_rate_limiter()
+    except ValueError as e:
+        if not args.no_output:
+            print_error(str(e))
+        return
 
     if args.ip:
         device, hostname = _build_device_and_hostname(args)
-        result_failed_hostname = _handle_execution(device, args, self.poutput, hostname, parser_kind=parser_kind)
-        if result_failed_hostname and not args.no_output:
-            print_error(f"❎ 🐸なんかトラブルケロ@: {result_failed_hostname}")
+        plan = _build_plan_or_report(args, {hostname: device.get("device_type")}, parser_kind)
+        if plan is None:
+            return
+        # フェーズごとの所要時間は logs/metrics/ に記録する（sys_config.yaml の metrics.enabled）
+        with create_run_metrics("execute", args) as run_metrics:
+            host_result = run_metrics.run(_handle_execution, device, args, self.poutput, hostname, plan=plan, buffer_budget=buffer_budget,
+                                          policy=policy)
+        if not host_result.ok and not args.no_output:
+            print_error(f"❎ 🐸なんかトラブルケロ@: {host_result.hostname}")
         return
 
     if args.host or args.group: 
@@ -400,59 +550,122 @@ def do_execute(self, args):
     
     if args.host:
         device, hostname = _build_device_and_hostname(args, inventory_data)
-        result_failed_hostname = _handle_execution(device, args, self.poutput, hostname, parser_kind=parser_kind)
-        if result_failed_hostname and not args.no_output:
-            print_error(f"❎ 🐸なんかトラブルケロ@: {result_failed_hostname}")
+        plan = _build_plan_or_report(args, {hostname: device.get("device_type")}, parser_kind)
+        if plan is None:
+            return
+        # フェーズごとの所要時間は logs/metrics/ に記録する（sys_config.yaml の metrics.enabled）
+        with create_run_metrics("execute", args) as run_metrics:
+            host_result = run_metrics.run(_handle_execution, device, args, self.poutput, hostname, plan=plan, buffer_budget=buffer_budget,
+                                          policy=policy)
+        if not host_result.ok and not args.no_output:
+            print_error(f"❎ 🐸なんかトラブルケロ@: {host_result.hostname}")
         return
 
     elif args.group:
         device_list, hostname_list = _build_device_and_hostname(args, inventory_data)
 
-        max_workers = default_workers(len(device_list), args)
+        # commands-list の解決と全ホストの device_type 検証はここで 1 度だけ行う。
+        targets = {hostname: device.get("device_type") for device, hostname in zip(device_list, hostname_list)}
+        plan = _build_plan_or_report(args, targets, parser_kind)
+        if plan is None:
+            return
 
-        result_failed_hostname_list = []
+        # 全ホストの HostResult を集め、最後にフェーズ別のパーセンタイル等をサマリ表示する。
+        run_result = RunResult("execute")
 
-        # ✅ --ordered 用の本文バッファ（hostname -> str）
-        ordered_output_buffers = {}  # {hostname: collected_output}
+        # --orderedがあって--quietと--no_outputがないこと。
+        ordered_output_enabled =  args.ordered and not args.quiet and not args.no_output
 
-        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # ✅ --ordered 用の本文バッファ。昇順で手前のホストがすべて終わったものから表示する。
+        def _emit_ordered_output(h, text_buffer):
+            print_info(f"NODE: {h} 📄OUTPUTケロ🐸")
+            write_chunks(self.poutput, text_buffer.chunks())
+        ordered_output_buffers = SortedPrefixFlusher(hostname_list, _emit_ordered_output) if ordered_output_enabled else None
 
-            futures = []
-            future_to_hostname = {} 
+        max_workers = default_workers(len(device_list), args)
 
-            ordered_output_enabled =  args.ordered and not args.quiet and not args.no_output
+        # --workers auto のときは確保した枠の中で同時実行数を実行中に上下させる。
+        try:
+            concurrency = create_adaptive_controller(max_workers) if args.workers == AUTO_WORKERS else None
+        except ValueError as e:
+            if not args.no_output:
+                print_error(str(e))
+            return
 
-            for device, hostname in zip(device_list, hostname_list):
-                # --orderedがあって--quietと--no_outputがないこと。
-                if ordered_output_enabled:
-                    # 順番を並び替えるために貯める。
-                    future = pool.submit(_handle_execution, device, args, self.poutput, hostname, output_buffers=ordered_output_buffers, parser_kind=parser_kind)
-                else:
-                    future = pool.submit(_handle_execution, device, args, self.poutput, hostname, parser_kind=parser_kind)
-                
-                futures.append(future)
-                future_to_hostname[future] = hostname
+        # --parser 指定時は I/O ワーカーとは別のプロセスプールでパースする。(CPU負荷の高いパースでGILを握らないため)
+        try:
+            parse_pool_context = create_parse_pool(default_parse_workers(len(device_list))) if parser_kind else nullcontext()
+        except ValueError as e:
+            if not args.no_output:
+                print_error(str(e))
+            return
 
-            for future in as_completed(futures):
-                hostname = future_to_hostname.get(future, "UNKNOWN")
+        # フェーズごとの所要時間は logs/metrics/ にホストごとに追記する（sys_config.yaml の metrics.enabled）
+        run_metrics = create_run_metrics("execute", args)
+
+        with parse_pool_context as parse_pool, run_metrics:
+            run_metrics.workers = max_workers
+            handler = partial(run_metrics.run, _handle_execution)
+            handler = partial(concurrency.run, handler) if concurrency else handler
+
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+
+                futures = []
+                future_to_hostname = {} 
+
+                for device, hostname in zip(device_list, hostname_list):
+                    if ordered_output_enabled:
+                        # 順番を並び替えるために貯める。
+                        future = pool.submit(handler, device, args, self.poutput, hostname, plan=plan, output_buffers=ordered_output_buffers,
+                                             parse_pool=parse_pool, concurrency=concurrency, buffer_budget=buffer_budget, policy=policy)
+                    else:
+                        future = pool.submit(handler, device, args, self.poutput, hostname, plan=plan, parse_pool=parse_pool, concurrency=concurrency,
+                                             buffer_budget=buffer_budget, policy=policy)
+
+                    futures.append(future)
+                    future_to_hostname[future] = hostname
+
+                def _collect(future):
+                    hostname = future_to_hostname.get(future, "UNKNOWN")
+                    try:
+                        run_result.add(future.result())
+                    except Exception as e:
+                        # _handle_execution で捕まえていない想定外の例外
+                        if not args.no_output:
+                            print_error(f"⚠️ 未処理の例外: {hostname}:{e}")
+                        run_result.add(HostResult.failure(hostname, "unhandled", e, status=STATUS_ERROR))
+                    # --ordered: 昇順で手前のホストがすべて終わっていれば、ここで表示される。
+                    if ordered_output_buffers is not None:
+                        ordered_output_buffers.done(hostname)
+
+                pending = set(futures)
                 try:
-                    result_failed_hostname = future.result()
-                    if result_failed_hostname:
-                        result_failed_hostname_list.append(result_failed_hostname)
-                except Exception as e:
-                    # _handle_execution で捕まえていない想定外の例外
-                    if not args.no_output:
-                        print_error(f"⚠️ 未処理の例外: {hostname}:{e}")
-        
-        # --orderedの場合は、ここで実行結果をまとめて表示する。
-        if ordered_output_enabled:
-            for h in sorted(ordered_output_buffers.keys(), key=lambda x: (x is None, x or "")):
-                print_info(f"NODE: {h} 📄OUTPUTケロ🐸")
-                self.poutput(ordered_output_buffers[h])
+                    for future in as_completed(futures, timeout=policy.deadline.remaining()):
+                        pending.discard(future)
+                        _collect(future)
+                except FuturesTimeoutError:
+                    # --deadline: 未開始のホストはキャンセルし、実行中のセッションは切断して終わらせる。
+                    policy.abort(pending)
+                    for future in [f for f in futures if f in pending]:
+                        if future.done() and not future.cancelled():
+                            _collect(future)
+                            continue
+                        hostname = future_to_hostname[future]
+                        run_result.add(HostResult.failure(hostname, "deadline", "実行全体の期限で打ち切り", status=STATUS_DEADLINE))
+                        if ordered_output_buffers is not None:
+                            ordered_output_buffers.done(hostname)
 
         # 結果をまとめて表示
-        if result_failed_hostname_list and not args.no_output:
-            print_warning(f"❎ 🐸なんかトラブルケロ: {', '.join(sorted(result_failed_hostname_list))}")
+        run_result.finish()
+        # 実行中に覚えたプロンプトはここでまとめてファイルに書く（ホストごとには書かない）。
+        flush_prompt_cache()
+        if not args.no_output:
+            print_run_summary(run_result)
+        deadline_hostnames = run_result.hostnames_with_status(STATUS_DEADLINE)
+        if deadline_hostnames and not args.no_output:
+            print_warning(f"⏰ 実行全体の期限({args.deadline}s)で打ち切ったケロ🐸: {', '.join(deadline_hostnames)}")
+        if run_result.failed and not args.no_output:
+            print_warning(f"❎ 🐸なんかトラブルケロ: {', '.join(run_result.failed_hostnames)}")
         else:
             if not args.no_output:
                 print_success("✅ すべてのホストで実行完了ケロ🐸")
\ No newline at end of file
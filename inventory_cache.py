@@ -0,0 +1,151 @@
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any
+
+from ruamel.yaml import YAML
+
+# inventory_cache.py
+# 役割:
+# - inventory.yaml（と sys_config.yaml）を 1 度だけパースして使い回す「コンパイル済み」キャッシュ
+#   - パースは safe ローダー（ruamel.yaml.clib があれば C 実装）で行う。コメント保持の round-trip ローダーより桁違いに速い
+#   - mtime と size が変わらない限りメモリ上の結果をそのまま返す（変われば読み直す）
+#   - inventory.yaml はパース結果を .kero_cache/inventory.yaml.pickle に保存し、次回の起動では YAML をパースせずに読む
+# - get_validated_inventory_data / show --hosts 系 / 補完 / テーマ取得など、inventory を読む箇所はすべてここを通す
+# 注意:
+# - 返す dict は全呼び出し元で共有している。書き換えないこと（書き換える場合は呼び出し側でコピーする）🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+INVENTORY_FILE = "inventory.yaml"
+CACHE_DIR_NAME = ".kero_cache"
+CACHE_FORMAT_VERSION = 1
+
+
+def _signature(path: Path) -> tuple[int, int]:
+    """変更検知用の (mtime_ns, size)。ファイルが無ければ FileNotFoundError。"""
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CompiledYamlCache:
+    """
+    1 つの YAML ファイルのパース結果のキャッシュ（スレッドセーフ）。
+
+    Parameters
+    ----------
+    path : str | Path
+        YAML ファイル
+    sidecar : str | Path | None
+        パース結果を保存するファイル。None ならメモリ上だけでキャッシュする
+
+    サイドカーは pickle を 2 つ続けて書く（ヘッダー → データ）。ヘッダーが合わなければデータは読まない。
+    """
+
+    def __init__(self, path: str | Path, sidecar: str | Path | None = None):
+        self.path = Path(path).absolute()
+        self.sidecar = Path(sidecar).absolute() if sidecar is not None else None
+        self._lock = threading.Lock()
+        self._signature: tuple[int, int] | None = None
+        self._data: Any = None
+
+    def load(self) -> Any:
+        """パース結果を返す。ファイルが変わっていれば読み直す。"""
+        signature = _signature(self.path)
+        with self._lock:
+            if self._signature == signature:
+                return self._data
+
+            header = self._header(signature)
+            data = self._read_sidecar(header)
+            if data is None:
+                data = self._parse()
+                self._write_sidecar(header, data)
+            self._signature, self._data = signature, data
+            return data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signature, self._data = None, None
+
+    def _header(self, signature: tuple[int, int]) -> dict:
+        return {"version": CACHE_FORMAT_VERSION, "source": str(self.path), "mtime_ns": signature[0], "size": signature[1]}
+
+    def _parse(self) -> Any:
+        # YAML インスタンスはスレッドセーフではないので毎回作る。
+        with open(self.path, "r", encoding="utf-8") as f:
+            return YAML(typ="safe").load(f)
+
+    def _read_sidecar(self, header: dict) -> Any:
+        if self.sidecar is None:
+            return None
+        try:
+            with open(self.sidecar, "rb") as f:
+                if pickle.load(f) != header:
+                    return None
+                return pickle.load(f)
+        except Exception:
+            # 無い / 壊れている / 古い形式 → YAML から読み直す
+            return None
+
+    def _write_sidecar(self, header: dict, data: Any) -> None:
+        if self.sidecar is None or data is None:
+            return
+        # 書きかけのファイルを読まれないよう、一時ファイルに書いてから置き換える。
+        try:
+            self.sidecar.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.sidecar.with_name(f"{self.sidecar.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.sidecar)
+        except OSError:
+            # キャッシュの保存失敗で読み込み自体を失敗させない。
+            pass
+
+
+_caches: dict[Path, CompiledYamlCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _get_cache(path: str | Path, *, sidecar: bool) -> CompiledYamlCache:
+    key = Path(path).absolute()
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            sidecar_path = key.parent / CACHE_DIR_NAME / f"{key.name}.pickle" if sidecar else None
+            cache = _caches[key] = CompiledYamlCache(key, sidecar_path)
+        return cache
+
+
+def load_yaml_cached(path: str | Path, *, sidecar: bool = False) -> Any:
+    """
+    path の YAML をキャッシュ経由で読む。
+
+    Parameters
+    ----------
+    path : str | Path
+        YAML ファイル（カレントディレクトリからの相対パス可）
+    sidecar : bool, optional
+        True ならパース結果を `<同じディレクトリ>/.kero_cache/<ファイル名>.pickle` にも保存する
+
+    Raises
+    ------
+    FileNotFoundError
+        path が存在しない場合
+    """
+    return _get_cache(path, sidecar=sidecar).load()
+
+
+def load_inventory(path: str | Path = INVENTORY_FILE) -> dict:
+    """inventory.yaml のパース結果（共有・読み取り専用）。存在しなければ FileNotFoundError。"""
+    return load_yaml_cached(path, sidecar=True)
+
+
+def clear_cache() -> None:
+    """メモリ上のキャッシュをすべて捨てる（サイドカーは残す）。"""
+    with _caches_lock:
+        _caches.clear()
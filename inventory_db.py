@@ -0,0 +1,321 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from ruamel.yaml import YAML
+
+# inventory_db.py
+# 役割:
+# - inventory を SQLite に持つバックエンド（sys_config.yaml の inventory.backend: sqlite で有効）
+#   - hostname / group / tag / device_type / site に索引を張り、補完や show、--group の展開は必要な行だけを引く
+#   - 数万台の inventory.yaml を毎回まるごと読み込まない・全プロセスで保持しないため
+# - inventory.yaml との相互変換（import / export）。ホスト・グループの定義は JSON でそのまま持つので YAML に戻しても同じ内容になる
+#
+# 使い方:
+#   python inventory_db.py import                       # inventory.yaml -> inventory.db
+#   python inventory_db.py export                       # inventory.db -> inventory.export.yaml
+# 注意:
+# - import は一時ファイルに作ってから置き換える。実行中の KeroRoute は次の問い合わせで新しい DB を開き直す
+# - export は手で書いた inventory.yaml（コメント付き）を潰さないよう別ファイルに書き、既にあるファイルは --force なしでは上書きしない🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_INVENTORY_YAML = "inventory.yaml"
+DEFAULT_EXPORT_YAML = "inventory.export.yaml"
+DEFAULT_INVENTORY_DB = "inventory.db"
+SCHEMA_VERSION = 1
+_PREFIX_END = "\U0010ffff" # 前方一致を「prefix 以上 prefix+最大文字 未満」の範囲検索にする（索引が効く）
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE hosts (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    hostname TEXT,
+    ip TEXT,
+    device_type TEXT,
+    site TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX hosts_position ON hosts (position);
+CREATE INDEX hosts_hostname ON hosts (hostname);
+CREATE INDEX hosts_device_type ON hosts (device_type);
+CREATE INDEX hosts_site ON hosts (site);
+CREATE TABLE host_tags (tag TEXT NOT NULL, host TEXT NOT NULL, PRIMARY KEY (tag, host)) WITHOUT ROWID;
+CREATE TABLE inventory_groups (name TEXT PRIMARY KEY, position INTEGER NOT NULL, data TEXT NOT NULL);
+CREATE INDEX inventory_groups_position ON inventory_groups (position);
+CREATE TABLE group_members (group_name TEXT NOT NULL, position INTEGER NOT NULL, host TEXT NOT NULL, PRIMARY KEY (group_name, position)) WITHOUT ROWID;
+CREATE INDEX group_members_host ON group_members (host);
+CREATE TABLE group_tags (tag TEXT NOT NULL, group_name TEXT NOT NULL, PRIMARY KEY (tag, group_name)) WITHOUT ROWID;
+"""
+
+
+class SqliteInventory:
+    """
+    SQLite の inventory（読み取り専用、スレッドセーフ）。
+
+    DB ファイルが置き換えられた（mtime / size が変わった）ら、次の問い合わせで開き直す。
+    返すホスト・グループの dict は inventory.yaml の 1 エントリと同じ形。
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_INVENTORY_DB):
+        self.path = Path(path).absolute()
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._signature: tuple[int, int] | None = None
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"{self.path.name} が存在しないケロ🐸 python inventory_db.py import で作ってケロ") from None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if self._connection is None or self._signature != signature:
+                if self._connection is not None:
+                    self._connection.close()
+                self._connection = sqlite3.connect(f"{self.path.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+                self._signature = signature
+            return self._connection.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # --- 名前の一覧（補完用） ---
+    # 前方一致は主キー / 索引の範囲検索になり、名前順に LIMIT 件で打ち切れる（limit が None / 0 以下なら全件）。
+    def _names(self, column: str, table: str, prefix: str, limit: int | None) -> list[str]:
+        rows = self._query(f"SELECT DISTINCT {column} FROM {table} WHERE {column} >= ? AND {column} < ? ORDER BY {column} LIMIT ?",
+                           (prefix, prefix + _PREFIX_END, limit if limit and limit > 0 else -1))
+        return [name for (name,) in rows]
+
+    def host_names(self, prefix: str = "", *, limit: int | None = None) -> list[str]:
+        return self._names("name", "hosts", prefix, limit)
+
+    def group_names(self, prefix: str = "", *, limit: int | None = None) -> list[str]:
+        return self._names("name", "inventory_groups", prefix, limit)
+
+    def device_types(self, prefix: str = "", *, limit: int | None = None) -> list[str]:
+        return self._names("device_type", "hosts", prefix, limit)
+
+    # --- 1 件の取得 ---
+    def get_host(self, name: str) -> dict | None:
+        rows = self._query("SELECT data FROM hosts WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def get_group(self, name: str) -> dict | None:
+        rows = self._query("SELECT data FROM inventory_groups WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def group_hosts(self, name: str) -> dict[str, dict]:
+        """グループのメンバー（inventory のキー -> ホスト定義）。inventory に無いメンバーは含めない。"""
+        rows = self._query("SELECT hosts.name, hosts.data FROM group_members JOIN hosts ON hosts.name = group_members.host "
+                           "WHERE group_members.group_name = ? ORDER BY group_members.position", (name,))
+        return {host: json.loads(data) for host, data in rows}
+
+    # --- 条件での検索 ---
+    def find_hosts(self, *, tag: str | None = None, site: str | None = None, device_type: str | None = None,
+                   hostname: str | None = None, group: str | None = None) -> dict[str, dict]:
+        """指定した条件をすべて満たすホスト（inventory のキー -> ホスト定義）。"""
+        conditions, params = [], []
+        for column, value in (("hosts.site", site), ("hosts.device_type", device_type), ("hosts.hostname", hostname)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if tag is not None:
+            conditions.append("hosts.name IN (SELECT host FROM host_tags WHERE tag = ?)")
+            params.append(tag)
+        if group is not None:
+            conditions.append("hosts.name IN (SELECT host FROM group_members WHERE group_name = ?)")
+            params.append(group)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"SELECT name, data FROM hosts {where} ORDER BY position", tuple(params))
+        return {name: json.loads(data) for name, data in rows}
+
+    # --- まとめて取得 ---
+    def hosts(self) -> dict[str, dict]:
+        return {name: json.loads(data) for name, data in self._query("SELECT name, data FROM hosts ORDER BY position")}
+
+    def groups(self) -> dict[str, dict]:
+        return {name: json.loads(data) for name, data in self._query("SELECT name, data FROM inventory_groups ORDER BY position")}
+
+    def to_inventory(self) -> dict:
+        """inventory.yaml と同じ形の dict（全件）。"""
+        return {"all": {"hosts": self.hosts(), "groups": self.groups()}}
+
+    def subset(self, *, host: str | None = None, group: str | None = None) -> dict:
+        """
+        inventory.yaml と同じ形で、host / group の処理に必要な分だけを入れた dict。
+        どちらも None なら全件。
+        """
+        if host is None and group is None:
+            return self.to_inventory()
+
+        hosts, groups = {}, {}
+        if host is not None:
+            host_info = self.get_host(host)
+            if host_info is not None:
+                hosts[host] = host_info
+        if group is not None:
+            group_info = self.get_group(group)
+            if group_info is not None:
+                groups[group] = group_info
+                hosts.update(self.group_hosts(group))
+        return {"all": {"hosts": hosts, "groups": groups}}
+
+
+def _create_database(path: Path, inventory_data: dict) -> None:
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SCHEMA)
+        all_section = (inventory_data or {}).get("all") or {}
+        hosts = all_section.get("hosts") or {}
+        groups = all_section.get("groups") or {}
+
+        connection.executemany("INSERT INTO hosts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               ((str(name), position, info.get("hostname"), info.get("ip"), info.get("device_type"), info.get("site"),
+                                 json.dumps(info, ensure_ascii=False))
+                                for position, (name, info) in enumerate(hosts.items())))
+        connection.executemany("INSERT OR IGNORE INTO host_tags VALUES (?, ?)",
+                               ((str(tag), str(name)) for name, info in hosts.items() for tag in info.get("tags") or []))
+        connection.executemany("INSERT INTO inventory_groups VALUES (?, ?, ?)",
+                               ((str(name), position, json.dumps(info, ensure_ascii=False)) for position, (name, info) in enumerate(groups.items())))
+        connection.executemany("INSERT INTO group_members VALUES (?, ?, ?)",
+                               ((str(name), position, str(host)) for name, info in groups.items() for position, host in enumerate(info.get("hosts") or [])))
+        connection.executemany("INSERT OR IGNORE INTO group_tags VALUES (?, ?)",
+                               ((str(tag), str(name)) for name, info in groups.items() for tag in info.get("tags") or []))
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", (("schema_version", str(SCHEMA_VERSION)),
+                                                                  ("hosts", str(len(hosts))),
+                                                                  ("groups", str(len(groups)))))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def import_yaml(yaml_path: str | Path = DEFAULT_INVENTORY_YAML, db_path: str | Path = DEFAULT_INVENTORY_DB) -> tuple[int, int]:
+    """
+    inventory.yaml を SQLite に変換する（既存の DB は置き換える）。
+
+    Returns
+    -------
+    tuple[int, int]
+        取り込んだ (ホスト数, グループ数)
+
+    Raises
+    ------
+    FileNotFoundError
+        yaml_path が存在しない場合
+    ValueError
+        hosts / groups の定義が mapping でない場合
+    """
+    yaml_path, db_path = Path(yaml_path), Path(db_path)
+    if not yaml_path.exists():
+        raise FileNotFoundError(f"{yaml_path} が存在しないケロ🐸")
+
+    with open(yaml_path, "r", encoding="utf-8") as f:
+        inventory_data = YAML(typ="safe").load(f) or {}
+
+    all_section = inventory_data.get("all") or {}
+    for section in ("hosts", "groups"):
+        entries = all_section.get(section) or {}
+        if not isinstance(entries, dict) or not all(isinstance(info, dict) for info in entries.values()):
+            raise ValueError(f"all.{section} の形式が正しくないケロ🐸")
+
+    # 書きかけの DB を読まれないよう、一時ファイルに作ってから置き換える。
+    tmp_path = db_path.with_name(f".{db_path.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        _create_database(tmp_path, inventory_data)
+        os.replace(tmp_path, db_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return len(all_section.get("hosts") or {}), len(all_section.get("groups") or {})
+
+
+def export_yaml(db_path: str | Path = DEFAULT_INVENTORY_DB, yaml_path: str | Path = DEFAULT_EXPORT_YAML, *, overwrite: bool = False) -> tuple[int, int]:
+    """
+    SQLite の inventory を inventory.yaml の形式で書き出す。
+
+    Parameters
+    ----------
+    overwrite : bool
+        True なら yaml_path が既にあっても上書きする
+
+    Returns
+    -------
+    tuple[int, int]
+        書き出した (ホスト数, グループ数)
+
+    Raises
+    ------
+    FileExistsError
+        overwrite=False で yaml_path が既にある場合
+    """
+    inventory_data = SqliteInventory(db_path).to_inventory()
+    yaml = YAML()
+    yaml.indent(mapping=2, sequence=4, offset=2)
+    with open(yaml_path, "w" if overwrite else "x", encoding="utf-8") as f:
+        yaml.dump(inventory_data, f)
+    return len(inventory_data["all"]["hosts"]), len(inventory_data["all"]["groups"])
+
+
+_backends: dict[Path, SqliteInventory] = {}
+_backends_lock = threading.Lock()
+
+
+def get_inventory_backend() -> SqliteInventory | None:
+    """
+    `sys_config.yaml` の `inventory.backend` が sqlite のときだけ SqliteInventory を返す（既定は yaml = None）。
+    sys_config.yaml が無い場合も None（inventory.yaml を使う）。
+    """
+    # load_and_validate_yaml がこのモジュールを import するので、ここで import する。
+    from load_and_validate_yaml import load_sys_config
+
+    try:
+        inventory_config = load_sys_config().get("inventory") or {}
+    except FileNotFoundError:
+        return None
+    if inventory_config.get("backend", "yaml") != "sqlite":
+        return None
+
+    path = Path(inventory_config.get("sqlite_path") or DEFAULT_INVENTORY_DB).absolute()
+    with _backends_lock:
+        backend = _backends.get(path)
+        if backend is None:
+            backend = _backends[path] = SqliteInventory(path)
+        return backend
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="inventory.yaml と SQLite の inventory を相互変換するケロ🐸")
+    parser.add_argument("action", choices=["import", "export"], help="import: YAML -> SQLite / export: SQLite -> YAML")
+    parser.add_argument("--yaml", type=Path, default=None,
+                        help=f"YAML ファイル (default: import は {DEFAULT_INVENTORY_YAML} / export は {DEFAULT_EXPORT_YAML})")
+    parser.add_argument("--db", type=Path, default=Path(DEFAULT_INVENTORY_DB), help=f"SQLite ファイル (default: {DEFAULT_INVENTORY_DB})")
+    parser.add_argument("--force", action="store_true", help="export 先の YAML が既にあっても上書きする")
+    args = parser.parse_args(argv)
+
+    if args.action == "import":
+        args.yaml = args.yaml or Path(DEFAULT_INVENTORY_YAML)
+        hosts, groups = import_yaml(args.yaml, args.db)
+        print(f"🐸 {args.yaml} -> {args.db} ({hosts} hosts, {groups} groups)")
+    else:
+        args.yaml = args.yaml or Path(DEFAULT_EXPORT_YAML)
+        try:
+            hosts, groups = export_yaml(args.db, args.yaml, overwrite=args.force)
+        except FileExistsError:
+            parser.error(f"{args.yaml} は既にあるケロ🐸 上書きするなら --force を付けてね")
+        print(f"🐸 {args.db} -> {args.yaml} ({hosts} hosts, {groups} groups)")
+
+
+if __name__ == "__main__":
+    main()
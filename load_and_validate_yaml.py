@@ -1,6 +1,9 @@
 from ruamel.yaml import YAML
 from pathlib import Path
 
+from inventory_cache import load_inventory, load_yaml_cached
+from inventory_db import get_inventory_backend
+
 #####################
 ### CONST_SECTION ###
 #####################
@@ -14,21 +17,20 @@ yaml = YAML()
 def load_sys_config():
     """
     sys_config.yaml を 読み込んで dict を返す。
-    キャッシュはしない(呼び出し側で保持する。)
+    パース結果は inventory_cache でメモリ上に保持し、ファイルが変わったときだけ読み直す。
+    返り値は共有なので書き換えないこと。
     """
     config_path = Path("sys_config.yaml")
     if not config_path.exists():
         raise FileNotFoundError("sys_config.yaml が見つからないケロ🐸")
 
-    with open(config_path, "r", encoding="utf-8") as f:
-        sys_config_data = yaml.load(f)
-
-    return sys_config_data
+    return load_yaml_cached(config_path)
 
 
 def get_validated_inventory_data(host: str = None, group: str =None) -> dict:
     """
     inventory.yaml を読み込み、指定されたホストまたはグループの存在を検証する。
+    inventory.backend: sqlite のときは SQLite から host / group の処理に必要な分だけを同じ形で返す。
 
     Parameters
     ----------
@@ -51,12 +53,15 @@ def get_validated_inventory_data(host: str = None, group: str =None) -> dict:
     """
     # Errorはraiseするが表示はexecuterやconfigure側で対応。
 
-    inventory_path = Path("inventory.yaml")
-    if not inventory_path.exists():
-        raise FileNotFoundError("inventory.yamlが存在しないケロ🐸")
+    backend = get_inventory_backend()
+    if backend is not None:
+        inventory_data = backend.subset(host=host or None, group=group or None)
+    else:
+        inventory_path = Path("inventory.yaml")
+        if not inventory_path.exists():
+            raise FileNotFoundError("inventory.yamlが存在しないケロ🐸")
 
-    with open(inventory_path, "r", encoding="utf-8") as inventory:
-        inventory_data = yaml.load(inventory)
+        inventory_data = load_inventory(inventory_path)
 
     if host and host not in inventory_data["all"]["hosts"]:
             msg = f"ホスト '{host}' はinventory.yamlに存在しないケロ🐸"
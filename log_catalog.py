@@ -0,0 +1,298 @@
+import argparse
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from log_storage import ARCHIVE_DIR_NAME, OBJECTS_DIR_NAME, logical_name
+
+# log_catalog.py
+# 役割:
+# - logs/ 配下のログ（.log / パース結果の .json）の目録を SQLite（logs/catalog.sqlite3）に持つ
+#   - save_log / save_json / --stream のログは、書き終わった時点で 1 行ずつ目録に追記する
+#   - 一覧・最新ログ・補完・絞り込みは目録の索引で引く（10 万ファイル規模でもディレクトリを全走査しない）
+# - 目録の外でファイルが増減した場合（手で消した・コピーしてきた・目録を作る前のログ）に備えて、
+#   問い合わせの前に日付ディレクトリの mtime を見比べ、変わったディレクトリだけを読み直す
+# - 圧縮保存したログ（{名前}.log.gz / .log.zst）・参照ファイル（{名前}.log.ref）は拡張子を除いた名前で登録する（log_storage.py）
+#
+# 使い方:
+#   python log_catalog.py rebuild        # 目録を作り直す（全走査）
+# 注意:
+# - 目録の更新に失敗してもログの保存自体は失敗させない（次の問い合わせでディレクトリから拾い直す）🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+LOG_ROOT = Path("logs")
+CATALOG_FILE_NAME = "catalog.sqlite3"
+KINDS = {"log": ".log", "json": ".json"}
+_PREFIX_END = "\U0010ffff" # 前方一致を範囲検索にする（索引が効く）
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    mode TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    host TEXT,
+    label TEXT,
+    memo TEXT,
+    parser TEXT,
+    size INTEGER,
+    PRIMARY KEY (mode, kind, date, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS logs_name ON logs (mode, kind, name);
+CREATE INDEX IF NOT EXISTS logs_host ON logs (mode, kind, host, name);
+CREATE INDEX IF NOT EXISTS logs_label ON logs (mode, kind, label, name);
+CREATE TABLE IF NOT EXISTS dirs (
+    mode TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    date TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (mode, kind, date)
+) WITHOUT ROWID;
+"""
+
+
+def mode_directory(root: Path, mode: str, kind: str = "log") -> Path:
+    """logs/{mode}/ または logs/{mode}_json/。"""
+    return root / (mode if kind == "log" else f"{mode}_{kind}")
+
+
+def _catalog_name(name: str, kind: str) -> str | None:
+    """目録に載せる名前（圧縮の拡張子を除く）。kind のファイルでなければ None。"""
+    name = logical_name(name)
+    return name if name.endswith(KINDS[kind]) else None
+
+
+def parse_log_name(name: str, kind: str = "log", *, hostname: str | None = None, memo: str = "", parser: str | None = None) -> dict:
+    """
+    `{YYYYmmdd-HHMMSS}_{hostname}_{command|list}[_{memo}][_{parser}]{.log|.json}` を分解する。
+
+    hostname / memo / parser が分かっている場合（保存時）はそれを使う。
+    分からない場合（ディレクトリから拾ったとき）は、ホスト名は 2 つ目の "_" 区切り、.json の parser は最後の区切りとみなす。
+    """
+    stem = name[:-len(KINDS[kind])] if name.endswith(KINDS[kind]) else name
+    _, _, rest = stem.partition("_")
+
+    if hostname and rest.startswith(f"{hostname}_"):
+        host, label = hostname, rest[len(hostname) + 1:]
+    else:
+        host, _, label = rest.partition("_")
+
+    if kind == "json":
+        if parser is None and "_" in label:
+            label, _, parser = label.rpartition("_")
+        elif parser and label.endswith(f"_{parser}"):
+            label = label[:-len(parser) - 1]
+    if memo and label.endswith(f"_{memo}"):
+        label = label[:-len(memo) - 1]
+    return {"host": host, "label": label, "memo": memo or "", "parser": parser}
+
+
+class LogCatalog:
+    """
+    logs/ の目録（スレッドごとに SQLite の接続を持つ）。
+
+    Parameters
+    ----------
+    root : Path
+        ログのルート（既定: カレントディレクトリの logs/）
+    """
+
+    def __init__(self, root: str | Path = LOG_ROOT):
+        self.root = Path(root)
+        self.path = self.root / CATALOG_FILE_NAME
+        self._local = threading.local()
+        # 目録に無いディレクトリを読み直したもの（プロセスごとに 1 度だけ読む）。
+        self._reconciled: set[tuple[str, str, str]] = set()
+        self._reconciled_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    # --- 追記 ---
+    def record(self, path: str | Path, *, mode: str, kind: str = "log", hostname: str | None = None, memo: str = "", parser: str | None = None) -> None:
+        """保存したファイルを 1 件目録に追加する（同じファイルなら上書き）。"""
+        path = Path(path)
+        name = logical_name(path.name)
+        meta = parse_log_name(name, kind, hostname=hostname, memo=memo, parser=parser)
+        date = path.parent.name
+        connection = self._connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (mode, kind, date, name, meta["host"], meta["label"], meta["memo"], meta["parser"], path.stat().st_size))
+            # このディレクトリは目録と一致している、と記録する（自分の追記で mtime が変わっても読み直さないため）。
+            if connection.execute("SELECT 1 FROM dirs WHERE mode = ? AND kind = ? AND date = ?", (mode, kind, date)).fetchone():
+                connection.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)", (mode, kind, date, path.parent.stat().st_mtime_ns))
+            elif self._claim_reconcile(mode, kind, date):
+                # 目録に無いディレクトリ（新しい日付・目録を作る前のログ）は、最初の 1 件のときだけ読み直して dirs に載せる。
+                # 保存のたびに全走査すると、並列に書くワーカーの数だけ O(n²) になる。
+                self._reload_directory(connection, path.parent, mode, kind, date)
+
+    def _claim_reconcile(self, mode: str, kind: str, date: str) -> bool:
+        """このプロセスでまだ読み直していないディレクトリなら True（読み直し済みとして印を付ける）。"""
+        with self._reconciled_lock:
+            if (mode, kind, date) in self._reconciled:
+                return False
+            self._reconciled.add((mode, kind, date))
+            return True
+
+    def _reload_directory(self, connection: sqlite3.Connection, directory: Path, mode: str, kind: str, date: str) -> None:
+        """日付ディレクトリ 1 つを読み直して目録を置き換え、dirs に mtime を記録する（トランザクションの中で呼ぶ）。"""
+        mtime_ns = directory.stat().st_mtime_ns
+        rows = []
+        for entry in os.scandir(directory):
+            name = _catalog_name(entry.name, kind)
+            if entry.is_file() and name is not None:
+                meta = parse_log_name(name, kind)
+                rows.append((mode, kind, date, name, meta["host"], meta["label"], meta["memo"], meta["parser"], entry.stat().st_size))
+        # 保存時に記録した memo / parser は残す（ファイル名だけでは区別できないため）。
+        recorded = {name: (memo, parser) for name, memo, parser in connection.execute(
+            "SELECT name, memo, parser FROM logs WHERE mode = ? AND kind = ? AND date = ?", (mode, kind, date))}
+        connection.execute("DELETE FROM logs WHERE mode = ? AND kind = ? AND date = ?", (mode, kind, date))
+        for row in rows:
+            if row[3] in recorded and recorded[row[3]][0]:
+                memo, parser = recorded[row[3]]
+                meta = parse_log_name(row[3], kind, hostname=row[4], memo=memo, parser=parser)
+                row = row[:5] + (meta["label"], memo, parser, row[8])
+            connection.execute("INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        connection.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)", (mode, kind, date, mtime_ns))
+
+    # --- ディレクトリとの突き合わせ ---
+    def sync(self, mode: str, kind: str = "log") -> None:
+        """日付ディレクトリの mtime が目録の記録と違うものだけ読み直す。消えたディレクトリは目録からも消す。"""
+        mode_dir = mode_directory(self.root, mode, kind)
+        current = {}
+        if mode_dir.is_dir():
+            for entry in os.scandir(mode_dir):
+                if entry.is_dir():
+                    current[entry.name] = entry.stat().st_mtime_ns
+
+        connection = self._connection()
+        known = dict(connection.execute("SELECT date, mtime_ns FROM dirs WHERE mode = ? AND kind = ?", (mode, kind)).fetchall())
+        changed = [date for date, mtime_ns in current.items() if known.get(date) != mtime_ns]
+        removed = [date for date in known if date not in current]
+        if not changed and not removed:
+            return
+
+        with connection:
+            for date in removed:
+                connection.execute("DELETE FROM logs WHERE mode = ? AND kind = ? AND date = ?", (mode, kind, date))
+                connection.execute("DELETE FROM dirs WHERE mode = ? AND kind = ? AND date = ?", (mode, kind, date))
+            for date in changed:
+                self._reload_directory(connection, mode_dir / date, mode, kind, date)
+
+    def rebuild(self, modes: list[str] | None = None) -> int:
+        """目録を作り直す。modes を省略すると logs/ 直下のディレクトリすべて。戻り値は登録したファイル数。"""
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM logs")
+            connection.execute("DELETE FROM dirs")
+        if modes is None:
+            modes = sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir() and entry.name not in (ARCHIVE_DIR_NAME, OBJECTS_DIR_NAME)) if self.root.is_dir() else []
+
+        for directory in modes:
+            mode, kind = (directory[:-5], "json") if directory.endswith("_json") else (directory, "log")
+            self.sync(mode, kind)
+        return connection.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+
+    # --- 問い合わせ（どれも先に sync する） ---
+    def dates(self, mode: str, kind: str = "log") -> list[tuple[str, int]]:
+        """日付ディレクトリと件数（日付順）。ファイルが 0 件のディレクトリも含む。"""
+        self.sync(mode, kind)
+        return self._connection().execute(
+            "SELECT dirs.date, COUNT(logs.name) FROM dirs LEFT JOIN logs ON logs.mode = dirs.mode AND logs.kind = dirs.kind AND logs.date = dirs.date "
+            "WHERE dirs.mode = ? AND dirs.kind = ? GROUP BY dirs.date ORDER BY dirs.date", (mode, kind)).fetchall()
+
+    def names(self, mode: str, *, kind: str = "log", date: str | None = None, prefix: str = "", host: str | None = None,
+              label: str | None = None, memo: str | None = None, parser: str | None = None,
+              newest_first: bool = False, limit: int | None = None) -> list[str]:
+        """条件に合うファイル名（名前順 = 時刻順）。limit が None / 0 以下なら全件。"""
+        self.sync(mode, kind)
+        conditions, params = ["mode = ?", "kind = ?", "name >= ?", "name < ?"], [mode, kind, prefix, prefix + _PREFIX_END]
+        for column, value in (("date", date), ("host", host), ("label", label), ("memo", memo), ("parser", parser)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        order = "DESC" if newest_first else "ASC"
+        params.append(limit if limit and limit > 0 else -1)
+        rows = self._connection().execute(f"SELECT name FROM logs WHERE {' AND '.join(conditions)} ORDER BY name {order} LIMIT ?", params).fetchall()
+        return [name for (name,) in rows]
+
+    def entries(self, mode: str, *, kind: str = "log", date_from: str | None = None, date_to: str | None = None,
+                host: str | None = None, label: str | None = None) -> list[tuple[str, str, str, str, int]]:
+        """条件に合うファイルの (date, name, host, label, size)（日付・名前順）。日付は YYYYmmdd で両端を含む。"""
+        self.sync(mode, kind)
+        conditions, params = ["mode = ?", "kind = ?"], [mode, kind]
+        if date_from:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("date <= ?")
+            params.append(date_to)
+        for column, value in (("host", host), ("label", label)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        return self._connection().execute(f"SELECT date, name, host, label, size FROM logs WHERE {' AND '.join(conditions)} ORDER BY date, name",
+                                          params).fetchall()
+
+    def latest(self, mode: str, kind: str = "log") -> Path | None:
+        """最新（名前が最大）のファイルの Path。無ければ None。圧縮保存なら実体は .gz / .zst 付き（log_storage.read_log_text で読む）。"""
+        self.sync(mode, kind)
+        row = self._connection().execute("SELECT date, name FROM logs WHERE mode = ? AND kind = ? ORDER BY date DESC, name DESC LIMIT 1",
+                                         (mode, kind)).fetchone()
+        return mode_directory(self.root, mode, kind) / row[0] / row[1] if row else None
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+_catalogs: dict[Path, LogCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_log_catalog(root: str | Path = LOG_ROOT) -> LogCatalog:
+    """root（既定: カレントディレクトリの logs/）ごとに共通の LogCatalog を返す。"""
+    key = Path(root).absolute()
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = LogCatalog(key)
+        return catalog
+
+
+def record_log(path: Path | None, *, mode: str, kind: str = "log", hostname: str | None = None, memo: str = "", parser: str | None = None) -> None:
+    """save_log / save_json から呼ぶ。目録の更新に失敗しても例外は出さない。"""
+    if path is None:
+        return
+    try:
+        get_log_catalog(path.parents[2]).record(path, mode=mode, kind=kind, hostname=hostname, memo=memo, parser=parser)
+    except (OSError, sqlite3.Error):
+        pass
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="logs/ の目録（catalog.sqlite3）を管理するケロ🐸")
+    parser.add_argument("action", choices=["rebuild"], help="rebuild: logs/ を全走査して目録を作り直す")
+    parser.add_argument("--root", type=Path, default=LOG_ROOT, help=f"ログのルート (default: {LOG_ROOT})")
+    args = parser.parse_args(argv)
+
+    count = get_log_catalog(args.root).rebuild()
+    print(f"🐸 {args.root / CATALOG_FILE_NAME}: {count} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+import argparse
+import mmap
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from log_catalog import LOG_ROOT, get_log_catalog, mode_directory
+from log_storage import log_digest, read_log_bytes, resolve_log_path
+
+# log_search.py
+# 役割:
+# - 保存済みログ（logs/{mode}/{YYYYmmdd}/*.log）の全文検索（show --grep）
+#   - ログの本文を SQLite FTS5 の trigram 索引（logs/search.sqlite3）に入れ、部分一致の候補ファイルを索引で絞る
+#   - 索引は検索のたびに目録（log_catalog.py）と突き合わせて、増えたファイルだけを追加する
+#     1 回の検索で入れるのは INDEX_BYTES_PER_SEARCH まで（残りは走査する）。まとめて入れるなら python log_search.py index を cron 等で
+#   - 索引は本文を持たない（contentless）。log.dedup で同じ内容のログは 1 回だけ索引に入れる
+#   - 正規表現・3 文字未満の文字列は索引が使えないので、対象ファイルを mmap してスレッドで並列に走査する
+#   - 候補ファイルは必ず中身を読み直して一致行を確定する（索引は大文字小文字を区別しないため）
+# - 圧縮保存したログ（.gz / .zst）は展開してから索引に入れ・走査する
+# - archive コマンドで zip にまとめたログは目録から外れるので検索しない（show --grep が件数だけ知らせる）
+# 注意:
+# - 展開後に MAX_INDEXED_BYTES を超える大きなログは索引に入れず、毎回走査する
+# - 索引はログから作り直せるので、SCHEMA_VERSION が変わったら作り直す🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+SEARCH_INDEX_FILE_NAME = "search.sqlite3"
+MAX_INDEXED_BYTES = 64 * 1024 * 1024
+INDEX_BYTES_PER_SEARCH = 256 * 1024 * 1024 # show --grep 1 回で新しく索引に入れる本文の上限（展開後）。残りは走査して次回以降に回す
+DEFAULT_MAX_RESULTS = 1000
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+MIN_INDEXED_PATTERN = 3 # trigram なので 3 文字以上でないと索引で絞れない
+SCHEMA_VERSION = 3 # 1: 消した行が残り続ける / 2: 本文をまるごと持つ
+CONTENTLESS_DELETE = sqlite3.sqlite_version_info >= (3, 43, 0)
+MIN_STALE_BODIES = 1000 # contentless_delete が使えないとき、消せずに残った本文がこれと生きている本文の数を超えたら作り直す
+
+# docs.indexed
+INDEX_PENDING = 0 # まだ索引に入れていない（検索では常に走査する）
+INDEX_DONE = 1
+INDEX_SKIPPED = 2 # MAX_INDEXED_BYTES を超えるので入れない（検索では常に走査する）
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode TEXT NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    host TEXT,
+    label TEXT,
+    size INTEGER NOT NULL,
+    indexed INTEGER NOT NULL,
+    body_id INTEGER,
+    UNIQUE (mode, date, name)
+);
+CREATE INDEX IF NOT EXISTS docs_host ON docs (mode, host, date);
+CREATE INDEX IF NOT EXISTS docs_label ON docs (mode, label, date);
+CREATE INDEX IF NOT EXISTS docs_pending ON docs (mode, indexed, date);
+CREATE INDEX IF NOT EXISTS docs_body ON docs (body_id);
+CREATE TABLE IF NOT EXISTS bodies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    digest TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS doc_text USING fts5(body, content='', {"contentless_delete=1, " if CONTENTLESS_DELETE else ""}tokenize='trigram');
+"""
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """一致した 1 行。"""
+    host: str
+    path: Path
+    line_no: int
+    line: str
+
+
+class LogSearchIndex:
+    """
+    ログ本文の trigram 索引（スレッドごとに SQLite の接続を持つ）。
+
+    doc_text は contentless（本文は持たず、ログから読み直す）で、rowid は bodies の id。
+    log.dedup の参照ファイルは同じオブジェクトを指す docs で bodies を共有するので、同じ内容は 1 回しか索引に入れない。
+    どの docs からも使われなくなった本文は doc_text から消す。SQLite 3.43 未満（contentless_delete が無い）では消せないので、
+    消せずに残った数を meta に数えておき、増えすぎたら索引を作り直す。
+    """
+
+    def __init__(self, root: str | Path = LOG_ROOT):
+        self.root = Path(root)
+        self.path = self.root / SEARCH_INDEX_FILE_NAME
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._reset(connection)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _reset(connection: sqlite3.Connection) -> None:
+        """索引を空にして作り直す（ログから作り直せるので、次の update で入れ直す）。"""
+        connection.executescript("BEGIN IMMEDIATE; DROP TABLE IF EXISTS doc_text; DROP TABLE IF EXISTS bodies; DROP TABLE IF EXISTS docs; "
+                                 f"DROP TABLE IF EXISTS meta; {SCHEMA} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;")
+
+    def _rebuild_if_bloated(self, connection: sqlite3.Connection) -> None:
+        """contentless_delete が無いとき、消せずに残った本文が生きている本文より多くなったら作り直す。"""
+        if CONTENTLESS_DELETE:
+            return
+        row = connection.execute("SELECT value FROM meta WHERE key = 'stale_bodies'").fetchone()
+        stale = row[0] if row else 0
+        if stale > max(MIN_STALE_BODIES, connection.execute("SELECT count(*) FROM bodies").fetchone()[0]):
+            self._reset(connection)
+
+    def update(self, mode: str, entries: list[tuple[str, str, str, str, int]], *, date_from: str | None = None, date_to: str | None = None,
+               max_bytes: int | None = None) -> int:
+        """
+        目録の entries（date, name, host, label, size）と索引を突き合わせ、増えた・変わったファイルを索引に入れる。
+        date_from / date_to は entries を取った範囲（範囲外の docs は消さない）。
+
+        max_bytes を渡すと、読み込む本文（展開後）の合計がそれを超えたところで止める（新しい日付から入れる）。
+        入れられなかったファイルは docs に INDEX_PENDING で残り、検索では走査され、次の update で続きを入れる。
+
+        Returns
+        -------
+        int
+            新しく索引に入れたファイル数
+        """
+        connection = self._connection()
+        self._rebuild_if_bloated(connection)
+        conditions, params = ["mode = ?"], [mode]
+        if date_from:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("date <= ?")
+            params.append(date_to)
+        where = " AND ".join(conditions)
+        known = {(date, name): (doc_id, size) for doc_id, date, name, size in connection.execute(
+            f"SELECT id, date, name, size FROM docs WHERE {where}", params)}
+
+        current = {(date, name) for date, name, _, _, _ in entries}
+        stale = [doc_id for key, (doc_id, _) in known.items() if key not in current]
+        with connection:
+            for date, name, host, label, size in entries:
+                previous = known.get((date, name))
+                if previous is not None and previous[1] == size:
+                    continue
+                if previous is not None:
+                    stale.append(previous[0])
+            self._delete(connection, stale)
+            connection.executemany("INSERT OR IGNORE INTO docs (mode, date, name, host, label, size, indexed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   ((mode, date, name, host, label, size, INDEX_PENDING) for date, name, host, label, size in entries
+                                    if known.get((date, name), (None, None))[1] != size))
+
+        pending = connection.execute(f"SELECT id, date, name FROM docs WHERE {where} AND indexed = ? ORDER BY date DESC, name DESC",
+                                     params + [INDEX_PENDING]).fetchall()
+        added, budget = 0, max_bytes
+        mode_dir = mode_directory(self.root, mode)
+        with connection:
+            for doc_id, date, name in pending:
+                path = mode_dir / date / name
+                digest = log_digest(path)
+                row = connection.execute("SELECT id FROM bodies WHERE digest = ?", (digest,)).fetchone() if digest else None
+                if row is not None: # 同じ内容を別のログで索引に入れてある（log.dedup）
+                    connection.execute("UPDATE docs SET indexed = ?, body_id = ? WHERE id = ?", (INDEX_DONE, row[0], doc_id))
+                    added += 1
+                    continue
+                if budget is not None and budget <= 0:
+                    break
+
+                # size は目録の（圧縮後・参照ファイルの）大きさなので、上限は展開した長さで判断する。
+                try:
+                    data = read_log_bytes(path, MAX_INDEXED_BYTES + 1)
+                except OSError:
+                    continue
+                if budget is not None:
+                    budget -= len(data)
+                if len(data) > MAX_INDEXED_BYTES:
+                    connection.execute("UPDATE docs SET indexed = ? WHERE id = ?", (INDEX_SKIPPED, doc_id))
+                    continue
+                body_id = connection.execute("INSERT INTO bodies (digest) VALUES (?)", (digest,)).lastrowid
+                connection.execute("INSERT INTO doc_text (rowid, body) VALUES (?, ?)", (body_id, data.decode("utf-8", errors="replace")))
+                connection.execute("UPDATE docs SET indexed = ?, body_id = ? WHERE id = ?", (INDEX_DONE, body_id, doc_id))
+                added += 1
+        return added
+
+    @staticmethod
+    def _delete(connection: sqlite3.Connection, doc_ids: list[int]) -> None:
+        """docs の行を消し、どの docs からも使われなくなった本文（bodies と doc_text の行）も消す。"""
+        body_ids = set()
+        for doc_id in doc_ids:
+            row = connection.execute("SELECT body_id FROM docs WHERE id = ?", (doc_id,)).fetchone()
+            if row and row[0] is not None:
+                body_ids.add(row[0])
+            connection.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+        unused = [body_id for body_id in body_ids if connection.execute("SELECT 1 FROM docs WHERE body_id = ? LIMIT 1", (body_id,)).fetchone() is None]
+        connection.executemany("DELETE FROM bodies WHERE id = ?", ((body_id,) for body_id in unused))
+        if CONTENTLESS_DELETE:
+            connection.executemany("DELETE FROM doc_text WHERE rowid = ?", ((body_id,) for body_id in unused))
+        elif unused:
+            connection.execute("INSERT INTO meta (key, value) VALUES ('stale_bodies', ?) ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+                               (len(unused),))
+
+    def candidates(self, mode: str, *, text: str | None = None, date_from: str | None = None, date_to: str | None = None,
+                   host: str | None = None, label: str | None = None) -> list[tuple[str, str, str]]:
+        """
+        条件に合うファイルの (date, name, host)。text を渡すと、それを含みうるファイルだけに索引で絞る。
+        まだ索引に入れていないファイル・大きなファイルは常に候補に含める。
+        """
+        conditions, params = ["mode = ?"], [mode]
+        for condition, value in (("date >= ?", date_from), ("date <= ?", date_to), ("host = ?", host), ("label = ?", label)):
+            if value:
+                conditions.append(condition)
+                params.append(value)
+        if text is not None:
+            conditions.append("(indexed != ? OR body_id IN (SELECT rowid FROM doc_text WHERE doc_text MATCH ?))")
+            params += [INDEX_DONE, '"' + text.replace('"', '""') + '"']
+        return self._connection().execute(f"SELECT date, name, host FROM docs WHERE {' AND '.join(conditions)} ORDER BY date, name",
+                                          params).fetchall()
+
+
+def _normalize_date(date: str | None) -> str | None:
+    """YYYY-MM-DD / YYYYmmdd のどちらでも受け付けて YYYYmmdd にする。"""
+    if not date:
+        return None
+    normalized = date.replace("-", "").replace("/", "")
+    if not re.fullmatch(r"\d{8}", normalized):
+        raise ValueError(f"日付は YYYYmmdd か YYYY-MM-DD で指定してケロ🐸: {date}")
+    return normalized
+
+
+def _scan(buffer, pattern: re.Pattern, host: str, path: Path, limit: int) -> list[SearchHit]:
+    """buffer（bytes / mmap）から pattern に一致する行を最大 limit 件返す（1 行につき 1 件）。"""
+    hits = []
+    line_no, counted_to, next_line_start = 1, 0, 0
+    for match in pattern.finditer(buffer):
+        if match.start() < next_line_start:
+            continue # 同じ行の 2 つ目以降の一致
+        line_start = buffer.rfind(b"\n", 0, match.start()) + 1
+        line_end = buffer.find(b"\n", match.start())
+        line_end = len(buffer) if line_end == -1 else line_end
+        line_no += buffer[counted_to:line_start].count(b"\n")
+        counted_to = line_start
+        hits.append(SearchHit(host, path, line_no, buffer[line_start:line_end].decode("utf-8", errors="replace").rstrip("\r")))
+        next_line_start = line_end + 1
+        if len(hits) >= limit:
+            break
+    return hits
+
+
+def scan_file(path: Path, pattern: re.Pattern, host: str, limit: int) -> list[SearchHit]:
+    """path を mmap して（圧縮保存なら展開して）pattern に一致する行を最大 limit 件返す。"""
+    try:
+        actual_path = resolve_log_path(path)
+        if actual_path is None:
+            return []
+        if actual_path != path:
+            return _scan(read_log_bytes(path), pattern, host, path, limit)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return _scan(mapped, pattern, host, path, limit)
+    except (OSError, ValueError, EOFError):
+        return []
+
+
+def search_logs(pattern: str, *, mode: str = "execute", date_from: str | None = None, date_to: str | None = None, host: str | None = None,
+                label: str | None = None, regex: bool = False, ignore_case: bool = False, max_results: int = DEFAULT_MAX_RESULTS,
+                root: str | Path = LOG_ROOT) -> tuple[list[SearchHit], int]:
+    """
+    logs/{mode}/ のログ本文から pattern を含む行を探す。
+
+    Parameters
+    ----------
+    pattern : str
+        探す文字列（regex=True なら正規表現）
+    date_from, date_to : str | None
+        対象の日付範囲（両端を含む。YYYYmmdd / YYYY-MM-DD）
+    host, label : str | None
+        ファイル名のホスト名・コマンド / commands-list 名で絞る
+    max_results : int
+        返す行数の上限
+
+    Returns
+    -------
+    tuple[list[SearchHit], int]
+        一致した行（日付・ファイル名・行番号順）と、中身を確認したファイル数
+
+    Raises
+    ------
+    ValueError
+        正規表現や日付の形式が正しくない場合
+    """
+    date_from, date_to = _normalize_date(date_from), _normalize_date(date_to)
+    flags = re.IGNORECASE if ignore_case else 0
+    try:
+        compiled = re.compile(pattern.encode("utf-8") if regex else re.escape(pattern.encode("utf-8")), flags)
+    except re.error as e:
+        raise ValueError(f"正規表現が正しくないケロ🐸: {e}") from None
+
+    root = Path(root)
+    index = get_search_index(root)
+    entries = get_log_catalog(root).entries(mode, date_from=date_from, date_to=date_to)
+    index.update(mode, entries, date_from=date_from, date_to=date_to, max_bytes=INDEX_BYTES_PER_SEARCH)
+
+    use_index = not regex and len(pattern) >= MIN_INDEXED_PATTERN
+    candidates = index.candidates(mode, text=pattern if use_index else None, date_from=date_from, date_to=date_to, host=host, label=label)
+
+    mode_dir = mode_directory(root, mode)
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="log-search") as pool:
+        results = pool.map(lambda candidate: scan_file(mode_dir / candidate[0] / candidate[1], compiled, candidate[2], max_results), candidates)
+        hits = []
+        for file_hits in results:
+            hits.extend(file_hits)
+            if len(hits) >= max_results:
+                break
+    return hits[:max_results], len(candidates)
+
+
+_indexes: dict[Path, LogSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(root: str | Path = LOG_ROOT) -> LogSearchIndex:
+    key = Path(root).absolute()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LogSearchIndex(key)
+        return index
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="logs/ の全文検索の索引（search.sqlite3）を更新するケロ🐸")
+    parser.add_argument("action", choices=["index"], help="index: 目録にあるログのうち、まだ索引に無いものを索引に入れる")
+    parser.add_argument("--mode", nargs="+", default=["execute", "console", "configure", "scp"], help="対象のモード")
+    parser.add_argument("--root", type=Path, default=LOG_ROOT, help=f"ログのルート (default: {LOG_ROOT})")
+    args = parser.parse_args(argv)
+
+    for mode in args.mode:
+        added = get_search_index(args.root).update(mode, get_log_catalog(args.root).entries(mode))
+        print(f"🐸 {mode}: {added} files indexed")
+
+
+if __name__ == "__main__":
+    main()
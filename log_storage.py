@@ -0,0 +1,401 @@
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import IO
+
+from load_and_validate_yaml import load_sys_config
+
+try:
+    from compression import zstd # Python 3.14 以降の標準ライブラリ
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+# log_storage.py
+# 役割:
+# - ログ（.log / .json）の圧縮保存と、圧縮・アーカイブ済みログの透過的な読み出し
+#   - sys_config.yaml の log.compression（none / gzip / zstd）に従って、save_log / save_json / --stream のログを
+#     {名前}.log.gz / {名前}.log.zst として書く
+#   - 目録・補完・show では拡張子を除いた名前（{名前}.log）で扱い、読むときにここで実体を探して展開する
+# - archive コマンド用に、古い日付ディレクトリを月ごとの zip（logs/archive/{mode}/{YYYYmm}.zip）にまとめる
+#   - zip の central directory が索引になるので、1 ファイルを読むのに bundle 全体を展開しない
+#   - bundle はファイル名先頭の年月で決まるので、show --log で名前を指定すれば開く zip は 1 つだけ
+# - log.dedup が true なら、本文を内容のハッシュ（sha256）で logs/objects/{先頭2桁}/{ハッシュ} に 1 度だけ保存し、
+#   日付ディレクトリには参照ファイル（{名前}.log.ref、中身はハッシュだけ）を置く
+#   - 前日と同じ show running-config のスナップショットは参照ファイルを書くだけで済む
+#   - どこからも参照されなくなったオブジェクトは gc コマンドで消す
+# 注意:
+# - zstd を使うには Python 3.14 以降か zstandard パッケージが必要🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+REF_SUFFIX = ".ref"
+STORED_SUFFIXES = (*COMPRESSED_SUFFIXES, REF_SUFFIX)
+DEFAULT_COMPRESSION = "none"
+GZIP_LEVEL = 6
+ARCHIVE_DIR_NAME = "archive"
+OBJECTS_DIR_NAME = "objects"
+HASH_NAME = "sha256"
+SPOOL_MAX_BYTES = 16 * 1024 * 1024 # これを超える本文だけ一時ファイルに退避してからハッシュを確定する
+GC_GRACE_SECONDS = 3600 # 作られたばかりのオブジェクトは、参照ファイルを書く前かもしれないので消さない
+DEFAULT_ARCHIVE_AFTER_DAYS = 30
+_DATE_DIR = re.compile(r"\d{8}")
+
+
+def get_log_compression() -> str:
+    """
+    `sys_config.yaml` の `log.compression`。sys_config.yaml が無ければ "none"。
+
+    Raises
+    ------
+    ValueError
+        未知の形式 / zstd を指定したのに使えない場合
+    """
+    try:
+        compression = (load_sys_config().get("log") or {}).get("compression") or DEFAULT_COMPRESSION
+    except FileNotFoundError:
+        return DEFAULT_COMPRESSION
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"log.compression は {' / '.join(COMPRESSIONS)} のどれかを指定してケロ🐸: {compression}")
+    if compression == "zstd" and zstd is None:
+        raise ValueError("log.compression: zstd には Python 3.14 以降か zstandard パッケージが必要ケロ🐸 (pip install zstandard)")
+    return compression
+
+
+def get_log_dedup() -> bool:
+    """`sys_config.yaml` の `log.dedup`。sys_config.yaml が無ければ False。"""
+    try:
+        return bool((load_sys_config().get("log") or {}).get("dedup", False))
+    except FileNotFoundError:
+        return False
+
+
+def get_archive_after_days() -> int:
+    """`sys_config.yaml` の `log.archive_after_days`（archive コマンドの既定値）。"""
+    try:
+        return int((load_sys_config().get("log") or {}).get("archive_after_days", DEFAULT_ARCHIVE_AFTER_DAYS))
+    except FileNotFoundError:
+        return DEFAULT_ARCHIVE_AFTER_DAYS
+
+
+def logical_name(name: str) -> str:
+    """圧縮・参照の拡張子（.gz / .zst / .ref）を除いた名前。"""
+    for suffix in STORED_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _open(path: Path, mode: str, compression: str | None = None, **kwargs) -> IO:
+    """compression（省略時は拡張子から判断）に応じて素のファイル / gzip / zstd として開く。"""
+    if compression is None:
+        compression = next((name for name, suffix in COMPRESSIONS.items() if suffix and path.name.endswith(suffix)), "none")
+    if compression == "gzip":
+        return gzip.open(path, mode, **({"compresslevel": GZIP_LEVEL} if "w" in mode else {}), **kwargs)
+    if compression == "zstd":
+        if zstd is None:
+            raise OSError(f"{path} を読むには Python 3.14 以降か zstandard パッケージが必要ケロ🐸")
+        return zstd.open(path, mode, **kwargs)
+    return open(path, mode, **kwargs)
+
+
+def objects_directory(root: Path) -> Path:
+    """オブジェクトの置き場（logs/objects/）。"""
+    return root / OBJECTS_DIR_NAME
+
+
+def object_path(root: Path, digest: str) -> Path:
+    """ハッシュ digest のオブジェクト（圧縮保存なら実体は .gz / .zst 付き）。"""
+    return objects_directory(root) / digest[:2] / digest
+
+
+class _ObjectWriter(io.RawIOBase):
+    """
+    書かれた内容をハッシュしながら溜めておき、close でオブジェクト（無ければ）と参照ファイルを書く。
+
+    本文は SPOOL_MAX_BYTES まではメモリに置くので、同じ内容が既にあればディスクには参照ファイルしか書かない。
+    """
+
+    def __init__(self, ref_path: Path, compression: str):
+        self.ref_path = ref_path
+        self.root = ref_path.parents[2]
+        self.compression = compression
+        objects_directory(self.root).mkdir(parents=True, exist_ok=True)
+        self._hash = hashlib.new(HASH_NAME)
+        self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, dir=objects_directory(self.root))
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._hash.update(data)
+        return self._spool.write(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            super().close()
+            digest = self._hash.hexdigest()
+            self._store(object_path(self.root, digest))
+            self.ref_path.write_text(f"{HASH_NAME} {digest}\n", encoding="utf-8")
+        finally:
+            self._spool.close()
+
+    def _store(self, path: Path) -> None:
+        existing = resolve_log_path(path)
+        if existing is not None:
+            # 同じ内容が既にある。参照ファイルを書くまでの間に gc が古いオブジェクトとして消さないよう、mtime を今にする
+            try:
+                os.utime(existing)
+                return
+            except FileNotFoundError:
+                pass # gc が先に消したので書き直す
+        path.parent.mkdir(parents=True, exist_ok=True)
+        actual_path = path.with_name(path.name + COMPRESSIONS[self.compression])
+        tmp_path = actual_path.with_name(f"{actual_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self._spool.seek(0)
+            with _open(tmp_path, "wb", self.compression) as f:
+                shutil.copyfileobj(self._spool, f)
+            os.replace(tmp_path, actual_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+
+def open_log_writer(path: Path, compression: str | None = None, *, dedup: bool | None = None) -> tuple[IO[str], Path]:
+    """
+    path（{名前}.log / .json）に書くためのテキストファイルを開く。
+
+    Parameters
+    ----------
+    compression : str | None
+        "none" / "gzip" / "zstd"。None なら sys_config.yaml の log.compression
+    dedup : bool | None
+        True なら本文をオブジェクトとして保存し、path には参照ファイルを置く（close 時に確定）。None なら log.dedup
+
+    Returns
+    -------
+    tuple[IO[str], Path]
+        書き込み用のファイルと、実際に書くファイルの Path（圧縮するなら .gz / .zst、dedup なら .ref 付き）
+    """
+    compression = get_log_compression() if compression is None else compression
+    dedup = get_log_dedup() if dedup is None else dedup
+    if dedup:
+        ref_path = path.with_name(path.name + REF_SUFFIX)
+        return io.TextIOWrapper(io.BufferedWriter(_ObjectWriter(ref_path, compression)), encoding="utf-8"), ref_path
+    actual_path = path.with_name(path.name + COMPRESSIONS[compression])
+    return _open(actual_path, "wt", encoding="utf-8"), actual_path
+
+
+def resolve_log_path(path: Path) -> Path | None:
+    """ディスク上の実体（path そのもの / .gz / .zst / .ref）。無ければ None（アーカイブは見ない）。"""
+    for candidate in (path, *(path.with_name(path.name + suffix) for suffix in STORED_SUFFIXES)):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _read_ref(ref_path: Path) -> str | None:
+    """参照ファイルのハッシュ。形式が違えば None。"""
+    try:
+        hash_name, digest = ref_path.read_text(encoding="utf-8").split()
+    except ValueError:
+        return None
+    return digest if hash_name == HASH_NAME and re.fullmatch(r"[0-9a-f]{64}", digest) else None
+
+
+def _resolve_ref(ref_path: Path) -> Path:
+    """参照ファイルが指すオブジェクトの実体。見つからなければ FileNotFoundError。"""
+    digest = _read_ref(ref_path)
+    actual_path = resolve_log_path(object_path(ref_path.parents[2], digest)) if digest else None
+    if actual_path is None:
+        raise FileNotFoundError(f"{ref_path} が指すオブジェクトが見つからないケロ🐸")
+    return actual_path
+
+
+def log_digest(path: Path) -> str | None:
+    """path が参照ファイル（log.dedup）で保存されていれば、その内容のハッシュ。そうでなければ None。"""
+    actual_path = resolve_log_path(path)
+    if actual_path is None or not actual_path.name.endswith(REF_SUFFIX):
+        return None
+    return _read_ref(actual_path)
+
+
+def archive_path(path: Path) -> Path:
+    """logs/{mode}/{YYYYmmdd}/{名前} が入る bundle（logs/archive/{mode}/{YYYYmm}.zip）。"""
+    return path.parents[2] / ARCHIVE_DIR_NAME / path.parent.parent.name / f"{path.parent.name[:6]}.zip"
+
+
+def read_log_bytes(path: Path, limit: int = -1) -> bytes:
+    """
+    logs/{mode}/{YYYYmmdd}/{名前} の中身（展開済み）。参照ファイルならオブジェクトを、ディスク上に無ければアーカイブの zip から読む。
+    limit を渡すと、展開後の先頭 limit バイトまでしか読まない。
+
+    Raises
+    ------
+    FileNotFoundError
+        どこにも無い / 参照先のオブジェクトが無い場合
+    """
+    actual_path = resolve_log_path(path)
+    if actual_path is not None:
+        if actual_path.name.endswith(REF_SUFFIX):
+            actual_path = _resolve_ref(actual_path)
+        with _open(actual_path, "rb") as f:
+            return f.read(limit)
+
+    bundle = archive_path(path)
+    try:
+        with zipfile.ZipFile(bundle) as zf, zf.open(f"{path.parent.name}/{path.name}") as f:
+            return f.read(limit)
+    except (FileNotFoundError, KeyError):
+        raise FileNotFoundError(f"{path} が存在しないケロ🐸") from None
+
+
+def read_log_text(path: Path) -> str:
+    """read_log_bytes の UTF-8 テキスト版。"""
+    return read_log_bytes(path).decode("utf-8", errors="replace")
+
+
+def log_exists(path: Path) -> bool:
+    """ディスク上（圧縮含む）かアーカイブのどこかに path があるか。"""
+    if resolve_log_path(path) is not None:
+        return True
+    try:
+        with zipfile.ZipFile(archive_path(path)) as zf:
+            zf.getinfo(f"{path.parent.name}/{path.name}")
+        return True
+    except (FileNotFoundError, KeyError, zipfile.BadZipFile):
+        return False
+
+
+def archived_bundles(root: Path, directory: str) -> list[tuple[Path, int]]:
+    """logs/archive/{directory}/ の bundle と、それぞれに入っているファイル数（年月順）。"""
+    archive_dir = root / ARCHIVE_DIR_NAME / directory
+    if not archive_dir.is_dir():
+        return []
+    bundles = []
+    for bundle in sorted(archive_dir.glob("*.zip")):
+        try:
+            with zipfile.ZipFile(bundle) as zf:
+                bundles.append((bundle, len(zf.infolist())))
+        except zipfile.BadZipFile:
+            continue
+    return bundles
+
+
+def archive_logs(root: Path, directories: list[str], *, before: str, dry_run: bool = False) -> list[tuple[Path, list[str]]]:
+    """
+    logs/{directory}/{YYYYmmdd}/ のうち before（YYYYmmdd）より前の日付ディレクトリを月ごとの zip にまとめ、元のディレクトリを消す。
+
+    zip の中は "{YYYYmmdd}/{名前}"（圧縮保存・参照ファイルは中身を展開して名前から .gz / .zst / .ref を除く）。
+    参照ファイルを消したことで不要になったオブジェクトは gc で消す。
+    既にある bundle には追記する（同じ名前が既にあれば上書きせずに元ファイルだけ消す）。
+    書きかけの bundle を残さないよう、コピーに追記してから置き換える。
+
+    Returns
+    -------
+    list[tuple[Path, list[str]]]
+        bundle ごとの、まとめた日付ディレクトリ
+    """
+    results = []
+    for directory in directories:
+        source_dir = root / directory
+        if not source_dir.is_dir():
+            continue
+        dates_by_month: dict[str, list[str]] = {}
+        for entry in sorted(os.scandir(source_dir), key=lambda entry: entry.name):
+            if entry.is_dir() and _DATE_DIR.fullmatch(entry.name) and entry.name < before:
+                dates_by_month.setdefault(entry.name[:6], []).append(entry.name)
+
+        for month, dates in dates_by_month.items():
+            bundle = root / ARCHIVE_DIR_NAME / directory / f"{month}.zip"
+            results.append((bundle, dates))
+            if dry_run:
+                continue
+            bundle.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = bundle.with_name(f"{bundle.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            if bundle.exists():
+                shutil.copyfile(bundle, tmp_path)
+            try:
+                with zipfile.ZipFile(tmp_path, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+                    archived = set(zf.namelist())
+                    for date in dates:
+                        for entry in sorted(os.scandir(source_dir / date), key=lambda entry: entry.name):
+                            if not entry.is_file():
+                                continue
+                            arcname = f"{date}/{logical_name(entry.name)}"
+                            if arcname in archived:
+                                continue
+                            data = read_log_bytes(source_dir / date / logical_name(entry.name))
+                            info = zipfile.ZipInfo.from_file(entry.path, arcname)
+                            info.compress_type = zipfile.ZIP_DEFLATED
+                            zf.writestr(info, data)
+                            archived.add(arcname)
+                os.replace(tmp_path, bundle)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            # bundle を置き換えた後でだけ元を消す。
+            for date in dates:
+                shutil.rmtree(source_dir / date)
+    return results
+
+
+def collect_garbage(root: Path, *, grace_seconds: float = GC_GRACE_SECONDS, dry_run: bool = False) -> tuple[int, int]:
+    """
+    logs/ 配下のどの参照ファイルからも指されていないオブジェクトを消す。
+
+    作られてから grace_seconds 経っていないもの（保存中で参照ファイルをまだ書いていないかもしれない）は残す。
+    書きかけのまま残った一時ファイルも同じ条件で消す。
+
+    Returns
+    -------
+    tuple[int, int]
+        消した（dry_run なら消す予定の）ファイル数と合計バイト数
+    """
+    objects_dir = objects_directory(root)
+    if not objects_dir.is_dir():
+        return 0, 0
+
+    referenced = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        if Path(dirpath) == root:
+            dirnames[:] = [name for name in dirnames if name not in (OBJECTS_DIR_NAME, ARCHIVE_DIR_NAME)]
+        for name in filenames:
+            if name.endswith(REF_SUFFIX):
+                digest = _read_ref(Path(dirpath) / name)
+                if digest:
+                    referenced.add(digest)
+
+    expire = time.time() - grace_seconds
+    removed, freed = 0, 0
+    for entry in os.scandir(objects_dir):
+        if not entry.is_dir():
+            continue
+        for obj in os.scandir(entry.path):
+            if logical_name(obj.name) in referenced:
+                continue
+            stat = obj.stat()
+            if stat.st_mtime > expire:
+                continue
+            if not dry_run:
+                os.unlink(obj.path)
+            removed += 1
+            freed += stat.st_size
+    return removed, freed
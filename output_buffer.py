@@ -0,0 +1,139 @@
+import tempfile
+import threading
+from typing import Callable, Iterable, Iterator
+
+from load_and_validate_yaml import load_sys_config
+
+# output_buffer.py
+# 役割:
+# - 1 回の実行（execute）で結果を溜めておくメモリの上限（executor.max_buffer_mb）を管理する
+# - 上限を超えたホストの結果は一時ファイルへ退避（spill）し、表示 / ログ保存時にチャンク単位で読み戻す
+# 大量ホスト × 大きな出力（show running-config all 等）でプロセスが OOM で落ちないようにするため🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+READ_CHUNK_SIZE = 1024 * 1024  # spill したファイルを読み戻す単位（文字数）
+
+
+def get_max_buffer_bytes() -> int | None:
+    """
+    `sys_config.yaml` の `executor.max_buffer_mb` をバイト数で返す。未設定 / null なら None（上限なし）。
+    do_execute（メインスレッド）で 1 度だけ呼ぶこと。
+
+    Raises
+    ------
+    ValueError
+        0 以下や数値以外が設定されている場合
+    """
+    executor_config = load_sys_config().get("executor") or {}
+    max_buffer_mb = executor_config.get("max_buffer_mb")
+    if max_buffer_mb is None:
+        return None
+    if isinstance(max_buffer_mb, bool) or not isinstance(max_buffer_mb, (int, float)) or max_buffer_mb <= 0:
+        raise ValueError(f"executor.max_buffer_mbには正の数を指定してくださいケロ🐸: {max_buffer_mb}")
+    return int(max_buffer_mb * 1024 * 1024)
+
+
+class MemoryBudget:
+    """1 回の実行全体で、メモリ上に溜めてよい結果の量（目安のバイト数）を管理する。スレッドセーフ。"""
+
+    def __init__(self, max_bytes: int | None):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> bool:
+        """size 分を確保できれば True。上限を超える場合は確保せず False。"""
+        with self._lock:
+            if self.max_bytes is not None and self.used + size > self.max_bytes:
+                return False
+            self.used += size
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self.used -= size
+
+
+class HostTextBuffer:
+    """
+    1 ホスト分の出力テキストを追記していくバッファ。
+
+    - 確保できる間は MemoryBudget の範囲でメモリに保持する
+    - 予算を超えた時点で、それまでの内容ごと一時ファイルへ移し、以降の追記もファイルに書く
+    - 読み出しは `chunks()` でチャンク単位に行う（全体を 1 つの文字列に結合しない）
+    - 使い終わったら `close()` で予算を返却し、一時ファイルを削除すること
+
+    `write()` を持つので json.dump() の出力先にも使える。
+    """
+
+    def __init__(self, budget: MemoryBudget | None = None):
+        self._budget = budget
+        self._chunks: list[str] = []
+        self._reserved = 0
+        self._spill_file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill_file is not None
+
+    def write(self, chunk: str) -> None:
+        if not chunk:
+            return
+        if self._spill_file is None:
+            if self._budget is None or self._budget.reserve(len(chunk)):
+                self._reserved += len(chunk)
+                self._chunks.append(chunk)
+                return
+            self._spill()
+        self._spill_file.write(chunk)
+
+    def chunks(self) -> Iterator[str]:
+        """溜めた内容を先頭から順に返す。何度呼んでもよい。"""
+        if self._spill_file is None:
+            yield from self._chunks
+            return
+        self._spill_file.flush()
+        self._spill_file.seek(0)
+        while True:
+            chunk = self._spill_file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        self._spill_file.seek(0, 2) # 追記位置（末尾）に戻す
+
+    def getvalue(self) -> str:
+        """全体を 1 つの文字列で返す（小さい出力や、テスト用）。"""
+        return "".join(self.chunks())
+
+    def close(self) -> None:
+        if self._budget is not None and self._reserved:
+            self._budget.release(self._reserved)
+        self._reserved = 0
+        self._chunks = []
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def _spill(self) -> None:
+        self._spill_file = tempfile.TemporaryFile(mode="w+", encoding="utf-8", prefix="kero-spill-")
+        for chunk in self._chunks:
+            self._spill_file.write(chunk)
+        self._chunks = []
+        if self._budget is not None and self._reserved:
+            self._budget.release(self._reserved)
+        self._reserved = 0
+
+
+def write_chunks(poutput: Callable[..., None], chunks: Iterable[str]) -> None:
+    """
+    チャンクを改行を挟まずに poutput へ書き出し、最後に 1 回だけ改行する。
+    （`poutput(text)` を 1 回呼んだ場合と同じ表示になる）
+    """
+    for chunk in chunks:
+        poutput(chunk, end="")
+    poutput("")
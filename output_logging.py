@@ -1,9 +1,12 @@
 import re
 import json
-from typing import Any
+from typing import Any, Iterable
 from datetime import datetime
 from pathlib import Path
 
+from log_catalog import record_log
+from log_storage import open_log_writer
+
 
 def sanitize_filename(text: str) -> str:
     """
@@ -16,35 +19,23 @@ def sanitize_filename(text: str) -> str:
     return re.sub(r'[\\/:*?"<>|]', '_', text).strip()
 
 
-def save_log(result_output_string: str, hostname: str, args, mode: str = "execute") -> Path | None:
+def build_log_path(hostname: str, args, mode: str = "execute") -> Path | None:
     """
-    プレーンテキスト出力を日時付き .log として保存する。
+    .log の保存先 Path を決める（ディレクトリは作成するが、ファイルは作らない）。
+    `save_log()` と、出力をコマンドごとに追記していく `--stream` 用のログで共通に使う。
 
     ファイル名: {YYYYmmdd-HHMMSS}_{hostname}_{command|list}[_{memo}].log
     保存先   : logs/{mode}/{YYYYmmdd}/
 
-    Parameters
-    ----------
-    result_output_string : str
-        コマンド実行結果（テキスト）
-    hostname : str
-        ログファイル名に含めるホスト識別子
-    args : argparse.Namespace
-        CLI 引数（--log, --memo, --command, --commands-list などを参照）
-    mode : str, optional
-        保存モード("execute", "console", "configure", "scp", "login" など)
-
     Returns
     -------
     Path | None
-        実際に保存した場合は保存先 Path、保存しない場合(None)は None
+        保存先 Path。--log 未指定などで保存しない場合は None
 
     Raises
     ------
     ValueError
         --memo のみ指定 / ファイル名が決定できない / SCPモードでput/get未指定 などの論理エラー
-    OSError
-        ファイル/ディレクトリ作成や書き込みに失敗した場合（そのまま伝播）
     """
 
     # --memoがあるのに--logがないとValueError
@@ -107,13 +98,57 @@ def save_log(result_output_string: str, hostname: str, args, mode: str = "execut
     
     log_path = log_dir / file_name
 
+    return log_path
+
+
+def save_log(result_output_string: str | Iterable[str], hostname: str, args, mode: str = "execute") -> Path | None:
+    """
+    プレーンテキスト出力を日時付き .log として保存する。
+
+    ファイル名: {YYYYmmdd-HHMMSS}_{hostname}_{command|list}[_{memo}].log
+    保存先   : logs/{mode}/{YYYYmmdd}/
+
+    Parameters
+    ----------
+    result_output_string : str | Iterable[str]
+        コマンド実行結果（テキスト）。チャンクの iterable（HostTextBuffer.chunks() 等）も受け付け、順に書き出す。
+    hostname : str
+        ログファイル名に含めるホスト識別子
+    args : argparse.Namespace
+        CLI 引数（--log, --memo, --command, --commands-list などを参照）
+    mode : str, optional
+        保存モード("execute", "console", "configure", "scp", "login" など)
+
+    Returns
+    -------
+    Path | None
+        実際に保存した場合は保存先 Path（圧縮時は .gz / .zst 付き）、保存しない場合(None)は None
+
+    Raises
+    ------
+    ValueError
+        --memo のみ指定 / ファイル名が決定できない / SCPモードでput/get未指定 / log.compression が不正 などの論理エラー
+    OSError
+        ファイル/ディレクトリ作成や書き込みに失敗した場合（そのまま伝播）
+    """
+
+    log_path = build_log_path(hostname, args, mode)
+    if log_path is None:
+        return None
+
     # loginコマンドではファイルパスのみ返す。(loginコマンドで処理するため。)
     if mode == "login":
         return log_path
 
-    with open(log_path, "w", encoding="utf-8") as log_file:
-        log_file.write(result_output_string)
-    
+    # sys_config.yaml の log.compression が gzip / zstd なら {名前}.log.gz / .log.zst に圧縮して書く。
+    log_file, log_path = open_log_writer(log_path)
+    with log_file:
+        if isinstance(result_output_string, str):
+            log_file.write(result_output_string)
+        else:
+            log_file.writelines(result_output_string)
+
+    record_log(log_path, mode=mode, hostname=hostname, memo=sanitize_filename(getattr(args, "memo", "") or ""))
     return log_path
 
 
@@ -140,12 +175,12 @@ def save_json(json_data: Any, hostname: str, args, *, parser_kind: str, mode: st
     Returns
     -------
     Path | None
-        実際に保存した場合は保存先 Path、保存しない場合(None)は None
+        実際に保存した場合は保存先 Path（圧縮時は .gz / .zst 付き）、保存しない場合(None)は None
 
     Raises
     ------
     ValueError
-        --memo のみ指定 / ファイル名が決定できない / SCPモードでput/get未指定 などの論理エラー
+        --memo のみ指定 / ファイル名が決定できない / SCPモードでput/get未指定 / log.compression が不正 などの論理エラー
     OSError
         ファイル/ディレクトリ作成や書き込みに失敗した場合（そのまま伝播）
     """
@@ -217,7 +252,9 @@ def save_json(json_data: Any, hostname: str, args, *, parser_kind: str, mode: st
     
     log_path = log_dir / file_name
 
-    with open(log_path, "w", encoding="utf-8") as log_file:
+    log_file, log_path = open_log_writer(log_path)
+    with log_file:
         log_file.write(json.dumps(json_data, ensure_ascii=False, indent=2))
-    
+
+    record_log(log_path, mode=mode, kind="json", hostname=hostname, memo=sanitize_filename(getattr(args, "memo", "") or ""), parser=parser_kind or None)
     return log_path
@@ -0,0 +1,126 @@
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+
+from message import print_info
+from output_logging import build_log_path, sanitize_filename
+from log_catalog import record_log
+from log_storage import open_log_writer
+from output_buffer import HostTextBuffer
+
+# output_stream.py
+# 役割:
+# - execute --stream 用に、コマンドの結果を届いた順に画面表示・ログ追記する（HostOutputStream）
+# - --ordered 用に、辞書順で手前のホストがすべて終わった時点でそのホストを出力する（SortedPrefixFlusher）
+# 順番待ちの本文は HostTextBuffer（output_buffer.py）で持ち、メモリ予算を超えたら一時ファイルに退避される。
+# 全ホスト分の出力を最後まで抱え込まないことで、大量ホスト × 大きな出力（show tech 等）でも
+# メモリを使い切らず、最初の結果がすぐに見えるようにする🐸
+
+
+class HostOutputStream:
+    """
+    1 ホスト分の出力をコマンド単位で受け取り、その場で表示 / ログ追記する。
+
+    Parameters
+    ----------
+    hostname : str
+        表示・ログファイル名に使うホスト名
+    args : argparse.Namespace
+        CLI 引数（log, memo, command, commands_list などを参照）
+    poutput : Callable[[str], None]
+        cmd2 の出力関数
+    live : bool
+        True なら届いたチャンクをその場で表示する
+    keep_buffer : HostTextBuffer | None
+        指定時は表示用の本文をここにも書く（--ordered で順番待ちする場合）
+    mode : str
+        ログの保存モード
+    """
+
+    def __init__(self, hostname: str, args, poutput: Callable[..., None], *, live: bool, keep_buffer: HostTextBuffer | None = None,
+                 mode: str = "execute"):
+        self.hostname = hostname
+        self.live = live
+        self.log_path: Path | None = build_log_path(hostname, args, mode)
+        self._mode = mode
+        self._memo = sanitize_filename(getattr(args, "memo", "") or "")
+        self._poutput = poutput
+        self._keep_buffer = keep_buffer
+        self._log_file = None
+        self._header_shown = False
+
+    def write(self, chunk: str) -> None:
+        """1 コマンド分の整形済みテキスト（"{prompt} {command}\\n{output}\\n"）を受け取る。"""
+        if self.log_path is not None:
+            if self._log_file is None:
+                # 追記しながら flush するので、log.dedup でも参照ファイルにはせずそのまま書く。
+                self._log_file, self.log_path = open_log_writer(self.log_path, dedup=False)
+            self._log_file.write(chunk)
+            self._log_file.flush()
+
+        if self.live:
+            if not self._header_shown:
+                print_info(f"<NODE: {self.hostname}> 📄OUTPUTケロ🐸 (stream)")
+                self._header_shown = True
+            self._poutput(chunk, end="") # チャンクは改行で終わっている
+
+        if self._keep_buffer is not None:
+            self._keep_buffer.write(chunk)
+
+    def close(self) -> Path | None:
+        """ログを閉じて保存先 Path を返す（1 行も書いていなければ None）。"""
+        if self._log_file is None:
+            return None
+        self._log_file.close()
+        self._log_file = None
+        record_log(self.log_path, mode=self._mode, hostname=self.hostname, memo=self._memo)
+        return self.log_path
+
+
+class SortedPrefixFlusher:
+    """
+    --ordered 用の出力バッファ。
+
+    ホスト名の辞書順で「手前のホストがすべて完了した」ものから順に emit する。
+    全ホスト完了まで待たずに出力でき、保持するのは順番待ちのホスト分だけになる。
+
+    - 各ホストの本文（HostTextBuffer）は `put()` で登録する（ワーカースレッドから呼んでよい）。emit 後にバッファを閉じる
+    - 完了（成功・失敗問わず）は `done()` で通知する。失敗したホストは本文無しで飛ばす
+    """
+
+    def __init__(self, hostnames: Iterable[str], emit: Callable[[str, HostTextBuffer], None]):
+        self._order = sorted(hostnames, key=lambda x: (x is None, x or ""))
+        self._emit = emit
+        self._next = 0
+        self._finished: set[str] = set()
+        self._outputs: dict[str, tuple[str, HostTextBuffer]] = {}  # inventory hostname -> (表示用 hostname, 本文)
+        self._lock = threading.Lock()
+
+    def put(self, hostname: str, display_hostname: str, text_buffer: HostTextBuffer) -> None:
+        with self._lock:
+            if hostname in self._finished:
+                # --deadline で打ち切り済み（done() 済み）のホストが後から終わった場合は表示しない
+                text_buffer.close()
+                return
+            self._outputs[hostname] = (display_hostname, text_buffer)
+
+    def done(self, hostname: str) -> None:
+        """ホストの完了を通知し、出力できるところまで emit する。"""
+        # 出力順を保証するため、emit もロックの中で行う。
+        with self._lock:
+            self._finished.add(hostname)
+            while self._next < len(self._order) and self._order[self._next] in self._finished:
+                current = self._order[self._next]
+                if current in self._outputs:
+                    display_hostname, text_buffer = self._outputs.pop(current)
+                    try:
+                        self._emit(display_hostname, text_buffer)
+                    finally:
+                        text_buffer.close()
+                self._next += 1
+
+    @property
+    def pending(self) -> int:
+        """順番待ちで保持しているホスト数。"""
+        with self._lock:
+            return len(self._outputs)
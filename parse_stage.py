@@ -0,0 +1,91 @@
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from netmiko.utilities import structured_data_converter
+
+# parse_stage.py
+# 役割:
+# - --parser genie/textfsm のパース処理を I/O ワーカーから切り離す
+# - 生テキスト → 構造化データ の変換を ProcessPoolExecutor 上で実行する
+# このモジュールは子プロセスでも import されるので、重いモジュール(cmd2 / rich 等)は import しないこと🐸
+
+
+def parse_raw_output(raw_output: str, *, command: str, platform: str, parser_kind: str, textfsm_template: str | None = None):
+    """
+    1 コマンド分の生テキストを構造化データ（list/dict）に変換する。
+
+    `send_command(..., use_genie=True | use_textfsm=True, raise_parsing_error=True)` と同じ
+    変換（netmiko の structured_data_converter）を行う。プロセスプールに渡すため top-level 関数にしている。
+
+    Parameters
+    ----------
+    raw_output : str
+        `send_command()` で取得した生テキスト
+    command : str
+        実行したコマンド（genie / ntc-templates のパーサ選択に使用）
+    platform : str
+        Netmiko の device_type（例: "cisco_ios"）
+    parser_kind : str
+        "genie" | "textfsm"
+    textfsm_template : str | None
+        parser_kind="textfsm" のときのテンプレートファイルパス
+
+    Returns
+    -------
+    list | dict
+        パース結果
+
+    Raises
+    ------
+    ValueError
+        未対応の parser_kind が指定された場合
+    Exception
+        パースに失敗した場合（netmiko / genie / textfsm の例外をそのまま伝播）
+    """
+    if parser_kind not in ("genie", "textfsm"):
+        raise ValueError(f"未対応のparserケロ🐸: {parser_kind}")
+
+    return structured_data_converter(raw_data=raw_output,
+                                     command=command,
+                                     platform=platform,
+                                     use_textfsm=(parser_kind == "textfsm"),
+                                     use_genie=(parser_kind == "genie"),
+                                     textfsm_template=textfsm_template,
+                                     raise_parsing_error=True)
+
+
+def parse_raw_outputs(raw_outputs: list[tuple[str, str]], *, platform: str, parser_kind: str, textfsm_template: str | None = None, parse_pool: Executor | None = None) -> list:
+    """
+    (command, raw_output) のリストをまとめてパースし、コマンド順の結果リストを返す。
+
+    Parameters
+    ----------
+    raw_outputs : list[tuple[str, str]]
+        I/O ワーカーが集めた (command, 生テキスト) のリスト
+    parse_pool : Executor | None
+        `create_parse_pool()` で作成したプロセスプール。None のときは呼び出し元スレッドでパースする。
+
+    Returns
+    -------
+    list
+        各コマンドのパース結果（raw_outputs と同じ順序）
+    """
+    if parse_pool is None:
+        return [parse_raw_output(raw_output, command=command, platform=platform,
+                                 parser_kind=parser_kind, textfsm_template=textfsm_template)
+                for command, raw_output in raw_outputs]
+
+    futures = [parse_pool.submit(parse_raw_output, raw_output, command=command, platform=platform,
+                                 parser_kind=parser_kind, textfsm_template=textfsm_template)
+               for command, raw_output in raw_outputs]
+    return [future.result() for future in futures]
+
+
+def create_parse_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    パース専用のプロセスプールを作成する。
+
+    I/O ワーカースレッドが動いている最中に子プロセスが起動されるため、
+    fork ではなく spawn で起動してスレッド/ロックの状態を引き継がないようにしている。
+    spawn の子プロセスは起動スクリプト（main.py）を import し直すので、main.py は __main__ ガードの外で何も import しない。
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
@@ -0,0 +1,187 @@
+import argparse
+import cProfile
+import io
+import pstats
+import shlex
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+import cmd2
+
+from message import print_info, print_success, print_error
+from output_logging import sanitize_filename
+
+# profiler.py
+# 役割:
+# - `profile cpu|mem <command...>` で、任意の REPL コマンドを cProfile / tracemalloc の下で 1 回実行する
+# - 結果は logs/profile/ に保存する
+#   cpu: .pstats（snakeviz / `python -m pstats` で開ける）と上位関数のテキストレポート
+#   mem: .tracemalloc（tracemalloc.Snapshot.load で開ける）と確保量上位の行のテキストレポート
+# 実機での実行で、時間が rich の描画（message.py）・ruamel の YAML 読み込み・genie のどこに消えているかを
+# コードに手を入れずに調べるため🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+PROFILE_DIR = Path("logs") / "profile"
+DEFAULT_TOP = 30
+SORT_KEYS = ("cumulative", "tottime", "calls")
+TRACEMALLOC_FRAMES = 25  # 確保元として記録するスタックの深さ
+
+
+######################
+###  HELP_SECTION  ###
+######################
+profile_mode_help = ("cpu: cProfile で関数ごとの実行時間を計測します。\n"
+                     "     Python 3.12 以降はワーカースレッド（--workers）の分も含まれます。関数ごとの内訳を正確に見たいときは --workers 1 で実行してください。\n"
+                     "mem: tracemalloc でメモリの確保元（行単位）とピークを計測します。全スレッドが対象です。")
+profile_command_help = ("計測するコマンドをそのまま続けて書きます。\n"
+                        "example: profile cpu execute --group tokyo -L show-basic --parser genie")
+profile_top_help = f"レポートに載せる件数を指定します。(default: {DEFAULT_TOP})"
+profile_sort_help = "cpu のレポートの並び順を指定します。(default: cumulative)"
+
+
+######################
+### PARSER_SECTION ###
+######################
+profile_parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
+profile_parser.add_argument("--top", type=int, default=DEFAULT_TOP, help=profile_top_help)
+profile_parser.add_argument("--sort", choices=SORT_KEYS, default="cumulative", help=profile_sort_help)
+profile_parser.add_argument("mode", choices=["cpu", "mem"], help=profile_mode_help)
+profile_parser.add_argument("command", nargs=argparse.REMAINDER, help=profile_command_help)
+
+
+@dataclass
+class ProfileReport:
+    """
+    1 回の計測結果。
+
+    Attributes
+    ----------
+    data_path : Path
+        生データ（.pstats / .tracemalloc）の保存先
+    report_path : Path
+        テキストレポートの保存先
+    report : str
+        テキストレポートの本文
+    elapsed : float
+        コマンドの実行にかかった秒数（計測のオーバーヘッド込み）
+    """
+    data_path: Path
+    report_path: Path
+    report: str
+    elapsed: float
+
+
+def build_profile_path(mode: str, command_line: str, *, now: datetime | None = None) -> Path:
+    """
+    保存先の拡張子なしの Path を決める（ディレクトリは作成する）。
+    保存先: logs/profile/{YYYYmmdd}/{YYYYmmdd-HHMMSS}_{cpu|mem}_{コマンド名}
+    """
+    now = now or datetime.now()
+    profile_dir = PROFILE_DIR / now.strftime("%Y%m%d")
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    command_name = sanitize_filename(command_line.split()[0]) if command_line.split() else "UNKNOWN"
+    return profile_dir / f"{now.strftime('%Y%m%d-%H%M%S')}_{mode}_{command_name}"
+
+
+def run_with_cpu_profile(func: Callable[[], object], path_stem: Path, *, top: int = DEFAULT_TOP, sort: str = "cumulative") -> ProfileReport:
+    """func を cProfile の下で実行し、{path_stem}.pstats と {path_stem}.txt を保存する。func の例外はそのまま送出する（保存は行う）。"""
+    profiler = cProfile.Profile()
+    started = perf_counter()
+    profiler.enable()
+    try:
+        func()
+    finally:
+        profiler.disable()
+        elapsed = perf_counter() - started
+
+        data_path = path_stem.with_suffix(".pstats")
+        profiler.dump_stats(data_path)
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(top)
+        report = stream.getvalue()
+        report_path = path_stem.with_suffix(".txt")
+        report_path.write_text(report, encoding="utf-8")
+    return ProfileReport(data_path, report_path, report, elapsed)
+
+
+def run_with_memory_profile(func: Callable[[], object], path_stem: Path, *, top: int = DEFAULT_TOP) -> ProfileReport:
+    """func を tracemalloc の下で実行し、{path_stem}.tracemalloc と {path_stem}.txt を保存する。func の例外はそのまま送出する（保存は行う）。"""
+    # 既に他で tracemalloc を使っていれば（python -X tracemalloc 等）止めずに残す。
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = perf_counter()
+    try:
+        func()
+    finally:
+        elapsed = perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if not already_tracing:
+            tracemalloc.stop()
+
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                           tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                                           tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>")))
+        data_path = path_stem.with_suffix(".tracemalloc")
+        snapshot.dump(str(data_path))
+
+        lines = [f"peak: {(peak - baseline) / 1024 / 1024:.2f} MiB (実行前からの増分)",
+                 f"retained: {(current - baseline) / 1024 / 1024:.2f} MiB (実行後も残っている分)",
+                 "",
+                 f"Top {top} allocations (lineno):"]
+        for index, stat in enumerate(snapshot.statistics("lineno")[:top], start=1):
+            frame = stat.traceback[0]
+            lines.append(f"{index:>3}. {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KiB ({stat.count} blocks)")
+        report = "\n".join(lines) + "\n"
+        report_path = path_stem.with_suffix(".txt")
+        report_path.write_text(report, encoding="utf-8")
+    return ProfileReport(data_path, report_path, report, elapsed)
+
+
+@cmd2.with_argparser(profile_parser)
+def do_profile(self, args):
+    """
+    `profile` コマンドのエントリポイント。
+
+    - `profile cpu <command...>` : cProfile で計測して .pstats とレポートを保存
+    - `profile mem <command...>` : tracemalloc で計測して .tracemalloc とレポートを保存
+
+    計測対象のコマンドは通常どおり `onecmd_plus_hooks()` で実行する（エラー表示などもいつもどおり）。
+    """
+    if not args.command:
+        print_error("計測するコマンドを指定してケロ🐸 example: profile cpu execute --host R1 -c 'show version'")
+        return
+    if args.command[0] == "profile":
+        print_error("profile の中で profile は使えないケロ🐸")
+        return
+    if args.top <= 0:
+        print_error("--top には正の整数を指定してケロ🐸")
+        return
+
+    # cmd2 が引用符を外しているので、空白を含む引数（-c "show ip int brief" 等）は引用し直してから渡す。
+    command_line = shlex.join(args.command)
+    path_stem = build_profile_path(args.mode, command_line)
+    print_info(f"⏱️ {args.mode} プロファイル計測を開始するケロ🐸: {command_line}")
+
+    def run_command():
+        self.onecmd_plus_hooks(command_line)
+
+    if args.mode == "cpu":
+        report = run_with_cpu_profile(run_command, path_stem, top=args.top, sort=args.sort)
+    else:
+        report = run_with_memory_profile(run_command, path_stem, top=args.top)
+
+    self.poutput(report.report)
+    print_success(f"⏱️ 計測完了ケロ🐸 (elapsed: {report.elapsed:.2f}s) ⏩⏩⏩ {report.data_path} / {report.report_path}")
@@ -0,0 +1,257 @@
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from message import print_warning
+
+# prometheus_export.py
+# 役割:
+# - execute / configure / scp の実行が終わるたびに、Prometheus の textfile（keroroute.prom）を更新する
+#   node_exporter の textfile collector（--collector.textfile.directory）で収集できる
+# - カウンタ（試行 / 成功 / エラー分類ごとの失敗ホスト数、受信バイト数 など）と
+#   ヒストグラム（接続レイテンシ、コマンドレイテンシ）、直近の実行のゲージ（所要時間、ワーカーの埋まり具合）
+# - カウンタは既存のファイルの値に加算していくので、KeroRoute を再起動しても減らない
+# - 一時ファイルに書いてから rename で置き換える（収集中に書きかけのファイルを読ませない）
+# 絵文字入りのコンソール出力をパースしなくても、収集が遅くなってきたことをアラートできるようにする🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_TEXTFILE_PATH = Path("logs") / "metrics" / "keroroute.prom"
+
+# 接続レイテンシとして数えるフェーズ（run_metrics.HostTimings のフェーズ名）。レートリミッタの待ち時間は含めない。
+CONNECT_PHASES = ("connect", "tcp_connect", "ssh_auth", "fast_connect")
+
+CONNECT_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COMMAND_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# メトリクス名 -> (型, HELP, ヒストグラムのバケット)。ファイルにはこの順で書き出す。
+METRICS: dict[str, tuple[str, str, tuple[float, ...] | None]] = {
+    "keroroute_runs_total": ("counter", "Number of runs.", None),
+    "keroroute_hosts_attempted_total": ("counter", "Hosts that were started.", None),
+    "keroroute_hosts_succeeded_total": ("counter", "Hosts that finished successfully.", None),
+    "keroroute_hosts_failed_total": ("counter", "Hosts that failed, by error class.", None),
+    "keroroute_connect_latency_seconds": ("histogram", "Time to open the session (TCP connect + SSH auth).", CONNECT_LATENCY_BUCKETS),
+    "keroroute_command_latency_seconds": ("histogram", "Time to run one command / config push.", COMMAND_LATENCY_BUCKETS),
+    "keroroute_bytes_received_total": ("counter", "Bytes of command output received from devices.", None),
+    "keroroute_worker_busy_seconds_total": ("counter", "Sum of per-host processing time.", None),
+    "keroroute_worker_capacity_seconds_total": ("counter", "Workers multiplied by run duration.", None),
+    "keroroute_last_run_duration_seconds": ("gauge", "Duration of the last run.", None),
+    "keroroute_last_run_workers": ("gauge", "Worker slots of the last run.", None),
+    "keroroute_last_run_worker_saturation": ("gauge", "Busy / capacity of the worker pool in the last run (0-1).", None),
+    "keroroute_last_run_timestamp_seconds": ("gauge", "Unix time when the last run finished.", None),
+}
+
+_SAMPLE_PATTERN = re.compile(r"^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})?\s+(?P<value>\S+)")
+_LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+_HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_le(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _family(sample_name: str) -> str | None:
+    """サンプル名（xxx_bucket 等）から METRICS のメトリクス名を引く。知らないものは None。"""
+    if sample_name in METRICS:
+        return sample_name
+    for suffix in _HISTOGRAM_SUFFIXES:
+        base = sample_name.removesuffix(suffix)
+        if base != sample_name and METRICS.get(base, ("",))[0] == "histogram":
+            return base
+    return None
+
+
+class PrometheusTextfile:
+    """
+    Prometheus の textfile（テキスト形式）の読み書き。METRICS に定義したメトリクスだけを扱う。
+
+    サンプルは (サンプル名, ラベル) -> 値 で持つ。スレッドセーフではない（呼び出し側でロックすること）。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.samples: dict[tuple[str, Labels], float] = {}
+
+    def load(self) -> None:
+        """既存のファイルがあれば読み込む（壊れた行・知らないメトリクスは無視する）。"""
+        try:
+            text = self.path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return
+        for line in text.splitlines():
+            match = _SAMPLE_PATTERN.match(line)
+            if line.startswith("#") or match is None or _family(match["name"]) is None:
+                continue
+            try:
+                value = float(match["value"])
+            except ValueError:
+                continue
+            labels = tuple(sorted((key, _unescape(value_text)) for key, value_text in _LABEL_PATTERN.findall(match["labels"] or "")))
+            self.samples[(match["name"], labels)] = value
+
+    def inc(self, name: str, labels: Labels, value: float = 1.0) -> None:
+        self.samples[(name, labels)] = self.samples.get((name, labels), 0.0) + value
+
+    def set(self, name: str, labels: Labels, value: float) -> None:
+        self.samples[(name, labels)] = value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """ヒストグラムに 1 件追加する。"""
+        buckets = METRICS[name][2] + (float("inf"),)
+        for bound in buckets:
+            bucket_labels = tuple(sorted(labels + (("le", _format_le(bound)),)))
+            # 該当しないバケットも 0 で出しておく（バケットが揃っていないと histogram_quantile が使えない）
+            self.inc(f"{name}_bucket", bucket_labels, 1.0 if value <= bound else 0.0)
+        self.inc(f"{name}_sum", labels, value)
+        self.inc(f"{name}_count", labels)
+
+    def render(self) -> str:
+        by_family: dict[str, list[tuple[str, Labels, float]]] = {}
+        for (sample_name, labels), value in self.samples.items():
+            by_family.setdefault(_family(sample_name), []).append((sample_name, labels, value))
+
+        lines = []
+        for name, (metric_type, help_text, _) in METRICS.items():
+            samples = by_family.get(name)
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in sorted(samples, key=_sort_key):
+                label_text = ",".join(f'{key}="{_escape(label_value)}"' for key, label_value in sorted(labels, key=lambda label: (label[0] == "le", label[0])))
+                lines.append(f"{sample_name}{{{label_text}}} {_format_value(value)}" if label_text else f"{sample_name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        """一時ファイルに書いてから rename で置き換える。"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # node_exporter は *.prom だけを読むので、一時ファイルは .prom で終わらない名前にする。
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.path)
+
+
+def _sort_key(sample: tuple[str, Labels, float]):
+    """同じラベルのヒストグラムを _bucket（le の昇順）→ _sum → _count の順に並べる。"""
+    sample_name, labels, _ = sample
+    base_labels = tuple(label for label in labels if label[0] != "le")
+    le = dict(labels).get("le")
+    suffix_order = next((i for i, suffix in enumerate(_HISTOGRAM_SUFFIXES) if sample_name.endswith(suffix)), 0)
+    return base_labels, suffix_order, float(le) if le is not None else 0.0
+
+
+# 同じプロセス内の複数の実行が同時に終わっても、読み込み → 加算 → 置き換え が混ざらないようにする。
+_textfile_lock = threading.Lock()
+
+
+class PrometheusRunRecorder:
+    """
+    1 回の実行分の集計。`add_host()` はスレッドセーフ。`close()` で textfile に加算して書き出す。
+
+    RunMetrics（run_metrics.py）が、ホストが終わるたびに HostTimings を渡す。
+    """
+
+    def __init__(self, path: Path, *, mode: str):
+        self.path = path
+        self.mode = mode
+        self.attempted = 0
+        self.succeeded = 0
+        self.failed: dict[str, int] = {}
+        self.connect_latencies: list[float] = []
+        self.command_latencies: list[float] = []
+        self.bytes_received = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_host(self, timings) -> None:
+        """終わったホストの HostTimings（finish() 済み）を集計に加える。"""
+        connect_phases = [timings.phases[name] for name in CONNECT_PHASES if name in timings.phases]
+        with self._lock:
+            self.attempted += 1
+            if timings.status == "ok":
+                self.succeeded += 1
+            else:
+                error_class = timings.error_class or "unknown"
+                self.failed[error_class] = self.failed.get(error_class, 0) + 1
+            if connect_phases:
+                self.connect_latencies.append(sum(connect_phases))
+            self.command_latencies.extend(command["seconds"] for command in timings.commands)
+            self.bytes_received += timings.bytes_received
+            self.busy_seconds += timings.elapsed or 0.0
+
+    def apply(self, textfile: PrometheusTextfile, *, elapsed: float, workers: int, now: float | None = None) -> None:
+        """この実行の集計を textfile に加算する。"""
+        labels = _labels(mode=self.mode)
+        with self._lock:
+            textfile.inc("keroroute_runs_total", labels)
+            textfile.inc("keroroute_hosts_attempted_total", labels, self.attempted)
+            textfile.inc("keroroute_hosts_succeeded_total", labels, self.succeeded)
+            for error_class, count in self.failed.items():
+                textfile.inc("keroroute_hosts_failed_total", _labels(mode=self.mode, error_class=error_class), count)
+            for seconds in self.connect_latencies:
+                textfile.observe("keroroute_connect_latency_seconds", labels, seconds)
+            for seconds in self.command_latencies:
+                textfile.observe("keroroute_command_latency_seconds", labels, seconds)
+            textfile.inc("keroroute_bytes_received_total", labels, self.bytes_received)
+
+            capacity = workers * elapsed
+            textfile.inc("keroroute_worker_busy_seconds_total", labels, self.busy_seconds)
+            textfile.inc("keroroute_worker_capacity_seconds_total", labels, capacity)
+            textfile.set("keroroute_last_run_duration_seconds", labels, elapsed)
+            textfile.set("keroroute_last_run_workers", labels, workers)
+            textfile.set("keroroute_last_run_worker_saturation", labels, min(1.0, self.busy_seconds / capacity) if capacity > 0 else 0.0)
+            textfile.set("keroroute_last_run_timestamp_seconds", labels, now if now is not None else time.time())
+
+    def close(self, *, elapsed: float, workers: int) -> Path | None:
+        """textfile を更新して保存先を返す。書き込めなかった場合は警告だけ出して None（実行自体は失敗させない）。"""
+        try:
+            with _textfile_lock:
+                textfile = PrometheusTextfile(self.path)
+                textfile.load()
+                self.apply(textfile, elapsed=elapsed, workers=workers)
+                textfile.write()
+        except OSError as e:
+            print_warning(f"Prometheus textfile を更新できなかったケロ🐸: {self.path}: {e}")
+            return None
+        return self.path
+
+
+def create_prometheus_recorder(mode: str, metrics_config: dict) -> PrometheusRunRecorder | None:
+    """
+    `sys_config.yaml` の `metrics.prometheus`（既定: 無効）に従って、この実行の集計を作る。無効なら None。
+    path の設定が不正な場合も、実行自体は止めずに警告だけ出して None を返す。
+    """
+    prometheus_config = metrics_config.get("prometheus") or {}
+    if not prometheus_config.get("enabled", False):
+        return None
+    path = prometheus_config.get("path") or DEFAULT_TEXTFILE_PATH
+    if not isinstance(path, (str, Path)):
+        print_warning(f"sys_config.yamlのmetrics.prometheus.pathにはファイルのパスを指定してくださいケロ🐸: {path}")
+        return None
+    return PrometheusRunRecorder(Path(path).expanduser(), mode=mode)
@@ -0,0 +1,140 @@
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from load_and_validate_yaml import load_sys_config
+
+# prompt_cache.py
+# 役割:
+# - fast-connect 用に、ホストごとの base_prompt / プロンプト / enable の要否をローカルに保存する
+# - 次回以降の接続は「find_prompt() 1 回で照合するだけ」で enable 確認・set_base_prompt を省略する
+# 高 RTT 環境（衛星回線など）では 1 往復ごとに数百 ms かかるので、その往復を減らすのが目的🐸
+# 更新はメモリ上に溜め、実行の終わり（flush_prompt_cache()）と終了時（atexit）にまとめてファイルへ書く。
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_PROMPT_CACHE_FILE = ".kero_cache/prompt_cache.json"
+DEFAULT_PROMPT_CACHE_TTL = 7 * 24 * 60 * 60  # 秒。これより古いエントリは使わない（再発見する）
+
+
+def cache_key(device: dict) -> str:
+    """
+    キャッシュのキーを作る。接続先（ip/host, port）・ユーザー・device_type が変われば別エントリにする。
+    """
+    return "|".join(str(device.get(k) or "") for k in ("device_type", "ip", "host", "port", "username"))
+
+
+class PromptCache:
+    """
+    ホストごとのプロンプト情報を JSON ファイルに保存するキャッシュ（スレッドセーフ）。
+
+    put / invalidate はメモリ上の内容だけを変える。ファイルへは `flush()` でまとめて書く
+    （ホストごとにファイル全体を書き直すと、大きな inventory の初回実行で書き込みが O(n²) になり、ワーカーもロックで詰まるため）。
+
+    エントリ:
+        {"base_prompt": "R1", "prompt": "R1#", "hostname": "R1", "enable_required": true, "updated_at": 1700000000.0}
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_PROMPT_CACHE_FILE, ttl: float = DEFAULT_PROMPT_CACHE_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._entries: dict[str, dict] = self._load()
+
+    def get(self, device: dict) -> dict | None:
+        """有効期限内のエントリを返す。無ければ None。"""
+        with self._lock:
+            entry = self._entries.get(cache_key(device))
+        if entry is None:
+            return None
+        if self.ttl and time.time() - entry.get("updated_at", 0) > self.ttl:
+            return None
+        return entry
+
+    def put(self, device: dict, *, base_prompt: str, prompt: str, hostname: str, enable_required: bool) -> None:
+        """エントリを更新する（ファイルへは flush() で書く）。内容が変わらなければ何もしない。"""
+        entry = {"base_prompt": base_prompt,
+                 "prompt": prompt,
+                 "hostname": hostname,
+                 "enable_required": enable_required}
+        key = cache_key(device)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and {k: current.get(k) for k in entry} == entry \
+                    and (not self.ttl or time.time() - current.get("updated_at", 0) <= self.ttl / 2):
+                return
+            self._entries[key] = {**entry, "updated_at": time.time()}
+            self._dirty = True
+
+    def invalidate(self, device: dict) -> None:
+        """照合に失敗したエントリを削除する（ファイルへは flush() で書く）。"""
+        with self._lock:
+            if self._entries.pop(cache_key(device), None) is not None:
+                self._dirty = True
+
+    def flush(self) -> None:
+        """前回の flush 以降に変わっていれば、ファイルに書き出す。"""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                entries = dict(self._entries)
+                self._dirty = False
+            self._save(entries)
+
+    def _load(self) -> dict[str, dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # 無い / 壊れている → 空から作り直す
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self, entries: dict[str, dict]) -> None:
+        # 書きかけのファイルを読まれないよう、一時ファイルに書いてから置き換える。
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # キャッシュの保存失敗で接続自体を失敗させない。
+            pass
+
+
+_cache: PromptCache | None = None
+_cache_enabled: bool | None = None
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> PromptCache | None:
+    """
+    `sys_config.yaml` の `connect.fast_connect` が true のときだけキャッシュを返す（既定は無効 = None）。
+    設定は最初の呼び出し時に 1 度だけ読む。
+    """
+    global _cache, _cache_enabled
+
+    with _cache_lock:
+        if _cache_enabled is None:
+            connect_config = load_sys_config().get("connect") or {}
+            _cache_enabled = bool(connect_config.get("fast_connect", False))
+            if _cache_enabled:
+                _cache = PromptCache(path=connect_config.get("prompt_cache_file") or DEFAULT_PROMPT_CACHE_FILE,
+                                     ttl=connect_config.get("prompt_cache_ttl", DEFAULT_PROMPT_CACHE_TTL))
+                atexit.register(_cache.flush)
+        return _cache
+
+
+def flush_prompt_cache() -> None:
+    """fast-connect が有効なら、溜まった更新をファイルに書く（execute / configure / scp の実行の終わりに呼ぶ）。"""
+    if _cache is not None:
+        _cache.flush()
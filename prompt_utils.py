@@ -69,7 +69,7 @@ class EnableModeError(ValueError):
     pass
 
 
-def ensure_enable_mode(connection: BaseConnection) -> None:
+def ensure_enable_mode(connection: BaseConnection) -> bool:
     """
     接続オブジェクトを必ず enable (#) モードに昇格させる。
     - check_enable_mode() で現在のモードを確認し、必要なら enable() を実行
@@ -81,16 +81,24 @@ def ensure_enable_mode(connection: BaseConnection) -> None:
     connection : BaseConnection
         Netmiko 接続オブジェクト
 
+    Returns
+    -------
+    bool
+        enable() を実行した場合 True（ログイン直後から # だった場合は False）。fast-connect のキャッシュに使う。
+
     Raises
     ------
     EnableModeError
         enable モードに移行できなかった場合
     """
     try: 
+        enable_required = False
         if not connection.check_enable_mode():
             connection.enable()
+            enable_required = True
         if not connection.check_enable_mode():
             raise EnableModeError("Enable Modeに移行できなかったケロ🐸")
+        return enable_required
     except Exception as e:
             raise EnableModeError(str(e)) from e
         # `from e` の意味:
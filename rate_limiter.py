@@ -0,0 +1,213 @@
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Mapping
+
+from load_and_validate_yaml import load_sys_config, get_validated_inventory_data
+from inventory_cache import INVENTORY_FILE
+from inventory_db import get_inventory_backend
+
+# rate_limiter.py
+# 役割:
+# - 新規 SSH / コンソール接続の開始レートをトークンバケットで制限する
+# - --group 実行開始時に全ワーカーが同時に ConnectHandler を呼び、
+#   TACACS+/RADIUS 側で認証待ちが詰まる（AAA ストーム）のを防ぐ
+# - 全体のバケットに加えて、inventory のグループ / タグ単位のバケットも設定できる
+# - 接続開始のタイミングはランダムな jitter でばらす
+# - リミッタはプロセスで 1 つ（設定は最初に 1 度だけ読む）。所属情報は inventory が変わったら作り直す
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+DEFAULT_CONNECT_RATE = 10.0   # 1 秒あたりの接続開始数
+DEFAULT_CONNECT_BURST = 10    # 一度に開始してよい接続数（バケットの容量）
+DEFAULT_CONNECT_JITTER = 0.2  # 接続開始前に追加するランダム待ち時間の上限(秒)
+
+
+class TokenBucket:
+    """
+    スレッドセーフなトークンバケット。
+
+    `acquire()` はトークンを前借り（予約）してから、ロックの外で必要な時間だけ待つ。
+    そのため待ち行列ができても到着順に rate の間隔で払い出される。
+    """
+
+    def __init__(self, rate: float, burst: int, *, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate_limit の rate / burst には正の数を指定してくださいケロ🐸")
+        self.rate = float(rate)
+        self.burst = int(burst)
+        self._tokens = float(burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """トークンを 1 つ予約し、使えるようになるまでの待ち時間(秒)を返す。"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """トークンを 1 つ取得する（必要なら待つ）。待った秒数を返す。"""
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class ConnectionRateLimiter:
+    """
+    接続前に呼ぶレートリミッタ。
+
+    - 全体のバケット（global）は常に通る
+    - ホストが所属するグループ / タグにバケットが設定されていれば、それも通る
+    - 最後に 0〜jitter 秒のランダムな待ちを入れる
+
+    memberships_loader を渡すと、memberships の代わりに接続のたびにそれを呼んで所属情報を引く（inventory の変更に追従するため）。
+    """
+
+    def __init__(self, *, rate: float = DEFAULT_CONNECT_RATE, burst: int = DEFAULT_CONNECT_BURST, jitter: float = DEFAULT_CONNECT_JITTER,
+                 group_buckets: Mapping[str, TokenBucket] | None = None, tag_buckets: Mapping[str, TokenBucket] | None = None,
+                 memberships: Mapping[str, tuple[set[str], set[str]]] | None = None,
+                 memberships_loader: Callable[[], Mapping[str, tuple[set[str], set[str]]]] | None = None, sleep=time.sleep):
+        self.global_bucket = TokenBucket(rate, burst, sleep=sleep)
+        self.jitter = jitter
+        self.group_buckets = dict(group_buckets or {})
+        self.tag_buckets = dict(tag_buckets or {})
+        self._memberships = dict(memberships or {})  # hostname / ip -> (groups, tags)
+        self._memberships_loader = memberships_loader
+        self._sleep = sleep
+
+    def buckets_for(self, hostname: str, device: dict | None = None) -> list[TokenBucket]:
+        """ホストに適用されるバケット（global + グループ + タグ）を返す。"""
+        memberships = self._memberships_loader() if self._memberships_loader is not None else self._memberships
+        groups, tags = memberships.get(hostname, (set(), set()))
+        if not groups and not tags and device:
+            groups, tags = memberships.get(device.get("ip") or device.get("host") or "", (set(), set()))
+
+        buckets = [self.global_bucket]
+        buckets += [self.group_buckets[g] for g in sorted(groups) if g in self.group_buckets]
+        buckets += [self.tag_buckets[t] for t in sorted(tags) if t in self.tag_buckets]
+        return buckets
+
+    def wait_for_slot(self, hostname: str, device: dict | None = None) -> float:
+        """接続を開始してよくなるまで待つ。待った合計秒数を返す（pop_rate_limit_wait() でも取得できる）。"""
+        waited = 0.0
+        for bucket in self.buckets_for(hostname, device):
+            waited += bucket.acquire()
+        if self.jitter > 0:
+            delay = random.uniform(0, self.jitter)
+            self._sleep(delay)
+            waited += delay
+        _wait_record.waited = getattr(_wait_record, "waited", 0.0) + waited
+        return waited
+
+
+# --workers auto の接続レイテンシからリミッタの待ち時間を除くため、スレッドごとに待った秒数を記録する。
+_wait_record = threading.local()
+
+
+def pop_rate_limit_wait() -> float:
+    """このスレッドで前回の呼び出し以降にリミッタで待った秒数を返し、0 に戻す。"""
+    waited = getattr(_wait_record, "waited", 0.0)
+    _wait_record.waited = 0.0
+    return waited
+
+
+def _inventory_memberships(inventory_data: dict) -> dict[str, tuple[set[str], set[str]]]:
+    """inventory から hostname / ip / inventory キー -> (所属グループ, タグ) の索引を作る。"""
+    hosts = (inventory_data.get("all") or {}).get("hosts") or {}
+    groups = (inventory_data.get("all") or {}).get("groups") or {}
+
+    memberships: dict[str, tuple[set[str], set[str]]] = {}
+    for host_key, node_info in hosts.items():
+        host_groups = {name for name, group in groups.items() if host_key in (group.get("hosts") or [])}
+        host_tags = set(node_info.get("tags") or [])
+        for name in host_groups:
+            host_tags.update(groups[name].get("tags") or [])
+        entry = (host_groups, host_tags)
+        for alias in (host_key, node_info.get("hostname"), node_info.get("ip")):
+            if alias:
+                memberships[str(alias)] = entry
+    return memberships
+
+
+_memberships_cache: tuple[tuple | None, dict[str, tuple[set[str], set[str]]]] = (None, {})
+_memberships_lock = threading.Lock()
+
+
+def _current_memberships() -> dict[str, tuple[set[str], set[str]]]:
+    """
+    今の inventory（inventory.backend: sqlite なら inventory.db）の所属情報。
+    inventory_cache と同じく (mtime_ns, size) が変わったときだけ作り直す。inventory が無ければ空。
+    """
+    global _memberships_cache
+
+    backend = get_inventory_backend()
+    path = backend.path if backend is not None else Path(INVENTORY_FILE).absolute()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return {}
+    signature = (path, stat.st_mtime_ns, stat.st_size)
+
+    with _memberships_lock:
+        if _memberships_cache[0] != signature:
+            try:
+                _memberships_cache = (signature, _inventory_memberships(get_validated_inventory_data()))
+            except FileNotFoundError:
+                return {}
+        return _memberships_cache[1]
+
+
+def _buckets_from_config(section: Mapping | None, default_rate: float) -> dict[str, TokenBucket]:
+    """groups / tags 設定からバケットを作る。burst 省略時は rate と同じ（最低 1）。"""
+    buckets = {}
+    for name, bucket_config in (section or {}).items():
+        bucket_config = bucket_config or {}
+        rate = bucket_config.get("rate", default_rate)
+        buckets[str(name)] = TokenBucket(rate, bucket_config.get("burst", max(1, int(rate))))
+    return buckets
+
+
+_limiter: ConnectionRateLimiter | None = None
+_limiter_enabled: bool | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_connection_rate_limiter() -> ConnectionRateLimiter | None:
+    """
+    `sys_config.yaml` の `connect.rate_limit` に従ってプロセス共通のリミッタを返す。
+    `connect.rate_limit.enabled` が false（既定）のときは None。
+    設定は最初の呼び出し時に 1 度だけ読む（設定の誤りを 1 度で知らせるため、ワーカーを起動する前にメインスレッドで呼ぶこと）。
+    inventory の所属情報は接続のたびに引き、inventory が変わっていれば作り直す。
+
+    Raises
+    ------
+    ValueError
+        rate / burst に 0 以下が設定されている場合
+    """
+    global _limiter, _limiter_enabled
+
+    with _limiter_lock:
+        if _limiter_enabled is None:
+            rate_config = (load_sys_config().get("connect") or {}).get("rate_limit") or {}
+            if rate_config.get("enabled", False):
+                rate = rate_config.get("rate", DEFAULT_CONNECT_RATE)
+                burst = rate_config.get("burst", DEFAULT_CONNECT_BURST)
+                group_buckets = _buckets_from_config(rate_config.get("groups"), rate)
+                tag_buckets = _buckets_from_config(rate_config.get("tags"), rate)
+                _limiter = ConnectionRateLimiter(rate=rate, burst=burst,
+                                                 jitter=rate_config.get("jitter", DEFAULT_CONNECT_JITTER),
+                                                 group_buckets=group_buckets, tag_buckets=tag_buckets,
+                                                 memberships_loader=_current_memberships if group_buckets or tag_buckets else None)
+            # 設定不備（ValueError）のときは有効/無効を確定させず、次回の接続でも同じエラーを出す。
+            _limiter_enabled = _limiter is not None
+        return _limiter
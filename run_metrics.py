@@ -0,0 +1,263 @@
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+from load_and_validate_yaml import load_sys_config
+from output_logging import sanitize_filename
+from trace_export import TraceRecorder, create_trace_recorder
+from prometheus_export import PrometheusRunRecorder, create_prometheus_recorder
+
+# run_metrics.py
+# 役割:
+# - 1 ホスト分のフェーズごとの所要時間と受信バイト数を記録する（HostTimings）
+#   フェーズ: TCP 接続 / SSH 認証 / enable / set_base_prompt / 各コマンド / パース / ログ保存 / 表示 など
+# - 1 回の実行（run）ごとに logs/metrics/ へ JSON Lines で書き出す（RunMetrics）
+# 遅い実行の原因が AAA なのか、デバイスの CPU なのか、パースなのか、ディスクなのかを切り分けるため🐸
+# connect_device など深い層からも記録できるよう、記録先はスレッドローカルで持つ（レートリミッタの待ち時間と同じ方式）。
+# --trace 指定時は、フェーズごとの開始・終了時刻とスレッドもタイムライン（trace_export.py）に渡す。
+# metrics.prometheus 有効時は、実行の終わりに Prometheus の textfile（prometheus_export.py）も更新する。
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+METRICS_DIR = Path("logs") / "metrics"
+
+
+class HostTimings:
+    """
+    1 ホスト分のフェーズごとの所要時間(秒)・コマンドごとの所要時間・受信バイト数。
+
+    同じフェーズを複数回計測した場合（リトライ等）は合算する。
+    タイムライン用に、計測した区間（spans）と処理したスレッドも記録する。作成したスレッドで使うこと。
+    """
+
+    def __init__(self, hostname: str, *, detailed: bool = True):
+        self.hostname = hostname
+        self.detailed = detailed # 書き出し先（metrics / --trace / Prometheus）があるときだけ True。接続を tcp_connect / ssh_auth に分けて測るか
+        self.started_at = datetime.now()
+        self.phases: dict[str, float] = {}
+        self.commands: list[dict] = []
+        self.spans: list[tuple[str, float, float, dict | None]] = []  # (フェーズ名, 開始, 終了, 付加情報)。時刻は perf_counter()
+        self.bytes_received = 0
+        self.status: str | None = None
+        self.error_class: str | None = None
+        self.log_path: Path | None = None
+        self.elapsed: float | None = None
+        self.thread_id = threading.get_native_id()
+        self.thread_name = threading.current_thread().name
+        self.perf_started = perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        """with ブロックの所要時間をフェーズ name に加算する（例外で抜けても計測する）。"""
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            finished = perf_counter()
+            self.add(name, finished - started)
+            self.spans.append((name, started, finished, None))
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record_command(self, command: str, seconds: float, output: str) -> None:
+        """1 コマンド分の所要時間と受信バイト数を記録する（合計は "command" フェーズにも加算）。"""
+        size = len(output.encode("utf-8", errors="replace"))
+        self.commands.append({"command": command, "seconds": round(seconds, 6), "bytes": size})
+        self.bytes_received += size
+        self.add("command", seconds)
+        finished = perf_counter()
+        self.spans.append(("command", finished - seconds, finished, {"command": command, "bytes": size}))
+
+    def finish(self, status: str, *, error_class: str | None = None, log_path: Path | None = None) -> None:
+        self.status = status
+        self.error_class = error_class
+        self.log_path = log_path
+        self.elapsed = perf_counter() - self.perf_started
+
+    def to_record(self) -> dict:
+        return {"type": "host",
+                "hostname": self.hostname,
+                "status": self.status,
+                "error_class": self.error_class,
+                "log_path": str(self.log_path) if self.log_path is not None else None,
+                "started_at": self.started_at.isoformat(timespec="milliseconds"),
+                "elapsed": round(self.elapsed, 6) if self.elapsed is not None else None,
+                "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                "commands": self.commands,
+                "bytes_received": self.bytes_received}
+
+
+_current = threading.local()
+
+
+def current_timings() -> HostTimings | None:
+    """このスレッドで処理中のホストの HostTimings（RunMetrics.run() の外なら None）。"""
+    return getattr(_current, "timings", None)
+
+
+@contextmanager
+def measuring(hostname: str, *, detailed: bool = True):
+    """
+    with ブロックの間、このスレッドで処理するホストの HostTimings を記録先にする（RunMetrics を使わない console 用）。
+    finish() は呼び出し側で行うこと。detailed=False なら接続の仕方を変えてまで細かく測らない（HostTimings.detailed）。
+    """
+    timings = HostTimings(hostname, detailed=detailed)
+    _current.timings = timings
+    try:
+        yield timings
+    finally:
+        _current.timings = None
+
+
+@contextmanager
+def timed(name: str):
+    """処理中のホストがあれば、with ブロックの所要時間をフェーズ name として記録する。無ければ何もしない。"""
+    timings = current_timings()
+    if timings is None:
+        yield
+        return
+    with timings.phase(name):
+        yield
+
+
+def record_command(command: str, seconds: float, output: str) -> None:
+    """処理中のホストがあれば、1 コマンド分の所要時間と受信バイト数を記録する。"""
+    timings = current_timings()
+    if timings is not None:
+        timings.record_command(command, seconds, output)
+
+
+class RunMetrics:
+    """
+    1 回の実行（execute / configure の 1 コマンド分）のメトリクスを JSON Lines で書き出す。スレッドセーフ。
+
+    1 行目に実行の概要（type: run）、ホストが終わるたびに 1 行（type: host）、
+    最後に `close()` で合計（type: run_end）を追記する。path が None なら書き出さない（計測だけ行う）。
+    trace / prometheus を渡すと、終わったホストをそれぞれにも追加し、`close()` で一緒に書き出す。
+    workers にはワーカー数（同時実行数の上限）を設定しておくこと（ワーカーの埋まり具合の計算に使う）。
+    """
+
+    def __init__(self, path: Path | None, *, mode: str, run_info: dict | None = None, trace: TraceRecorder | None = None,
+                 prometheus: PrometheusRunRecorder | None = None):
+        self.path = path
+        self.mode = mode
+        self.trace = trace
+        self.prometheus = prometheus
+        self.workers = 1
+        self.hosts = 0
+        self.failed = 0
+        self._timer = perf_counter()
+        self._lock = threading.Lock()
+        self._file = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self._create(path)
+            self._write({"type": "run", "mode": mode, "started_at": datetime.now().isoformat(timespec="milliseconds"), **(run_info or {})})
+
+    def _create(self, path: Path):
+        """
+        path を新しく作って開く。同じ秒に始まった別の実行（別プロセス含む）が既に作っていれば
+        {名前}-1.jsonl, {名前}-2.jsonl ... と番号を付けて、上書きせずに別のファイルにする（self.path も更新する）。
+        """
+        candidate, number = path, 0
+        while True:
+            try:
+                f = open(candidate, "x", encoding="utf-8")
+            except FileExistsError:
+                number += 1
+                candidate = path.with_name(f"{path.stem}-{number}{path.suffix}")
+                continue
+            self.path = candidate
+            return f
+
+    def run(self, handler: Callable, device: dict, args, poutput, hostname: str, *handler_args, **handler_kwargs):
+        """
+        handler（`_handle_execution` 等）を、このスレッドで計測しながら実行する（ThreadPoolExecutor.submit 用）。
+        handler は HostResult（run_result.py）を返すこと。戻り値には計測結果（timings）を付けてそのまま返す。
+        """
+        result = None
+        # metrics / --trace / Prometheus のどれも書き出さないときは、サマリ用の計測だけで接続の仕方は変えない。
+        detailed = self.path is not None or self.trace is not None or self.prometheus is not None
+        with measuring(hostname, detailed=detailed) as timings:
+            try:
+                result = handler(device, args, poutput, hostname, *handler_args, **handler_kwargs)
+                return result
+            finally:
+                self._finish_host(timings, result)
+
+    def _finish_host(self, timings: HostTimings, result) -> None:
+        if result is None:
+            timings.finish("error", error_class="unhandled") # handler で捕まえていない例外
+        else:
+            timings.finish(result.status, error_class=result.error_class, log_path=result.log_path)
+            result.timings = timings
+        self.add_host(timings)
+
+    def add_host(self, timings: HostTimings) -> None:
+        with self._lock:
+            self.hosts += 1
+            if timings.status != "ok":
+                self.failed += 1
+            if self._file is not None:
+                self._write(timings.to_record())
+        if self.trace is not None:
+            self.trace.add_host(timings)
+        if self.prometheus is not None:
+            self.prometheus.add_host(timings)
+
+    def close(self) -> Path | None:
+        """合計を書き出してファイルを閉じ、保存先を返す（書き出さない設定なら None）。"""
+        if self.trace is not None:
+            self.trace.close()
+        if self.prometheus is not None:
+            self.prometheus.close(elapsed=perf_counter() - self._timer, workers=self.workers)
+            self.prometheus = None # 2 回目の close() で二重に加算しない
+        with self._lock:
+            if self._file is None:
+                return self.path
+            self._write({"type": "run_end", "elapsed": round(perf_counter() - self._timer, 6), "hosts": self.hosts, "failed": self.failed})
+            self._file.close()
+            self._file = None
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+
+def create_run_metrics(mode: str, args) -> RunMetrics:
+    """
+    `sys_config.yaml` の `metrics.enabled`（既定 false）に従って、この実行の RunMetrics を作る。
+    保存先: logs/metrics/{YYYYmmdd}/{YYYYmmdd-HHMMSS}_{mode}_{target}.jsonl（同じ秒の実行があれば -1, -2 ... を付ける）
+    無効のときも計測用の RunMetrics（書き出しなし）を返す。--trace が指定されていればタイムラインも書き出す。
+    `metrics.prometheus.enabled`（既定 false）なら実行の終わりに Prometheus の textfile も更新する。
+    """
+    metrics_config = load_sys_config().get("metrics") or {}
+    target = getattr(args, "group", None) or getattr(args, "host", None) or getattr(args, "ip", None) or "UNKNOWN"
+    run_info = {"target": target,
+                "command": getattr(args, "command", "") or None,
+                "commands_list": getattr(args, "commands_list", "") or getattr(args, "config_list", "") or None,
+                "workers": getattr(args, "workers", None)}
+
+    trace = create_trace_recorder(mode, args, run_info=run_info)
+    prometheus = create_prometheus_recorder(mode, metrics_config)
+
+    if not metrics_config.get("enabled", False):
+        return RunMetrics(None, mode=mode, run_info=run_info, trace=trace, prometheus=prometheus)
+
+    now = datetime.now()
+    path = METRICS_DIR / now.strftime("%Y%m%d") / f"{now.strftime('%Y%m%d-%H%M%S')}_{mode}_{sanitize_filename(str(target))}.jsonl"
+    return RunMetrics(path, mode=mode, run_info=run_info, trace=trace, prometheus=prometheus)
@@ -0,0 +1,189 @@
+import math
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+
+from rich.console import Console
+from rich.table import Table
+
+from run_metrics import HostTimings
+from utils import get_table_theme
+
+# run_result.py
+# 役割:
+# - 1 ホスト分の処理結果（HostResult）: 成否・失敗の分類・フェーズごとの所要時間・受信バイト数・ログの保存先
+#   _handle_execution / _handle_configure / _handle_scp はすべてこれを返す
+# - 1 回の実行全体の集計（RunResult）と、グループ実行の最後に表示するサマリ
+#   （フェーズごとの p50/p95/p99、スループット hosts/min、遅いホスト上位 10 件）
+# 大量ホストでの --workers やタイムアウトの調整はこのサマリを見て行う🐸
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+PERCENTILES = (50, 95, 99)
+SLOWEST_HOSTS = 10
+
+# HostResult.status
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"      # 接続 / 実行 / パース等の失敗（handler 内で捕捉済み）
+STATUS_SKIPPED = "skipped"    # 接続前に中止（device_type 不一致・ファイルが無い等）
+STATUS_DEADLINE = "deadline"  # --deadline で打ち切り
+STATUS_ERROR = "error"        # handler で捕まえていない想定外の例外
+
+
+console = Console()
+
+
+@dataclass
+class HostResult:
+    """
+    1 ホスト分の処理結果。
+
+    Attributes
+    ----------
+    hostname : str
+        ホスト名（接続できた場合はプロンプト由来、できなかった場合は接続前の識別子）
+    status : str
+        STATUS_OK / STATUS_FAILED / STATUS_SKIPPED / STATUS_DEADLINE / STATUS_ERROR
+    error_class : str | None
+        失敗の分類。接続失敗は `classify_connection_error()` と同じ "timeout" / "auth" / "enable" / "other"、
+        それ以外は "validation" / "command" / "parse" / "transfer" / "deadline" / "unhandled" など
+    error : str | None
+        エラーメッセージ
+    log_path : Path | None
+        --log で保存したログの保存先
+    timings : HostTimings | None
+        フェーズごとの所要時間（`RunMetrics.run()` 経由で実行したときに付く）
+    """
+    hostname: str
+    status: str = STATUS_OK
+    error_class: str | None = None
+    error: str | None = None
+    log_path: Path | None = None
+    timings: HostTimings | None = None
+
+    @classmethod
+    def success(cls, hostname: str, *, log_path: Path | None = None) -> "HostResult":
+        return cls(hostname, STATUS_OK, log_path=log_path)
+
+    @classmethod
+    def failure(cls, hostname: str, error_class: str, error: object = None, *, status: str = STATUS_FAILED) -> "HostResult":
+        return cls(hostname, status, error_class=error_class, error=str(error) if error is not None else None)
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    @property
+    def elapsed(self) -> float | None:
+        return self.timings.elapsed if self.timings is not None else None
+
+    @property
+    def bytes_received(self) -> int:
+        return self.timings.bytes_received if self.timings is not None else 0
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """線形補間のパーセンタイル（numpy.percentile の既定と同じ）。values は空でないこと。"""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower, upper = math.floor(rank), math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class RunResult:
+    """1 回の実行（execute / configure / scp）の HostResult を集める。add() はスレッドセーフ。"""
+
+    def __init__(self, mode: str, *, clock=perf_counter):
+        self.mode = mode
+        self.results: list[HostResult] = []
+        self.elapsed: float | None = None
+        self._clock = clock
+        self._started = clock()
+        self._lock = threading.Lock()
+
+    def add(self, result: HostResult) -> None:
+        with self._lock:
+            self.results.append(result)
+
+    def finish(self) -> None:
+        self.elapsed = self._clock() - self._started
+
+    @property
+    def failed(self) -> list[HostResult]:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def failed_hostnames(self) -> list[str]:
+        return sorted(result.hostname for result in self.failed)
+
+    def hostnames_with_status(self, status: str) -> list[str]:
+        return sorted(result.hostname for result in self.results if result.status == status)
+
+    @property
+    def throughput(self) -> float | None:
+        """完了したホスト数 / 分（成功・失敗問わず）。"""
+        elapsed = self.elapsed if self.elapsed is not None else self._clock() - self._started
+        if elapsed <= 0:
+            return None
+        return len(self.results) / elapsed * 60
+
+    def phase_percentiles(self) -> dict[str, dict[int, float]]:
+        """フェーズ名 -> {50: p50, 95: p95, 99: p99}。"total" はホスト全体の所要時間。計測の無いフェーズは含めない。"""
+        samples: dict[str, list[float]] = {}
+        for result in self.results:
+            if result.timings is None:
+                continue
+            for name, seconds in result.timings.phases.items():
+                samples.setdefault(name, []).append(seconds)
+            if result.timings.elapsed is not None:
+                samples.setdefault("total", []).append(result.timings.elapsed)
+        return {name: {pct: percentile(values, pct) for pct in PERCENTILES} for name, values in samples.items()}
+
+    def slowest(self, n: int = SLOWEST_HOSTS) -> list[HostResult]:
+        timed_results = [result for result in self.results if result.elapsed is not None]
+        return sorted(timed_results, key=lambda result: result.elapsed, reverse=True)[:n]
+
+
+def build_summary_tables(run_result: RunResult) -> list[Table]:
+    """サマリ表示用のテーブル（フェーズ別パーセンタイル / 遅いホスト）を作る。"""
+    table_theme = get_table_theme()
+    throughput = run_result.throughput
+    ok_count = len(run_result.results) - len(run_result.failed)
+    caption = f"hosts: {len(run_result.results)} (ok: {ok_count}, failed: {len(run_result.failed)}) / elapsed: {run_result.elapsed or 0:.2f}s"
+    if throughput is not None:
+        caption += f" / throughput: {throughput:.1f} hosts/min"
+
+    phase_table = Table(title=f"🐸 {run_result.mode.upper()} SUMMARY 🐸", caption=caption, **table_theme)
+    for header in ["PHASE", "HOSTS"] + [f"P{pct}" for pct in PERCENTILES]:
+        phase_table.add_column(header)
+    percentiles = run_result.phase_percentiles()
+    host_counts = {name: sum(1 for result in run_result.results
+                             if result.timings is not None and (name == "total" or name in result.timings.phases))
+                   for name in percentiles}
+    for name, values in percentiles.items():
+        phase_table.add_row(name, f"{host_counts[name]}", *(f"{values[pct]:.3f}s" for pct in PERCENTILES))
+
+    slowest_table = Table(title=f"🐢 SLOWEST {SLOWEST_HOSTS} HOSTS 🐢", **table_theme)
+    for header in ["HOSTNAME", "STATUS", "ELAPSED", "SLOWEST PHASE", "BYTES", "ERROR"]:
+        slowest_table.add_column(header)
+    for result in run_result.slowest():
+        phases = result.timings.phases if result.timings is not None else {}
+        slowest_phase = max(phases, key=phases.get) if phases else "-"
+        slowest_phase_text = f"{slowest_phase} ({phases[slowest_phase]:.2f}s)" if phases else "-"
+        slowest_table.add_row(result.hostname,
+                              result.status,
+                              f"{result.elapsed:.2f}s",
+                              slowest_phase_text,
+                              f"{result.bytes_received}",
+                              result.error_class or "")
+
+    return [phase_table, slowest_table]
+
+
+def print_run_summary(run_result: RunResult) -> None:
+    """グループ実行の最後にサマリを表示する。"""
+    for table in build_summary_tables(run_result):
+        console.print(table)
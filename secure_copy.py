@@ -1,17 +1,24 @@
 import argparse
 import cmd2
 import sys
+from functools import partial
+from time import perf_counter
 from netmiko import SCPConn
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from message import print_info, print_success, print_error
+from message import print_info, print_success, print_warning, print_error
 from load_and_validate_yaml import get_validated_inventory_data
 from build_device import _build_device_and_hostname
 
 from output_logging import save_log
-from connect_device import connect_to_device, safe_disconnect
-from workers import default_workers
+from connect_device import open_session, close_session, classify_connection_error, pop_connect_kind, CONNECT_FAST, CONNECT_POOLED
+from rate_limiter import pop_rate_limit_wait
+from workers import default_workers, workers_option, create_adaptive_controller, AUTO_WORKERS
+from adaptive_concurrency import AdaptiveConcurrencyController
+from prompt_cache import flush_prompt_cache
+from run_metrics import create_run_metrics, timed
+from run_result import HostResult, RunResult, print_run_summary, STATUS_SKIPPED, STATUS_ERROR
 
 
 ######################
@@ -40,13 +47,19 @@ memo_help = ("ログファイル名に付加する任意のメモ（文字列）
              "example 20250506-125600_R0_show-ip-int-brief_memo.log")
 workers_help = ("並列実行するワーカースレッド数を指定します。\n"
                 "指定しない場合は sys_config.yaml の executor.default_workers を参照します。\n"
-                "そこにも設定が無いときは、グループ台数と 規定上限(DEFAULT_MAX_WORKERS) の小さい方が自動で採用されます。")
+                "そこにも設定が無いときは、グループ台数と 規定上限(DEFAULT_MAX_WORKERS) の小さい方が自動で採用されます。\n"
+                "auto を指定すると接続レイテンシ・タイムアウト/認証失敗率・fd/メモリを見ながら実行中に同時実行数を上下させます。")
 secret_help = ("enable に入るための secret を指定します。(省略時は password を流用します。)\n"
                "--ip専用。--host|--group指定時はinventory.yamlの値を使用します。")
 
 src_help = ("転送元のパスを指定します。")
 dest_help = ("転送先のパスを指定します。")
 
+trace_help = ("実行のタイムラインを Chrome trace-event 形式の JSON で FILE に書き出します。\n"
+              "ホストごと・フェーズ（接続 / 認証 / 転送 / ログ保存）ごとの区間がワーカースレッド別に並びます。\n"
+              "https://ui.perfetto.dev や chrome://tracing で開けます。\n"
+              "example: scp --group tokyo --put --src ... --dest ... --trace logs/trace.json")
+
 
 ######################
 ### PARSER_SECTION ###
@@ -60,8 +73,9 @@ netmiko_scp_parser.add_argument("-P", "--port", type=int, default=22, help=port_
 netmiko_scp_parser.add_argument("-t", "--timeout", type=int, default=10, help=timeout_help)
 netmiko_scp_parser.add_argument("-l", "--log", action="store_true", help=log_help)
 netmiko_scp_parser.add_argument("-m", "--memo", type=str, default="", help=memo_help)
-netmiko_scp_parser.add_argument("-w", "--workers", type=int, default=None, metavar="N", help=workers_help)
+netmiko_scp_parser.add_argument("-w", "--workers", type=workers_option, default=None, metavar="N|auto", help=workers_help)
 netmiko_scp_parser.add_argument("-s", "--secret", type=str, default="", help=secret_help)
+netmiko_scp_parser.add_argument("--trace", type=str, default=None, metavar="FILE", help=trace_help)
 
 netmiko_scp_parser.add_argument("--src", type=str, required=True, help=src_help)
 netmiko_scp_parser.add_argument("--dest", type=str, required=True, help=dest_help)
@@ -87,55 +101,70 @@ def progress(filename, size, sent):
         print(file=sys.stderr, flush=True)   # 完了時に改行
 
 
-def _handle_scp(device, args, poutput, hostname):
+def _handle_scp(device, args, poutput, hostname, *, concurrency: AdaptiveConcurrencyController | None = None) -> HostResult:
     # ファイルの存在を確認
     if args.put:
         src_path = Path(args.src)
         if not src_path.is_file():
             print_error(f"ローカルファイルが存在しないケロ🐸💥: {args.src}")
-            return
+            return HostResult.failure(hostname, "validation", f"no such file: {args.src}", status=STATUS_SKIPPED)
     elif args.get:
         dest_path = Path(args.dest)
         if not dest_path.parent.exists():
             print_error(f"ダウンロード先が存在しないケロ🐸💥: {dest_path.parent}")
-            return
+            return HostResult.failure(hostname, "validation", f"no such directory: {dest_path.parent}", status=STATUS_SKIPPED)
 
     # ① SSH接続を確立
     # ✅ 2. 接続とプロンプト取得
+    connect_timer = perf_counter()
     try:
-        connection, prompt, hostname = connect_to_device(device, hostname)
+        connection, prompt, hostname = open_session(device, hostname)
         print_success(f"NODE: {hostname} 🔗接続成功ケロ🐸")
     except ConnectionError as e:
+        if concurrency is not None:
+            concurrency.record_connect(None, classify_connection_error(e))
         print_error(str(e))
-        return
+        return HostResult.failure(hostname, classify_connection_error(e), e)
 
-    # ② SCPConnをラップ
-    scp = SCPConn(connection, progress=progress)
+    if concurrency is not None:
+        # レートリミッタで待った時間は接続レイテンシに含めない。プールの使い回し・fast-connect は成功だけ報告する。
+        latency = perf_counter() - connect_timer - pop_rate_limit_wait()
+        concurrency.record_connect(None if pop_connect_kind() in (CONNECT_FAST, CONNECT_POOLED) else latency)
 
+    # ② SCPConnをラップ
     # ③ 転送！
-    if args.put:
-        scp.scp_put_file(args.src, args.dest)   # put（アップロード）
-        result_output_string = f"PUT {args.src} >>>>>>> {args.dest}"
-
-    elif args.get:
-        scp.scp_get_file(args.src, args.dest) # get（ダウンロード）
-        result_output_string = f"GET {args.dest} <<<<<<< {args.src}"
-
-
-    # ④ 忘れずにクローズ！
-    scp.close()
-    # ✅ 4. 接続終了
-    safe_disconnect(connection)
+    try:
+        with timed("transfer"):
+            scp = SCPConn(connection, progress=progress)
+            if args.put:
+                scp.scp_put_file(args.src, args.dest)   # put（アップロード）
+                result_output_string = f"PUT {args.src} >>>>>>> {args.dest}"
+
+            elif args.get:
+                scp.scp_get_file(args.src, args.dest) # get（ダウンロード）
+                result_output_string = f"GET {args.dest} <<<<<<< {args.src}"
+
+            # ④ 忘れずにクローズ！
+            scp.close()
+    except Exception as e:
+        print_error(f"NODE: {hostname} 転送に失敗したケロ🐸💥: {e}")
+        close_session(connection, discard=True) # 状態が不明なセッションはプールに戻さない
+        return HostResult.failure(hostname, "transfer", e)
+
+    # ✅ 4. 接続終了（プール有効時は返却）
+    close_session(connection)
 
     # ✅ 5. ログ保存（--log指定時のみ）
+    log_path = None
     if args.log:
-        save_log(result_output_string, hostname, args, mode="scp")
+        with timed("save_log"):
+            log_path = save_log(result_output_string, hostname, args, mode="scp")
 
     # ✅ 6. 結果表示
     print_info(f"NODE: {hostname} 📄OUTPUTケロ🐸")
     poutput(result_output_string)
     print_success(f"NODE: {hostname} 🔚実行完了ケロ🐸")
-    return
+    return HostResult.success(hostname, log_path=log_path)
 
 
 
@@ -159,7 +188,8 @@ def do_scp(self, args):
 
     if args.ip:
         device, hostname = _build_device_and_hostname(args)
-        _handle_scp(device, args, self.poutput, hostname)
+        with create_run_metrics("scp", args) as run_metrics:
+            run_metrics.run(_handle_scp, device, args, self.poutput, hostname)
         return
 
     if args.host or args.group: 
@@ -173,7 +203,8 @@ def do_scp(self, args):
     
     if args.host:
         device, hostname = _build_device_and_hostname(args, inventory_data)
-        _handle_scp(device, args, self.poutput, hostname)
+        with create_run_metrics("scp", args) as run_metrics:
+            run_metrics.run(_handle_scp, device, args, self.poutput, hostname)
         return
 
     elif args.group:
@@ -181,12 +212,44 @@ def do_scp(self, args):
 
         max_workers = default_workers(len(device_list), args)
 
-        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # --workers auto のときは確保した枠の中で同時実行数を実行中に上下させる。
+        try:
+            concurrency = create_adaptive_controller(max_workers) if args.workers == AUTO_WORKERS else None
+        except ValueError as e:
+            print_error(str(e))
+            return
+        # フェーズごとの所要時間は logs/metrics/ にホストごとに追記する（sys_config.yaml の metrics.enabled）
+        run_metrics = create_run_metrics("scp", args)
+        run_metrics.workers = max_workers
+        handler = partial(run_metrics.run, _handle_scp)
+        handler = partial(concurrency.run, handler) if concurrency else handler
+
+        # 全ホストの HostResult を集め、最後にフェーズ別のパーセンタイル等をサマリ表示する。
+        run_result = RunResult("scp")
+
+        with run_metrics, ThreadPoolExecutor(max_workers=max_workers) as pool:
 
             futures = []
+            future_to_hostname = {}
             for device, hostname in zip(device_list, hostname_list):
-                future = pool.submit(_handle_scp, device, args, self.poutput, hostname)
+                future = pool.submit(handler, device, args, self.poutput, hostname, concurrency=concurrency)
                 futures.append(future)
+                future_to_hostname[future] = hostname
 
             for future in as_completed(futures):
-                future.result()
+                try:
+                    run_result.add(future.result())
+                except Exception as e:
+                    # _handle_scp で捕まえていない想定外の例外
+                    print_error(f"⚠️ 未処理の例外: {future_to_hostname[future]}:{e}")
+                    run_result.add(HostResult.failure(future_to_hostname[future], "unhandled", e, status=STATUS_ERROR))
+
+        # 結果をまとめて表示
+        run_result.finish()
+        # 実行中に覚えたプロンプトはここでまとめてファイルに書く（ホストごとには書かない）。
+        flush_prompt_cache()
+        print_run_summary(run_result)
+        if run_result.failed:
+            print_warning(f"❎ 🐸なんかトラブルケロ: {', '.join(run_result.failed_hostnames)}")
+        else:
+            print_success("✅ すべてのホストで転送完了ケロ🐸")
@@ -15,6 +15,7 @@ import difflib
 
 import shutil
 import subprocess
+import tempfile
 
 import webbrowser
 import time
@@ -23,6 +24,11 @@ from message import print_info, print_success, print_warning, print_error
 from utils import get_table_theme, get_panel_theme
 from completers import host_names_completer, group_names_completer, commands_list_names_completer, config_list_names_completer, log_filename_completer
 from load_and_validate_yaml import COMMANDS_LISTS_FILE, CONFIG_LISTS_FILE
+from inventory_cache import load_inventory
+from inventory_db import get_inventory_backend
+from log_catalog import get_log_catalog
+from log_search import search_logs, DEFAULT_MAX_RESULTS
+from log_storage import archived_bundles, log_exists, logical_name, read_log_text, resolve_log_path
 
 
 #######################
@@ -66,6 +72,15 @@ diff_help= "--diff で比較する2つのログファイルを指定するケロ
 style_help = "差分表示のスタイルを選べるケロ🐸\n" \
                   "unified（標準）, side-by-side, html から選べるケロ"
 keep_html_help = "HTMLファイルを削除せずに残すケロ🐸"
+grep_help = "保存済みログの本文から PATTERN を含む行を探すケロ🐸 (-m / --date / --since / --until / --log-host / --log-label で絞り込み。archive でまとめたログは対象外)"
+since_help = "show --grep で探す最初の日付です。YYYY-MM-DDで記載します。"
+until_help = "show --grep で探す最後の日付です。YYYY-MM-DDで記載します。"
+log_host_help = "show --grep で探すログのホスト名です。"
+log_label_help = "show --grep で探すログのコマンド / commands-list 名です。"
+regex_help = "show --grep の PATTERN を正規表現として扱うケロ🐸 (索引は使わず全ファイルを走査する)"
+ignore_case_help = "show --grep で大文字小文字を区別しないケロ🐸"
+max_results_help = f"show --grep で表示する最大行数です。(default: {DEFAULT_MAX_RESULTS})"
+pool_help = "コネクションプール内の SSH セッション一覧を表示します。(sys_config.yaml の connection_pool.enabled が true のとき)"
 
 
 ######################
@@ -78,6 +93,13 @@ show_parser.add_argument("-m", "--mode", type=str, default="execute", choices=["
 show_parser.add_argument("-d", "--date", type=str, default="", help=date_help)
 show_parser.add_argument("--style", type=str, default="unified", choices=["unified", "side-by-side", "html"], help=style_help)
 show_parser.add_argument("--keep-html", action="store_true", help=keep_html_help)
+show_parser.add_argument("--since", type=str, default="", help=since_help)
+show_parser.add_argument("--until", type=str, default="", help=until_help)
+show_parser.add_argument("--log-host", type=str, default=None, help=log_host_help, completer=host_names_completer)
+show_parser.add_argument("--log-label", type=str, default=None, help=log_label_help)
+show_parser.add_argument("--regex", action="store_true", help=regex_help)
+show_parser.add_argument("-i", "--ignore-case", action="store_true", help=ignore_case_help)
+show_parser.add_argument("--max-results", type=int, default=DEFAULT_MAX_RESULTS, help=max_results_help)
 
 
 # mutually exclusive
@@ -94,6 +116,8 @@ target_show.add_argument("--log-last", action="store_true", help=log_last_help)
 target_show.add_argument("--diff", nargs=2, metavar=("OLD_LOG", "NEW_LOG"), help=diff_help, completer=log_filename_completer)
 target_show.add_argument("--config-lists", action="store_true", help=config_lists_help)
 target_show.add_argument("--config-list", type=str, default="", help=config_list_help, completer=config_list_names_completer)
+target_show.add_argument("--pool", action="store_true", help=pool_help)
+target_show.add_argument("--grep", type=str, default="", metavar="PATTERN", help=grep_help)
 
 
 yaml = YAML()
@@ -102,9 +126,8 @@ console = Console()
 
 def _show_hosts():
 
-    with open("inventory.yaml", "r") as host_list:
-        host_list_data = yaml.load(host_list) 
-        node_list = host_list_data["all"]["hosts"]
+    backend = get_inventory_backend()
+    node_list = backend.hosts() if backend else load_inventory()["all"]["hosts"]
     
     table_theme = get_table_theme()
 
@@ -130,9 +153,8 @@ def _show_hosts():
 
 def _show_host(node):
     
-    with open("inventory.yaml", "r") as host_list:
-        host_list_data = yaml.load(host_list) 
-        node_list = host_list_data["all"]["hosts"]
+    backend = get_inventory_backend()
+    node_list = backend.subset(host=node)["all"]["hosts"] if backend else load_inventory()["all"]["hosts"]
 
     if node not in node_list:
         raise ValueError(f"'{node}' は inventory.yaml に居ないケロ🐸")
@@ -163,9 +185,8 @@ def _show_host(node):
 
 def _show_groups():
     
-    with open("inventory.yaml", "r") as inventory:
-        inventory_data = yaml.load(inventory) 
-        groups_list = inventory_data["all"]["groups"]
+    backend = get_inventory_backend()
+    groups_list = backend.groups() if backend else load_inventory()["all"]["groups"]
     
     table_theme = get_table_theme()
     table = Table(title="🐸 SHOW_GROUPS 🐸", **table_theme)
@@ -184,9 +205,10 @@ def _show_groups():
 
 def _show_group(group):
 
-    with open("inventory.yaml", "r") as inventory:
-        inventory_data = yaml.load(inventory) 
-        groups_list = inventory_data["all"]["groups"]
+    # sqlite のときはグループ定義とメンバーのホストだけを引く。
+    backend = get_inventory_backend()
+    inventory_data = backend.subset(group=group) if backend else load_inventory()
+    groups_list = inventory_data["all"]["groups"]
 
     if group not in groups_list:
         raise ValueError(f"'{group}' は inventory.yaml に居ないケロ🐸")
@@ -424,76 +446,77 @@ def _show_logs(args):
     today_dir = log_mode_dir / today_str
 
 # 2週間以上前のログはログは表示しない機能。
-# 先月のログは一つにまとめる機能。do_archiveとか？
+# 先月のログを一つにまとめる機能は archive コマンド（logs/archive/{mode}/{YYYYmm}.zip）。
 # KeroRoute全体の設定ファイルが必要かも。ログの表示件数とか。
 
     if args.logs:
         if args.mode in ("execute", "console", "configure", "scp"):
+            # ファイル一覧・件数は logs/catalog.sqlite3 の目録から引く（日付ディレクトリを何度も glob しない）。
+            catalog = get_log_catalog()
             if args.date:
                 date_str = args.date
                 date_dir = log_mode_dir / date_str
-                log_dir_list = list(log_mode_dir.glob("*"))
-                is_exists_directory = False
+                num_logs_by_date = dict(catalog.dates(args.mode))
                 # 特定の日付だけログを表示
-                for dir in log_dir_list:
-                    if dir.name == date_str:
-                        is_exists_directory = True
-                        # 一致するならTree表示。
-                        num_logs = len(list(date_dir.glob("*.log")))
-                        date_tree = Tree(str(date_dir))
-                        for log_file in sorted(date_dir.glob("*.log")):
-                            date_tree.add(log_file.name)
-                        console.print(f"📂 {date_dir}/ :{num_logs}件のログファイルがあるケロ🐸\n")
-                        console.print(date_tree)
-                        console.print("\n")
-                        return
-
-                if not is_exists_directory:
-                    console.print(f"📂 {args.date} に対応するログディレクトリは存在しないケロ🐸")
+                if date_str in num_logs_by_date:
+                    # 一致するならTree表示。
+                    num_logs = num_logs_by_date[date_str]
+                    date_tree = Tree(str(date_dir))
+                    for log_name in catalog.names(args.mode, date=date_str):
+                        date_tree.add(log_name)
+                    console.print(f"📂 {date_dir}/ :{num_logs}件のログファイルがあるケロ🐸\n")
+                    console.print(date_tree)
+                    console.print("\n")
+                    return
+
+                console.print(f"📂 {args.date} に対応するログディレクトリは存在しないケロ🐸")
 
             else:
                 # 今日のログをTree表示。その他の日はフアイル数でTree or Summary
-                num_logs_today = len(list(today_dir.glob("*.log")))
+                today_logs = catalog.names(args.mode, date=today_str)
                 today_tree = Tree(str(today_dir))
-                for log_file in sorted(today_dir.glob("*.log")):
-                    today_tree.add(log_file.name)
-                console.print(f"📂 {today_dir}/ :{num_logs_today}件のログファイルがあるケロ🐸\n")
+                for log_name in today_logs:
+                    today_tree.add(log_name)
+                console.print(f"📂 {today_dir}/ :{len(today_logs)}件のログファイルがあるケロ🐸\n")
                 console.print(today_tree)            
                 console.print("\n")            
 
                 # 他の日付はファイル数でTree表示。
-                for date_dir in sorted(log_mode_dir.glob("*")):
-                    if date_dir == today_dir:
+                for date_str, num_logs in catalog.dates(args.mode):
+                    if date_str == today_str:
                         continue
                     
-                    num_logs = len(list(date_dir.glob("*.log")))
                     if num_logs == 0:
-                        console.print(f"📂 {date_dir.name}/ : ログファイルは存在しないケロ🐸\n")
+                        console.print(f"📂 {date_str}/ : ログファイルは存在しないケロ🐸\n")
                     elif num_logs <= 5: # magic_number
-                        tree = Tree(f"{log_mode_dir}/{date_dir.name}")
-                        for log_file in sorted(date_dir.glob("*.log")):
-                            tree.add(log_file.name)
-                        console.print(f"📂 {log_mode_dir}/{date_dir.name}/ :{num_logs}件のログファイルがあるケロ🐸\n")
+                        tree = Tree(f"{log_mode_dir}/{date_str}")
+                        for log_name in catalog.names(args.mode, date=date_str):
+                            tree.add(log_name)
+                        console.print(f"📂 {log_mode_dir}/{date_str}/ :{num_logs}件のログファイルがあるケロ🐸\n")
                         console.print(tree)
                         console.print("\n")
                     else:
-                        console.print(f"📂 {log_mode_dir}/{date_dir.name}/ :{num_logs}件のログファイルがあるケロ🐸\n")
+                        console.print(f"📂 {log_mode_dir}/{date_str}/ :{num_logs}件のログファイルがあるケロ🐸\n")
                         console.print("ファイル数が多いから省略するケロ🐸\n")
 
+                # archive コマンドでまとめた月は bundle ごとの件数だけ表示。
+                for bundle, num_logs in archived_bundles(Path("logs"), args.mode):
+                    console.print(f"📦 {bundle} :{num_logs}件のログファイルがアーカイブされているケロ🐸\n")
+
 
 def _show_log(args):
     if args.log:
         if args.mode in ("execute", "console", "configure", "scp"):
             mode_dir = Path("logs") / args.mode  # e.g., logs/execute/
             target_dir = args.log[:8] # logファイルの最初の8文字を取得。
-            log_path = mode_dir / target_dir / args.log       # e.g., logs/execute/20250508/filename.log
+            log_path = mode_dir / target_dir / logical_name(args.log)       # e.g., logs/execute/20250508/filename.log
 
-            if not log_path.exists():
+            # 圧縮保存（.gz / .zst）・アーカイブ済み（logs/archive/）のログも同じ名前で読める。
+            if not log_exists(log_path):
                 print_error(f"{log_path} が存在しないケロ🐸")
                 return
 
-            with open(log_path, "r") as f:
-                content = f.read()
+            content = read_log_text(log_path)
            
             # Linuxのコマンドでlessを使用している  
             try:
@@ -514,19 +537,18 @@ def _show_diff(args):
         return
 
     mode_dir = Path("logs") /args.mode
-    log1_path = mode_dir / args.diff[0][:8] / args.diff[0]
-    log2_path = mode_dir / args.diff[1][:8] / args.diff[1]
+    log1_path = mode_dir / args.diff[0][:8] / logical_name(args.diff[0])
+    log2_path = mode_dir / args.diff[1][:8] / logical_name(args.diff[1])
     
-    if not log1_path.exists():
+    if not log_exists(log1_path):
         print_error(f"{log1_path} が存在しないケロ🐸")
         return
-    if not log2_path.exists():
+    if not log_exists(log2_path):
         print_error(f"{log2_path} が存在しないケロ🐸")
         return
 
-    with open(log1_path, "r") as log_1, open(log2_path, "r") as log_2:
-        text_1= log_1.readlines()
-        text_2= log_2.readlines()
+    text_1= read_log_text(log1_path).splitlines(keepends=True)
+    text_2= read_log_text(log2_path).splitlines(keepends=True)
 
 
     if args.mode in ("execute", "console", "configure", "scp"):
@@ -569,28 +591,23 @@ def _show_diff(args):
 
         elif style == "side-by-side":
             diff_command = "colordiff" if shutil.which("colordiff") else "diff"
-            subprocess.run([diff_command, "-y", str(log1_path), str(log2_path)])
+            # 圧縮保存・アーカイブ済みのログは、展開した一時ファイルを diff に渡す。
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                diff_paths = []
+                for index, (log_path, text) in enumerate(((log1_path, text_1), (log2_path, text_2))):
+                    if resolve_log_path(log_path) != log_path:
+                        log_path = Path(tmp_dir) / f"{index}_{log_path.name}"
+                        log_path.write_text("".join(text), encoding="utf-8")
+                    diff_paths.append(str(log_path))
+                subprocess.run([diff_command, "-y", *diff_paths])
 
     else:
         print_error(f"未対応のモードケロ🐸: {args.mode}")
 
 
 def _find_latest_log_path(mode: str) -> Path | None:
-
-    mode_dir = Path("logs") / mode
-    candidates_dirs = sorted(mode_dir.glob("*")) # 日付dirを取得してソート
-    if not candidates_dirs:
-        return None
-    
-    latest_date_dir = candidates_dirs[-1] # ソート済みのリストの最後の要素が最新
-    
-    # 最新の日付ディレクトリ内のログファイルを取得
-    log_files = sorted(latest_date_dir.glob("*.log")) # ここもソート
-    
-    if not log_files:
-        return None
-        
-    return log_files[-1] # 最新のログファイルを返す
+    # ファイル名は日時で始まるので、目録の索引で名前が最大のものが最新。
+    return get_log_catalog().latest(mode)
 
 
 def _show_log_last(args):
@@ -611,13 +628,94 @@ def _show_log_last(args):
     
     print_info(f"🕒 最新ログを表示するケロ🐸 → {latest_log}")
     try:
-        content = latest_log.read_text()
+        content = read_log_text(latest_log)
         subprocess.run(["less", "-R"], input=content.encode(), check=True)
     except Exception as e:
         print_error(f"lessの表示に失敗したケロ🐸: {e}")
 
 
 
+def _print_archived_excluded(mode, date_from, date_to):
+    """--grep, archive コマンドでまとめたログは検索の対象外なので、範囲内に bundle があればその件数を知らせる。"""
+    month_from = date_from.replace("-", "")[:6] if date_from else ""
+    month_to = date_to.replace("-", "")[:6] if date_to else ""
+    num_logs = sum(count for bundle, count in archived_bundles(Path("logs"), mode)
+                   if (not month_from or bundle.stem >= month_from) and (not month_to or bundle.stem <= month_to))
+    if num_logs:
+        print_info(f"📦 アーカイブ済みの {num_logs} 件（logs/archive/{mode}/）は --grep の対象外ケロ🐸 (show --log でファイル名を指定すれば読める)")
+
+
+def _show_grep(args):
+    """--grep, 保存済みログの本文を検索して、一致した行をホスト・ファイル・行番号つきで表示する。"""
+    # --date はその日だけ、--since / --until は範囲（両端を含む）。
+    date_from = args.date or args.since or None
+    date_to = args.date or args.until or None
+
+    started = time.perf_counter()
+    try:
+        hits, num_files = search_logs(args.grep, mode=args.mode, date_from=date_from, date_to=date_to, host=args.log_host,
+                                      label=args.log_label, regex=args.regex, ignore_case=args.ignore_case, max_results=args.max_results)
+    except ValueError as e:
+        print_error(str(e))
+        return
+    elapsed = time.perf_counter() - started
+    _print_archived_excluded(args.mode, date_from, date_to)
+
+    if not hits:
+        print_info(f"🔍 '{args.grep}' に一致する行は無いケロ🐸 ({num_files} files, {elapsed:.2f}s)")
+        return
+
+    table_theme = get_table_theme()
+    table = Table(title="🐸 SHOW_GREP 🐸", **table_theme)
+
+    header = ["HOST", "FILE", "LINE", "TEXT"]
+    for _ in header:
+        table.add_column(_, overflow=TABLE_OVERFLOW_MODE)
+
+    for hit in hits:
+        # ログの中身に [ ] があっても rich のマークアップとして解釈させない。
+        table.add_row(hit.host or "", f"{hit.path.parent.name}/{hit.path.name}", str(hit.line_no), Text(hit.line))
+
+    console.print(table)
+    truncated = "（上限に達したので打ち切り）" if len(hits) >= args.max_results else ""
+    print_info(f"🔍 {len(hits)} 行 / {len({hit.path for hit in hits})} ファイルで一致したケロ🐸{truncated} ({num_files} files, {elapsed:.2f}s)")
+
+
+def _show_pool():
+    """--pool, コネクションプール内のセッションを LRU 順（古い順）で表示する。"""
+    # connection_pool は netmiko を import するので、--pool のときだけ読み込む。
+    from connection_pool import get_connection_pool
+
+    pool = get_connection_pool()
+    if pool is None:
+        print_info("コネクションプールは無効ケロ🐸 (sys_config.yaml の connection_pool.enabled)")
+        return
+
+    sessions = pool.snapshot()
+    if not sessions:
+        print_info("📭 プールにセッションは無いケロ🐸")
+        return
+
+    table_theme = get_table_theme()
+    table = Table(title="🐸 SHOW_POOL 🐸", **table_theme)
+
+    header = ["HOSTNAME", "HOST", "PORT", "USER", "STATE", "AGE", "IDLE", "REUSE"]
+    for _ in header:
+        table.add_column(_)
+
+    for session in sessions:
+        table.add_row(session["hostname"],
+                      f'{session["host"]}',
+                      f'{session["port"]}',
+                      f'{session["username"]}',
+                      session["state"],
+                      f'{session["age"]:.0f}s',
+                      f'{session["idle"]:.0f}s',
+                      f'{session["reuse_count"]}')
+
+    console.print(table)
+
+
 @cmd2.with_argparser(show_parser)
 def do_show(self, args):
     if args.diff:
@@ -644,3 +742,7 @@ def do_show(self, args):
         _show_logs(args)
     elif args.log:
         _show_log(args)
+    elif args.pool:
+        _show_pool()
+    elif args.grep:
+        _show_grep(args)
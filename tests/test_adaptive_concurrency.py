@@ -0,0 +1,108 @@
+import pytest
+import threading
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    import adaptive_concurrency as ac
+    # ローカル資源は常に余裕がある前提にする。
+    monkeypatch.setattr(ac, "_open_fd_ratio", lambda: 0.1)
+    monkeypatch.setattr(ac, "_available_memory_ratio", lambda: 0.9)
+    monkeypatch.setattr(ac, "DECREASE_COOLDOWN", 0.0)
+    return ac.AdaptiveConcurrencyController(max_limit=8, min_limit=1, initial_limit=2)
+
+
+def test_limit_grows_after_fast_connects(controller):
+    for _ in range(2):
+        controller.record_connect(0.05)
+    assert controller.limit == 3
+
+
+def test_limit_never_exceeds_max(controller):
+    for _ in range(200):
+        controller.record_connect(0.05)
+    assert controller.limit == 8
+
+
+def test_timeout_and_auth_failure_halve_the_limit(controller):
+    for _ in range(30):
+        controller.record_connect(0.05)
+    assert controller.limit == 8
+    controller.record_connect(None, "timeout")
+    assert controller.limit == 4
+    controller.record_connect(None, "auth")
+    assert controller.limit == 2
+    assert controller.error_counts == {"timeout": 1, "auth": 1}
+
+
+def test_enable_failure_does_not_shrink_the_limit(controller):
+    controller.record_connect(None, "enable")
+    assert controller.limit == 2
+
+
+def test_latency_spike_shrinks_the_limit(controller):
+    for _ in range(30):
+        controller.record_connect(0.05)
+    for _ in range(10):
+        controller.record_connect(5.0)
+    assert controller.limit < 8
+
+
+def test_local_resource_pressure_blocks_growth(controller, monkeypatch):
+    import adaptive_concurrency as ac
+    monkeypatch.setattr(ac, "_open_fd_ratio", lambda: 0.95)
+    for _ in range(30):
+        controller.record_connect(0.05)
+    assert controller.limit == 1
+
+
+def test_slot_respects_limit(controller):
+    started = threading.Event()
+    release = threading.Event()
+    entered = []
+
+    def hold():
+        with controller.slot():
+            entered.append(1)
+            started.set()
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold) for _ in range(3)]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    # limit=2 なので 3 本目は待たされる。
+    assert controller.in_flight <= 2
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(entered) == 3
+    assert controller.peak_in_flight == 2
+
+
+def test_reused_sessions_count_as_success_without_moving_the_baseline(controller):
+    controller.record_connect(1.0)
+    for _ in range(10):
+        controller.record_connect(None) # プールの使い回し / fast-connect
+    assert controller.baseline_latency == 1.0
+    limit = controller.limit
+    assert limit > 2
+
+    controller.record_connect(1.2) # フルの接続は基準と比べて遅くなっていない
+    assert controller.limit >= limit
+
+
+def test_local_resources_are_checked_at_most_once_per_interval(controller, monkeypatch):
+    import adaptive_concurrency as ac
+    checks = []
+    monkeypatch.setattr(ac, "_open_fd_ratio", lambda: checks.append(1) or 0.1)
+    for _ in range(50):
+        controller.record_connect(0.05)
+    assert len(checks) == 1
@@ -0,0 +1,90 @@
+import re
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+OUTPUTS = {
+    "show clock": "*12:00:00.000 UTC Mon Jan 1 2024",
+    "show ip int brief": "Interface  IP-Address\r\nGi0/0      192.0.2.1\r\n  note: R1# inside a line",
+    "show users": "",
+}
+
+
+class FakePipelineConnection:
+    """書き込まれたコマンドに IOS 風のエコー / 出力 / プロンプトを返す Netmiko 接続もどき。"""
+
+    RETURN = "\n"
+    RESPONSE_RETURN = "\n"
+
+    def __init__(self, prompt="R1#"):
+        self.prompt = prompt
+        self.writes = []
+        self._read_buffer = ""
+
+    def write_channel(self, data):
+        self.writes.append(data)
+        for command in data.split(self.RETURN)[:-1]:
+            output = OUTPUTS[command]
+            self._read_buffer += f"{command}\r\n{output}\r\n{self.prompt}" if output else f"{command}\r\n{self.prompt}"
+
+    def read_until_pattern(self, pattern, read_timeout=10.0):
+        from netmiko.exceptions import ReadTimeout
+        match = re.search(pattern, self._read_buffer)
+        if match is None:
+            raise ReadTimeout("pattern not found")
+        output, self._read_buffer = self._read_buffer[:match.end()], self._read_buffer[match.end():]
+        return output
+
+    def normalize_linefeeds(self, a_string):
+        return a_string.replace("\r\n", "\n")
+
+    def send_command(self, command):
+        return OUTPUTS[command].replace("\r\n", "\n")
+
+
+def test_pipelined_outputs_match_send_command():
+    from command_pipeline import send_commands_pipelined
+    connection = FakePipelineConnection()
+    commands = list(OUTPUTS)
+
+    outputs = send_commands_pipelined(connection, "R1#", commands)
+
+    assert outputs == [connection.send_command(c) for c in commands]
+    assert len(connection.writes) == 1
+
+
+def test_pipeline_window_splits_writes():
+    from command_pipeline import send_commands_pipelined
+    connection = FakePipelineConnection()
+
+    send_commands_pipelined(connection, "R1#", list(OUTPUTS), window=2)
+
+    assert connection.writes == ["show clock\nshow ip int brief\n", "show users\n"]
+
+
+def test_missing_prompt_raises_read_timeout():
+    from command_pipeline import send_commands_pipelined
+    from netmiko.exceptions import ReadTimeout
+    connection = FakePipelineConnection(prompt="R1(config)#")
+
+    with pytest.raises(ReadTimeout):
+        send_commands_pipelined(connection, "R1#", ["show clock"], read_timeout=0.1)
+
+
+
+def test_command_timeout_is_asked_before_each_read():
+    from command_pipeline import send_commands_pipelined
+    connection = FakePipelineConnection()
+    timeouts, remaining = [], iter([30.0, 12.5, None])
+    real_read = connection.read_until_pattern
+    connection.read_until_pattern = lambda pattern, read_timeout: (timeouts.append(read_timeout), real_read(pattern))[1]
+
+    send_commands_pipelined(connection, "R1#", list(OUTPUTS), read_timeout=60.0, command_timeout=lambda: next(remaining))
+
+    assert timeouts == [30.0, 12.5, 60.0]
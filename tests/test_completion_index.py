@@ -0,0 +1,76 @@
+import os
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(project_root):
+    import completion_index
+    import inventory_cache
+    completion_index.clear_completion_indexes()
+    inventory_cache.clear_cache()
+    yield
+    completion_index.clear_completion_indexes()
+    inventory_cache.clear_cache()
+
+
+def test_lookup_uses_sorted_prefix_range(tmp_path):
+    from completion_index import CompletionIndex
+    source = tmp_path / "names.txt"
+    source.write_text("x", encoding="utf-8")
+    index = CompletionIndex((source,), lambda: ["R10", "SW1", "R2", "R1", "r3", None])
+
+    assert index.lookup("R") == ["R1", "R10", "R2"]
+    assert index.lookup("R1") == ["R1", "R10"]
+    assert index.lookup("R", limit=2) == ["R1", "R10"]
+    assert index.lookup("Z") == []
+    assert index.lookup("") == ["R1", "R10", "R2", "SW1", "r3"]
+
+
+def test_index_is_rebuilt_only_when_source_changes(tmp_path):
+    from completion_index import CompletionIndex
+    source = tmp_path / "names.txt"
+    source.write_text("R1\n", encoding="utf-8")
+    os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return source.read_text(encoding="utf-8").split()
+
+    index = CompletionIndex((source,), build)
+    assert index.lookup("R") == ["R1"]
+    assert index.lookup("R") == ["R1"]
+    assert len(builds) == 1
+
+    source.write_text("R1\nR2\n", encoding="utf-8")
+    assert index.lookup("R") == ["R1", "R2"]
+    assert len(builds) == 2
+
+
+def test_completers_share_the_index_and_respect_the_limit(tmp_path, monkeypatch):
+    from completers import host_names_completer, commands_list_names_completer, device_types_completer
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sys_config.yaml").write_text("user_interface:\n  completion_limit: 3\n", encoding="utf-8")
+    hosts = "".join(f"    R{index:02d}:\n      device_type: cisco_ios\n" for index in range(10))
+    (tmp_path / "inventory.yaml").write_text(f"all:\n  hosts:\n{hosts}  groups: {{}}\n", encoding="utf-8")
+    (tmp_path / "commands-lists.yaml").write_text("commands_lists:\n  precheck:\n    device_type: cisco_xe\n    commands_list: []\n",
+                                                  encoding="utf-8")
+
+    assert host_names_completer(None, "R0", "", 0, 0) == ["R00", "R01", "R02"]
+    assert commands_list_names_completer(None, "p", "", 0, 0) == ["precheck"]
+    assert device_types_completer(None, "cisco", "", 0, 0) == ["cisco_ios", "cisco_xe"]
+
+
+def test_completers_return_nothing_without_sources(tmp_path, monkeypatch):
+    from completers import host_names_completer, config_list_names_completer
+    monkeypatch.chdir(tmp_path)
+
+    assert host_names_completer(None, "R", "", 0, 0) == []
+    assert config_list_names_completer(None, "", "", 0, 0) == []
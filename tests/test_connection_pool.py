@@ -0,0 +1,168 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+class FakeConnection:
+    def __init__(self, host):
+        self.host = host
+        self.alive = True
+        self.disconnected = False
+
+    def is_alive(self):
+        return self.alive
+
+
+class FakeBackend:
+    """connect_to_device / safe_disconnect の代わり。"""
+
+    def __init__(self):
+        self.connects = []
+        self.disconnected = []
+
+    def connect(self, device, hostname, require_enable=True):
+        connection = FakeConnection(device["ip"])
+        self.connects.append(device)
+        return connection, f"{hostname}#", hostname
+
+    def disconnect(self, connection):
+        connection.disconnected = True
+        self.disconnected.append(connection)
+
+
+def _device(ip="192.0.2.1", password="cisco"):
+    return {"device_type": "cisco_ios", "ip": ip, "port": 22, "username": "admin", "password": password, "secret": "cisco"}
+
+
+def _pool(backend, **kwargs):
+    from connection_pool import ConnectionPool
+    return ConnectionPool(connect_func=backend.connect, disconnect_func=backend.disconnect, **kwargs)
+
+
+def test_released_session_is_reused():
+    backend = FakeBackend()
+    pool = _pool(backend)
+
+    first, prompt, hostname = pool.acquire(_device(), "R1")
+    pool.release(first)
+    second, _, _ = pool.acquire(_device(), "R1")
+
+    assert second is first
+    assert (prompt, hostname) == ("R1#", "R1")
+    assert len(backend.connects) == 1
+    assert pool.snapshot()[0]["reuse_count"] == 1
+
+
+def test_borrowed_session_is_not_shared():
+    backend = FakeBackend()
+    pool = _pool(backend)
+
+    first, _, _ = pool.acquire(_device(), "R1")
+    second, _, _ = pool.acquire(_device(), "R1")
+
+    assert second is not first
+    assert len(backend.connects) == 2
+
+
+def test_different_credentials_do_not_share_sessions():
+    backend = FakeBackend()
+    pool = _pool(backend)
+
+    first, _, _ = pool.acquire(_device(password="old"), "R1")
+    pool.release(first)
+    second, _, _ = pool.acquire(_device(password="new"), "R1")
+
+    assert second is not first
+
+
+def test_keepalive_is_passed_to_new_connections():
+    backend = FakeBackend()
+    pool = _pool(backend, keepalive=15)
+
+    pool.acquire(_device(), "R1")
+
+    assert backend.connects[0]["keepalive"] == 15
+
+
+def test_dead_session_is_discarded_and_reconnected():
+    backend = FakeBackend()
+    pool = _pool(backend)
+
+    first, _, _ = pool.acquire(_device(), "R1")
+    pool.release(first)
+    first.alive = False
+    second, _, _ = pool.acquire(_device(), "R1")
+
+    assert second is not first
+    assert first.disconnected
+    assert len(pool.snapshot()) == 1
+
+
+def test_release_with_discard_disconnects():
+    backend = FakeBackend()
+    pool = _pool(backend)
+
+    connection, _, _ = pool.acquire(_device(), "R1")
+    pool.release(connection, discard=True)
+
+    assert connection.disconnected
+    assert pool.snapshot() == []
+
+
+def test_idle_ttl_expires_sessions(monkeypatch):
+    import connection_pool
+    now = [1000.0]
+    monkeypatch.setattr(connection_pool, "monotonic", lambda: now[0])
+
+    backend = FakeBackend()
+    pool = _pool(backend, idle_ttl=60)
+
+    first, _, _ = pool.acquire(_device(), "R1")
+    pool.release(first)
+    now[0] += 61
+    second, _, _ = pool.acquire(_device(), "R1")
+
+    assert second is not first
+    assert first.disconnected
+
+
+def test_lru_session_is_evicted_over_max_size():
+    backend = FakeBackend()
+    pool = _pool(backend, max_size=2)
+
+    r1, _, _ = pool.acquire(_device("192.0.2.1"), "R1")
+    r2, _, _ = pool.acquire(_device("192.0.2.2"), "R2")
+    pool.release(r1)
+    pool.release(r2)
+    r3, _, _ = pool.acquire(_device("192.0.2.3"), "R3")
+
+    assert r1.disconnected
+    assert not r2.disconnected
+    assert [s["hostname"] for s in pool.snapshot()] == ["R2", "R3"]
+
+
+def test_flush_closes_idle_and_discards_borrowed_on_release():
+    backend = FakeBackend()
+    pool = _pool(backend)
+
+    idle, _, _ = pool.acquire(_device("192.0.2.1"), "R1")
+    pool.release(idle)
+    borrowed, _, _ = pool.acquire(_device("192.0.2.2"), "R2")
+
+    assert pool.flush() == 1
+    assert idle.disconnected
+    assert not borrowed.disconnected
+
+    pool.release(borrowed)
+    assert borrowed.disconnected
+    assert pool.snapshot() == []
+
+
+def test_invalid_max_size():
+    with pytest.raises(ValueError):
+        _pool(FakeBackend(), max_size=0)
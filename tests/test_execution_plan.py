@@ -0,0 +1,69 @@
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+import textwrap
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+@pytest.fixture
+def commands_lists_file(tmp_path, monkeypatch):
+    path = tmp_path / "commands-lists.yaml"
+    path.write_text(textwrap.dedent("""
+    commands_lists:
+      cisco-precheck:
+        device_type: cisco_ios
+        description: precheck
+        tags: [before, cisco_ios]
+        commands_list:
+          - show version
+          - show ip int brief
+    """), encoding="utf-8")
+    import load_and_validate_yaml as lvy
+    monkeypatch.setattr(lvy, "COMMANDS_LISTS_FILE", str(path))
+    return path
+
+
+def test_build_execution_plan_resolves_commands_once(commands_lists_file):
+    from execution_plan import build_execution_plan
+    args = SimpleNamespace(commands_list="cisco-precheck", command="", textfsm_template=None)
+    plan = build_execution_plan(args, {"R1": "cisco_ios", "FW1": "paloalto_panos"})
+
+    assert plan.commands == ("show version", "show ip int brief")
+    assert plan.list_device_type == "cisco_ios"
+    assert plan.validation_error_for("R1") is None
+    assert "device_type 不一致" in plan.validation_error_for("FW1")
+
+
+def test_execution_plan_is_immutable(commands_lists_file):
+    from dataclasses import FrozenInstanceError
+    from execution_plan import build_execution_plan
+    args = SimpleNamespace(commands_list="cisco-precheck", command="", textfsm_template=None)
+    plan = build_execution_plan(args, {"FW1": "paloalto_panos"})
+
+    with pytest.raises(FrozenInstanceError):
+        plan.commands = ("reload",)
+    with pytest.raises(TypeError):
+        plan.host_validation_errors["FW1"] = "overwritten"
+
+
+def test_build_execution_plan_for_single_command():
+    from execution_plan import build_execution_plan
+    args = SimpleNamespace(commands_list="", command="show version", textfsm_template="t.textfsm")
+    plan = build_execution_plan(args, {"R1": "cisco_ios"}, parser_kind="textfsm")
+
+    assert plan.commands is None
+    assert plan.parser_kind == "textfsm"
+    assert plan.textfsm_template == "t.textfsm"
+    assert plan.validation_error_for("R1") is None
+
+
+def test_build_execution_plan_unknown_list(commands_lists_file):
+    from execution_plan import build_execution_plan
+    args = SimpleNamespace(commands_list="missing", command="", textfsm_template=None)
+    with pytest.raises(ValueError):
+        build_execution_plan(args, {"R1": "cisco_ios"})
@@ -0,0 +1,189 @@
+import argparse
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeConnection:
+    def __init__(self):
+        self.read_timeout_override = None
+        self.disconnected = False
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+def _error(kind):
+    """connect_to_device() と同じく、Netmiko の例外を原因に持つ ConnectionError を作る。"""
+    from netmiko.exceptions import NetMikoTimeoutException, NetMikoAuthenticationException
+    cause = {"timeout": NetMikoTimeoutException("t"), "auth": NetMikoAuthenticationException("a")}[kind]
+    error = ConnectionError(kind)
+    error.__cause__ = cause
+    return error
+
+
+def _opener(*outcomes):
+    """outcomes を順番に返す（例外なら送出する）open_session もどき。渡された device を記録する。"""
+    calls = []
+
+    def open_func(device, hostname):
+        calls.append(device)
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome, f"{hostname}#", hostname
+    return open_func, calls
+
+
+def test_deadline_clamps_phase_timeouts():
+    from execution_policy import ExecutionPolicy, RunDeadline
+    clock = FakeClock()
+    policy = ExecutionPolicy(connect_timeout=5, auth_timeout=30, deadline=RunDeadline(20, clock=clock))
+    clock.now = 12
+
+    device = policy.device_with_deadlines({"ip": "192.0.2.1"})
+
+    assert device["conn_timeout"] == 5
+    assert device["auth_timeout"] == device["banner_timeout"] == 8
+    assert device["read_timeout_override"] == 8 # enable は未設定でも残り時間で切り詰める
+
+
+def test_no_deadline_leaves_unset_phases_to_netmiko():
+    from execution_policy import ExecutionPolicy
+    policy = ExecutionPolicy(command_timeout=30)
+
+    assert policy.device_with_deadlines({"ip": "192.0.2.1"}) == {"ip": "192.0.2.1"}
+    assert policy.current_command_timeout() == 30
+
+
+def test_command_timeout_is_refreshed_against_the_remaining_deadline():
+    from execution_policy import ExecutionPolicy, RunDeadline
+    clock = FakeClock()
+    policy = ExecutionPolicy(command_timeout=30, deadline=RunDeadline(60, clock=clock))
+    connection = FakeConnection()
+
+    assert policy.refresh_command_timeout(connection) == 30
+    clock.now = 50
+    assert policy.refresh_command_timeout(connection) == 10
+    assert connection.read_timeout_override == 10
+
+
+def test_backoff_is_exponential_with_cap():
+    from execution_policy import ExecutionPolicy
+    policy = ExecutionPolicy(backoff_base=1.0, backoff_max=5.0)
+
+    assert [policy.backoff(n, rng=lambda: 1.0) for n in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+    assert policy.backoff(3, rng=lambda: 0.5) == 2.5
+
+
+def test_timeouts_are_retried_with_backoff():
+    from execution_policy import ExecutionPolicy, open_session_with_policy
+    connection = FakeConnection()
+    open_func, calls = _opener(_error("timeout"), _error("timeout"), connection)
+    policy = ExecutionPolicy(max_retries=2, command_timeout=30)
+    slept = []
+
+    result = open_session_with_policy({"ip": "192.0.2.1"}, "R1", policy, open_func=open_func, sleep=slept.append)
+
+    assert result == (connection, "R1#", "R1")
+    assert len(calls) == 3 and len(slept) == 2
+    assert connection.read_timeout_override == 30
+
+
+def test_pool_hits_and_fast_connect_report_no_latency():
+    from connect_device import record_connect_kind, CONNECT_FULL, CONNECT_POOLED, CONNECT_FAST
+    from execution_policy import ExecutionPolicy, open_session_with_policy
+
+    class Recorder:
+        def __init__(self):
+            self.latencies = []
+
+        def record_connect(self, latency, error_class=None):
+            self.latencies.append(latency)
+
+    concurrency = Recorder()
+    for kind in (CONNECT_FULL, CONNECT_POOLED, CONNECT_FAST):
+        def open_func(device, hostname, kind=kind):
+            record_connect_kind(kind)
+            return FakeConnection(), f"{hostname}#", hostname
+        open_session_with_policy({"ip": "192.0.2.1"}, "R1", ExecutionPolicy(), concurrency=concurrency, open_func=open_func)
+
+    assert concurrency.latencies[0] is not None
+    assert concurrency.latencies[1:] == [None, None]
+
+
+def test_auth_failure_is_not_retried():
+    from execution_policy import ExecutionPolicy, open_session_with_policy
+    open_func, calls = _opener(_error("auth"), FakeConnection())
+    policy = ExecutionPolicy(max_retries=3)
+
+    with pytest.raises(ConnectionError):
+        open_session_with_policy({"ip": "192.0.2.1"}, "R1", policy, open_func=open_func, sleep=lambda s: None)
+    assert len(calls) == 1
+
+
+def test_retry_gives_up_when_backoff_would_pass_deadline(monkeypatch):
+    import execution_policy
+    from execution_policy import ExecutionPolicy, RunDeadline, open_session_with_policy
+    monkeypatch.setattr(execution_policy.random, "random", lambda: 1.0)
+    clock = FakeClock()
+    open_func, calls = _opener(_error("timeout"), FakeConnection())
+    policy = ExecutionPolicy(max_retries=3, backoff_base=10, backoff_max=10, deadline=RunDeadline(5, clock=clock))
+
+    with pytest.raises(ConnectionError):
+        open_session_with_policy({"ip": "192.0.2.1"}, "R1", policy, open_func=open_func, sleep=clock.sleep)
+    assert len(calls) == 1
+    assert clock.slept == []
+
+
+def test_expired_deadline_skips_connect():
+    from execution_policy import ExecutionPolicy, RunDeadline, DeadlineExceededError, open_session_with_policy
+    clock = FakeClock()
+    open_func, calls = _opener(FakeConnection())
+    policy = ExecutionPolicy(deadline=RunDeadline(5, clock=clock))
+    clock.now = 5
+
+    with pytest.raises(DeadlineExceededError):
+        open_session_with_policy({"ip": "192.0.2.1"}, "R1", policy, open_func=open_func)
+    assert calls == []
+
+
+def test_abort_cancels_futures_and_closes_sessions():
+    from concurrent.futures import Future
+    from execution_policy import ExecutionPolicy, DeadlineExceededError
+    policy = ExecutionPolicy()
+    running, late = FakeConnection(), FakeConnection()
+    policy.sessions.register(running, "R1")
+    future = Future()
+
+    assert policy.abort([future]) == 1
+    assert future.cancelled()
+    assert running.disconnected
+    with pytest.raises(DeadlineExceededError):
+        policy.sessions.register(late, "R2")
+
+
+def test_deadline_option_rejects_non_positive():
+    from execution_policy import deadline_option
+    assert deadline_option("90") == 90.0
+    for value in ("0", "-1", "abc", "nan"):
+        with pytest.raises(argparse.ArgumentTypeError, match="正の秒数"):
+            deadline_option(value)
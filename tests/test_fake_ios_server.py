@@ -0,0 +1,38 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+    monkeypatch.syspath_prepend(str(root / "benchmarks"))
+
+
+def test_netmiko_can_drive_fake_ios():
+    from netmiko import ConnectHandler
+    from fake_ios_server import FakeIOSFleet, FakeDeviceProfile
+
+    with FakeIOSFleet(1, FakeDeviceProfile(output_size=500)) as fleet:
+        hostname = fleet.hostnames[0]
+        connection = ConnectHandler(**fleet.device(hostname))
+        try:
+            assert connection.find_prompt() == f"{hostname}>"
+            connection.enable()
+            assert connection.check_enable_mode()
+            output = connection.send_command("show ip interface brief")
+        finally:
+            connection.disconnect()
+
+    assert output.startswith(f"{hostname} output of 'show ip interface brief'")
+    assert len(output) >= 500
+
+
+def test_fleet_inventory_matches_ports():
+    from fake_ios_server import FakeIOSFleet
+
+    with FakeIOSFleet(3) as fleet:
+        inventory = fleet.inventory("bench")
+
+    assert inventory["all"]["groups"]["bench"]["hosts"] == fleet.hostnames
+    assert {host["port"] for host in inventory["all"]["hosts"].values()} == set(fleet.ports.values())
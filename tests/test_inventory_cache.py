@@ -0,0 +1,113 @@
+import os
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(project_root):
+    import inventory_cache
+    inventory_cache.clear_cache()
+    yield
+    inventory_cache.clear_cache()
+
+
+INVENTORY = """\
+all:
+  hosts:
+    R1:
+      hostname: "R1"
+      ip: "192.0.2.1"
+      device_type: "cisco_ios"
+      tags: ["core"]
+  groups:
+    lab:
+      description: "lab"
+      tags: []
+      hosts: [R1]
+"""
+
+
+def _write(path, text, *, mtime_ns=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_inventory_is_parsed_once_and_shared(tmp_path, monkeypatch):
+    import inventory_cache
+    monkeypatch.chdir(tmp_path)
+    _write(tmp_path / "inventory.yaml", INVENTORY)
+
+    first = inventory_cache.load_inventory()
+    second = inventory_cache.load_inventory()
+
+    assert first is second
+    assert first["all"]["hosts"]["R1"]["tags"] == ["core"]
+    assert (tmp_path / ".kero_cache" / "inventory.yaml.pickle").exists()
+
+
+def test_inventory_is_reloaded_when_mtime_or_size_changes(tmp_path, monkeypatch):
+    import inventory_cache
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "inventory.yaml"
+    _write(path, INVENTORY, mtime_ns=1_000_000_000)
+    assert inventory_cache.load_inventory()["all"]["hosts"]["R1"]["ip"] == "192.0.2.1"
+
+    _write(path, INVENTORY.replace("192.0.2.1", "192.0.2.9"), mtime_ns=1_000_000_000) # 同じ size・同じ mtime
+    assert inventory_cache.load_inventory()["all"]["hosts"]["R1"]["ip"] == "192.0.2.1"
+
+    _write(path, INVENTORY.replace("192.0.2.1", "192.0.2.9"), mtime_ns=2_000_000_000)
+    assert inventory_cache.load_inventory()["all"]["hosts"]["R1"]["ip"] == "192.0.2.9"
+
+
+def test_sidecar_is_used_without_parsing_yaml(tmp_path, monkeypatch):
+    import inventory_cache
+    monkeypatch.chdir(tmp_path)
+    _write(tmp_path / "inventory.yaml", INVENTORY)
+    expected = inventory_cache.load_inventory()
+    inventory_cache.clear_cache()
+
+    def fail_parse(self):
+        raise AssertionError("YAML should not be parsed")
+    monkeypatch.setattr(inventory_cache.CompiledYamlCache, "_parse", fail_parse)
+
+    assert inventory_cache.load_inventory() == expected
+
+
+def test_broken_sidecar_falls_back_to_yaml(tmp_path, monkeypatch):
+    import inventory_cache
+    monkeypatch.chdir(tmp_path)
+    _write(tmp_path / "inventory.yaml", INVENTORY)
+    (tmp_path / ".kero_cache").mkdir()
+    (tmp_path / ".kero_cache" / "inventory.yaml.pickle").write_bytes(b"not a pickle")
+
+    assert list(inventory_cache.load_inventory()["all"]["groups"]) == ["lab"]
+
+
+def test_validated_inventory_and_completers_use_the_cache(tmp_path, monkeypatch):
+    from load_and_validate_yaml import get_validated_inventory_data
+    from completers import host_names_completer, group_names_completer
+    import inventory_cache
+    monkeypatch.chdir(tmp_path)
+    _write(tmp_path / "inventory.yaml", INVENTORY)
+
+    data = get_validated_inventory_data(host="R1")
+    assert data is inventory_cache.load_inventory()
+    assert host_names_completer(None, "R", "", 0, 0) == ["R1"]
+    assert group_names_completer(None, "l", "", 0, 0) == ["lab"]
+    with pytest.raises(ValueError):
+        get_validated_inventory_data(group="core")
+
+
+def test_missing_inventory_raises_file_not_found(tmp_path, monkeypatch):
+    import inventory_cache
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(FileNotFoundError):
+        inventory_cache.load_inventory()
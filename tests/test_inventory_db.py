@@ -0,0 +1,153 @@
+import os
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+INVENTORY = """\
+all:
+  hosts:
+    R2:
+      hostname: "R2"
+      ip: "192.0.2.2"
+      username: "cisco"
+      password: "cisco"
+      device_type: "cisco_ios"
+      port: 22
+      timeout: 10
+      ttl: 64
+      tags: ["branch", "osaka"]
+      site: "osaka"
+      description: "大阪支店のルータ"
+    R1:
+      hostname: "R1"
+      ip: "192.0.2.1"
+      username: "cisco"
+      password: "cisco"
+      secret: null
+      device_type: "cisco_xe"
+      port: 22
+      timeout: 10
+      ttl: 64
+      tags: ["core"]
+      site: "tokyo"
+      description: "東京オフィスのルータ"
+    SW1:
+      hostname: "SW1"
+      ip: "192.0.2.3"
+      device_type: "cisco_ios"
+      tags: ["core", "osaka"]
+      site: "osaka"
+  groups:
+    osaka:
+      description: "大阪"
+      tags: ["branch"]
+      hosts: [SW1, R2]
+    core:
+      description: "コア"
+      tags: []
+      hosts: [R1, SW1]
+"""
+
+
+@pytest.fixture
+def inventory_db(tmp_path):
+    from inventory_db import import_yaml, SqliteInventory
+    (tmp_path / "inventory.yaml").write_text(INVENTORY, encoding="utf-8")
+    assert import_yaml(tmp_path / "inventory.yaml", tmp_path / "inventory.db") == (3, 2)
+    backend = SqliteInventory(tmp_path / "inventory.db")
+    yield backend
+    backend.close()
+
+
+def test_import_and_export_round_trip(tmp_path, inventory_db):
+    from ruamel.yaml import YAML
+    from inventory_db import export_yaml
+
+    assert export_yaml(tmp_path / "inventory.db", tmp_path / "exported.yaml") == (3, 2)
+
+    original = YAML(typ="safe").load(INVENTORY)
+    exported = YAML(typ="safe").load((tmp_path / "exported.yaml").read_text(encoding="utf-8"))
+    assert exported == original
+    assert list(exported["all"]["hosts"]) == ["R2", "R1", "SW1"]
+
+
+def test_export_cli_does_not_overwrite_inventory_yaml(tmp_path, monkeypatch, inventory_db):
+    from inventory_db import main
+    monkeypatch.chdir(tmp_path)
+
+    main(["export"])
+    assert (tmp_path / "inventory.yaml").read_text(encoding="utf-8") == INVENTORY
+    assert (tmp_path / "inventory.export.yaml").exists()
+
+    with pytest.raises(SystemExit):
+        main(["export", "--yaml", "inventory.yaml"])
+    assert (tmp_path / "inventory.yaml").read_text(encoding="utf-8") == INVENTORY
+
+    main(["export", "--yaml", "inventory.yaml", "--force"])
+    assert (tmp_path / "inventory.yaml").read_text(encoding="utf-8") != INVENTORY
+
+
+def test_prefix_queries_are_sorted_and_capped(inventory_db):
+    assert inventory_db.host_names() == ["R1", "R2", "SW1"]
+    assert inventory_db.host_names("R") == ["R1", "R2"]
+    assert inventory_db.host_names("R", limit=1) == ["R1"]
+    assert inventory_db.host_names("X") == []
+    assert inventory_db.group_names("o") == ["osaka"]
+    assert inventory_db.device_types("cisco_i") == ["cisco_ios"]
+
+
+def test_indexed_lookups(inventory_db):
+    assert list(inventory_db.find_hosts(tag="osaka")) == ["R2", "SW1"]
+    assert list(inventory_db.find_hosts(site="osaka", device_type="cisco_ios", tag="core")) == ["SW1"]
+    assert list(inventory_db.find_hosts(hostname="R1")) == ["R1"]
+    assert list(inventory_db.group_hosts("osaka")) == ["SW1", "R2"]
+    assert inventory_db.get_host("R9") is None
+
+
+def test_subset_has_only_what_the_group_needs(inventory_db):
+    subset = inventory_db.subset(group="core")
+
+    assert list(subset["all"]["groups"]) == ["core"]
+    assert list(subset["all"]["hosts"]) == ["R1", "SW1"]
+    assert subset["all"]["hosts"]["R1"]["tags"] == ["core"]
+    assert inventory_db.subset(host="R9") == {"all": {"hosts": {}, "groups": {}}}
+
+
+def test_reimport_is_picked_up(tmp_path, inventory_db):
+    from inventory_db import import_yaml
+    assert inventory_db.host_names("SW") == ["SW1"]
+
+    (tmp_path / "inventory.yaml").write_text(INVENTORY.replace("SW1", "SW9"), encoding="utf-8")
+    import_yaml(tmp_path / "inventory.yaml", tmp_path / "inventory.db")
+    os.utime(tmp_path / "inventory.db", ns=(1, 1))
+
+    assert inventory_db.host_names("SW") == ["SW9"]
+
+
+def test_sqlite_backend_is_used_when_configured(tmp_path, monkeypatch, inventory_db):
+    from load_and_validate_yaml import get_validated_inventory_data
+    from completers import host_names_completer, group_names_completer, device_types_completer
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "inventory.yaml").unlink()
+    (tmp_path / "sys_config.yaml").write_text('inventory:\n  backend: sqlite\n  sqlite_path: "inventory.db"\n', encoding="utf-8")
+
+    data = get_validated_inventory_data(host="R1")
+    assert list(data["all"]["hosts"]) == ["R1"]
+    assert host_names_completer(None, "R", "", 0, 0) == ["R1", "R2"]
+    assert group_names_completer(None, "c", "", 0, 0) == ["core"]
+    assert "cisco_xe" in device_types_completer(None, "cisco", "", 0, 0)
+    with pytest.raises(ValueError):
+        get_validated_inventory_data(group="tokyo")
+
+
+def test_missing_database_raises_file_not_found(tmp_path):
+    from inventory_db import SqliteInventory
+
+    with pytest.raises(FileNotFoundError):
+        SqliteInventory(tmp_path / "missing.db").host_names()
@@ -0,0 +1,127 @@
+import argparse
+import os
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+def _write_log(root, mode, date, name, text="x"):
+    path = root / mode / date / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_save_log_and_save_json_are_recorded(tmp_path, monkeypatch):
+    from output_logging import save_log, save_json
+    from log_catalog import get_log_catalog
+    monkeypatch.chdir(tmp_path)
+    args = argparse.Namespace(log=True, memo="before change", command="show ip int brief")
+
+    log_path = save_log("output", "R1", args)
+    json_path = save_json([{"a": 1}], "R1", args, parser_kind="textfsm")
+
+    catalog = get_log_catalog()
+    assert catalog.names("execute") == [log_path.name]
+    assert catalog.names("execute", host="R1", label="show-ip-int-brief", memo="before-change") == [log_path.name]
+    assert catalog.names("execute", kind="json", parser="textfsm", label="show-ip-int-brief") == [json_path.name]
+    assert catalog.latest("execute") == (tmp_path / log_path).absolute()
+
+
+def test_existing_logs_are_picked_up_and_queried_by_index(tmp_path):
+    from log_catalog import LogCatalog
+    root = tmp_path / "logs"
+    _write_log(root, "execute", "20250101", "20250101-090000_R1_show-version.log")
+    _write_log(root, "execute", "20250101", "20250101-100000_R2_show-version.log")
+    _write_log(root, "execute", "20250102", "20250102-090000_R1_jizen_command.log")
+    (root / "execute" / "20250103").mkdir()
+    catalog = LogCatalog(root)
+
+    assert catalog.dates("execute") == [("20250101", 2), ("20250102", 1), ("20250103", 0)]
+    assert catalog.names("execute", prefix="20250101", newest_first=True) == ["20250101-100000_R2_show-version.log",
+                                                                               "20250101-090000_R1_show-version.log"]
+    assert catalog.names("execute", host="R1", label="jizen_command") == ["20250102-090000_R1_jizen_command.log"]
+    assert catalog.names("execute", limit=1) == ["20250101-090000_R1_show-version.log"]
+    assert catalog.latest("execute").name == "20250102-090000_R1_jizen_command.log"
+    assert catalog.latest("scp") is None
+
+
+def test_directory_changes_outside_the_catalog_are_resynced(tmp_path):
+    from log_catalog import LogCatalog
+    root = tmp_path / "logs"
+    old = _write_log(root, "execute", "20250101", "20250101-090000_R1_show-version.log")
+    catalog = LogCatalog(root)
+    assert catalog.names("execute") == [old.name]
+
+    old.unlink()
+    new = _write_log(root, "execute", "20250101", "20250101-120000_R3_show-clock.log")
+    os.utime(new.parent, ns=(1, 1))
+    _write_log(root, "execute", "20250105", "20250105-090000_R1_show-clock.log")
+
+    assert catalog.names("execute") == [new.name, "20250105-090000_R1_show-clock.log"]
+
+    for path in (root / "execute" / "20250105").iterdir():
+        path.unlink()
+    (root / "execute" / "20250105").rmdir()
+    assert catalog.dates("execute") == [("20250101", 1)]
+
+
+def test_recorded_memo_survives_a_resync(tmp_path):
+    from log_catalog import LogCatalog
+    root = tmp_path / "logs"
+    catalog = LogCatalog(root)
+    path = _write_log(root, "execute", "20250101", "20250101-090000_R1_show-version_before.log")
+    catalog.record(path, mode="execute", hostname="R1", memo="before")
+    _write_log(root, "execute", "20250101", "20250101-100000_R1_show-version.log")
+
+    assert catalog.names("execute", label="show-version") == ["20250101-090000_R1_show-version_before.log",
+                                                              "20250101-100000_R1_show-version.log"]
+    assert catalog.names("execute", memo="before") == [path.name]
+
+
+def test_new_directory_is_scanned_once_per_process(tmp_path, monkeypatch):
+    import log_catalog
+    root = tmp_path / "logs"
+    catalog = log_catalog.LogCatalog(root)
+    _write_log(root, "execute", "20250101", "20250101-080000_R0_show-version.log")
+    scanned = []
+    real_scandir = log_catalog.os.scandir
+    monkeypatch.setattr(log_catalog.os, "scandir", lambda path: (scanned.append(Path(path).name), real_scandir(path))[1])
+
+    for index in range(1, 21):
+        path = _write_log(root, "execute", "20250101", f"20250101-09{index:04d}_R{index}_show-version.log")
+        catalog.record(path, mode="execute", hostname=f"R{index}")
+    assert scanned == ["20250101"]
+
+    scanned.clear()
+    assert len(catalog.names("execute")) == 21
+    assert scanned == ["execute"]
+
+
+def test_rebuild_counts_every_mode(tmp_path):
+    from log_catalog import LogCatalog
+    root = tmp_path / "logs"
+    _write_log(root, "execute", "20250101", "20250101-090000_R1_show-version.log")
+    _write_log(root, "execute_json", "20250101", "20250101-090000_R1_show-version_genie.json")
+    _write_log(root, "configure", "20250101", "20250101-090000_R1_loopback.log")
+
+    catalog = LogCatalog(root)
+    assert catalog.rebuild() == 3
+    assert catalog.names("execute", kind="json", parser="genie") == ["20250101-090000_R1_show-version_genie.json"]
+
+
+def test_log_filename_completer_uses_the_catalog(tmp_path, monkeypatch):
+    from completers import log_filename_completer
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sys_config.yaml").write_text("user_interface:\n  completion_limit: 2\n", encoding="utf-8")
+    for hour in range(5):
+        _write_log(tmp_path / "logs", "configure", "20250101", f"20250101-0{hour}0000_R1_loopback.log")
+
+    line = "show --diff --mode configure 2025"
+    assert log_filename_completer(None, "2025", line, len(line) - 4, len(line)) == ["20250101-040000_R1_loopback.log",
+                                                                                    "20250101-030000_R1_loopback.log"]
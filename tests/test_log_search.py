@@ -0,0 +1,183 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+def _write_log(root, mode, date, name, text):
+    path = root / mode / date / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def log_root(tmp_path):
+    root = tmp_path / "logs"
+    _write_log(root, "execute", "20250101", "20250101-090000_R1_show-version.log",
+               "Cisco IOS Software\nuptime is 1 week\nGigabitEthernet0/1 is up\n")
+    _write_log(root, "execute", "20250102", "20250102-090000_R2_show-ip-int-brief.log",
+               "Interface  IP-Address  Status\nGigabitEthernet0/1  10.0.0.2  up\nGigabitEthernet0/2  unassigned  administratively down\n")
+    _write_log(root, "execute", "20250103", "20250103-090000_R1_show-ip-int-brief.log",
+               "Interface  IP-Address  Status\nGigabitEthernet0/1  10.0.0.1  up\n")
+    return root
+
+
+def _lines(hits):
+    return [(hit.host, hit.path.name, hit.line_no) for hit in hits]
+
+
+def test_literal_search_uses_index_and_reports_line_numbers(log_root):
+    from log_search import search_logs
+    hits, num_files = search_logs("GigabitEthernet0/2", root=log_root)
+
+    assert _lines(hits) == [("R2", "20250102-090000_R2_show-ip-int-brief.log", 3)]
+    assert hits[0].line.startswith("GigabitEthernet0/2")
+    assert num_files == 1 # 索引で候補が 1 ファイルに絞られている
+
+
+def test_case_is_respected_unless_ignore_case(log_root):
+    from log_search import search_logs
+    assert search_logs("cisco", root=log_root)[0] == []
+    assert _lines(search_logs("cisco", ignore_case=True, root=log_root)[0]) == [("R1", "20250101-090000_R1_show-version.log", 1)]
+
+
+def test_regex_and_short_patterns_scan_files(log_root):
+    from log_search import search_logs
+    hits, num_files = search_logs(r"10\.0\.0\.\d+", regex=True, root=log_root)
+    assert [hit.line_no for hit in hits] == [2, 2]
+    assert num_files == 3
+
+    assert len(search_logs("up", root=log_root)[0]) == 4
+
+    with pytest.raises(ValueError):
+        search_logs("(", regex=True, root=log_root)
+
+
+def test_filters_by_date_range_host_and_label(log_root):
+    from log_search import search_logs
+    assert len(search_logs("GigabitEthernet0/1", root=log_root)[0]) == 3
+    assert _lines(search_logs("GigabitEthernet0/1", date_from="2025-01-02", root=log_root)[0]) == \
+        [("R2", "20250102-090000_R2_show-ip-int-brief.log", 2), ("R1", "20250103-090000_R1_show-ip-int-brief.log", 2)]
+    assert [hit.path.name for hit in search_logs("GigabitEthernet0/1", host="R1", label="show-ip-int-brief", root=log_root)[0]] == \
+        ["20250103-090000_R1_show-ip-int-brief.log"]
+    assert len(search_logs("GigabitEthernet", max_results=2, root=log_root)[0]) == 2
+
+    with pytest.raises(ValueError):
+        search_logs("up", date_from="Jan 1", root=log_root)
+
+
+def test_index_picks_up_new_and_removed_logs(log_root):
+    from log_search import search_logs, get_search_index
+    assert search_logs("reload reason", root=log_root)[0] == []
+
+    new = _write_log(log_root, "execute", "20250104", "20250104-090000_R3_show-version.log", "Last reload reason: power-on\n")
+    assert _lines(search_logs("reload reason", root=log_root)[0]) == [("R3", new.name, 1)]
+
+    new.unlink()
+    new.parent.rmdir()
+    assert search_logs("reload reason", root=log_root)[0] == []
+    assert get_search_index(log_root).update("execute", []) == 0
+
+
+def test_compressed_logs_are_indexed_and_scanned(log_root):
+    import gzip
+    from log_search import search_logs
+    path = log_root / "execute" / "20250105" / "20250105-090000_R4_show-version.log.gz"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(gzip.compress(b"Cisco IOS XE Software\nuptime is 2 weeks\n"))
+
+    assert _lines(search_logs("IOS XE", root=log_root)[0]) == [("R4", "20250105-090000_R4_show-version.log", 1)]
+    assert [hit.line_no for hit in search_logs(r"uptime is \d+ weeks?", regex=True, root=log_root)[0]] == [2, 2]
+
+
+def test_archived_logs_are_excluded_and_reported(log_root, monkeypatch, capsys):
+    from log_search import search_logs
+    from log_storage import archive_logs
+    from show import _print_archived_excluded
+    archive_logs(log_root, ["execute"], before="20250103")
+    monkeypatch.chdir(log_root.parent)
+
+    assert [hit.path.name for hit in search_logs("GigabitEthernet0/1", root=log_root)[0]] == ["20250103-090000_R1_show-ip-int-brief.log"]
+
+    _print_archived_excluded("execute", "2025-01-01", None)
+    assert "2 件" in capsys.readouterr().out
+    _print_archived_excluded("execute", "2025-02-01", None)
+    assert capsys.readouterr().out == ""
+
+
+def _count(log_root, sql):
+    from log_search import get_search_index
+    return get_search_index(log_root)._connection().execute(sql).fetchone()[0]
+
+
+def test_removed_logs_release_their_index_rows(log_root, monkeypatch):
+    import log_search
+    from log_search import search_logs
+    search_logs("GigabitEthernet", root=log_root)
+    assert _count(log_root, "SELECT count(*) FROM docs") == _count(log_root, "SELECT count(*) FROM bodies") == 3
+
+    added = _write_log(log_root, "execute", "20250104", "20250104-090000_R1_show-ip-int-brief.log",
+                       "Interface  IP-Address  Status\nLoopback0  1.1.1.1  up\n")
+    removed = log_root / "execute" / "20250101"
+    for path in removed.iterdir():
+        path.unlink()
+    removed.rmdir()
+
+    assert _lines(search_logs("Loopback0", root=log_root)[0]) == [("R1", added.name, 2)]
+    assert _count(log_root, "SELECT count(*) FROM docs") == _count(log_root, "SELECT count(*) FROM bodies") == 3
+    if not log_search.CONTENTLESS_DELETE:
+        assert _count(log_root, "SELECT value FROM meta WHERE key = 'stale_bodies'") == 1
+
+        # 消せずに残った本文が増えすぎたら作り直す（結果は変わらない）
+        monkeypatch.setattr(log_search, "MIN_STALE_BODIES", 0)
+        with log_search.get_search_index(log_root)._connection() as connection:
+            connection.execute("UPDATE meta SET value = 4 WHERE key = 'stale_bodies'") # 生きている本文（3）より多い
+        assert _lines(search_logs("Loopback0", root=log_root)[0]) == [("R1", added.name, 2)]
+        assert _count(log_root, "SELECT count(*) FROM meta") == 0
+        assert _count(log_root, "SELECT count(*) FROM bodies") == 3
+
+
+def test_deduplicated_logs_share_one_indexed_body(tmp_path, monkeypatch):
+    import argparse
+    from output_logging import save_log
+    from log_search import search_logs
+    (tmp_path / "sys_config.yaml").write_text("log:\n  dedup: true\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    root = tmp_path / "logs"
+    for memo in ("day1", "day2", "day3"):
+        save_log("hostname R1\nntp server 10.0.0.1\n", "R1", argparse.Namespace(log=True, memo=memo, command="show run"))
+
+    assert len(search_logs("ntp server", root=root)[0]) == 3
+    assert _count(root, "SELECT count(*) FROM docs") == 3
+    assert _count(root, "SELECT count(*) FROM bodies") == 1
+
+
+def test_indexing_per_search_is_bounded(log_root, monkeypatch):
+    import log_search
+    from log_search import search_logs
+    monkeypatch.setattr(log_search, "INDEX_BYTES_PER_SEARCH", 1)
+
+    # 新しい日付の 1 ファイルだけ索引に入り、残りは走査されるので結果は同じ
+    assert len(search_logs("GigabitEthernet0/1", root=log_root)[0]) == 3
+    assert _count(log_root, f"SELECT count(*) FROM docs WHERE indexed = {log_search.INDEX_PENDING}") == 2
+    assert len(search_logs("GigabitEthernet0/1", root=log_root)[0]) == 3
+    assert _count(log_root, f"SELECT count(*) FROM docs WHERE indexed = {log_search.INDEX_PENDING}") == 1
+
+
+def test_size_limit_applies_to_expanded_length(log_root, monkeypatch):
+    import gzip
+    import log_search
+    monkeypatch.setattr(log_search, "MAX_INDEXED_BYTES", 1024)
+    path = log_root / "execute" / "20250105" / "20250105-090000_R4_show-run.log.gz"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(gzip.compress(b"interface Loopback0\n" * 1000)) # 圧縮後は 1024 バイト未満
+
+    assert len(log_search.search_logs("Loopback0", root=log_root)[0]) == 1000
+    indexed = log_search.get_search_index(log_root)._connection().execute(
+        "SELECT indexed FROM docs WHERE name = ?", ("20250105-090000_R4_show-run.log",)).fetchone()
+    assert indexed == (log_search.INDEX_SKIPPED,)
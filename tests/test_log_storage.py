@@ -0,0 +1,215 @@
+import argparse
+import gzip
+import zipfile
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+def _use_compression(tmp_path, monkeypatch, compression):
+    (tmp_path / "sys_config.yaml").write_text(f"log:\n  compression: {compression}\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+
+def _write_log(root, directory, date, name, text):
+    path = root / directory / date / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_save_log_compresses_and_reads_back_by_logical_name(tmp_path, monkeypatch):
+    from output_logging import save_log, save_json
+    from log_catalog import get_log_catalog
+    from log_storage import read_log_text
+    _use_compression(tmp_path, monkeypatch, "gzip")
+    args = argparse.Namespace(log=True, memo="", command="show version")
+
+    log_path = save_log(["Cisco IOS\n", "uptime is 1 week\n"], "R1", args)
+    json_path = save_json({"version": "17.9"}, "R1", args, parser_kind="genie")
+
+    assert log_path.name.endswith(".log.gz") and json_path.name.endswith(".json.gz")
+    assert gzip.decompress(log_path.read_bytes()) == b"Cisco IOS\nuptime is 1 week\n"
+
+    catalog = get_log_catalog()
+    logical_name = log_path.name[:-len(".gz")]
+    assert catalog.names("execute") == [logical_name]
+    assert catalog.names("execute", kind="json", parser="genie") == [json_path.name[:-len(".gz")]]
+    latest = catalog.latest("execute")
+    assert latest.name == logical_name
+    assert read_log_text(latest) == "Cisco IOS\nuptime is 1 week\n"
+
+
+def test_stream_log_is_compressed(tmp_path, monkeypatch):
+    from output_stream import HostOutputStream
+    from log_storage import read_log_text
+    _use_compression(tmp_path, monkeypatch, "gzip")
+    args = argparse.Namespace(log=True, memo="", command="show clock")
+
+    stream = HostOutputStream("R1", args, lambda *_, **__: None, live=False)
+    stream.write("R1# show clock\n10:00:00\n")
+    log_path = stream.close()
+
+    assert log_path.suffix == ".gz"
+    assert read_log_text(log_path.with_name(log_path.name[:-len(".gz")])) == "R1# show clock\n10:00:00\n"
+
+
+def test_unknown_or_unavailable_compression_is_rejected(tmp_path, monkeypatch):
+    import log_storage
+    _use_compression(tmp_path, monkeypatch, "bzip2")
+    with pytest.raises(ValueError):
+        log_storage.get_log_compression()
+
+    (tmp_path / "sys_config.yaml").write_text("log:\n  compression: zstd\n  archive_after_days: 7\n", encoding="utf-8")
+    monkeypatch.setattr(log_storage, "zstd", None)
+    with pytest.raises(ValueError):
+        log_storage.get_log_compression()
+    assert log_storage.get_archive_after_days() == 7
+
+
+def test_archive_packs_old_dates_and_keeps_them_readable(tmp_path):
+    from log_catalog import LogCatalog
+    from log_storage import archive_logs, archived_bundles, log_exists, read_log_text
+    root = tmp_path / "logs"
+    plain = _write_log(root, "execute", "20250101", "20250101-090000_R1_show-version.log", "IOS 15.2\n")
+    compressed = root / "execute" / "20250102" / "20250102-090000_R2_show-version.log"
+    compressed.parent.mkdir(parents=True)
+    compressed.with_name(compressed.name + ".gz").write_bytes(gzip.compress(b"IOS 17.9\n"))
+    _write_log(root, "execute_json", "20250101", "20250101-090000_R1_show-version_genie.json", "{}")
+    recent = _write_log(root, "execute", "20250301", "20250301-090000_R1_show-version.log", "IOS 17.12\n")
+    catalog = LogCatalog(root)
+    assert len(catalog.names("execute")) == 3
+
+    results = archive_logs(root, ["execute", "execute_json"], before="20250201")
+
+    assert [(bundle.relative_to(root).as_posix(), dates) for bundle, dates in results] == \
+        [("archive/execute/202501.zip", ["20250101", "20250102"]), ("archive/execute_json/202501.zip", ["20250101"])]
+    assert not plain.parent.exists() and not compressed.parent.exists()
+    with zipfile.ZipFile(root / "archive" / "execute" / "202501.zip") as zf:
+        assert zf.namelist() == ["20250101/20250101-090000_R1_show-version.log", "20250102/20250102-090000_R2_show-version.log"]
+
+    assert read_log_text(plain) == "IOS 15.2\n"
+    assert read_log_text(compressed) == "IOS 17.9\n"
+    assert log_exists(plain) and log_exists(recent)
+    assert not log_exists(plain.with_name("20250101-100000_R9_missing.log"))
+    assert catalog.names("execute") == [recent.name]
+    assert archived_bundles(root, "execute") == [(root / "archive" / "execute" / "202501.zip", 2)]
+
+
+def test_archive_appends_to_existing_bundle_and_dry_run_changes_nothing(tmp_path):
+    from log_storage import archive_logs, read_log_text
+    root = tmp_path / "logs"
+    first = _write_log(root, "execute", "20250101", "20250101-090000_R1_a.log", "first\n")
+    archive_logs(root, ["execute"], before="20250102")
+    second = _write_log(root, "execute", "20250115", "20250115-090000_R1_b.log", "second\n")
+
+    assert archive_logs(root, ["execute"], before="20250201", dry_run=True)[0][1] == ["20250115"]
+    assert second.exists()
+
+    archive_logs(root, ["execute"], before="20250201")
+    assert read_log_text(first) == "first\n"
+    assert read_log_text(second) == "second\n"
+    with pytest.raises(FileNotFoundError):
+        read_log_text(root / "execute" / "20250116" / "20250116-090000_R1_c.log")
+
+
+def _use_dedup(tmp_path, monkeypatch, compression="none"):
+    (tmp_path / "sys_config.yaml").write_text(f"log:\n  compression: {compression}\n  dedup: true\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+
+def _objects(root):
+    return sorted(path.name for path in (root / "objects").glob("*/*"))
+
+
+def test_identical_snapshots_share_one_object(tmp_path, monkeypatch):
+    from output_logging import save_log
+    from log_catalog import get_log_catalog
+    from log_storage import read_log_text
+    _use_dedup(tmp_path, monkeypatch, "gzip")
+    root = tmp_path / "logs"
+    config = "hostname R1\n" + "interface Gi0/1\n no shutdown\n" * 100
+
+    first = save_log(config, "R1", argparse.Namespace(log=True, memo="day1", command="show running-config"))
+    second = save_log(config, "R1", argparse.Namespace(log=True, memo="day2", command="show running-config"))
+    changed = save_log(config + "ntp server 10.0.0.1\n", "R1", argparse.Namespace(log=True, memo="day3", command="show running-config"))
+
+    assert all(path.suffix == ".ref" for path in (first, second, changed))
+    assert first.read_text() == second.read_text() != changed.read_text()
+    objects = _objects(root)
+    assert len(objects) == 2 and all(name.endswith(".gz") for name in objects)
+
+    names = get_log_catalog().names("execute")
+    assert names == sorted(path.name[:-len(".ref")] for path in (first, second, changed))
+    assert read_log_text(first.with_name(names[0])) == config
+    assert read_log_text(changed.with_name(changed.name[:-len(".ref")])).endswith("ntp server 10.0.0.1\n")
+
+
+def test_gc_removes_only_unreferenced_objects(tmp_path, monkeypatch):
+    from output_logging import save_log
+    from log_storage import collect_garbage, read_log_text
+    _use_dedup(tmp_path, monkeypatch)
+    root = tmp_path / "logs"
+    kept = save_log("same\n", "R1", argparse.Namespace(log=True, memo="a", command="show clock"))
+    dropped = save_log("other\n", "R1", argparse.Namespace(log=True, memo="b", command="show clock"))
+    dropped.unlink()
+
+    assert collect_garbage(root) == (0, 0) # まだ猶予期間内
+    assert collect_garbage(root, grace_seconds=0, dry_run=True) == (1, len("other\n"))
+    assert len(_objects(root)) == 2
+
+    assert collect_garbage(root, grace_seconds=0) == (1, len("other\n"))
+    assert len(_objects(root)) == 1
+    assert read_log_text(kept.with_name(kept.name[:-len(".ref")])) == "same\n"
+
+
+def test_gc_between_dedup_hit_and_ref_write_keeps_the_object(tmp_path, monkeypatch):
+    import os
+    import time
+    import log_storage
+    from output_logging import save_log
+    from log_storage import collect_garbage, read_log_text
+    _use_dedup(tmp_path, monkeypatch)
+    root = tmp_path / "logs"
+    orphan = save_log("same\n", "R1", argparse.Namespace(log=True, memo="a", command="show clock"))
+    orphan.unlink()
+    (obj,) = (root / "objects").glob("*/*")
+    old = time.time() - 2 * log_storage.GC_GRACE_SECONDS
+    os.utime(obj, (old, old)) # 参照されなくなって猶予期間も過ぎたオブジェクト
+
+    store = log_storage._ObjectWriter._store
+
+    def store_then_gc(self, path):
+        store(self, path)
+        assert collect_garbage(root) == (0, 0) # 参照ファイルを書く直前に gc が走る
+
+    monkeypatch.setattr(log_storage._ObjectWriter, "_store", store_then_gc)
+    ref = save_log("same\n", "R1", argparse.Namespace(log=True, memo="b", command="show clock"))
+
+    assert _objects(root) == [obj.name]
+    assert read_log_text(ref.with_name(ref.name[:-len(".ref")])) == "same\n"
+
+
+def test_archived_refs_are_inlined_and_stream_logs_are_not_deduplicated(tmp_path, monkeypatch):
+    from output_logging import save_log
+    from output_stream import HostOutputStream
+    from log_storage import archive_logs, collect_garbage, read_log_text
+    _use_dedup(tmp_path, monkeypatch)
+    root = tmp_path / "logs"
+    stream = HostOutputStream("R1", argparse.Namespace(log=True, memo="", command="show clock"), lambda *_, **__: None, live=False)
+    stream.write("10:00:00\n")
+    assert stream.close().suffix == ".log"
+
+    old = root / "execute" / "20250101" / "20250101-090000_R1_show-run.log"
+    old.parent.mkdir(parents=True)
+    ref = save_log("hostname R1\n", "R1", argparse.Namespace(log=True, memo="", command="show run"))
+    ref.rename(old.with_name(old.name + ".ref"))
+
+    archive_logs(root, ["execute"], before="20250102")
+    assert collect_garbage(root, grace_seconds=0)[0] == 1
+    assert read_log_text(old) == "hostname R1\n"
@@ -0,0 +1,92 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+def test_buffer_stays_in_memory_within_budget():
+    from output_buffer import MemoryBudget, HostTextBuffer
+    budget = MemoryBudget(100)
+    buffer = HostTextBuffer(budget)
+
+    buffer.write("R1# show clock\n")
+    buffer.write("12:00\n")
+
+    assert not buffer.spilled
+    assert buffer.getvalue() == "R1# show clock\n12:00\n"
+    assert budget.used == len("R1# show clock\n12:00\n")
+
+    buffer.close()
+    assert budget.used == 0
+
+
+def test_buffer_spills_when_budget_is_exceeded(monkeypatch):
+    import output_buffer
+    monkeypatch.setattr(output_buffer, "READ_CHUNK_SIZE", 4)
+    budget = output_buffer.MemoryBudget(10)
+    small = output_buffer.HostTextBuffer(budget)
+    large = output_buffer.HostTextBuffer(budget)
+
+    small.write("12345")
+    large.write("abc")
+    large.write("defghijk")  # 予算超過 → それまでの分も含めて一時ファイルへ
+
+    assert not small.spilled
+    assert large.spilled
+    assert budget.used == 5  # spill した分は予算に返却済み
+    assert list(large.chunks()) == ["abcd", "efgh", "ijk"]
+
+    large.write("!")  # spill 後も追記でき、読み直せる
+    assert large.getvalue() == "abcdefghijk!"
+
+    large.close()
+    small.close()
+    assert budget.used == 0
+
+
+def test_json_dump_into_buffer():
+    import json
+    from output_buffer import MemoryBudget, HostTextBuffer
+    buffer = HostTextBuffer(MemoryBudget(1))
+    data = {"interfaces": [{"name": f"Gi0/{i}"} for i in range(50)]}
+
+    json.dump(data, buffer, ensure_ascii=False, indent=2)
+
+    assert buffer.spilled
+    assert json.loads(buffer.getvalue()) == data
+    buffer.close()
+
+
+def test_write_chunks_matches_single_poutput():
+    from output_buffer import write_chunks
+    written = []
+    write_chunks(lambda msg="", *, end="\n": written.append(msg + end), ["a\n", "b"])
+    assert "".join(written) == "a\nb\n"
+
+
+def test_save_log_accepts_chunks(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from output_logging import save_log
+    monkeypatch.chdir(tmp_path)
+    args = SimpleNamespace(log=True, memo="", command="show clock", commands_list="")
+
+    log_path = save_log(iter(["R1# show clock\n", "12:00\n"]), "R1", args)
+
+    assert log_path.read_text() == "R1# show clock\n12:00\n"
+
+
+def test_get_max_buffer_bytes(monkeypatch):
+    import output_buffer
+    monkeypatch.setattr(output_buffer, "load_sys_config", lambda: {"executor": {"max_buffer_mb": 2}})
+    assert output_buffer.get_max_buffer_bytes() == 2 * 1024 * 1024
+
+    monkeypatch.setattr(output_buffer, "load_sys_config", lambda: {"executor": {}})
+    assert output_buffer.get_max_buffer_bytes() is None
+
+    monkeypatch.setattr(output_buffer, "load_sys_config", lambda: {"executor": {"max_buffer_mb": 0}})
+    with pytest.raises(ValueError):
+        output_buffer.get_max_buffer_bytes()
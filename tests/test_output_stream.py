@@ -0,0 +1,99 @@
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+class FakeBuffer:
+    def __init__(self, text):
+        self.text = text
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _flusher(hostnames):
+    from output_stream import SortedPrefixFlusher
+    emitted = []
+    return SortedPrefixFlusher(hostnames, lambda h, text_buffer: emitted.append(h)), emitted
+
+
+def test_flusher_emits_once_every_smaller_host_is_done():
+    flusher, emitted = _flusher(["R3", "R1", "R2"])
+
+    out2 = FakeBuffer("out2")
+    flusher.put("R2", "R2", out2)
+    flusher.done("R2")
+    assert emitted == []
+    assert flusher.pending == 1
+
+    flusher.put("R1", "R1", FakeBuffer("out1"))
+    flusher.done("R1")
+    assert emitted == ["R1", "R2"]
+    assert flusher.pending == 0
+    assert out2.closed
+
+    flusher.put("R3", "R3", FakeBuffer("out3"))
+    flusher.done("R3")
+    assert emitted == ["R1", "R2", "R3"]
+
+
+def test_flusher_skips_failed_hosts():
+    flusher, emitted = _flusher(["R1", "R2"])
+
+    flusher.done("R1")  # 失敗（本文無し）
+    flusher.put("R2", "R2-prompt", FakeBuffer("out2"))
+    flusher.done("R2")
+
+    assert emitted == ["R2-prompt"]
+
+
+class FakeOutput:
+    def __init__(self):
+        self.written = []
+
+    def __call__(self, msg="", *, end="\n"):
+        self.written.append(msg + end)
+
+
+@pytest.fixture
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_host_output_stream_appends_log_per_chunk(in_tmp):
+    from output_stream import HostOutputStream
+    args = SimpleNamespace(log=True, memo="", command="", commands_list="cisco-precheck", no_output=False)
+    poutput = FakeOutput()
+    stream = HostOutputStream("R1", args, poutput, live=True)
+
+    stream.write("R1# show clock\n12:00\n")
+    assert stream.log_path.read_text() == "R1# show clock\n12:00\n"  # 完了前でもログに出ている
+    stream.write("R1# show users\n\n")
+    log_path = stream.close()
+
+    assert log_path.parent.parent == Path("logs") / "execute"
+    assert log_path.read_text() == "R1# show clock\n12:00\nR1# show users\n\n"
+    assert poutput.written == ["R1# show clock\n12:00\n", "R1# show users\n\n"]
+
+
+def test_host_output_stream_keeps_text_for_ordered(in_tmp):
+    from output_stream import HostOutputStream
+    from output_buffer import HostTextBuffer
+    args = SimpleNamespace(log=False, memo="", command="show clock", commands_list="", no_output=False)
+    poutput = FakeOutput()
+    keep_buffer = HostTextBuffer()
+    stream = HostOutputStream("R1", args, poutput, live=False, keep_buffer=keep_buffer)
+
+    stream.write("R1# show clock\n12:00\n")
+
+    assert poutput.written == []
+    assert keep_buffer.getvalue() == "R1# show clock\n12:00\n"
+    assert stream.close() is None
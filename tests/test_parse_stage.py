@@ -0,0 +1,65 @@
+import pytest
+from pathlib import Path
+import textwrap
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+RAW_OUTPUT = """\
+Interface              IP-Address      OK? Method Status                Protocol
+GigabitEthernet0/0     192.0.2.1       YES manual up                    up
+GigabitEthernet0/1     unassigned      YES unset  administratively down down
+"""
+
+TEMPLATE = """\
+Value INTERFACE (\\S+)
+Value IP_ADDRESS (\\S+)
+
+Start
+  ^${INTERFACE}\\s+${IP_ADDRESS}\\s+\\w+\\s+\\w+ -> Record
+"""
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    path = tmp_path / "ip_int_brief.textfsm"
+    path.write_text(textwrap.dedent(TEMPLATE), encoding="utf-8")
+    return str(path)
+
+
+def test_parse_raw_outputs_textfsm_in_caller_thread(template_path):
+    from parse_stage import parse_raw_outputs
+    parsed = parse_raw_outputs([("show ip int brief", RAW_OUTPUT)], platform="cisco_ios",
+                               parser_kind="textfsm", textfsm_template=template_path)
+    assert parsed[0][0]["interface"] == "GigabitEthernet0/0"
+    assert parsed[0][1]["ip_address"] == "unassigned"
+
+
+def test_parse_raw_outputs_textfsm_in_process_pool(template_path):
+    from parse_stage import parse_raw_outputs, create_parse_pool
+    raw_outputs = [("show ip int brief", RAW_OUTPUT), ("show ip int brief", RAW_OUTPUT)]
+    with create_parse_pool(2) as parse_pool:
+        parsed = parse_raw_outputs(raw_outputs, platform="cisco_ios", parser_kind="textfsm",
+                                   textfsm_template=template_path, parse_pool=parse_pool)
+    assert len(parsed) == 2
+    assert parsed[1][0]["ip_address"] == "192.0.2.1"
+
+
+def test_parse_raw_output_rejects_unknown_parser():
+    from parse_stage import parse_raw_output
+    with pytest.raises(ValueError):
+        parse_raw_output("", command="show version", platform="cisco_ios", parser_kind="ttp")
+
+
+def test_spawned_workers_do_not_import_the_repl():
+    # spawn の子プロセスは main.py を __mp_main__ として import し直す。そのときに cmd2 等を読み込まないこと。
+    import subprocess
+    import sys
+    root = Path(__file__).resolve().parents[1]
+    code = "import runpy, sys; runpy.run_path('main.py', run_name='__mp_main__'); print(sorted({'cmd2', 'kero_route', 'executor'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,61 @@
+import pstats
+import tracemalloc
+import pytest
+from datetime import datetime
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+def _busy():
+    return sum(i * i for i in range(20000))
+
+
+def test_cpu_profile_saves_pstats_and_report(tmp_path):
+    from profiler import run_with_cpu_profile
+    report = run_with_cpu_profile(_busy, tmp_path / "cpu", top=5)
+
+    assert report.data_path == tmp_path / "cpu.pstats"
+    assert report.report_path.read_text(encoding="utf-8") == report.report
+    assert "_busy" in report.report
+    stats = pstats.Stats(str(report.data_path))
+    assert any(func[2] == "_busy" for func in stats.stats)
+
+
+def test_memory_profile_reports_allocations(tmp_path):
+    from profiler import run_with_memory_profile
+    kept = []
+
+    def allocate():
+        kept.append([bytearray(1024) for _ in range(1000)])
+
+    report = run_with_memory_profile(allocate, tmp_path / "mem", top=3)
+
+    assert report.report.startswith("peak: ")
+    assert "test_profiler.py" in report.report
+    assert tracemalloc.Snapshot.load(str(report.data_path)).statistics("lineno")
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_is_saved_even_if_command_fails(tmp_path):
+    from profiler import run_with_cpu_profile
+
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_with_cpu_profile(boom, tmp_path / "cpu")
+    assert (tmp_path / "cpu.pstats").exists()
+
+
+def test_build_profile_path(tmp_path, monkeypatch):
+    from profiler import build_profile_path
+    monkeypatch.chdir(tmp_path)
+    path = build_profile_path("mem", "execute --group tokyo", now=datetime(2025, 5, 4, 23, 57, 34))
+
+    assert path == Path("logs/profile/20250504/20250504-235734_mem_execute")
+    assert path.parent.is_dir()
@@ -0,0 +1,91 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+def _timings(hostname, *, status="ok", error_class=None, connect=0.3, commands=((0.2, "x" * 10),)):
+    from run_metrics import HostTimings
+    timings = HostTimings(hostname)
+    timings.add("tcp_connect", connect)
+    timings.add("ssh_auth", connect)
+    for seconds, output in commands:
+        timings.record_command("show clock", seconds, output)
+    timings.finish(status, error_class=error_class)
+    timings.elapsed = 2.0
+    return timings
+
+
+def _samples(path):
+    from prometheus_export import PrometheusTextfile
+    textfile = PrometheusTextfile(path)
+    textfile.load()
+    return textfile.samples
+
+
+def test_run_is_written_as_counters_and_histograms(tmp_path):
+    from prometheus_export import PrometheusRunRecorder
+    path = tmp_path / "keroroute.prom"
+    recorder = PrometheusRunRecorder(path, mode="execute")
+    recorder.add_host(_timings("R1"))
+    recorder.add_host(_timings("R2", status="failed", error_class="timeout", commands=()))
+
+    assert recorder.close(elapsed=4.0, workers=1) == path
+
+    samples = _samples(path)
+    mode = (("mode", "execute"),)
+    assert samples[("keroroute_hosts_attempted_total", mode)] == 2
+    assert samples[("keroroute_hosts_succeeded_total", mode)] == 1
+    assert samples[("keroroute_hosts_failed_total", (("error_class", "timeout"), ("mode", "execute")))] == 1
+    assert samples[("keroroute_connect_latency_seconds_count", mode)] == 2
+    assert samples[("keroroute_connect_latency_seconds_bucket", (("le", "0.5"), ("mode", "execute")))] == 0
+    assert samples[("keroroute_connect_latency_seconds_bucket", (("le", "1.0"), ("mode", "execute")))] == 2
+    assert samples[("keroroute_command_latency_seconds_bucket", (("le", "+Inf"), ("mode", "execute")))] == 1
+    assert samples[("keroroute_bytes_received_total", mode)] == 10
+    assert samples[("keroroute_last_run_worker_saturation", mode)] == 1.0
+
+
+def test_counters_accumulate_across_runs(tmp_path):
+    from prometheus_export import PrometheusRunRecorder
+    path = tmp_path / "keroroute.prom"
+
+    for _ in range(2):
+        recorder = PrometheusRunRecorder(path, mode="execute")
+        recorder.add_host(_timings("R1"))
+        recorder.close(elapsed=4.0, workers=2)
+    recorder = PrometheusRunRecorder(path, mode="scp")
+    recorder.add_host(_timings("R1"))
+    recorder.close(elapsed=2.0, workers=1)
+
+    samples = _samples(path)
+    assert samples[("keroroute_runs_total", (("mode", "execute"),))] == 2
+    assert samples[("keroroute_connect_latency_seconds_count", (("mode", "execute"),))] == 2
+    assert samples[("keroroute_last_run_worker_saturation", (("mode", "execute"),))] == 0.25
+    assert samples[("keroroute_runs_total", (("mode", "scp"),))] == 1
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_histogram_lines_are_ordered(tmp_path):
+    from prometheus_export import PrometheusRunRecorder
+    path = tmp_path / "keroroute.prom"
+    recorder = PrometheusRunRecorder(path, mode="configure")
+    recorder.add_host(_timings("R1"))
+    recorder.close(elapsed=1.0, workers=1)
+
+    lines = [line for line in path.read_text(encoding="utf-8").splitlines() if line.startswith("keroroute_connect_latency_seconds")]
+    assert lines[0] == 'keroroute_connect_latency_seconds_bucket{mode="configure",le="0.1"} 0'
+    assert lines[-3] == 'keroroute_connect_latency_seconds_bucket{mode="configure",le="+Inf"} 1'
+    assert lines[-2].startswith("keroroute_connect_latency_seconds_sum")
+    assert lines[-1] == 'keroroute_connect_latency_seconds_count{mode="configure"} 1'
+    assert "# TYPE keroroute_connect_latency_seconds histogram" in path.read_text(encoding="utf-8")
+
+
+def test_prometheus_is_disabled_by_default(tmp_path):
+    from prometheus_export import create_prometheus_recorder
+    assert create_prometheus_recorder("execute", {}) is None
+    recorder = create_prometheus_recorder("execute", {"prometheus": {"enabled": True, "path": str(tmp_path / "k.prom")}})
+    assert recorder.path == tmp_path / "k.prom"
@@ -0,0 +1,136 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+class FakeConnection:
+    """ログイン直後が `>` か `#` かを切り替えられる Netmiko 接続もどき。"""
+
+    def __init__(self, base_prompt="R1", enabled=False):
+        self.base_prompt = base_prompt
+        self.enabled = enabled
+        self.calls = []
+
+    def find_prompt(self):
+        self.calls.append("find_prompt")
+        return f"{self.base_prompt}{'#' if self.enabled else '>'}"
+
+    def check_enable_mode(self):
+        self.calls.append("check_enable_mode")
+        return self.enabled
+
+    def enable(self):
+        self.calls.append("enable")
+        self.enabled = True
+
+    def set_base_prompt(self):
+        self.calls.append("set_base_prompt")
+
+    def disconnect(self):
+        self.calls.append("disconnect")
+
+
+DEVICE = {"device_type": "cisco_ios", "ip": "192.0.2.1", "port": 22, "username": "admin", "password": "cisco", "secret": "cisco"}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    import connect_device
+    from prompt_cache import PromptCache
+    cache = PromptCache(path=tmp_path / "prompt_cache.json")
+    monkeypatch.setattr(connect_device, "get_prompt_cache", lambda: cache)
+    return cache
+
+
+def _connect(monkeypatch, connection):
+    import connect_device
+    monkeypatch.setattr(connect_device, "ConnectHandler", lambda **kwargs: connection)
+    return connect_device.connect_to_device(dict(DEVICE), "R1")
+
+
+def test_cache_roundtrip_through_file(tmp_path):
+    from prompt_cache import PromptCache
+    cache = PromptCache(path=tmp_path / "prompt_cache.json")
+    cache.put(DEVICE, base_prompt="R1", prompt="R1#", hostname="R1", enable_required=True)
+    cache.flush()
+
+    reloaded = PromptCache(path=tmp_path / "prompt_cache.json")
+    assert reloaded.get(DEVICE)["prompt"] == "R1#"
+    assert reloaded.get({**DEVICE, "port": 2222}) is None
+
+
+def test_updates_are_written_once_on_flush(tmp_path, monkeypatch):
+    import prompt_cache
+    cache = prompt_cache.PromptCache(path=tmp_path / "prompt_cache.json")
+    saves = []
+    real_save = cache._save
+    monkeypatch.setattr(cache, "_save", lambda entries: (saves.append(len(entries)), real_save(entries)))
+
+    for port in range(50):
+        cache.put({**DEVICE, "port": 2000 + port}, base_prompt="R1", prompt="R1#", hostname="R1", enable_required=False)
+    assert saves == []
+    assert not (tmp_path / "prompt_cache.json").exists()
+
+    cache.flush()
+    cache.flush()
+    assert saves == [50]
+    assert prompt_cache.PromptCache(path=tmp_path / "prompt_cache.json").get({**DEVICE, "port": 2049})["prompt"] == "R1#"
+
+
+def test_expired_entry_is_ignored(tmp_path, monkeypatch):
+    import prompt_cache
+    cache = prompt_cache.PromptCache(path=tmp_path / "prompt_cache.json", ttl=60)
+    cache.put(DEVICE, base_prompt="R1", prompt="R1#", hostname="R1", enable_required=False)
+
+    real_time = prompt_cache.time.time
+    monkeypatch.setattr(prompt_cache.time, "time", lambda: real_time() + 61)
+    assert cache.get(DEVICE) is None
+
+
+def test_broken_cache_file_is_ignored(tmp_path):
+    from prompt_cache import PromptCache
+    path = tmp_path / "prompt_cache.json"
+    path.write_text("{not json")
+    assert PromptCache(path=path).get(DEVICE) is None
+
+
+def test_first_connect_populates_cache(cache, monkeypatch):
+    connection, prompt, hostname = _connect(monkeypatch, FakeConnection(enabled=False))
+
+    assert (prompt, hostname) == ("R1#", "R1")
+    entry = cache.get(DEVICE)
+    assert entry["enable_required"] is True
+    assert entry["prompt"] == "R1#"
+
+
+def test_fast_connect_skips_enable_checks(cache, monkeypatch):
+    cache.put(DEVICE, base_prompt="R1", prompt="R1#", hostname="R1", enable_required=False)
+
+    connection, prompt, hostname = _connect(monkeypatch, FakeConnection(enabled=True))
+
+    assert (prompt, hostname) == ("R1#", "R1")
+    assert connection.calls == ["find_prompt"]
+
+
+def test_fast_connect_enables_without_checking_first(cache, monkeypatch):
+    cache.put(DEVICE, base_prompt="R1", prompt="R1#", hostname="R1", enable_required=True)
+
+    connection, prompt, _ = _connect(monkeypatch, FakeConnection(enabled=False))
+
+    assert prompt == "R1#"
+    assert connection.calls == ["find_prompt", "enable"]
+
+
+def test_mismatch_falls_back_and_refreshes_cache(cache, monkeypatch):
+    cache.put(DEVICE, base_prompt="OLD-R1", prompt="OLD-R1#", hostname="OLD-R1", enable_required=False)
+
+    connection, prompt, hostname = _connect(monkeypatch, FakeConnection(base_prompt="R1", enabled=True))
+
+    assert (prompt, hostname) == ("R1#", "R1")
+    assert "set_base_prompt" in connection.calls
+    assert cache.get(DEVICE)["base_prompt"] == "R1"
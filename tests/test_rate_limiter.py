@@ -0,0 +1,108 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_spaces_out():
+    from rate_limiter import TokenBucket
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.reserve() for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.5)
+    assert waits[4] == pytest.approx(1.0)
+
+
+def test_token_bucket_refills_over_time():
+    from rate_limiter import TokenBucket
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, burst=1, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0.0
+    clock.now += 1.0
+    assert bucket.acquire() == 0.0
+
+
+def test_invalid_rate():
+    from rate_limiter import TokenBucket
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
+
+
+INVENTORY = {
+    "all": {
+        "hosts": {
+            "R1": {"hostname": "R1", "ip": "192.0.2.1", "tags": ["core"]},
+            "SAT1": {"hostname": "SAT1", "ip": "192.0.2.9", "tags": ["satellite"]},
+        },
+        "groups": {
+            "branch": {"tags": ["wan"], "hosts": ["SAT1"]},
+        },
+    }
+}
+
+
+def test_buckets_for_group_and_tag_members():
+    from rate_limiter import ConnectionRateLimiter, TokenBucket, _inventory_memberships
+    branch = TokenBucket(rate=1, burst=1)
+    satellite = TokenBucket(rate=1, burst=1)
+    limiter = ConnectionRateLimiter(group_buckets={"branch": branch}, tag_buckets={"satellite": satellite},
+                                    memberships=_inventory_memberships(INVENTORY), jitter=0)
+
+    assert limiter.buckets_for("SAT1") == [limiter.global_bucket, branch, satellite]
+    assert limiter.buckets_for("192.0.2.9", {"ip": "192.0.2.9"}) == [limiter.global_bucket, branch, satellite]
+    assert limiter.buckets_for("R1") == [limiter.global_bucket]
+    assert limiter.buckets_for("unknown") == [limiter.global_bucket]
+
+
+def test_wait_for_slot_records_wait_with_jitter():
+    from rate_limiter import ConnectionRateLimiter, pop_rate_limit_wait
+    slept = []
+    limiter = ConnectionRateLimiter(rate=100, burst=100, jitter=0.5, sleep=slept.append)
+
+    pop_rate_limit_wait()
+    waited = limiter.wait_for_slot("R1")
+
+    assert 0 <= waited <= 0.5
+    assert slept == [waited]
+    assert pop_rate_limit_wait() == pytest.approx(waited)
+    assert pop_rate_limit_wait() == 0.0
+
+
+def test_memberships_follow_inventory_changes(tmp_path, monkeypatch):
+    import os
+    from ruamel.yaml import YAML
+    import rate_limiter
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rate_limiter, "_memberships_cache", (None, {}))
+    inventory = tmp_path / "inventory.yaml"
+    assert rate_limiter._current_memberships() == {}
+
+    YAML().dump(INVENTORY, inventory)
+    assert rate_limiter._current_memberships()["SAT1"] == ({"branch"}, {"wan", "satellite"})
+
+    moved = {"all": {"hosts": INVENTORY["all"]["hosts"], "groups": {"core": {"hosts": ["SAT1"]}}}}
+    YAML().dump(moved, inventory)
+    stat = inventory.stat()
+    os.utime(inventory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert rate_limiter._current_memberships()["SAT1"] == ({"core"}, {"satellite"})
@@ -0,0 +1,114 @@
+import json
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+def _handler(device, args, poutput, hostname, *, fail=False):
+    from run_metrics import timed, record_command
+    from run_result import HostResult
+    with timed("connect"):
+        pass
+    record_command("show clock", 0.25, "12:00 UTC")
+    record_command("show users", 0.5, "ユーザー")
+    return HostResult.failure(hostname, "timeout", "timed out") if fail else HostResult.success(hostname)
+
+
+def _read_records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_run_records_phases_commands_and_bytes(tmp_path):
+    from run_metrics import RunMetrics
+    path = tmp_path / "metrics.jsonl"
+
+    with RunMetrics(path, mode="execute", run_info={"target": "lab"}) as run_metrics:
+        r1_result = run_metrics.run(_handler, {}, None, None, "R1")
+        r2_result = run_metrics.run(_handler, {}, None, None, "R2", fail=True)
+
+    run, r1, r2, run_end = _read_records(path)
+    assert run["type"] == "run" and run["mode"] == "execute" and run["target"] == "lab"
+    assert r1["hostname"] == "R1" and r1["status"] == "ok"
+    assert set(r1["phases"]) == {"connect", "command"}
+    assert r1["phases"]["command"] == pytest.approx(0.75)
+    assert [c["command"] for c in r1["commands"]] == ["show clock", "show users"]
+    assert r1["bytes_received"] == len("12:00 UTC") + len("ユーザー".encode("utf-8"))
+    assert r2["status"] == "failed" and r2["error_class"] == "timeout"
+    assert r1_result.ok and r1_result.timings.bytes_received == r1["bytes_received"]
+    assert not r2_result.ok
+    assert run_end["type"] == "run_end" and run_end["hosts"] == 2 and run_end["failed"] == 1
+
+
+def test_unhandled_exception_is_recorded_as_error(tmp_path):
+    from run_metrics import RunMetrics, current_timings
+    path = tmp_path / "metrics.jsonl"
+
+    def boom(device, args, poutput, hostname):
+        raise RuntimeError("boom")
+
+    with RunMetrics(path, mode="execute") as run_metrics:
+        with pytest.raises(RuntimeError):
+            run_metrics.run(boom, {}, None, None, "R1")
+
+    assert _read_records(path)[1]["status"] == "error"
+    assert current_timings() is None
+
+
+def test_timed_without_host_is_noop():
+    from run_metrics import timed, record_command, current_timings
+    with timed("connect"):
+        record_command("show clock", 0.1, "x")
+    assert current_timings() is None
+
+
+def test_disabled_metrics_do_not_write(tmp_path):
+    from run_metrics import RunMetrics
+    run_metrics = RunMetrics(None, mode="execute")
+
+    assert run_metrics.run(_handler, {}, None, None, "R1").ok
+    assert run_metrics.close() is None
+    assert run_metrics.hosts == 1
+
+
+def test_runs_in_the_same_second_do_not_overwrite_each_other(tmp_path):
+    from run_metrics import RunMetrics
+    path = tmp_path / "20250101-090000_execute_R1.jsonl"
+    first = RunMetrics(path, mode="execute")
+    second = RunMetrics(path, mode="execute")
+
+    assert first.close() == path
+    assert second.close() == tmp_path / "20250101-090000_execute_R1-1.jsonl"
+    assert all(p.read_text(encoding="utf-8").count("\n") == 2 for p in (first.path, second.path))
+
+
+def test_preconnect_only_for_plain_ssh():
+    from connect_device import _can_preconnect
+    assert _can_preconnect({"device_type": "cisco_ios", "ip": "192.0.2.1"})
+    assert not _can_preconnect({"device_type": "cisco_ios_telnet", "ip": "192.0.2.1"})
+    assert not _can_preconnect({"device_type": "cisco_ios_serial", "serial_settings": {"port": "COM1"}})
+    assert not _can_preconnect({"device_type": "cisco_ios", "ip": "192.0.2.1", "ssh_config_file": "~/.ssh/config"})
+
+
+def test_connect_is_split_only_when_metrics_are_written(tmp_path, monkeypatch):
+    import connect_device
+    from run_metrics import RunMetrics
+    from run_result import HostResult
+    calls = []
+    monkeypatch.setattr(connect_device, "ConnectHandler", lambda **kwargs: calls.append(kwargs) or object())
+    monkeypatch.setattr(connect_device, "_preconnect_socket", lambda device: "sock")
+
+    def connect(device, args, poutput, hostname):
+        connect_device._connect_handler({"device_type": "cisco_ios", "ip": "192.0.2.1"})
+        return HostResult.success(hostname)
+
+    RunMetrics(None, mode="execute").run(connect, {}, None, None, "R1")
+    with RunMetrics(tmp_path / "metrics.jsonl", mode="execute") as run_metrics:
+        run_metrics.run(connect, {}, None, None, "R1")
+
+    assert "sock" not in calls[0] # 書き出さないときは ConnectHandler(**device) のまま
+    assert calls[1]["sock"] == "sock"
@@ -0,0 +1,82 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+    monkeypatch.chdir(root) # sys_config.yaml（テーブルのテーマ）を読むため
+
+
+def _result(hostname, elapsed, phases, *, status="ok"):
+    from run_metrics import HostTimings
+    from run_result import HostResult
+    timings = HostTimings(hostname)
+    for name, seconds in phases.items():
+        timings.add(name, seconds)
+    timings.finish(status)
+    timings.elapsed = elapsed
+    return HostResult(hostname, status, timings=timings)
+
+
+def test_percentile_interpolates_like_numpy():
+    from run_result import percentile
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert percentile(values, 50) == pytest.approx(5.5)
+    assert percentile(values, 95) == pytest.approx(9.55)
+    assert percentile(values, 99) == pytest.approx(9.91)
+    assert percentile([3.0], 99) == 3.0
+
+
+def test_phase_percentiles_and_slowest():
+    from run_result import RunResult
+    run_result = RunResult("execute")
+    for i in range(1, 21):
+        run_result.add(_result(f"R{i:02}", float(i), {"ssh_auth": i / 10, "command": 0.5}))
+    run_result.add(_result("DEAD", 30.0, {"tcp_connect": 10.0}, status="failed"))
+
+    percentiles = run_result.phase_percentiles()
+    assert set(percentiles) == {"ssh_auth", "command", "tcp_connect", "total"}
+    assert percentiles["command"][99] == pytest.approx(0.5)
+    assert percentiles["ssh_auth"][50] == pytest.approx(1.05)
+
+    slowest = run_result.slowest()
+    assert len(slowest) == 10
+    assert [r.hostname for r in slowest[:2]] == ["DEAD", "R20"]
+    assert run_result.failed_hostnames == ["DEAD"]
+
+
+def test_throughput_is_hosts_per_minute():
+    from run_result import RunResult, HostResult
+    clock = iter([0.0, 30.0])
+    run_result = RunResult("configure", clock=lambda: next(clock))
+    for hostname in ("R1", "R2", "R3"):
+        run_result.add(HostResult.success(hostname))
+    run_result.finish()
+
+    assert run_result.throughput == pytest.approx(6.0)
+
+
+def test_results_without_timings_are_skipped_in_percentiles():
+    from run_result import RunResult, HostResult, STATUS_DEADLINE
+    run_result = RunResult("execute")
+    run_result.add(HostResult.failure("R1", "deadline", "cut off", status=STATUS_DEADLINE))
+
+    assert run_result.phase_percentiles() == {}
+    assert run_result.slowest() == []
+    assert run_result.hostnames_with_status(STATUS_DEADLINE) == ["R1"]
+
+
+def test_summary_tables_render():
+    from rich.console import Console
+    from run_result import RunResult, build_summary_tables
+    run_result = RunResult("execute")
+    run_result.add(_result("R1", 2.0, {"ssh_auth": 1.5}))
+    run_result.finish()
+
+    console = Console(record=True, width=200)
+    for table in build_summary_tables(run_result):
+        console.print(table)
+    text = console.export_text()
+    assert "ssh_auth" in text and "P99" in text and "R1" in text
@@ -0,0 +1,87 @@
+import json
+import pytest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.syspath_prepend(str(root))
+
+
+def _handler(device, args, poutput, hostname):
+    from run_metrics import timed, record_command
+    from run_result import HostResult
+    with timed("connect"):
+        with timed("ssh_auth"):
+            pass
+    record_command("show clock", 0.25, "12:00 UTC")
+    return HostResult.success(hostname)
+
+
+def _spans(trace, category):
+    return [event for event in trace["traceEvents"] if event["ph"] == "X" and event["cat"] == category]
+
+
+def test_trace_has_host_phase_and_command_spans(tmp_path):
+    from run_metrics import RunMetrics
+    from trace_export import TraceRecorder
+    path = tmp_path / "trace.json"
+
+    with RunMetrics(None, mode="execute", trace=TraceRecorder(path, mode="execute", run_info={"target": "lab"})) as run_metrics:
+        run_metrics.run(_handler, {}, None, None, "R1")
+
+    trace = json.loads(path.read_text(encoding="utf-8"))
+    (run_span,) = _spans(trace, "run")
+    (host_span,) = _spans(trace, "host")
+    phase_names = {event["name"] for event in _spans(trace, "phase")}
+    (command_span,) = _spans(trace, "command")
+
+    assert run_span["name"] == "execute" and run_span["args"]["target"] == "lab"
+    assert host_span["name"] == "R1" and host_span["args"]["status"] == "ok"
+    assert phase_names == {"connect", "ssh_auth"}
+    assert command_span["name"] == "show clock" and command_span["args"]["hostname"] == "R1"
+    # フェーズはホストの区間の中に収まる（Perfetto で入れ子に表示される）
+    for event in _spans(trace, "phase"):
+        assert event["tid"] == host_span["tid"]
+        assert host_span["ts"] <= event["ts"] and event["ts"] + event["dur"] <= host_span["ts"] + host_span["dur"] + 1
+
+
+def test_trace_names_worker_threads(tmp_path):
+    from run_metrics import RunMetrics
+    from trace_export import TraceRecorder
+    path = tmp_path / "trace.json"
+
+    with RunMetrics(None, mode="execute", trace=TraceRecorder(path, mode="execute")) as run_metrics:
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="kero-test") as pool:
+            list(pool.map(lambda hostname: run_metrics.run(_handler, {}, None, None, hostname), ["R1", "R2", "R3", "R4"]))
+
+    trace = json.loads(path.read_text(encoding="utf-8"))
+    thread_names = {event["tid"]: event["args"]["name"] for event in trace["traceEvents"] if event["name"] == "thread_name"}
+    host_spans = _spans(trace, "host")
+
+    assert sorted(event["name"] for event in host_spans) == ["R1", "R2", "R3", "R4"]
+    assert all(thread_names[event["tid"]].startswith("kero-test") for event in host_spans)
+    assert trace["otherData"]["hosts"] == 4
+
+
+def test_hosts_after_close_are_dropped(tmp_path):
+    from run_metrics import HostTimings
+    from trace_export import TraceRecorder
+    recorder = TraceRecorder(tmp_path / "trace.json", mode="execute")
+    timings = HostTimings("R1")
+    timings.finish("ok")
+
+    assert recorder.close() == tmp_path / "trace.json"
+    recorder.add_host(timings)
+    assert recorder.close() is None
+    assert _spans(json.loads((tmp_path / "trace.json").read_text(encoding="utf-8")), "host") == []
+
+
+def test_create_trace_recorder_only_with_trace_option(tmp_path):
+    from trace_export import create_trace_recorder
+    assert create_trace_recorder("execute", SimpleNamespace(trace=None)) is None
+    assert create_trace_recorder("execute", SimpleNamespace()) is None
+    assert create_trace_recorder("scp", SimpleNamespace(trace=str(tmp_path / "t.json"))).path == tmp_path / "t.json"
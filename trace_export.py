@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from pathlib import Path
+from time import perf_counter
+
+# trace_export.py
+# 役割:
+# - --trace FILE 用に、1 回の実行をタイムライン（Chrome trace-event 形式の JSON）として書き出す（TraceRecorder）
+#   - ホストごとの区間と、その中のフェーズ（TCP 接続 / SSH 認証 / enable / 各コマンド / パース / ログ保存 / 表示 など）
+#   - 区間は処理したスレッドの行に並ぶので、ワーカーの使われ方・空き時間・最後まで残ったホストが見える
+# - 出力は Perfetto（https://ui.perfetto.dev）や chrome://tracing でそのまま開ける🐸
+# 記録する区間は run_metrics.HostTimings が持っている。ここではそれをイベントに変換するだけ。
+
+
+#######################
+###  CONST_SECTION  ###
+#######################
+CATEGORY_RUN = "run"
+CATEGORY_HOST = "host"
+CATEGORY_PHASE = "phase"
+CATEGORY_COMMAND = "command"
+
+
+class TraceRecorder:
+    """
+    1 回の実行のタイムライン。`add_host()` はスレッドセーフ。
+
+    時刻はすべて perf_counter() の値で受け取り、作成時点を 0 としたマイクロ秒に変換する。
+    `close()` で、実行全体の区間（作成したスレッドの行）とスレッド名を付けて書き出す。
+    close() の後に add_host() されたホスト（--deadline で打ち切った後に終わったもの等）は捨てる。
+    """
+
+    def __init__(self, path: Path, *, mode: str, run_info: dict | None = None, clock=perf_counter):
+        self.path = path
+        self.mode = mode
+        self.run_info = dict(run_info or {})
+        self._clock = clock
+        self._origin = clock()
+        self._pid = os.getpid()
+        self._main_thread = (threading.get_native_id(), threading.current_thread().name)
+        self._threads: dict[int, str] = {}
+        self._events: list[dict] = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _timestamp(self, perf: float) -> float:
+        return round((perf - self._origin) * 1_000_000, 3)
+
+    def _span(self, name: str, category: str, started: float, finished: float, thread_id: int, args: dict | None = None) -> dict:
+        event = {"name": name,
+                 "cat": category,
+                 "ph": "X",
+                 "ts": self._timestamp(started),
+                 "dur": round(max(0.0, finished - started) * 1_000_000, 3),
+                 "pid": self._pid,
+                 "tid": thread_id}
+        if args:
+            event["args"] = args
+        return event
+
+    def add_host(self, timings) -> None:
+        """終わったホストの HostTimings（run_metrics.py。finish() 済み）を、ホストの区間とフェーズの区間に変換して追加する。"""
+        finished = timings.perf_started + (timings.elapsed or 0.0)
+        events = [self._span(timings.hostname, CATEGORY_HOST, timings.perf_started, finished, timings.thread_id,
+                             {"status": timings.status,
+                              "error_class": timings.error_class,
+                              "bytes_received": timings.bytes_received,
+                              "log_path": str(timings.log_path) if timings.log_path is not None else None})]
+        for name, started, span_finished, detail in timings.spans:
+            if name == "command" and detail:
+                # コマンドはコマンド文字列を区間名にする（どのコマンドが遅いか見えるように）
+                events.append(self._span(detail["command"], CATEGORY_COMMAND, started, span_finished, timings.thread_id,
+                                         {"hostname": timings.hostname, "bytes": detail["bytes"]}))
+            else:
+                events.append(self._span(name, CATEGORY_PHASE, started, span_finished, timings.thread_id,
+                                         {"hostname": timings.hostname, **(detail or {})}))
+
+        with self._lock:
+            if self._closed:
+                return
+            self._threads.setdefault(timings.thread_id, timings.thread_name)
+            self._events.extend(events)
+
+    def build(self) -> dict:
+        """書き出す JSON（{"traceEvents": [...]} 形式）を組み立てる。"""
+        main_thread_id, main_thread_name = self._main_thread
+        with self._lock:
+            threads = {main_thread_id: main_thread_name, **self._threads}
+            events = list(self._events)
+
+        metadata = [{"name": "process_name", "ph": "M", "pid": self._pid, "tid": main_thread_id,
+                     "args": {"name": f"KeroRoute {self.mode}"}}]
+        for sort_index, (thread_id, thread_name) in enumerate(sorted(threads.items(), key=lambda item: item[0] != main_thread_id)):
+            metadata.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": thread_id, "args": {"name": thread_name}})
+            metadata.append({"name": "thread_sort_index", "ph": "M", "pid": self._pid, "tid": thread_id, "args": {"sort_index": sort_index}})
+
+        run_span = self._span(self.mode, CATEGORY_RUN, self._origin, self._clock(), main_thread_id,
+                              {key: value for key, value in self.run_info.items() if value is not None})
+        return {"traceEvents": metadata + [run_span] + sorted(events, key=lambda event: event["ts"]),
+                "displayTimeUnit": "ms",
+                "otherData": {"mode": self.mode, "hosts": sum(1 for event in events if event["cat"] == CATEGORY_HOST)}}
+
+    def close(self) -> Path | None:
+        """タイムラインを書き出して保存先を返す（2 回目以降は何もせず None）。"""
+        with self._lock:
+            if self._closed:
+                return None
+            self._closed = True
+        trace = self.build()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 書きかけのファイルを Perfetto で開いてしまわないよう、一時ファイルに書いてから置き換える。
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        return self.path
+
+
+def create_trace_recorder(mode: str, args, *, run_info: dict | None = None) -> TraceRecorder | None:
+    """--trace FILE が指定されていれば、その実行の TraceRecorder を作る（無ければ None）。"""
+    trace_file = getattr(args, "trace", None)
+    if not trace_file:
+        return None
+    return TraceRecorder(Path(trace_file).expanduser(), mode=mode, run_info=run_info)
@@ -1,10 +1,66 @@
+import os
 from load_and_validate_yaml import load_sys_config
+from adaptive_concurrency import AdaptiveConcurrencyController
 
 
 #######################
 ###  CONST_SECTION  ### 
 #######################
 DEFAULT_MAX_WORKERS = 20 # 並列スレッド上限。(sys_config.yamlに設定が無い場合に参照。)
+AUTO_WORKERS = "auto" # --workers auto で適応的な同時実行数制御を使う。
+DEFAULT_MAX_ADAPTIVE_WORKERS = 100 # --workers auto 時の上限。(sys_config.yamlに設定が無い場合に参照。)
+DEFAULT_INITIAL_ADAPTIVE_WORKERS = 10 # --workers auto 時の開始値。
+
+
+def workers_option(value: str) -> int | str:
+    """
+    --workers の argparse 用 type 関数。整数または "auto" を受け付ける。
+    値の範囲チェック(1以上)は default_workers() 側で行う。
+    """
+    if value == AUTO_WORKERS:
+        return AUTO_WORKERS
+    return int(value)
+
+
+def _load_adaptive_config() -> dict:
+    system_config = load_sys_config()
+    adaptive_config = (system_config.get("executor") or {}).get("adaptive") or {}
+
+    for key in ("min_workers", "max_workers", "initial_workers"):
+        value = adaptive_config.get(key)
+        if value is None:
+            continue
+        if type(value) != int or value <= 0:
+            msg = f"sys_config.yamlのexecutor.adaptive.{key}には1以上の整数を指定してくださいケロ🐸"
+            raise ValueError(msg)
+
+    return adaptive_config
+
+
+def create_adaptive_controller(pool_size: int) -> AdaptiveConcurrencyController:
+    """
+    --workers auto 用のコントローラを `sys_config.yaml` の `executor.adaptive` から作成する。
+
+    Parameters
+    ----------
+    pool_size : int
+        ThreadPoolExecutor に確保したワーカー数（上限として使う）
+
+    Raises
+    ------
+    ValueError
+        `executor.adaptive` に不正な型や値が書かれていた場合
+    """
+    adaptive_config = _load_adaptive_config()
+    latency_tolerance = adaptive_config.get("latency_tolerance", 3.0)
+    if not isinstance(latency_tolerance, (int, float)) or latency_tolerance <= 1:
+        msg = "sys_config.yamlのexecutor.adaptive.latency_toleranceには1より大きい数値を指定してくださいケロ🐸"
+        raise ValueError(msg)
+
+    return AdaptiveConcurrencyController(max_limit=pool_size,
+                                         min_limit=adaptive_config.get("min_workers", 1),
+                                         initial_limit=adaptive_config.get("initial_workers", DEFAULT_INITIAL_ADAPTIVE_WORKERS),
+                                         latency_tolerance=latency_tolerance)
 
 
 def default_workers(group_size: int, args) -> int:
@@ -18,6 +74,9 @@ def default_workers(group_size: int, args) -> int:
 
     ただし、最終的には `group_size`（ホスト台数）と `DEFAULT_MAX_WORKERS` の両方を超えないように調整する。
 
+    `--workers auto` のときは `executor.adaptive.max_workers`（無ければ `DEFAULT_MAX_ADAPTIVE_WORKERS`）と
+    `group_size` の小さい方を返す。実際の同時実行数は `create_adaptive_controller()` が実行中に調整する。
+
     Parameters
     ----------
     group_size : int
@@ -38,6 +97,9 @@ def default_workers(group_size: int, args) -> int:
     """
     workers = args.workers
 
+    if workers == AUTO_WORKERS:
+        return min(_load_adaptive_config().get("max_workers", DEFAULT_MAX_ADAPTIVE_WORKERS), group_size)
+
     if workers or workers == 0: # workers が None なら False、0 だけ特別に True 扱い
         if type(workers) != int:
                 msg = "--workersは整数である必要があるケロ🐸。"
@@ -61,4 +123,30 @@ def default_workers(group_size: int, args) -> int:
 
 
     workers = min(workers, group_size, DEFAULT_MAX_WORKERS)
-    return workers
\ No newline at end of file
+    return workers
+
+
+def default_parse_workers(group_size: int) -> int:
+    """
+    --parser 使用時のパース用プロセス数を決定する。
+
+    `sys_config.yaml` の `executor.parse_workers` を参照し、未設定なら CPU コア数を使う。
+    最終的には `group_size` を超えないように調整する。
+
+    Raises
+    ------
+    ValueError
+        `sys_config.yaml` に不正な型や値が書かれていた場合
+    """
+    system_config = load_sys_config()
+    parse_workers = (system_config.get("executor") or {}).get("parse_workers") or os.cpu_count() or 1
+
+    if type(parse_workers) != int:
+        msg = "sys_config.yamlのexecutor.parse_workersは整数である必要があるケロ🐸。"
+        raise ValueError(msg)
+
+    if parse_workers <= 0:
+        msg = "executor.parse_workersには1以上の整数を指定してくださいケロ🐸"
+        raise ValueError(msg)
+
+    return min(parse_workers, group_size)